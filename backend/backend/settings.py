@@ -32,8 +32,113 @@ ALLOWED_HOSTS = []
 WSGI_APPLICATION = 'backend.wsgi.application'
 
 DUMP1090_POLLING_TIME = 2
+DUMP1090_MAX_WORKERS = 8
+
+# Receivers to poll, as name=url pairs separated by commas. Each one gets
+# its own poll-dump1090-<name> beat entry on dump1090_queue, so polls are
+# spread over every worker consuming it. With more than one receiver an
+# aircraft is stored once per DUMP1090_MERGE_WINDOW seconds, from whichever
+# receiver reports it first.
+DUMP1090_RECEIVERS = config(
+    'DUMP1090_RECEIVERS', default='default=http://dump1090:8080',
+    cast=lambda value: dict(entry.strip().split('=', 1) for entry in value.split(',') if entry.strip()),
+)
+DUMP1090_MERGE_WINDOW = DUMP1090_POLLING_TIME
+
+# Only one poll per receiver runs at a time; ticks that find it still running
+# are skipped. Polls (and their retries) expire DUMP1090_POLL_STALE_AFTER
+# seconds after beat sends them. The 'adaptive' scheduler also stretches a
+# receiver's interval, up to DUMP1090_POLL_MAX_INTERVAL, while polls take
+# longer than DUMP1090_POLLING_TIME or more than DUMP1090_POLL_QUEUE_LIMIT
+# polls are queued. Counters and timings are at /api/poll_stats/.
+DUMP1090_POLL_SCHEDULER = config('DUMP1090_POLL_SCHEDULER', default='fixed')
+DUMP1090_POLL_STALE_AFTER = 2 * DUMP1090_POLLING_TIME
+DUMP1090_POLL_MAX_INTERVAL = 30
+DUMP1090_POLL_QUEUE_LIMIT = 10
+
+# Ingest stage timings, upstream request outcomes, enrichment cache hits and
+# queries/aircraft per poll, summed across workers in Redis and served in
+# Prometheus format at /metrics. Off, the instrumentation costs next to nothing.
+DUMP1090_METRICS_ENABLED = config('DUMP1090_METRICS_ENABLED', default=True, cast=bool)
+
+# 'poll' fetches aircraft.json every DUMP1090_POLLING_TIME seconds; 'stream'
+# runs the stream_dump1090 collector on dump1090's TCP feed instead
+# (DUMP1090_STREAM_FORMAT sbs on 30003, raw on 30002 or beast on 30005) and
+# stores changed aircraft every DUMP1090_STREAM_FLUSH_INTERVAL seconds.
+DUMP1090_INGEST = config('DUMP1090_INGEST', default='poll')
+DUMP1090_STREAM_HOST = config('DUMP1090_STREAM_HOST', default='dump1090')
+DUMP1090_STREAM_FORMAT = config('DUMP1090_STREAM_FORMAT', default='sbs')
+DUMP1090_STREAM_PORT = config('DUMP1090_STREAM_PORT', default=30003, cast=int)
+DUMP1090_STREAM_FLUSH_INTERVAL = 0.5
+DUMP1090_STREAM_MAX_BATCH = 500
+
 CACHE_TTL = 600
 
+# adsbdb answers are cached with a TTL that depends on what came back:
+# CACHE_TTL for real data, longer for "unknown" answers (military and private
+# aircraft never resolve) and short for transport errors. TTLs are spread by
+# +/- ENRICHMENT_CACHE_JITTER, and each worker keeps the hot set in a local
+# ENRICHMENT_L1_SIZE-entry cache for up to ENRICHMENT_L1_TTL seconds.
+ENRICHMENT_UNKNOWN_TTL = 6 * 60 * 60
+ENRICHMENT_ERROR_TTL = 60
+ENRICHMENT_CACHE_JITTER = 0.1
+ENRICHMENT_L1_TTL = 60
+ENRICHMENT_L1_SIZE = 10000
+
+ADSBDB_BASE_URL = 'https://api.adsbdb.com/v0'
+ADSBDB_MAX_IN_FLIGHT = 8
+ADSBDB_RATE_LIMIT = 20  # requests per second across every worker, via a token bucket in Redis
+ADSBDB_RATE_BURST = 40
+
+# Lookups that miss the cache are queued on enrichment_queue and back-filled
+# onto positions stored within the last ENRICHMENT_BACKFILL_WINDOW seconds.
+ENRICHMENT_PENDING_TTL = 120
+ENRICHMENT_BACKFILL_WINDOW = 3600
+
+# Only store a position when it changed since the last stored row for that
+# hex, or every DUMP1090_DELTA_HEARTBEAT seconds for aircraft holding still.
+DUMP1090_DELTA_ENABLED = True
+DUMP1090_DELTA_HEARTBEAT = 30
+
+# Every poll also refreshes the current picture in Redis (a hash per hex and
+# a sorted set by last-seen time) behind /api/live/. Aircraft drop out after
+# DUMP1090_LIVE_TTL seconds; the endpoint defaults to DUMP1090_LIVE_MAX_AGE.
+DUMP1090_LIVE_TTL = 300
+DUMP1090_LIVE_MAX_AGE = 60
+
+# Raw positions are kept for DUMP1090_RAW_RETENTION_DAYS, per-minute rollups
+# and flight sessions for DUMP1090_ROLLUP_RETENTION_DAYS (None keeps
+# everything). Once
+# `manage.py partition_flightdata` has been run, FlightData is partitioned by
+# day (or 'week') and expiry drops whole partitions instead of deleting rows;
+# only positions that fell into the default partition are deleted one by one.
+DUMP1090_PARTITION_INTERVAL = 'day'
+DUMP1090_PARTITION_PREMAKE = 3
+DUMP1090_RAW_RETENTION_DAYS = 30
+DUMP1090_ROLLUP_RETENTION_DAYS = 365
+DUMP1090_ROLLUP_QUERY_THRESHOLD = 6 * 60 * 60
+
+# With DUMP1090_ARCHIVE_AFTER_DAYS set, the storage maintenance task moves
+# positions older than that many days out of FlightData into one compressed
+# Arrow file per UTC day under DUMP1090_ARCHIVE_DIR. Tracks and raw flight
+# paths starting before the archived range read it back from the files.
+DUMP1090_ARCHIVE_DIR = config('DUMP1090_ARCHIVE_DIR', default=str(BASE_DIR / 'archive'))
+DUMP1090_ARCHIVE_AFTER_DAYS = config('DUMP1090_ARCHIVE_AFTER_DAYS', default=None, cast=lambda value: int(value) if value else None)
+
+# With DUMP1090_CAPTURE on, every polled aircraft.json is also appended, raw
+# and with its fetch time, to hourly zstd segments per receiver under
+# DUMP1090_CAPTURE_DIR, for `manage.py replay_captures` to rebuild history or
+# load-test from. Segments older than DUMP1090_CAPTURE_RETENTION_DAYS are
+# deleted by the storage maintenance task (None keeps them).
+DUMP1090_CAPTURE = config('DUMP1090_CAPTURE', default=False, cast=bool)
+DUMP1090_CAPTURE_DIR = config('DUMP1090_CAPTURE_DIR', default=str(BASE_DIR / 'captures'))
+DUMP1090_CAPTURE_RETENTION_DAYS = config('DUMP1090_CAPTURE_RETENTION_DAYS', default=None, cast=lambda value: int(value) if value else None)
+
+# Receiver position, for the coverage job's bearing/range bins and max range
+# per bearing. Without it only the lat/lon coverage grid is aggregated.
+DUMP1090_RECEIVER_LAT = config('DUMP1090_RECEIVER_LAT', default=None, cast=lambda value: float(value) if value else None)
+DUMP1090_RECEIVER_LON = config('DUMP1090_RECEIVER_LON', default=None, cast=lambda value: float(value) if value else None)
+
 REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
 REDIS_PORT = os.environ.get("REDIS_PORT", "6379")
 
@@ -100,14 +205,50 @@ TEMPLATES = [
 ]
 
 CELERY_BEAT_SCHEDULE = {
-    'poll-dump1090': {
-        'task': 'dump1090_collector.tasks.poll_dump1090_task',
-        'schedule': DUMP1090_POLLING_TIME,
+    **{
+        f'poll-dump1090-{receiver}': {
+            'task': 'dump1090_collector.tasks.poll_dump1090_task',
+            'schedule': DUMP1090_POLLING_TIME,
+            'args': [receiver],
+            'options': {
+                'queue': 'dump1090_queue',
+                'expires': DUMP1090_POLL_STALE_AFTER,
+            }
+        }
+        for receiver in DUMP1090_RECEIVERS
+    },
+    'rollup-flightdata': {
+        'task': 'dump1090_collector.tasks.rollup_flightdata_task',
+        'schedule': 60,
+        'options': {
+            'queue': 'maintenance_queue'
+        }
+    },
+    'aggregate-coverage': {
+        'task': 'dump1090_collector.tasks.aggregate_coverage_task',
+        'schedule': 5 * 60,
+        'options': {
+            'queue': 'maintenance_queue'
+        }
+    },
+    'aggregate-stats': {
+        'task': 'dump1090_collector.tasks.aggregate_stats_task',
+        'schedule': 5 * 60,
+        'options': {
+            'queue': 'maintenance_queue'
+        }
+    },
+    'maintain-flightdata-storage': {
+        'task': 'dump1090_collector.tasks.maintain_flightdata_storage_task',
+        'schedule': 60 * 60,
         'options': {
-            'queue': 'dump1090_queue'
+            'queue': 'maintenance_queue'
         }
     },
 }
+if DUMP1090_INGEST == 'stream':
+    for receiver in DUMP1090_RECEIVERS:
+        del CELERY_BEAT_SCHEDULE[f'poll-dump1090-{receiver}']
 
 
 DATABASES = {
@@ -17,7 +17,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from dump1090_collector.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('dump1090_collector/', include('dump1090_collector.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
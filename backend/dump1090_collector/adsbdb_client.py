@@ -0,0 +1,190 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from dump1090_collector.fetch_helper import fetch_json
+
+logger = logging.getLogger(__name__)
+
+ADSBDB_BASE_URL = getattr(settings, 'ADSBDB_BASE_URL', 'https://api.adsbdb.com/v0')
+ADSBDB_MAX_IN_FLIGHT = getattr(settings, 'ADSBDB_MAX_IN_FLIGHT', 8)
+ADSBDB_RATE_LIMIT = getattr(settings, 'ADSBDB_RATE_LIMIT', 20)
+ADSBDB_RATE_BURST = getattr(settings, 'ADSBDB_RATE_BURST', 40)
+ADSBDB_TIMEOUT = getattr(settings, 'ADSBDB_TIMEOUT', 10)
+ADSBDB_RATE_KEY = getattr(settings, 'ADSBDB_RATE_KEY', 'collector:adsbdb:bucket')
+
+# Refill and take one token in a single step on the Redis server, timed by the
+# server's clock so workers on different hosts agree. Returns the seconds to
+# wait before trying again, or 0 once a token was taken.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    """Blocking token bucket: ``rate`` tokens per second, up to ``capacity`` banked."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class RedisTokenBucket:
+    """
+    Token bucket kept in Redis, so ``rate`` is the limit across every worker
+    process and container sharing the cache rather than per process.
+    """
+
+    def __init__(self, client, rate, capacity, key=ADSBDB_RATE_KEY, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.key = key
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._sleep = sleep
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            wait = float(self._script(keys=[self.key], args=[self.rate, self.capacity]))
+            if wait <= 0:
+                return
+            self._sleep(wait)
+
+
+def shared_token_bucket(rate, capacity):
+    """Redis bucket when the default cache is django-redis, a per-process one otherwise."""
+    if rate and 'django_redis' in settings.CACHES['default']['BACKEND']:
+        from django_redis import get_redis_connection
+        return RedisTokenBucket(get_redis_connection('default'), rate, capacity)
+    return TokenBucket(rate, capacity)
+
+
+class AdsbdbClient:
+    """
+    adsbdb client shared by every enrichment thread in a worker.
+
+    Requests go through one keep-alive session, at most ``max_in_flight`` are
+    outstanding at once, they are paced by a token bucket shared by every
+    worker through Redis (shared_token_bucket), and concurrent
+    lookups of the same URL are coalesced into a single upstream request.
+    """
+
+    def __init__(self, base_url=ADSBDB_BASE_URL, max_in_flight=ADSBDB_MAX_IN_FLIGHT,
+                 rate=ADSBDB_RATE_LIMIT, burst=ADSBDB_RATE_BURST, timeout=ADSBDB_TIMEOUT, bucket=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._bucket = bucket or shared_token_bucket(rate, burst)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.upstream_requests = 0
+        self.coalesced_requests = 0
+
+    def fetch(self, path):
+        url = f'{self.base_url}/{path.lstrip("/")}'
+        with self._lock:
+            future = self._in_flight.get(url)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[url] = future
+            else:
+                self.coalesced_requests += 1
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._request(url)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(url, None)
+
+    def _request(self, url):
+        with self._slots:
+            self._bucket.acquire()
+            with self._lock:
+                self.upstream_requests += 1
+            return fetch_json(url, timeout=self.timeout, session=self.session, upstream='adsbdb')
+
+    def aircraft(self, hex_id):
+        return self.fetch(f'aircraft/{hex_id}')
+
+    def callsign(self, callsign):
+        return self.fetch(f'callsign/{callsign.strip()}')
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_adsbdb_client():
+    """Per-process client; Celery's prefork children each build their own session."""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = AdsbdbClient()
+            _client_pid = os.getpid()
+        return _client
+
+
+def set_adsbdb_client(client):
+    """Swap the process-wide client, e.g. to point it at a stub server."""
+    global _client, _client_pid
+    with _client_lock:
+        _client = client
+        _client_pid = os.getpid()
@@ -20,5 +20,7 @@ class Dump1090CollectorConfig(AppConfig):
         return os.environ.get('WORKER_MAIN_PID') == str(os.getpid())
 
     def start_task(self):
+        from .services.receivers import RECEIVERS
         from .tasks import poll_dump1090_task
-        poll_dump1090_task.delay()
+        for receiver in RECEIVERS:
+            poll_dump1090_task.delay(receiver)
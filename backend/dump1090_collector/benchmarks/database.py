@@ -0,0 +1,25 @@
+from contextlib import contextmanager
+
+from django.db import connection
+
+from ..models import FlightData, Aircraft, Airline, Airport
+from ..services.identity_map import IDENTITY_MAPS
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """Run against a throwaway test database so benchmarks never touch real data."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def reset_benchmark_state():
+    """Empty the collector tables and in-process caches between benchmark runs."""
+    for model in (FlightData, Aircraft, Airline, Airport):
+        model.objects.all().delete()
+    for identity_map in IDENTITY_MAPS.values():
+        identity_map.clear()
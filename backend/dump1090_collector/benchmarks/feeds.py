@@ -0,0 +1,79 @@
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from .traffic import generate_snapshot
+
+SBS_EPOCH = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def sbs_line(msg_type, hex_code, at, callsign='', altitude='', speed='', track='', lat='', lon='',
+             vert_rate='', squawk=''):
+    date, clock = at.strftime('%Y/%m/%d'), at.strftime('%H:%M:%S.%f')[:-3]
+    return (
+        f'MSG,{msg_type},1,1,{hex_code.upper()},1,{date},{clock},{date},{clock},{callsign},{altitude},'
+        f'{speed},{track},{lat},{lon},{vert_rate},{squawk},0,0,0,0\r\n'
+    )
+
+
+def generate_sbs_capture(count, seconds, rate=2, seed=0):
+    """
+    A BaseStation (port 30003) capture of ``count`` synthetic aircraft over
+    ``seconds``: ``rate`` position and velocity messages per aircraft per
+    second, identification every 5 s and squawk every 10 s.
+    """
+    lines = []
+    for second in range(seconds):
+        for step in range(rate):
+            at = SBS_EPOCH + timedelta(seconds=second + step / rate)
+            snapshot = generate_snapshot(count, poll=second * rate + step, seed=seed)
+            for flight in snapshot['aircraft']:
+                hex_code = flight['hex']
+                lines.append(sbs_line(3, hex_code, at, altitude=flight['altitude'],
+                                      lat=f"{flight['lat']:.5f}", lon=f"{flight['lon']:.5f}"))
+                lines.append(sbs_line(4, hex_code, at, speed=flight['speed'], track=flight['track'],
+                                      vert_rate=flight['vert_rate']))
+                if step == 0 and second % 5 == 0:
+                    lines.append(sbs_line(1, hex_code, at, callsign=flight['flight'].strip()))
+                if step == 0 and second % 10 == 0:
+                    lines.append(sbs_line(6, hex_code, at, squawk=flight['squawk']))
+    return ''.join(lines).encode('ascii')
+
+
+@contextmanager
+def serve_feed(data, chunk_size=4096, duration=0.0):
+    """
+    Serve ``data`` to each client that connects to a free local port, in
+    ``chunk_size`` writes so frames straddle reads as they do on a live
+    feed, spread evenly over ``duration`` seconds, then close. Yields
+    (host, port).
+    """
+    pause = duration / max(1, -(-len(data) // chunk_size))
+    server = socket.create_server(('127.0.0.1', 0))
+    stopped = threading.Event()
+
+    def serve():
+        server.settimeout(0.2)
+        while not stopped.is_set():
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            with connection:
+                for offset in range(0, len(data), chunk_size):
+                    connection.sendall(data[offset:offset + chunk_size])
+                    if pause:
+                        time.sleep(pause)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    try:
+        yield server.getsockname()[:2]
+    finally:
+        stopped.set()
+        server.close()
+        thread.join()
@@ -0,0 +1,153 @@
+import random
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from ..models import Aircraft, FlightData
+from ..services.spatial import GRID_CELL_DEGREES, GRID_COLUMNS, GRID_ROWS, grid_cell
+from .traffic import AIRLINES
+
+HISTORY_DAYS = 30
+
+
+def history_callsign(index):
+    return f'{AIRLINES[index % len(AIRLINES)][0]}{100 + index % 900}'
+
+
+def populate_history(rows, aircraft=5000, batch_size=10000, seed=0, lat_span=1.0, lon_span=1.0):
+    """
+    Fill FlightData with ``rows`` positions spread over HISTORY_DAYS days and
+    ``aircraft`` airframes, mimicking legacy rows: dump1090 padding on the raw
+    callsign, lower-case hex. Positions fall uniformly in ``lat_span`` by
+    ``lon_span`` degrees north-east of 51N 1W. Returns the Aircraft ids in
+    creation order.
+    """
+    Aircraft.objects.bulk_create(
+        [Aircraft(hex_id=f'{0x400000 + index:06X}', registration=f'G-{index:04X}') for index in range(aircraft)],
+        batch_size=batch_size,
+    )
+    aircraft_ids = list(Aircraft.objects.order_by('id').values_list('id', flat=True))
+    end = timezone.now()
+    if connection.vendor == 'postgresql':
+        populate_history_postgres(rows, aircraft_ids, end, lat_span, lon_span)
+    else:
+        rng = random.Random(seed)
+        start = end - timedelta(days=HISTORY_DAYS)
+        step = timedelta(days=HISTORY_DAYS) / rows
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for row in range(offset, min(rows, offset + batch_size)):
+                index = rng.randrange(aircraft)
+                callsign = history_callsign(index)
+                lat, lon = 51 + rng.random() * lat_span, -1 + rng.random() * lon_span
+                batch.append(FlightData(
+                    flight_hex=f'{0x400000 + index:06x}',
+                    flight_callsign=f'{callsign:<8}',
+                    callsign_norm=callsign,
+                    latitude=lat,
+                    longitude=lon,
+                    valid_position=True,
+                    grid_cell=grid_cell(lat, lon),
+                    altitude=rng.randrange(1000, 41000, 100),
+                    timestamp=start + step * row,
+                    aircraft_id=aircraft_ids[index],
+                ))
+            FlightData.objects.bulk_create(batch)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {connection.ops.quote_name(FlightData._meta.db_table)}")
+    return aircraft_ids
+
+
+def populate_history_postgres(rows, aircraft_ids, end, lat_span=1.0, lon_span=1.0):
+    """Server-side generate_series insert; tens of millions of rows in minutes."""
+    table = connection.ops.quote_name(FlightData._meta.db_table)
+    airlines = [airline[0] for airline in AIRLINES]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (
+                flight_hex, flight_callsign, callsign_norm, latitude, longitude, valid_position, grid_cell,
+                altitude, speed_in_knots, messages_received, seen, valid_track, timestamp, aircraft_id
+            )
+            SELECT
+                lower(to_hex(4194304 + ac.idx)),
+                rpad(ac.callsign, 8),
+                ac.callsign,
+                pos.lat, pos.lon, true,
+                LEAST(floor((pos.lat + 90) / %(cell)s)::int, %(rows_max)s) * %(columns)s
+                    + mod(floor((pos.lon + 180) / %(cell)s)::int, %(columns)s),
+                (random() * 40000)::int, 400, 1, 0, true,
+                %(end)s - (%(days)s * interval '1 day') * (n::float / %(rows)s),
+                ac.id
+            FROM generate_series(1, %(rows)s) AS n
+            JOIN LATERAL (
+                SELECT 51 + %(lat_span)s * (hashint4(-n) & 2147483647) / 2147483647.0 AS lat,
+                       -1 + %(lon_span)s * (hashint4(n # 1431655765) & 2147483647) / 2147483647.0 AS lon
+            ) AS pos ON true
+            JOIN LATERAL (
+                SELECT idx, ids.id,
+                       (%(airlines)s)[1 + idx %% %(airline_count)s] || (100 + idx %% 900)::text AS callsign
+                FROM (SELECT (hashint4(n) & 2147483647) %% %(aircraft)s AS idx) AS pick,
+                     LATERAL (SELECT (%(aircraft_ids)s)[1 + pick.idx] AS id) AS ids
+            ) AS ac ON true
+            """,
+            {
+                'end': end, 'days': HISTORY_DAYS, 'rows': rows, 'airlines': airlines,
+                'airline_count': len(airlines), 'aircraft': len(aircraft_ids), 'aircraft_ids': aircraft_ids,
+                'lat_span': lat_span, 'lon_span': lon_span, 'cell': GRID_CELL_DEGREES,
+                'rows_max': GRID_ROWS - 1, 'columns': GRID_COLUMNS,
+            },
+        )
+
+
+def populate_airframe(hex_code='4CA2D6', days=HISTORY_DAYS, flights_per_day=6, flight_minutes=90,
+                      interval=2, spike_rate=0.001, batch_size=10000, seed=0):
+    """
+    A month of history for one busy airframe: ``flights_per_day`` flights a
+    day, each a straight climb-cruise-descent between two points with a
+    position every ``interval`` seconds, a new callsign per flight and the
+    odd bad-decode position spike. Returns the number of rows written.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    aircraft = Aircraft.objects.create(hex_id=hex_code.upper(), registration='G-BUSY')
+    end = timezone.now()
+    start = end - timedelta(days=days)
+    turnaround = timedelta(days=1) / flights_per_day
+    points = flight_minutes * 60 // interval
+    progress = np.linspace(0.0, 1.0, points)
+    profile = np.minimum(1.0, np.minimum(progress, 1 - progress) * 5) * 36000
+    written = 0
+    batch = []
+    for flight in range(days * flights_per_day):
+        departure = start + turnaround * flight
+        lat = 51.5 + rng.uniform(-1, 1) + progress * rng.uniform(-3, 3)
+        lon = -0.5 + rng.uniform(-1, 1) + progress * rng.uniform(-4, 4)
+        spikes = rng.random(points) < spike_rate
+        lat[spikes] += rng.uniform(-5, 5, spikes.sum())
+        callsign = history_callsign(flight)
+        for index in range(points):
+            batch.append(FlightData(
+                flight_hex=hex_code.upper(),
+                flight_callsign=callsign,
+                callsign_norm=callsign,
+                latitude=float(lat[index]),
+                longitude=float(lon[index]),
+                valid_position=True,
+                grid_cell=grid_cell(float(lat[index]), float(lon[index])),
+                altitude=int(profile[index]),
+                speed_in_knots=420,
+                timestamp=departure + timedelta(seconds=index * interval),
+                aircraft=aircraft,
+            ))
+            if len(batch) >= batch_size:
+                FlightData.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+    FlightData.objects.bulk_create(batch)
+    written += len(batch)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {connection.ops.quote_name(FlightData._meta.db_table)}")
+    return written
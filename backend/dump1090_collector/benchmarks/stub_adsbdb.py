@@ -0,0 +1,105 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .traffic import generate_enrichment, generate_snapshot
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class StubAdsbdbServer:
+    """
+    Local stand-in for api.adsbdb.com serving the synthetic fleet from
+    ``traffic``. Every request sleeps for ``latency`` seconds (plus up to
+    ``jitter``) and fails with a 500 with probability ``error_rate``.
+
+    Use as a context manager; ``base_url`` is ready once it is entered.
+    """
+
+    def __init__(self, fleet_size, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.aircraft = {}
+        self.callsigns = {}
+        for index, flight in enumerate(generate_snapshot(fleet_size, seed=seed)['aircraft']):
+            aircraft_data, callsign_data = generate_enrichment(index, seed=seed)
+            self.aircraft[flight['hex']] = aircraft_data
+            self.callsigns.setdefault(flight['flight'].strip(), callsign_data)
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v0'
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Send headers and body in one segment; otherwise Nagle plus
+            # delayed ACKs add ~40ms to every keep-alive response.
+            disable_nagle_algorithm = True
+            wbufsize = -1
+
+            def do_GET(self):
+                stub.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def handle(self, request):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            fail = self._rng.random() < self.error_rate
+            self.failures += fail
+        try:
+            time.sleep(delay)
+            status, payload = self.route(request.path, fail)
+            body = json.dumps(payload).encode()
+            request.send_response(status)
+            request.send_header('Content-Type', 'application/json')
+            request.send_header('Content-Length', str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def route(self, path, fail):
+        if fail:
+            return 500, {'response': 'internal server error'}
+        parts = path.strip('/').split('/')
+        if len(parts) == 3 and parts[1] == 'aircraft':
+            payload = self.aircraft.get(parts[2].lower())
+            return (200, payload) if payload else (404, {'response': 'unknown aircraft'})
+        if len(parts) == 3 and parts[1] == 'callsign':
+            payload = self.callsigns.get(parts[2].upper())
+            return (200, payload) if payload else (404, {'response': 'unknown callsign'})
+        return 404, {'response': 'not found'}
@@ -0,0 +1,90 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+
+from .stub_adsbdb import Server
+from .traffic import generate_snapshot
+
+
+class StubReceiverServer:
+    """
+    Local stand-in for one of ``receivers`` dump1090 instances serving
+    /data/aircraft.json for the synthetic fleet from ``traffic``. Receiver
+    ``index`` hears the aircraft within ``overlap`` places of it, so with
+    ``overlap`` > 1 every aircraft is reported by several receivers. Set
+    ``poll`` to move the fleet on; ``now`` advances ``window`` seconds a poll.
+    ``generator`` builds each poll's snapshot, e.g. a configured
+    generate_traffic for churn and missing fields.
+
+    Use as a context manager; ``base_url`` is ready once it is entered.
+    """
+
+    def __init__(self, index, receivers, fleet_size, overlap=3, window=2.0, seed=0,
+                 generator=generate_snapshot):
+        self.index = index
+        self.receivers = receivers
+        self.fleet_size = fleet_size
+        self.overlap = min(overlap, receivers)
+        self.window = window
+        self.seed = seed
+        self.generator = generator
+        self.poll = 0
+        self.requests = 0
+        self._documents = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+            wbufsize = -1
+
+            def do_GET(self):
+                stub.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def hears(self, aircraft):
+        return (aircraft - self.index) % self.receivers < self.overlap
+
+    def document(self, poll):
+        with self._lock:
+            self.requests += 1
+            if poll not in self._documents:
+                snapshot = self.generator(self.fleet_size, poll=poll, seed=self.seed)
+                snapshot['aircraft'] = [flight for index, flight in enumerate(snapshot['aircraft'])
+                                        if self.hears(index)]
+                snapshot['now'] = poll * self.window
+                self._documents = {poll: json.dumps(snapshot).encode()}
+            return self._documents[poll]
+
+    def handle(self, request):
+        if request.path != '/data/aircraft.json':
+            status, body = 404, b'{}'
+        else:
+            status, body = 200, self.document(self.poll)
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
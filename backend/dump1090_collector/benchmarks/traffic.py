@@ -0,0 +1,198 @@
+import math
+import random
+
+AIRLINES = [
+    ('BAW', 'BA', 'British Airways'),
+    ('DLH', 'LH', 'Lufthansa'),
+    ('AFR', 'AF', 'Air France'),
+    ('KLM', 'KL', 'KLM'),
+    ('EZY', 'U2', 'easyJet'),
+    ('RYR', 'FR', 'Ryanair'),
+    ('UAL', 'UA', 'United Airlines'),
+    ('AAL', 'AA', 'American Airlines'),
+    ('DAL', 'DL', 'Delta Air Lines'),
+    ('UAE', 'EK', 'Emirates'),
+]
+
+AIRPORTS = [
+    ('LHR', 'EGLL'), ('LGW', 'EGKK'), ('MAN', 'EGCC'), ('CDG', 'LFPG'),
+    ('AMS', 'EHAM'), ('FRA', 'EDDF'), ('MUC', 'EDDM'), ('MAD', 'LEMD'),
+    ('BCN', 'LEBL'), ('DUB', 'EIDW'), ('JFK', 'KJFK'), ('EWR', 'KEWR'),
+    ('ORD', 'KORD'), ('ATL', 'KATL'), ('DXB', 'OMDB'), ('FCO', 'LIRF'),
+]
+
+RECEIVER_LAT = 51.47
+RECEIVER_LON = -0.45
+EARTH_RADIUS_NM = 3440.065
+
+
+def _aircraft_state(index, seed):
+    rng = random.Random(seed * 100003 + index)
+    airline = AIRLINES[index % len(AIRLINES)]
+    origin, destination = rng.sample(AIRPORTS, 2)
+    return {
+        'hex': f'{0x400000 + index:06x}',
+        'registration': f'G-{index:04X}',
+        'callsign': f'{airline[0]}{100 + index % 900}',
+        'airline': airline,
+        'origin': origin,
+        'destination': destination,
+        'lat': RECEIVER_LAT + rng.uniform(-2.0, 2.0),
+        'lon': RECEIVER_LON + rng.uniform(-3.0, 3.0),
+        'altitude': rng.randrange(1000, 41000, 100),
+        'track': rng.randrange(0, 360),
+        'speed': rng.randrange(150, 520),
+        'squawk': rng.randrange(1000, 7000),
+    }
+
+
+def generate_snapshot(count, poll=0, seed=0):
+    """
+    Build a synthetic dump1090 aircraft.json payload with ``count`` aircraft.
+
+    The same (count, seed) always yields the same fleet; ``poll`` moves every
+    aircraft along its track so consecutive snapshots look like real polls.
+    """
+    aircraft = []
+    for index in range(count):
+        state = _aircraft_state(index, seed)
+        aircraft.append({
+            'hex': state['hex'],
+            'squawk': state['squawk'],
+            'flight': f"{state['callsign']:<8}",
+            'lat': state['lat'] + 0.001 * poll * ((state['track'] % 3) - 1),
+            'lon': state['lon'] + 0.001 * poll * ((state['track'] % 5) - 2),
+            'validposition': 1,
+            'altitude': state['altitude'],
+            'vert_rate': 0,
+            'track': state['track'],
+            'validtrack': 1,
+            'speed': state['speed'],
+            'messages': 100 + poll * 7 + index,
+            'seen': 0,
+        })
+    return {'now': poll * 2.0, 'messages': sum(a['messages'] for a in aircraft), 'aircraft': aircraft}
+
+
+def great_circle(lat, lon, track, distance_nm):
+    """Where flying ``distance_nm`` along the great circle from (lat, lon) on ``track`` ends up, and the track there."""
+    phi1, lambda1, theta = math.radians(lat), math.radians(lon), math.radians(track)
+    delta = distance_nm / EARTH_RADIUS_NM
+    phi2 = math.asin(math.sin(phi1) * math.cos(delta) + math.cos(phi1) * math.sin(delta) * math.cos(theta))
+    lambda2 = lambda1 + math.atan2(math.sin(theta) * math.sin(delta) * math.cos(phi1),
+                                   math.cos(delta) - math.sin(phi1) * math.sin(phi2))
+    back_y = math.sin(lambda1 - lambda2) * math.cos(phi1)
+    back_x = math.cos(phi2) * math.sin(phi1) - math.sin(phi2) * math.cos(phi1) * math.cos(lambda1 - lambda2)
+    back = math.atan2(back_y, back_x)
+    return (math.degrees(phi2), (math.degrees(lambda2) + 540) % 360 - 180,
+            (math.degrees(back) + 180) % 360)
+
+
+def traffic_lifetime(churn):
+    """Polls each aircraft stays in range when ``churn`` of the fleet is replaced every poll."""
+    return max(1, round(1 / churn)) if churn else None
+
+
+def traffic_fleet_size(count, polls, churn=0.0):
+    """How many distinct aircraft generate_traffic yields over ``polls`` polls, for StubAdsbdbServer."""
+    lifetime = traffic_lifetime(churn)
+    if lifetime is None:
+        return count
+    return count * ((polls - 1 + lifetime - 1) // lifetime + 1)
+
+
+def generate_traffic(count, poll=0, seed=0, interval=2.0, churn=0.0, missing=0.0):
+    """
+    A more realistic aircraft.json than generate_snapshot: ``count``
+    aircraft in range at any time, flying great-circle tracks at their own
+    speed, ``interval`` seconds of receiver clock apart per poll.
+
+    Every poll ``churn`` of the fleet leaves range and is replaced by new
+    aircraft (new hex and callsign), which report no callsign on their first
+    poll as dump1090 does before it decodes the identification message. Each
+    of callsign, altitude, squawk and position is also missing from a report
+    with probability ``missing``. Deterministic for a given seed.
+    """
+    lifetime = traffic_lifetime(churn)
+    aircraft = []
+    for slot in range(count):
+        if lifetime is None:
+            index, age = slot, poll
+        else:
+            generation, age = divmod(poll + slot % lifetime, lifetime)
+            index = slot + count * generation
+        state = _aircraft_state(index, seed)
+        lat, lon, track = great_circle(state['lat'], state['lon'], state['track'],
+                                       state['speed'] * interval * age / 3600)
+        flight = {
+            'hex': state['hex'],
+            'squawk': state['squawk'],
+            'flight': f"{state['callsign']:<8}",
+            'lat': lat,
+            'lon': lon,
+            'validposition': 1,
+            'altitude': state['altitude'],
+            'vert_rate': 0,
+            'track': round(track),
+            'validtrack': 1,
+            'speed': state['speed'],
+            'messages': 100 + age * 7 + index,
+            'seen': 0,
+        }
+        rng = random.Random(hash((seed, index, poll)))
+        if (lifetime is not None and age == 0) or rng.random() < missing:
+            del flight['flight']
+        for field in ('altitude', 'squawk'):
+            if rng.random() < missing:
+                del flight[field]
+        if rng.random() < missing:
+            del flight['lat'], flight['lon']
+            flight['validposition'] = 0
+        aircraft.append(flight)
+    return {'now': poll * interval, 'messages': sum(a['messages'] for a in aircraft), 'aircraft': aircraft}
+
+
+def generate_enrichment(index, seed=0):
+    """Return adsbdb-shaped (aircraft, callsign) payloads for synthetic aircraft ``index``."""
+    state = _aircraft_state(index, seed)
+    icao, iata, name = state['airline']
+    aircraft_data = {
+        'response': {
+            'aircraft': {
+                'type': 'A320',
+                'icao_type': 'A320',
+                'manufacturer': 'Airbus',
+                'mode_s': state['hex'].upper(),
+                'registration': state['registration'],
+                'registered_owner_country_iso_name': 'GB',
+                'registered_owner_country_name': 'United Kingdom',
+                'registered_owner_operator_flag_code': icao,
+                'registered_owner': name,
+                'url_photo': None,
+                'url_photo_thumbnail': None,
+            }
+        }
+    }
+    callsign_data = {
+        'response': {
+            'flightroute': {
+                'callsign': state['callsign'],
+                'airline': {'name': name, 'icao': icao, 'iata': iata, 'country': 'United Kingdom',
+                            'country_iso': 'GB', 'callsign': name.upper()},
+                'origin': {'iata_code': state['origin'][0], 'icao_code': state['origin'][1],
+                           'name': state['origin'][1]},
+                'destination': {'iata_code': state['destination'][0], 'icao_code': state['destination'][1],
+                                'name': state['destination'][1]},
+            }
+        }
+    }
+    return aircraft_data, callsign_data
+
+
+def generate_entries(count, poll=0, seed=0):
+    """Return ``(flight, aircraft_data, callsign_data)`` entries as fed to store_snapshot."""
+    snapshot = generate_snapshot(count, poll=poll, seed=seed)
+    return [
+        (flight, *generate_enrichment(index, seed=seed))
+        for index, flight in enumerate(snapshot['aircraft'])
+    ]
@@ -1,13 +1,20 @@
 import requests
 import logging
+import time
 
+from dump1090_collector.services.metrics import inc, observe
 
-def fetch_json(url: str, timeout=10) -> dict:
+
+def fetch_json(url: str, timeout=10, session=None, upstream='other') -> dict:
     response = None
+    started = time.perf_counter()
+    outcome = 'error'
     try:
-        response = requests.get(url, timeout=timeout)
+        response = (session or requests).get(url, timeout=timeout)
         response.raise_for_status()
-        return response.json()
+        payload = response.json()
+        outcome = 'ok'
+        return payload
     except requests.exceptions.RequestException as e:
         if response is not None:
             try:
@@ -18,24 +25,31 @@ def fetch_json(url: str, timeout=10) -> dict:
             resp_value = content.get("response", "")
             if resp_value == "unknown callsign":
                 logging.info(f"Unknown callsign from {url}: {content}")
+                outcome = 'unknown'
                 return content
             elif resp_value == "unknown aircraft":
                 logging.info(f"Unknown aircraft from {url}: {content}")
+                outcome = 'unknown'
                 return content
             else:
                 logging.error(f"Request to {url} failed: {e}. Response content: {content}")
         else:
             logging.error(f"No response returned from {url}. Error: {e}")
         return {}
+    finally:
+        observe('dump1090_upstream_seconds', time.perf_counter() - started, upstream=upstream)
+        inc('dump1090_upstream_requests_total', upstream=upstream, outcome=outcome)
 
 
-def fetch_dump1090_data() -> list:
-    return fetch_json('http://dump1090:8080/data/aircraft.json')
+def fetch_dump1090_data(base_url='http://dump1090:8080') -> list:
+    return fetch_json(f"{base_url.rstrip('/')}/data/aircraft.json", upstream='dump1090')
 
 
 def fetch_adsbdbAircraftData(hex_id) -> dict:
-    return fetch_json(f'https://api.adsbdb.com/v0/aircraft/{hex_id}')
+    from dump1090_collector.adsbdb_client import get_adsbdb_client
+    return get_adsbdb_client().aircraft(hex_id)
 
 
 def fetch_adsbdbCallsignData(flight) -> dict:
-    return fetch_json(f'https://api.adsbdb.com/v0/callsign/{flight.strip()}')
+    from dump1090_collector.adsbdb_client import get_adsbdb_client
+    return get_adsbdb_client().callsign(flight)
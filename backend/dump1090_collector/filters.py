@@ -1,22 +1,90 @@
+from datetime import timedelta
+
 import django_filters
-from django.db.models.functions import Trim
-from .models import FlightData
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Flight, FlightData
+from .services.extractors import normalize_callsign, normalize_hex
+from .services.flights import FLIGHT_GAP
+from .services.spatial import filter_bbox, filter_radius
+
+
+def parse_numbers(name, value, count):
+    try:
+        numbers = [float(number) for number in value.split(',')]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count:
+        raise ValidationError({name: f"Expected {count} comma-separated numbers."})
+    return numbers
 
 
 class FlightDataFilter(django_filters.FilterSet):
+    """
+    Besides callsign, hex id and exact timestamp:
+      - bbox: min_lon,min_lat,max_lon,max_lat (min_lon > max_lon crosses the antimeridian)
+      - radius: lat,lon,nautical_miles
+      - start, end: ISO 8601 datetimes bounding the timestamp
+      - max_age: only positions from the last this many seconds
+    """
     flight_callsign = django_filters.CharFilter(method='filter_callsign')
 
-    aircraft__hex_id = django_filters.CharFilter(
-        field_name='aircraft__hex_id',
-        lookup_expr='iexact'
-    )
+    aircraft__hex_id = django_filters.CharFilter(method='filter_hex')
+
+    bbox = django_filters.CharFilter(method='filter_bbox')
+    radius = django_filters.CharFilter(method='filter_radius')
+    start = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='gte')
+    end = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='lt')
+    max_age = django_filters.NumberFilter(method='filter_max_age')
 
     class Meta:
         model = FlightData
-        fields = ['flight_callsign', 'aircraft__hex_id', 'timestamp']
+        fields = ['flight_callsign', 'aircraft__hex_id', 'timestamp', 'flight']
 
     def filter_callsign(self, queryset, name, value):
-        value = value.strip()
-        return queryset.annotate(
-            trimmed_callsign=Trim('flight_callsign')
-        ).filter(trimmed_callsign__iexact=value)
+        return queryset.filter(callsign_norm=normalize_callsign(value) or '')
+
+    def filter_hex(self, queryset, name, value):
+        return queryset.filter(aircraft__hex_id=normalize_hex(value))
+
+    def filter_bbox(self, queryset, name, value):
+        return filter_bbox(queryset, *parse_numbers(name, value, 4))
+
+    def filter_radius(self, queryset, name, value):
+        lat, lon, radius_nm = parse_numbers(name, value, 3)
+        if radius_nm < 0:
+            raise ValidationError({name: "Radius must not be negative."})
+        return filter_radius(queryset, lat, lon, radius_nm)
+
+    def filter_max_age(self, queryset, name, value):
+        return queryset.filter(timestamp__gte=timezone.now() - timedelta(seconds=float(value)))
+
+
+class FlightFilter(django_filters.FilterSet):
+    """
+    Besides aircraft, airline and airport ids:
+      - hex, callsign: normalized before matching
+      - start, end: ISO 8601 datetimes; flights seen at any time in between
+      - active: true for flights that could still receive positions, i.e.
+        seen within the last DUMP1090_FLIGHT_GAP seconds
+    """
+    hex = django_filters.CharFilter(method='filter_hex')
+    callsign = django_filters.CharFilter(method='filter_callsign')
+    start = django_filters.IsoDateTimeFilter(field_name='last_seen', lookup_expr='gte')
+    end = django_filters.IsoDateTimeFilter(field_name='first_seen', lookup_expr='lt')
+    active = django_filters.BooleanFilter(method='filter_active')
+
+    class Meta:
+        model = Flight
+        fields = ['hex', 'callsign', 'aircraft', 'airline', 'origin_airport', 'destination_airport']
+
+    def filter_hex(self, queryset, name, value):
+        return queryset.filter(flight_hex=normalize_hex(value))
+
+    def filter_callsign(self, queryset, name, value):
+        return queryset.filter(callsign=normalize_callsign(value) or '')
+
+    def filter_active(self, queryset, name, value):
+        since = timezone.now() - timedelta(seconds=FLIGHT_GAP)
+        return queryset.filter(last_seen__gte=since) if value else queryset.filter(last_seen__lt=since)
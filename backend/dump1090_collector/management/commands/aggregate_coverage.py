@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dump1090_collector.services.coverage import aggregate_coverage, reset_coverage
+
+
+class Command(BaseCommand):
+    help = (
+        "Bin positions stored since the coverage watermark into the coverage "
+        "tables until caught up. --reset starts over from the oldest position, "
+        "e.g. after moving the antenna."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset_coverage()
+        now = timezone.now()
+        total = runs = 0
+        while (binned := aggregate_coverage(now=now)) is not None:
+            total += binned
+            runs += 1
+        self.stdout.write(f"Binned {total} positions in {runs} runs")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dump1090_collector.services.stats import aggregate_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Count positions stored since the stats watermark into the hourly and "
+        "per-callsign stats tables until caught up. --reset recounts from the "
+        "oldest stored position."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset_stats()
+        now = timezone.now()
+        total = runs = 0
+        while (counted := aggregate_stats(now=now)) is not None:
+            total += counted
+            runs += 1
+        self.stdout.write(f"Counted {total} positions in {runs} runs")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dump1090_collector.services.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_DIR, archive_closed_days
+
+
+class Command(BaseCommand):
+    help = (
+        "Move closed days of positions out of FlightData into compressed Arrow "
+        "files, one per UTC day, under DUMP1090_ARCHIVE_DIR. Days are closed "
+        "once older than --after-days and read by the stats, coverage and "
+        "rollup jobs. Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after-days', type=int, default=ARCHIVE_AFTER_DAYS,
+                            help="Defaults to DUMP1090_ARCHIVE_AFTER_DAYS.")
+
+    def handle(self, *args, **options):
+        if not ARCHIVE_DIR or options['after_days'] is None:
+            raise CommandError("Set DUMP1090_ARCHIVE_DIR and DUMP1090_ARCHIVE_AFTER_DAYS, or pass --after-days.")
+        archived = archive_closed_days(after_days=options['after_days'])
+        for day, positions in archived:
+            self.stdout.write(f"{day}{positions:>12}")
+        self.stdout.write(f"Archived {sum(positions for _, positions in archived)} positions from {len(archived)} days")
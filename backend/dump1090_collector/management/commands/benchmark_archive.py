@@ -0,0 +1,65 @@
+import os
+import statistics
+import tempfile
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from dump1090_collector.benchmarks.database import benchmark_database
+from dump1090_collector.benchmarks.history import populate_history
+from dump1090_collector.models import FlightData
+from dump1090_collector.services.archive import archive_closed_days, archived_positions
+from dump1090_collector.services.tracks import load_positions
+
+
+class Command(BaseCommand):
+    help = (
+        "Move a synthetic month of positions to the day-file archive, then "
+        "compare storage and loading one airframe's month of positions from "
+        "FlightData against the archive. Runs against a temporary test "
+        "database and archive directory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2_000_000)
+        parser.add_argument('--aircraft', type=int, default=500)
+        parser.add_argument('--lookups', type=int, default=10, help="Loads timed per source.")
+
+    def handle(self, *args, **options):
+        with benchmark_database(), tempfile.TemporaryDirectory() as directory, \
+                mock.patch('dump1090_collector.services.archive.ARCHIVE_DIR', directory):
+            populate_history(options['rows'], options['aircraft'])
+            hex_code = FlightData.objects.values_list('flight_hex', flat=True).first()
+            table_bytes, rows = self.table_bytes(), FlightData.objects.count()
+            hot = self.time(lambda: load_positions(FlightData.objects.filter(flight_hex=hex_code)), options['lookups'])
+
+            started = time.perf_counter()
+            archived = sum(positions for _, positions in archive_closed_days(after_days=0))
+            elapsed = time.perf_counter() - started
+            archive_bytes = sum(entry.stat().st_size for entry in os.scandir(directory))
+            cold = self.time(lambda: archived_positions(flight_hex=hex_code), options['lookups'])
+
+        self.stdout.write(f"Archived {archived} positions in {elapsed:.1f}s ({archived / elapsed:,.0f} positions/s)")
+        if table_bytes:
+            self.stdout.write(f"{'FlightData':<12}{table_bytes / 2**20:>10.1f} MiB{table_bytes / rows:>8.1f} bytes/row")
+        self.stdout.write(f"{'archive':<12}{archive_bytes / 2**20:>10.1f} MiB{archive_bytes / archived:>8.1f} bytes/row")
+        self.stdout.write(f"One airframe's month: FlightData p50 {hot:.1f} ms, archive p50 {cold:.1f} ms")
+
+    @staticmethod
+    def table_bytes():
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_total_relation_size(%s)", [FlightData._meta.db_table])
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def time(query, lookups):
+        timings = []
+        for _ in range(lookups):
+            started = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,60 @@
+import random
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dump1090_collector.benchmarks.database import benchmark_database
+from dump1090_collector.benchmarks.history import populate_history
+from dump1090_collector.models import FlightData
+from dump1090_collector.services.coverage import aggregate_coverage
+from dump1090_collector.services.spatial import grid_cell
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the coverage aggregation catching up on a synthetic position "
+        "history, then one incremental run over the positions of the next "
+        "few minutes. Runs against a temporary test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2_000_000)
+        parser.add_argument('--aircraft', type=int, default=5000)
+        parser.add_argument('--new-minutes', type=int, default=5, help="Positions added before the incremental run.")
+        parser.add_argument('--new-aircraft', type=int, default=200)
+
+    @mock.patch.multiple('dump1090_collector.services.coverage', RECEIVER_LAT=53.0, RECEIVER_LON=2.0)
+    def handle(self, *args, **options):
+        with benchmark_database():
+            populate_history(options['rows'], options['aircraft'], lat_span=4.0, lon_span=6.0)
+            now = timezone.now() + timedelta(minutes=5)
+
+            started = time.perf_counter()
+            binned = runs = 0
+            while (count := aggregate_coverage(now=now)) is not None:
+                binned += count
+                runs += 1
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"Catch-up: {binned} positions in {runs} runs, {elapsed:.1f}s "
+                              f"({binned / elapsed:,.0f} positions/s)")
+
+            rng = random.Random(0)
+            rows = []
+            for second in range(0, options['new_minutes'] * 60, 2):
+                for index in range(options['new_aircraft']):
+                    lat, lon = 51 + rng.random() * 4, -1 + rng.random() * 6
+                    rows.append(FlightData(
+                        flight_hex=f'{0x500000 + index:06X}', latitude=lat, longitude=lon, valid_position=True,
+                        grid_cell=grid_cell(lat, lon), altitude=rng.randrange(1000, 41000, 100),
+                        timestamp=now + timedelta(seconds=second),
+                    ))
+            FlightData.objects.bulk_create(rows, batch_size=10000)
+
+            started = time.perf_counter()
+            count = aggregate_coverage(now=now + timedelta(minutes=options['new_minutes'] + 5))
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"Incremental: {count} new positions of {FlightData.objects.count()} stored "
+                              f"in {elapsed * 1000:.0f} ms")
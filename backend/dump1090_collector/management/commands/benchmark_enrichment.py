@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from dump1090_collector.adsbdb_client import AdsbdbClient
+from dump1090_collector.benchmarks.stub_adsbdb import StubAdsbdbServer
+from dump1090_collector.benchmarks.traffic import generate_snapshot
+from dump1090_collector.fetch_helper import fetch_json
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class UnpooledClient:
+    """The pre-session behaviour: a fresh connection for every lookup."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def aircraft(self, hex_id):
+        return fetch_json(f'{self.base_url}/aircraft/{hex_id}')
+
+    def callsign(self, callsign):
+        return fetch_json(f'{self.base_url}/callsign/{callsign.strip()}')
+
+
+class Command(BaseCommand):
+    help = (
+        "Report p50/p99 adsbdb enrichment latency for a cold poll, served by a "
+        "local stub adsbdb server with injected latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aircraft', type=int, default=200)
+        parser.add_argument('--latency', type=float, default=50.0, help="Stub latency per request in ms.")
+        parser.add_argument('--jitter', type=float, default=20.0, help="Extra random stub latency in ms.")
+        parser.add_argument('--max-in-flight', type=int, default=8)
+        parser.add_argument('--rate', type=float, default=0, help="Token bucket rate; 0 disables it.")
+        parser.add_argument('--workers', type=int, default=None, help="Defaults to --max-in-flight.")
+
+    def handle(self, *args, **options):
+        flights = generate_snapshot(options['aircraft'])['aircraft']
+        self.stdout.write(f"{'client':<12}{'workers':>8}{'p50 ms':>10}{'p99 ms':>10}{'poll ms':>10}{'upstream':>10}")
+        runs = [
+            ('unpooled', 4, lambda url: UnpooledClient(url)),
+            ('pooled', options['workers'] or options['max_in_flight'], lambda url: AdsbdbClient(
+                base_url=url, max_in_flight=options['max_in_flight'],
+                rate=options['rate'], burst=options['max_in_flight'],
+            )),
+        ]
+        for name, workers, build_client in runs:
+            stub = StubAdsbdbServer(
+                options['aircraft'], latency=options['latency'] / 1000, jitter=options['jitter'] / 1000
+            )
+            with stub:
+                client = build_client(stub.base_url)
+                latencies, elapsed = self.cold_poll(client, flights, workers)
+                upstream = stub.requests
+            self.stdout.write(
+                f"{name:<12}{workers:>8}{percentile(latencies, 0.5):>10.1f}"
+                f"{percentile(latencies, 0.99):>10.1f}{elapsed:>10.1f}{upstream:>10}"
+            )
+
+    def cold_poll(self, client, flights, workers):
+        def enrich(flight):
+            start = time.perf_counter()
+            client.aircraft(flight['hex'])
+            client.callsign(flight['flight'])
+            return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = list(executor.map(enrich, flights))
+        elapsed = (time.perf_counter() - start) * 1000
+        return latencies, elapsed
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import random
+import re
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from dump1090_collector.benchmarks.traffic import RECEIVER_LAT, RECEIVER_LON, generate_snapshot
+from dump1090_collector.services.live import in_bbox, live_state
+from dump1090_collector.services.push import DELTA_CHANNEL, DeltaHub, LocalPubSub, get_pubsub, sse_event
+
+NOW = re.compile(r'"now":([0-9.]+)')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def random_bboxes(count, seed=0):
+    """Client viewports of 0.5-3 degrees scattered over the synthetic traffic area."""
+    rng = random.Random(seed)
+    bboxes = []
+    for _ in range(count):
+        width, height = rng.uniform(0.5, 3.0), rng.uniform(0.5, 2.0)
+        min_lon = RECEIVER_LON + rng.uniform(-3.0, 3.0 - width)
+        min_lat = RECEIVER_LAT + rng.uniform(-2.0, 2.0 - height)
+        bboxes.append((round(min_lon, 3), round(min_lat, 3), round(min_lon + width, 3), round(min_lat + height, 3)))
+    return bboxes
+
+
+def naive_dispatch(message, bboxes):
+    """Per-subscriber decode, filter and encode, for comparison with DeltaHub.dispatch."""
+    for bbox in bboxes:
+        delta = json.loads(message)
+        aircraft = [state for state in delta['aircraft'] if in_bbox(state, bbox)]
+        if aircraft:
+            sse_event('delta', json.dumps({'now': delta['now'], 'aircraft': aircraft}))
+
+
+class Command(BaseCommand):
+    help = (
+        "Fan live deltas out to many simulated SSE subscribers with random "
+        "bounding boxes and report dispatch cost and publish-to-delivery "
+        "latency. Uses an in-process pub/sub unless --redis is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=1000)
+        parser.add_argument('--aircraft', type=int, default=500)
+        parser.add_argument('--messages', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=0.25, help="Seconds between published deltas")
+        parser.add_argument('--redis', action='store_true', help="Publish through the configured Redis cache server")
+
+    def handle(self, *args, **options):
+        results = asyncio.run(self.run(options))
+        for name, value in results.items():
+            self.stdout.write(f"{name:<26}{value}")
+
+    async def run(self, options):
+        pubsub = get_pubsub() if options['redis'] else LocalPubSub()
+        hub = DeltaHub(pubsub)
+        dispatch_times = []
+        dispatch = hub.dispatch
+
+        def timed_dispatch(message):
+            started = time.perf_counter()
+            dispatch(message)
+            dispatch_times.append((time.perf_counter() - started) * 1000)
+        hub.dispatch = timed_dispatch
+
+        bboxes = random_bboxes(options['subscribers'])
+        subscriptions = [hub.subscribe(bbox, queue_size=options['messages']) for bbox in bboxes]
+        latencies = []
+
+        async def consume(subscription):
+            while True:
+                event = await subscription.queue.get()
+                latencies.append((time.time() - float(NOW.search(event).group(1))) * 1000)
+
+        consumers = [asyncio.create_task(consume(subscription)) for subscription in subscriptions]
+        await asyncio.sleep(0.5)
+
+        deltas = []
+        for poll in range(options['messages']):
+            now = time.time()
+            deltas.append([live_state(flight, now) for flight in generate_snapshot(options['aircraft'], poll)['aircraft']])
+
+        def publish():
+            for states in deltas:
+                pubsub.publish(DELTA_CHANNEL, json.dumps({'now': time.time(), 'aircraft': states}))
+                time.sleep(options['interval'])
+
+        started = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(None, publish)
+        while hub.messages < len(deltas) and time.perf_counter() - started < 60:
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.2)
+        for consumer in consumers:
+            consumer.cancel()
+        for subscription in subscriptions:
+            hub.unsubscribe(subscription)
+
+        sample = json.dumps({'now': time.time(), 'aircraft': deltas[0]})
+        naive_started = time.perf_counter()
+        naive_dispatch(sample, bboxes)
+        naive_ms = (time.perf_counter() - naive_started) * 1000
+
+        return {
+            'pubsub': type(pubsub).__name__,
+            'subscribers': len(subscriptions),
+            'messages': hub.messages,
+            'aircraft/message': options['aircraft'],
+            'events delivered': len(latencies),
+            'events dropped': sum(subscription.dropped for subscription in subscriptions),
+            'dispatch p50 ms': f"{statistics.median(dispatch_times):.2f}" if dispatch_times else '-',
+            'dispatch p99 ms': f"{percentile(dispatch_times, 0.99):.2f}",
+            'naive dispatch ms': f"{naive_ms:.2f}",
+            'delivery p50 ms': f"{percentile(latencies, 0.5):.2f}",
+            'delivery p99 ms': f"{percentile(latencies, 0.99):.2f}",
+        }
@@ -0,0 +1,112 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+from django.db.models.functions import Trim
+
+from dump1090_collector.benchmarks.database import benchmark_database
+from dump1090_collector.benchmarks.history import history_callsign, populate_history
+from dump1090_collector.models import FlightData
+from dump1090_collector.services.extractors import normalize_callsign
+
+# The single-column foreign key index FlightData.aircraft had before the
+# composite indexes replaced it.
+LEGACY_INDEXES = [models.Index(fields=['aircraft'], name='bench_legacy_aircraft_idx')]
+LOOKUP_INDEXES = [index for index in FlightData._meta.indexes if index.name in (
+    'flightdata_aircraft_ts_idx', 'flightdata_callsign_ts_idx',
+)]
+
+
+def legacy_by_callsign(callsign):
+    return FlightData.objects.annotate(
+        trimmed_callsign=Trim('flight_callsign')
+    ).filter(trimmed_callsign__iexact=callsign.strip()).order_by('timestamp')
+
+
+def legacy_by_aircraft(aircraft_id):
+    return FlightData.objects.filter(aircraft__id=aircraft_id).order_by('timestamp')
+
+
+def indexed_by_callsign(callsign):
+    return FlightData.objects.filter(callsign_norm=normalize_callsign(callsign)).order_by('timestamp')
+
+
+def indexed_by_aircraft(aircraft_id):
+    return FlightData.objects.filter(aircraft_id=aircraft_id).order_by('timestamp')
+
+
+class Command(BaseCommand):
+    help = (
+        "Time flight_path lookups on a synthetic position history, first with "
+        "the old Trim/iexact queries and single-column index, then with the "
+        "normalized columns and composite indexes. Runs against a temporary "
+        "test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000)
+        parser.add_argument('--aircraft', type=int, default=5000)
+        parser.add_argument('--lookups', type=int, default=20, help="Lookups timed per query shape.")
+        parser.add_argument('--window-hours', type=int, default=6, help="Time range for the windowed lookups.")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            with connection.schema_editor() as editor:
+                for index in LOOKUP_INDEXES:
+                    editor.remove_index(FlightData, index)
+                for index in LEGACY_INDEXES:
+                    editor.add_index(FlightData, index)
+
+            started = time.perf_counter()
+            aircraft_ids = populate_history(options['rows'], options['aircraft'])
+            self.stdout.write(f"Populated {options['rows']} rows in {time.perf_counter() - started:.1f}s")
+
+            rng = random.Random(0)
+            picks = [rng.randrange(len(aircraft_ids)) for _ in range(options['lookups'])]
+            samples = {
+                'aircraft': [aircraft_ids[pick] for pick in picks],
+                'callsign': [f'{history_callsign(pick).lower()}  ' for pick in picks],
+            }
+            latest = FlightData.objects.order_by('-timestamp').values_list('timestamp', flat=True).first()
+            window_start = latest - timedelta(hours=options['window_hours'])
+
+            before = self.measure(legacy_by_aircraft, legacy_by_callsign, samples, window_start)
+
+            with connection.schema_editor() as editor:
+                for index in LEGACY_INDEXES:
+                    editor.remove_index(FlightData, index)
+                started = time.perf_counter()
+                for index in LOOKUP_INDEXES:
+                    editor.add_index(FlightData, index)
+            self.stdout.write(f"Built composite indexes in {time.perf_counter() - started:.1f}s")
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(FlightData._meta.db_table)}")
+
+            after = self.measure(indexed_by_aircraft, indexed_by_callsign, samples, window_start)
+
+        self.stdout.write(f"{'lookup':<22}{'before p50 ms':>15}{'before p95 ms':>15}{'after p50 ms':>15}{'after p95 ms':>15}")
+        for name in before:
+            self.stdout.write(
+                f"{name:<22}{before[name][0]:>15.1f}{before[name][1]:>15.1f}{after[name][0]:>15.1f}{after[name][1]:>15.1f}"
+            )
+
+    def measure(self, by_aircraft, by_callsign, samples, window_start):
+        shapes = {
+            'aircraft': lambda value: by_aircraft(value),
+            'aircraft_window': lambda value: by_aircraft(value).filter(timestamp__gte=window_start),
+            'callsign': lambda value: by_callsign(value),
+            'callsign_window': lambda value: by_callsign(value).filter(timestamp__gte=window_start),
+        }
+        results = {}
+        for name, query in shapes.items():
+            timings = []
+            for value in samples[name.split('_')[0]]:
+                started = time.perf_counter()
+                list(query(value).values_list('timestamp', 'latitude', 'longitude', 'altitude'))
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[name] = (statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))])
+        return results
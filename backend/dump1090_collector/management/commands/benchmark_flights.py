@@ -0,0 +1,109 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from dump1090_collector.benchmarks.database import benchmark_database
+from dump1090_collector.benchmarks.history import HISTORY_DAYS, history_callsign
+from dump1090_collector.models import Flight, FlightData
+from dump1090_collector.services.flights import build_flights_from_history
+
+
+def populate_flights(flights, points, aircraft, seed=0):
+    """``flights`` flights of ``points`` positions 10 s apart, spread over HISTORY_DAYS days."""
+    rng = random.Random(seed)
+    end = timezone.now()
+    batch = []
+    for flight in range(flights):
+        index = rng.randrange(aircraft)
+        callsign = history_callsign(flight)
+        start = end - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+        for point in range(points):
+            batch.append(FlightData(
+                flight_hex=f'{0x400000 + index:06X}', flight_callsign=callsign, callsign_norm=callsign,
+                latitude=51 + point / points, longitude=-1.0, valid_position=True,
+                altitude=1000 + 300 * point, timestamp=start + timedelta(seconds=10 * point),
+            ))
+        if len(batch) >= 10000:
+            FlightData.objects.bulk_create(batch)
+            batch = []
+    FlightData.objects.bulk_create(batch)
+
+
+def raw_sessions(queryset):
+    return list(
+        queryset.values('flight_hex', 'callsign_norm')
+        .annotate(first_seen=Min('timestamp'), last_seen=Max('timestamp'), points=Count('id'))
+        .order_by('first_seen')[:500]
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Group a synthetic position history into flight sessions, then time "
+        "listing the last day's flights and looking one callsign up, grouped "
+        "ad hoc over FlightData vs read from Flight, and report table sizes. "
+        "Runs against a temporary test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flights', type=int, default=10000)
+        parser.add_argument('--points', type=int, default=100, help="Positions per flight.")
+        parser.add_argument('--aircraft', type=int, default=2000)
+        parser.add_argument('--lookups', type=int, default=10, help="Queries timed per shape.")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            populate_flights(options['flights'], options['points'], options['aircraft'])
+            started = time.perf_counter()
+            assigned = build_flights_from_history()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"Grouped {assigned} positions into {Flight.objects.count()} flights in "
+                              f"{elapsed:.1f}s ({assigned / elapsed:,.0f} positions/s)")
+
+            since = timezone.now() - timedelta(days=1)
+            callsign = history_callsign(0)
+            queries = {
+                'last day': (lambda: raw_sessions(FlightData.objects.filter(timestamp__gte=since)),
+                             lambda: list(Flight.objects.filter(last_seen__gte=since).order_by('first_seen', 'id')[:500])),
+                'one callsign': (lambda: raw_sessions(FlightData.objects.filter(callsign_norm=callsign)),
+                                 lambda: list(Flight.objects.filter(callsign=callsign).order_by('first_seen')[:500])),
+            }
+            results = {name: [self.time(raw, options['lookups']), self.time(sessions, options['lookups'])]
+                       for name, (raw, sessions) in queries.items()}
+            sizes = self.sizes() if connection.vendor == 'postgresql' else {}
+
+        self.stdout.write(f"{'query':<16}{'FlightData p50 ms':>19}{'Flight p50 ms':>15}")
+        for name, (raw, sessions) in results.items():
+            self.stdout.write(f"{name:<16}{raw:>19.1f}{sessions:>15.1f}")
+        for name, (total, per_row) in sizes.items():
+            self.stdout.write(f"{name:<16}{total / 2**20:>10.1f} MiB{per_row:>10.0f} bytes/row")
+
+    @staticmethod
+    def sizes():
+        """
+        Table plus index bytes, in total and per row, compacted first: ingest
+        writes each position once, while grouping the history rewrote them all.
+        """
+        sizes = {}
+        with connection.cursor() as cursor:
+            for model in (FlightData, Flight):
+                cursor.execute(f"VACUUM FULL {connection.ops.quote_name(model._meta.db_table)}")
+                cursor.execute("SELECT pg_total_relation_size(%s)", [model._meta.db_table])
+                total = cursor.fetchone()[0]
+                sizes[model.__name__] = (total, total / max(1, model.objects.count()))
+        return sizes
+
+    @staticmethod
+    def time(query, lookups):
+        timings = []
+        for _ in range(lookups):
+            started = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
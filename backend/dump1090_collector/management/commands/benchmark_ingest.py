@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from dump1090_collector.benchmarks.database import benchmark_database, reset_benchmark_state
+from dump1090_collector.benchmarks.traffic import generate_entries
+from dump1090_collector.services.bulk_store import store_snapshot
+from dump1090_collector.services.store_data import store_data
+
+
+def ingest_per_aircraft(entries):
+    for entry in entries:
+        store_data(*entry)
+
+
+class QueryCounter:
+    """Execute wrapper that counts queries without keeping them in memory."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+INGEST_MODES = {
+    'per_aircraft': ingest_per_aircraft,
+    'bulk': store_snapshot,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure queries and wall time per poll for the per-aircraft and bulk "
+        "ingestion paths. Runs against a temporary test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aircraft', type=int, nargs='+', default=[50, 200, 1000])
+        parser.add_argument('--polls', type=int, default=5, help="Polls per run; the first one is cold.")
+        parser.add_argument('--mode', choices=['both', *INGEST_MODES], default='both')
+
+    def handle(self, *args, **options):
+        modes = list(INGEST_MODES) if options['mode'] == 'both' else [options['mode']]
+        self.stdout.write(f"{'mode':<14}{'aircraft':>10}{'cold ms':>12}{'cold queries':>14}{'warm ms':>12}{'warm queries':>14}")
+        with benchmark_database():
+            for count in options['aircraft']:
+                for mode in modes:
+                    cold, warm = self.run(INGEST_MODES[mode], count, options['polls'])
+                    warm_ms = sum(ms for ms, _ in warm) / len(warm) if warm else 0.0
+                    warm_queries = sum(q for _, q in warm) / len(warm) if warm else 0.0
+                    self.stdout.write(
+                        f"{mode:<14}{count:>10}{cold[0]:>12.1f}{cold[1]:>14}{warm_ms:>12.1f}{warm_queries:>14.1f}"
+                    )
+
+    def run(self, ingest, count, polls):
+        reset_benchmark_state()
+        results = []
+        for poll in range(polls):
+            entries = generate_entries(count, poll=poll)
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                ingest(entries)
+                elapsed = (time.perf_counter() - start) * 1000
+            results.append((elapsed, counter.count))
+        return results[0], results[1:]
@@ -0,0 +1,160 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from dump1090_collector.adsbdb_client import AdsbdbClient, get_adsbdb_client, set_adsbdb_client
+from dump1090_collector.benchmarks.database import benchmark_database, reset_benchmark_state
+from dump1090_collector.benchmarks.stub_adsbdb import StubAdsbdbServer
+from dump1090_collector.benchmarks.stub_receiver import StubReceiverServer
+from dump1090_collector.benchmarks.traffic import generate_traffic, traffic_fleet_size
+from dump1090_collector.management.commands.benchmark_ingest import QueryCounter
+from dump1090_collector.models import FlightData
+from dump1090_collector.services.enrichment_cache import enrichment_cache
+from dump1090_collector.tasks import enrich_pending_task, poll_dump1090_task
+
+RECEIVER = 'benchmark'
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=Path(__file__).resolve().parent,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "End-to-end ingest benchmark: poll_dump1090_task polls a local stub "
+        "dump1090 serving synthetic great-circle traffic with churn and missing "
+        "fields, and the lookups it queues run against a stub adsbdb with "
+        "injected latency and errors before the next poll, as the enrichment "
+        "worker would. Reports throughput, poll latency and queries per poll "
+        "from the configured database and cache (on a temporary test database; "
+        "the cache is cleared), as a table or as JSON to track across commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aircraft', type=int, nargs='+', default=[100, 500])
+        parser.add_argument('--polls', type=int, default=50, help="Polls per run; the first one is cold.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Receiver seconds between polls.")
+        parser.add_argument('--churn', type=float, default=0.02, help="Fraction of the fleet replaced every poll.")
+        parser.add_argument('--missing', type=float, default=0.05, help="Chance each optional field is missing.")
+        parser.add_argument('--adsbdb-latency', type=float, default=20.0, help="Stub adsbdb latency in ms.")
+        parser.add_argument('--adsbdb-jitter', type=float, default=10.0, help="Extra random stub latency in ms.")
+        parser.add_argument('--adsbdb-errors', type=float, default=0.01, help="Stub adsbdb error rate.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true', help="Print the results as one JSON document.")
+        parser.add_argument('--output', help="Also append the results as a JSON line to this file.")
+
+    def handle(self, *args, **options):
+        params = {key: options[key] for key in (
+            'polls', 'interval', 'churn', 'missing', 'adsbdb_latency', 'adsbdb_jitter', 'adsbdb_errors', 'seed',
+        )}
+        previous_client = get_adsbdb_client()
+        try:
+            with benchmark_database():
+                results = [self.run(count, **params) for count in options['aircraft']]
+        finally:
+            set_adsbdb_client(previous_client)
+        record = {
+            'benchmark': 'pipeline',
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'cache': settings.CACHES['default']['BACKEND'],
+            'params': params,
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'a') as output:
+                output.write(json.dumps(record) + '\n')
+        if options['json']:
+            self.stdout.write(json.dumps(record, indent=2))
+            return
+        self.stdout.write(f"{'aircraft':>10}{'positions/s':>13}{'p50 ms':>10}{'p99 ms':>10}{'cold ms':>10}"
+                          f"{'queries/poll':>14}{'cold queries':>14}{'enrich ms':>11}{'adsbdb':>8}")
+        for result in results:
+            self.stdout.write(
+                f"{result['aircraft']:>10}{result['positions_per_second']:>13.0f}{result['poll_ms_p50']:>10.1f}"
+                f"{result['poll_ms_p99']:>10.1f}{result['cold_poll_ms']:>10.1f}{result['queries_per_poll']:>14.1f}"
+                f"{result['cold_queries']:>14}{result['enrichment_ms']:>11.0f}{result['adsbdb_requests']:>8}"
+            )
+
+    def run(self, count, polls, interval, churn, missing, adsbdb_latency, adsbdb_jitter, adsbdb_errors, seed):
+        reset_benchmark_state()
+        cache.clear()
+        enrichment_cache.clear_local()
+        queued = []
+        poll_ms, poll_queries, enrichment_ms, results = [], [], [], []
+        generator = partial(generate_traffic, interval=interval, churn=churn, missing=missing)
+        with ExitStack() as stack:
+            adsbdb = stack.enter_context(StubAdsbdbServer(
+                traffic_fleet_size(count, polls, churn), latency=adsbdb_latency / 1000,
+                jitter=adsbdb_jitter / 1000, error_rate=adsbdb_errors, seed=seed,
+            ))
+            receiver = stack.enter_context(StubReceiverServer(
+                0, 1, count, overlap=1, window=interval, seed=seed, generator=generator,
+            ))
+            set_adsbdb_client(AdsbdbClient(base_url=adsbdb.base_url, rate=0))
+            stack.enter_context(mock.patch('dump1090_collector.services.receivers.RECEIVERS',
+                                           {RECEIVER: receiver.base_url}))
+            # Polls run back to back here; the adaptive scheduler would skip them as not due.
+            stack.enter_context(mock.patch('dump1090_collector.services.polling.POLL_SCHEDULER', 'fixed'))
+            stack.enter_context(mock.patch('dump1090_collector.tasks.POLL_SCHEDULER', 'fixed'))
+            stack.enter_context(mock.patch('dump1090_collector.tasks.enrich_pending_task.delay',
+                                           side_effect=lambda *args: queued.append(args)))
+            for poll in range(polls):
+                receiver.poll = poll
+                counter = QueryCounter()
+                with connection.execute_wrapper(counter):
+                    started = time.perf_counter()
+                    results.append(poll_dump1090_task(RECEIVER))
+                    poll_ms.append((time.perf_counter() - started) * 1000)
+                poll_queries.append(counter.count)
+
+                started = time.perf_counter()
+                while queued:
+                    enrich_pending_task(*queued.pop(0))
+                enrichment_ms.append((time.perf_counter() - started) * 1000)
+
+        reported = sum(result['aircraft'] for result in results if result)
+        warm = poll_queries[1:] or poll_queries
+        return {
+            'aircraft': count,
+            'polls': polls,
+            'reported': reported,
+            'stored': FlightData.objects.count(),
+            'suppressed': sum(result['suppressed'] for result in results if result),
+            'positions_per_second': reported / (sum(poll_ms) / 1000),
+            'poll_ms_p50': statistics.median(poll_ms),
+            'poll_ms_p99': percentile(poll_ms, 0.99),
+            'poll_ms_max': max(poll_ms),
+            'cold_poll_ms': poll_ms[0],
+            'queries_per_poll': statistics.mean(warm),
+            'queries_per_poll_max': max(warm),
+            'cold_queries': poll_queries[0],
+            'enrichment_ms': sum(enrichment_ms),
+            'adsbdb_requests': adsbdb.requests,
+            'adsbdb_failures': adsbdb.failures,
+        }
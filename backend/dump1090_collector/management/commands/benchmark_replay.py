@@ -0,0 +1,65 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from dump1090_collector.benchmarks.database import benchmark_database, reset_benchmark_state
+from dump1090_collector.benchmarks.traffic import generate_traffic
+from dump1090_collector.models import FlightData
+from dump1090_collector.services.capture import capture_segments, capture_snapshot, read_captures
+from dump1090_collector.tasks import replay_snapshots
+
+# 2024-01-01T00:00:00Z, so the synthetic capture starts on a segment boundary.
+CAPTURE_START = 1704067200
+
+
+class Command(BaseCommand):
+    help = (
+        "Capture --minutes of synthetic polls (great-circle traffic with churn) "
+        "to segment files, then replay them into a temporary test database "
+        "with bulk stores of 1 and --batch snapshots. Reports capture size and "
+        "cost and how long a day of captures would take to replay."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aircraft', type=int, default=300)
+        parser.add_argument('--minutes', type=int, default=30)
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between captured polls.")
+        parser.add_argument('--batch', type=int, nargs='+', default=[1, 50])
+
+    def handle(self, *args, **options):
+        polls = int(options['minutes'] * 60 / options['interval'])
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            for poll in range(polls):
+                snapshot = generate_traffic(options['aircraft'], poll=poll, interval=options['interval'], churn=0.005)
+                snapshot['now'] = CAPTURE_START + poll * options['interval']
+                capture_snapshot('benchmark', snapshot, fetched=snapshot['now'], directory=directory)
+            capture_ms = (time.perf_counter() - started) * 1000 / polls
+            segments = capture_segments([directory])
+            size = sum(os.path.getsize(path) for _, _, path in segments)
+            self.stdout.write(f"{polls} snapshots of {options['aircraft']} aircraft in {len(segments)} segments: "
+                              f"{size / polls / 1024:.1f} KiB and {capture_ms:.2f} ms per snapshot")
+
+            self.stdout.write(f"{'batch':>8}{'snapshots/s':>14}{'positions/s':>14}{'stored':>10}{'day min':>10}")
+            # Enrichment lookups are outside what this measures; don't queue them.
+            with benchmark_database(), mock.patch('dump1090_collector.tasks.enrich_pending_task.delay'):
+                for batch_size in options['batch']:
+                    reset_benchmark_state()
+                    cache.clear()
+                    states, batch, aircraft = {}, [], 0
+                    started = time.perf_counter()
+                    for record in read_captures(segments):
+                        batch.append(record)
+                        if len(batch) >= batch_size:
+                            aircraft += replay_snapshots(batch, states)['aircraft']
+                            batch = []
+                    if batch:
+                        aircraft += replay_snapshots(batch, states)['aircraft']
+                    elapsed = time.perf_counter() - started
+                    day_minutes = elapsed * 86400 / (polls * options['interval']) / 60
+                    self.stdout.write(f"{batch_size:>8}{polls / elapsed:>14.0f}{aircraft / elapsed:>14.0f}"
+                                      f"{FlightData.objects.count():>10}{day_minutes:>10.1f}")
@@ -0,0 +1,61 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from dump1090_collector.benchmarks.database import benchmark_database
+from dump1090_collector.benchmarks.history import populate_history
+from dump1090_collector.benchmarks.traffic import AIRLINES, AIRPORTS
+from dump1090_collector.models import Airline, Airport, Flight, FlightData
+from dump1090_collector.projections import LAYOUTS
+from dump1090_collector.views import FlightDataViewSet
+
+
+def link_routes():
+    """Give every synthetic position a flight with an airline and an origin/destination pair."""
+    airlines = Airline.objects.bulk_create([Airline(icao=icao, iata=iata, name=name) for icao, iata, name in AIRLINES])
+    airports = Airport.objects.bulk_create([Airport(iata_code=iata, icao_code=icao) for iata, icao in AIRPORTS])
+    now = timezone.now()
+    flight = Flight.objects.create(
+        flight_hex='400000', first_seen=now, last_seen=now,
+        airline=airlines[0], origin_airport=airports[0], destination_airport=airports[1],
+    )
+    FlightData.objects.update(flight=flight)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare response size, wall time and query count of one flight_path "
+        "page in the nested, flat and columns layouts. Runs against a "
+        "temporary test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--aircraft', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        view = FlightDataViewSet.as_view({'get': 'flight_path'})
+        factory = RequestFactory()
+        self.stdout.write(f"{'layout':<10}{'bytes':>12}{'p50 ms':>10}{'queries':>10}")
+        with benchmark_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+            aircraft_ids = populate_history(options['rows'], options['aircraft'])
+            link_routes()
+            params = {'aircraft_id': aircraft_ids[0], 'page_size': options['page_size']}
+            for layout in LAYOUTS:
+                timings = []
+                for _ in range(options['repeat']):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        response = view(factory.get('/', {**params, 'layout': layout}))
+                        response.render()
+                        timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{layout:<10}{len(response.content):>12}{statistics.median(timings):>10.1f}{len(queries):>10}"
+                )
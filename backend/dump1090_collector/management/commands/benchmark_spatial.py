@@ -0,0 +1,72 @@
+import random
+import statistics
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from dump1090_collector.benchmarks.database import benchmark_database
+from dump1090_collector.benchmarks.history import populate_history
+from dump1090_collector.filters import FlightDataFilter
+from dump1090_collector.models import FlightData
+
+# Positions cover LAT_SPAN x LON_SPAN degrees north-east of 51N 1W; query
+# centres stay a degree inside that.
+LAT_SPAN = 4.0
+LON_SPAN = 6.0
+
+QUERIES = {
+    'radius 20nm, 1h': lambda lat, lon: {'radius': f'{lat},{lon},20', 'max_age': 3600},
+    'radius 20nm, 24h': lambda lat, lon: {'radius': f'{lat},{lon},20', 'max_age': 86400},
+    'bbox 0.5deg, 1h': lambda lat, lon: {'bbox': f'{lon},{lat},{lon + 0.5},{lat + 0.5}', 'max_age': 3600},
+    'radius 5nm, all': lambda lat, lon: {'radius': f'{lat},{lon},5'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time FlightDataFilter bbox/radius/time-window queries on a synthetic "
+        "multi-million-row position history, with plain lat/lon predicates "
+        "and then through the grid cell index. Runs against a temporary test "
+        "database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5_000_000)
+        parser.add_argument('--aircraft', type=int, default=5000)
+        parser.add_argument('--lookups', type=int, default=20, help="Queries timed per shape.")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            started = time.perf_counter()
+            populate_history(options['rows'], options['aircraft'], lat_span=LAT_SPAN, lon_span=LON_SPAN)
+            self.stdout.write(f"Populated {options['rows']} rows in {time.perf_counter() - started:.1f}s")
+
+            rng = random.Random(0)
+            centres = [(51 + rng.uniform(1, LAT_SPAN - 1), -1 + rng.uniform(1, LON_SPAN - 1))
+                       for _ in range(options['lookups'])]
+            with mock.patch('dump1090_collector.services.spatial.MAX_QUERY_CELLS', 0):
+                before = self.measure(centres)
+            after = self.measure(centres)
+
+        self.stdout.write(f"{'query':<20}{'rows':>8}{'lat/lon p50 ms':>16}{'p95 ms':>10}{'grid p50 ms':>14}{'p95 ms':>10}")
+        for name, (rows, p50, p95) in after.items():
+            self.stdout.write(f"{name:<20}{rows:>8}{before[name][1]:>16.1f}{before[name][2]:>10.1f}{p50:>14.1f}{p95:>10.1f}")
+
+    def measure(self, centres):
+        results = {}
+        for name, params in QUERIES.items():
+            timings, counts = [], []
+            for lat, lon in centres:
+                queryset = FlightDataFilter(params(lat, lon), queryset=FlightData.objects.all()).qs
+                started = time.perf_counter()
+                rows = list(queryset.values_list('timestamp', 'latitude', 'longitude', 'altitude'))
+                timings.append((time.perf_counter() - started) * 1000)
+                counts.append(len(rows))
+            timings.sort()
+            results[name] = (
+                int(statistics.median(counts)),
+                statistics.median(timings),
+                timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            )
+        return results
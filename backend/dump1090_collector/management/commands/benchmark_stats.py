@@ -0,0 +1,108 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from dump1090_collector.benchmarks.database import benchmark_database
+from dump1090_collector.benchmarks.history import populate_history
+from dump1090_collector.benchmarks.traffic import AIRLINES, AIRPORTS
+from dump1090_collector.models import Airline, Airport, Flight, FlightData
+from dump1090_collector.services.stats import (
+    aggregate_stats,
+    airline_leaderboard,
+    hourly_traffic,
+    route_leaderboard,
+)
+
+
+def raw_hourly(hours):
+    since = timezone.now() - timedelta(hours=hours)
+    return list(
+        FlightData.objects.filter(timestamp__gte=since)
+        .annotate(hour=TruncHour('timestamp')).values('hour')
+        .annotate(positions=Count('id'), aircraft=Count('flight_hex', distinct=True))
+        .order_by('hour')
+    )
+
+
+def raw_leaderboard(days, *fields):
+    since = timezone.now() - timedelta(days=days)
+    return list(
+        FlightData.objects.filter(timestamp__gte=since, **{f'flight__{field}__isnull': False for field in fields})
+        .values(*[f'flight__{field}' for field in fields]).annotate(flights=Count('callsign_norm', distinct=True))
+        .order_by('-flights')[:10]
+    )
+
+
+QUERIES = {
+    'hourly, 24h': (lambda: raw_hourly(24), lambda: hourly_traffic(24)),
+    'hourly, 30 days': (lambda: raw_hourly(30 * 24), lambda: hourly_traffic(30 * 24)),
+    'airlines, 30 days': (lambda: raw_leaderboard(30, 'airline'), lambda: airline_leaderboard(30, 10)),
+    'routes, 30 days': (lambda: raw_leaderboard(30, 'origin_airport', 'destination_airport'),
+                        lambda: route_leaderboard(30, 10)),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the stats endpoints' queries on a synthetic multi-million-row "
+        "position history, as ad-hoc aggregates over FlightData and from the "
+        "summary tables kept by aggregate_stats, plus the aggregation itself. "
+        "Runs against a temporary test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2_000_000)
+        parser.add_argument('--aircraft', type=int, default=5000)
+        parser.add_argument('--lookups', type=int, default=10, help="Queries timed per shape.")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            populate_history(options['rows'], options['aircraft'])
+            self.link_routes()
+            now = timezone.now() + timedelta(minutes=5)
+
+            started = time.perf_counter()
+            counted = runs = 0
+            while (count := aggregate_stats(now=now)) is not None:
+                counted += count
+                runs += 1
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"Catch-up: {counted} positions in {runs} runs, {elapsed:.1f}s "
+                              f"({counted / elapsed:,.0f} positions/s)")
+
+            results = {name: [self.time(raw, options['lookups']), self.time(summary, options['lookups'])]
+                       for name, (raw, summary) in QUERIES.items()}
+
+        self.stdout.write(f"{'query':<20}{'FlightData p50 ms':>19}{'summary p50 ms':>16}")
+        for name, (raw, summary) in results.items():
+            self.stdout.write(f"{name:<20}{raw:>19.1f}{summary:>16.1f}")
+
+    @staticmethod
+    def link_routes():
+        """
+        populate_history leaves positions unenriched; give each airline's
+        callsigns a route through one flight per airline.
+        """
+        airports = [Airport.objects.create(icao_code=icao, iata_code=iata) for iata, icao in AIRPORTS]
+        now = timezone.now()
+        for index, (icao, iata, name) in enumerate(AIRLINES):
+            flight = Flight.objects.create(
+                flight_hex=f'{index:06X}', first_seen=now, last_seen=now,
+                airline=Airline.objects.create(icao=icao, iata=iata, name=name),
+                origin_airport=airports[index], destination_airport=airports[-1 - index],
+            )
+            FlightData.objects.filter(callsign_norm__startswith=icao).update(flight=flight)
+
+    @staticmethod
+    def time(query, lookups):
+        timings = []
+        for _ in range(lookups):
+            started = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,84 @@
+import json
+import statistics
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from dump1090_collector.benchmarks.database import benchmark_database
+from dump1090_collector.benchmarks.feeds import generate_sbs_capture, serve_feed
+from dump1090_collector.benchmarks.traffic import generate_snapshot
+from dump1090_collector.management.commands.benchmark_ingest import QueryCounter
+from dump1090_collector.services.feed import FLUSH_INTERVAL, SbsDecoder, StreamCollector
+from dump1090_collector.tasks import POLLING_TIME, ingest_flights
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the parsing cost and update latency of polling aircraft.json "
+        "with decoding the SBS stream, and replay a synthetic SBS capture "
+        "through a local socket into the store (temporary test database)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aircraft', type=int, default=300)
+        parser.add_argument('--seconds', type=int, default=60)
+        parser.add_argument('--rate', type=int, default=2, help="Position and velocity messages per aircraft per second")
+        parser.add_argument('--speedup', type=float, default=10, help="Replay this many times faster than real time")
+        parser.add_argument('--no-store', action='store_true', help="Skip the end-to-end replay into the database")
+
+    def handle(self, *args, **options):
+        count, seconds = options['aircraft'], options['seconds']
+        capture = generate_sbs_capture(count, seconds, rate=options['rate'])
+        messages = capture.count(b'\n')
+
+        # Polling: one full aircraft.json parse every POLLING_TIME seconds.
+        document = json.dumps(generate_snapshot(count)).encode()
+        timings = []
+        for _ in range(20):
+            started = time.perf_counter()
+            json.loads(document)
+            timings.append(time.perf_counter() - started)
+        poll_cpu = statistics.median(timings) * seconds / POLLING_TIME
+
+        # Streaming: decode every message into per-aircraft state.
+        decoder = SbsDecoder()
+        started = time.perf_counter()
+        decoded = sum(1 for _ in decoder.feed(capture))
+        stream_cpu = time.perf_counter() - started
+
+        self.stdout.write(f"{count} aircraft, {seconds}s of traffic, {messages} SBS messages")
+        self.stdout.write(
+            f"poll   every {POLLING_TIME}s: {poll_cpu * 1000:.1f} ms parsing, "
+            f"position age up to {POLLING_TIME}s, messages between polls never seen"
+        )
+        self.stdout.write(
+            f"stream flush {FLUSH_INTERVAL}s: {stream_cpu * 1000:.1f} ms decoding {decoded} messages "
+            f"({stream_cpu / max(decoded, 1) * 1e6:.2f} us/message), position age up to {FLUSH_INTERVAL}s"
+        )
+        if options['no_store']:
+            return
+
+        batch_ms = []
+
+        def timed_ingest(flights):
+            started = time.perf_counter()
+            ingest_flights(flights)
+            batch_ms.append((time.perf_counter() - started) * 1000)
+
+        # Enrichment lookups are outside what this measures; don't queue them.
+        with benchmark_database(), mock.patch('dump1090_collector.tasks.enrich_pending_task.delay'):
+            counter = QueryCounter()
+            duration = seconds / options['speedup']
+            with serve_feed(capture, duration=duration) as (host, port), connection.execute_wrapper(counter):
+                collector = StreamCollector(timed_ingest, host, port, 'sbs', reconnect=False)
+                started = time.perf_counter()
+                collector.run()
+                elapsed = time.perf_counter() - started
+        batch_ms.sort()
+        self.stdout.write(
+            f"replay at {options['speedup']:g}x: {collector.tracker.messages} messages in {elapsed:.2f}s, "
+            f"{len(batch_ms)} batches, store p50 {statistics.median(batch_ms):.1f} ms / "
+            f"max {batch_ms[-1]:.1f} ms, {counter.count / len(batch_ms):.1f} queries/batch"
+        )
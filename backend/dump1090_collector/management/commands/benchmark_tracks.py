@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from dump1090_collector.benchmarks.database import benchmark_database
+from dump1090_collector.benchmarks.history import populate_airframe
+from dump1090_collector.models import FlightData
+from dump1090_collector.services.tracks import build_tracks, load_positions
+from dump1090_collector.views import FlightDataViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Time /flightdata/tracks/ on a month of history for one busy airframe: "
+        "loading, segmentation and the full JSON response, then flight_path "
+        "for one flight in full, simplified and simplified from the cache. "
+        "Runs against a temporary test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--flights-per-day', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--tolerance', default='0.05', help="flight_path tolerance in nautical miles")
+
+    def handle(self, *args, **options):
+        view = FlightDataViewSet.as_view({'get': 'tracks'})
+        factory = RequestFactory()
+        with benchmark_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+            rows = populate_airframe(days=options['days'], flights_per_day=options['flights_per_day'])
+            queryset = FlightData.objects.filter(flight_hex='4CA2D6')
+            timings = {'load': [], 'build': [], 'summary response': [], 'full response': []}
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                positions = load_positions(queryset)
+                timings['load'].append(time.perf_counter() - started)
+                started = time.perf_counter()
+                tracks = build_tracks(positions)
+                timings['build'].append(time.perf_counter() - started)
+                for name, params in (('summary response', {'hex': '4CA2D6', 'points': 'false'}),
+                                     ('full response', {'hex': '4CA2D6'})):
+                    started = time.perf_counter()
+                    response = view(factory.get('/', params))
+                    response.render()
+                    timings[name].append(time.perf_counter() - started)
+            kept = sum(track['points'] for track in tracks)
+            self.stdout.write(f"{rows} positions, {len(tracks)} flights, {rows - kept} spikes dropped")
+            for name, values in timings.items():
+                self.stdout.write(f"{name:<18}{statistics.median(values) * 1000:>10.1f} ms")
+            self.stdout.write(f"{'full response':<18}{len(response.content) / 1e6:>10.1f} MB")
+            self.benchmark_flight_path(factory, tracks[len(tracks) // 2], options)
+
+    def benchmark_flight_path(self, factory, track, options):
+        """One closed flight through flight_path: every position against the simplified path."""
+        view = FlightDataViewSet.as_view({'get': 'flight_path'})
+        aircraft_id = FlightData.objects.filter(flight_hex='4CA2D6').values_list('aircraft_id', flat=True)[0]
+        params = {'aircraft_id': aircraft_id, 'resolution': 'raw', 'layout': 'columns',
+                  'start': track['start'], 'end': f"{track['end'][:19]}.999999+00:00"}
+        cases = (('full path', {**params, 'page_size': track['points']}),
+                 ('simplified', {**params, 'tolerance': options['tolerance']}),
+                 ('simplified cached', {**params, 'tolerance': options['tolerance']}))
+        self.stdout.write(f"flight_path for one {track['points']}-point flight:")
+        for name, case in cases:
+            timings = []
+            for _ in range(options['repeat']):
+                if name == 'simplified':
+                    cache.clear()
+                started = time.perf_counter()
+                response = view(factory.get('/', case))
+                response.render()
+                timings.append(time.perf_counter() - started)
+            points = len(response.data['results']['columns']['id'])
+            self.stdout.write(f"{name:<18}{statistics.median(timings) * 1000:>10.1f} ms"
+                              f"{points:>8} points{len(response.content) / 1e3:>10.1f} kB")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from dump1090_collector.services.flights import FLIGHT_HISTORY_BATCH_SIZE, build_flights_from_history
+
+
+class Command(BaseCommand):
+    help = (
+        "Group positions stored before flight sessions existed into flights, "
+        "taking routes from the positions' legacy route columns, then the "
+        "stats job's per-callsign rows. Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=FLIGHT_HISTORY_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        assigned = build_flights_from_history(options['batch_size'])
+        self.stdout.write(f"Grouped {assigned} positions into flights")
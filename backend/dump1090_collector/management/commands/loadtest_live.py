@@ -0,0 +1,103 @@
+import statistics
+import threading
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+from dump1090_collector.benchmarks.traffic import generate_snapshot
+from dump1090_collector.benchmarks.wsgi import serve_django
+from dump1090_collector.services.live import get_live_store, update_live_picture
+
+
+class QueryCounter:
+    """Counts queries on every database connection opened while installed."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def attach(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test /api/live/ against a local server while a background "
+        "thread refreshes the live picture like the poller does, and count "
+        "database queries made meanwhile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--aircraft', type=int, default=500)
+        parser.add_argument('--clients', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument('--bbox', default=None, help="min_lon,min_lat,max_lon,max_lat")
+        parser.add_argument('--poll-interval', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        counter = QueryCounter()
+        params = {'bbox': options['bbox']} if options['bbox'] else {}
+
+        def poller():
+            poll = 0
+            while not stop.is_set():
+                update_live_picture(generate_snapshot(options['aircraft'], poll=poll)['aircraft'])
+                poll += 1
+                stop.wait(options['poll_interval'])
+
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def client(url):
+            session = requests.Session()
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    response = session.get(url, params=params, timeout=10)
+                    ok = response.status_code == 200
+                except requests.RequestException:
+                    ok = False
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    (latencies if ok else errors).append(elapsed)
+
+        connection_created.connect(counter.attach)
+        for connection in connections.all(initialized_only=True):
+            connection.execute_wrappers.append(counter)
+        try:
+            with override_settings(ALLOWED_HOSTS=['127.0.0.1']), serve_django() as base_url:
+                threads = [threading.Thread(target=poller)]
+                threads += [
+                    threading.Thread(target=client, args=(f'{base_url}/dump1090_collector/api/live/',))
+                    for _ in range(options['clients'])
+                ]
+                started = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                time.sleep(options['duration'])
+                stop.set()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(counter.attach)
+
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0.0
+        self.stdout.write(f"store          {type(get_live_store()).__name__}")
+        self.stdout.write(f"aircraft       {options['aircraft']}")
+        self.stdout.write(f"requests       {len(latencies)} ok, {len(errors)} failed")
+        self.stdout.write(f"throughput     {len(latencies) / elapsed:.0f} req/s")
+        self.stdout.write(f"latency p50    {statistics.median(latencies) if latencies else 0.0:.1f} ms")
+        self.stdout.write(f"latency p99    {p99:.1f} ms")
+        self.stdout.write(f"db queries     {counter.count}")
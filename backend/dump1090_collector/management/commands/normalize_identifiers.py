@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from dump1090_collector.services.normalize import NORMALIZE_BATCH_SIZE, normalize_existing_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the hex id from the linked aircraft on positions stored before "
+        "the column existed, upper-case hex ids and fill the normalized "
+        "callsign column on rows stored before identifiers were normalized "
+        "at ingest, and the grid cell on positions stored before it existed. "
+        "Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=NORMALIZE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        for name, count in normalize_existing_rows(options['batch_size']).items():
+            self.stdout.write(f"{name:<22}{count:>12}")
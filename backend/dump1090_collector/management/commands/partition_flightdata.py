@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dump1090_collector.services.partitions import (
+    convert_to_partitioned,
+    ensure_partitions,
+    list_partitions,
+    supports_partitioning,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the FlightData table into a table range-partitioned by "
+        "timestamp (PostgreSQL only). Stop the collector first: the table is "
+        "locked while existing rows are copied. Safe to re-run."
+    )
+
+    def handle(self, *args, **options):
+        if not supports_partitioning():
+            raise CommandError("FlightData partitioning requires PostgreSQL.")
+        if convert_to_partitioned():
+            self.stdout.write(self.style.SUCCESS("FlightData is now partitioned by timestamp."))
+        else:
+            created = ensure_partitions()
+            self.stdout.write(f"FlightData is already partitioned; created {len(created)} new partitions.")
+        for name, start, end in list_partitions():
+            self.stdout.write(f"  {name:<40} {start or 'DEFAULT'} -> {end or ''}")
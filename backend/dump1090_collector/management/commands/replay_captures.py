@@ -0,0 +1,138 @@
+import time
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from dump1090_collector.services import coverage, stats
+from dump1090_collector.services.capture import CAPTURE_DIR, capture_segments, read_captures
+from dump1090_collector.services.rollups import rewind_rollups, rolled_up_until
+from dump1090_collector.services.watermarks import watermark_position
+from dump1090_collector.tasks import ingest_flights, replay_snapshots
+
+
+def parse_time(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise CommandError(f"Not a date and time: {value}")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    return moment.timestamp()
+
+
+class Command(BaseCommand):
+    help = (
+        "Feed captured receiver snapshots (DUMP1090_CAPTURE) back through "
+        "ingestion in fetch order, merged across receivers. By default they "
+        "are stored as history, stamped with their capture time, --batch "
+        "snapshots per bulk store, e.g. to rebuild positions after a schema "
+        "change. Snapshots fetched within DUMP1090_REPLAY_OVERLAP seconds of a "
+        "stored position are skipped, so only gaps in the stored history are "
+        "filled. Stats, coverage and rollups do not count history behind their "
+        "watermarks: --reset-aggregates recounts stats and coverage from the "
+        "oldest stored position and recomputes rollups from the earliest "
+        "replayed minute on. With --live each snapshot goes through the poll "
+        "path instead (live picture, push feed, current time) to load-test "
+        "with real traffic. --speedup paces the replay against the capture's "
+        "clock."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help="Capture directories or segment files; DUMP1090_CAPTURE_DIR by default.")
+        parser.add_argument('--receiver', action='append', help="Only these receivers; repeatable.")
+        parser.add_argument('--since', help="Only snapshots fetched at or after this time (UTC unless given).")
+        parser.add_argument('--until', help="Only snapshots fetched before this time.")
+        parser.add_argument('--speedup', type=float, default=0,
+                            help="Replay this many times faster than captured; 0 replays as fast as possible.")
+        parser.add_argument('--batch', type=int, default=50, help="Snapshots per bulk store when storing history.")
+        parser.add_argument('--live', action='store_true', help="Ingest each snapshot as a live poll.")
+        parser.add_argument('--reset-aggregates', action='store_true',
+                            help="After a history replay, reset stats and coverage and rewind rollups to count it.")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ([CAPTURE_DIR] if CAPTURE_DIR else [])
+        if not paths:
+            raise CommandError("Pass capture paths or set DUMP1090_CAPTURE_DIR.")
+        start = parse_time(options['since']) if options['since'] else None
+        end = parse_time(options['until']) if options['until'] else None
+        segments = capture_segments(paths, receivers=options['receiver'], start=start, end=end)
+        if not segments:
+            self.stdout.write("No captured snapshots found")
+            return
+
+        totals = {'snapshots': 0, 'aircraft': 0, 'stored': 0, 'suppressed': 0, 'merged': 0, 'skipped': 0}
+        states = {}
+        replayed = set()
+        batch = []
+        earliest = None
+
+        def add(result, snapshots):
+            totals['snapshots'] += snapshots
+            for key in ('aircraft', 'stored', 'suppressed', 'merged', 'skipped'):
+                totals[key] += result.get(key, 0)
+
+        def flush():
+            nonlocal earliest
+            if batch:
+                result = replay_snapshots(batch, states, replayed)
+                add(result, len(batch))
+                if result['earliest'] is not None and (earliest is None or result['earliest'] < earliest):
+                    earliest = result['earliest']
+                batch.clear()
+
+        first = last = None
+        started = time.perf_counter()
+        for record in read_captures(segments, start=start, end=end):
+            first = record['fetched'] if first is None else first
+            last = record['fetched']
+            if options['speedup']:
+                ahead = (last - first) / options['speedup'] - (time.perf_counter() - started)
+                if ahead > 0:
+                    # Store what is pending rather than holding it back while waiting.
+                    flush()
+                    time.sleep(max(0.0, (last - first) / options['speedup'] - (time.perf_counter() - started)))
+            if options['live']:
+                snapshot = record['snapshot']
+                flights = [flight for flight in snapshot.get('aircraft', []) if isinstance(flight, dict)]
+                add(ingest_flights(flights, receiver=record['receiver'], now=snapshot.get('now')), 1)
+            else:
+                batch.append(record)
+                if len(batch) >= options['batch']:
+                    flush()
+        flush()
+        elapsed = time.perf_counter() - started
+
+        span = (last - first) if first is not None else 0
+        self.stdout.write(
+            f"Replayed {totals['snapshots']} snapshots from {len(segments)} segments ({span:.0f}s captured) "
+            f"in {elapsed:.1f}s ({span / elapsed if elapsed else 0:.0f}x): {totals['aircraft']} aircraft, "
+            f"{totals['stored']} stored, {totals['suppressed']} unchanged, {totals['merged']} merged, "
+            f"{totals['skipped']} snapshots already stored"
+        )
+        if earliest is not None:
+            self.aggregate(earliest, options['reset_aggregates'])
+
+    def aggregate(self, earliest, reset):
+        """Reset or warn about the aggregates that will not count positions replayed from ``earliest`` on."""
+        if reset:
+            stats.reset_stats()
+            coverage.reset_coverage()
+            rewound = rewind_rollups(earliest)
+            self.stdout.write(
+                f"Reset stats and coverage and dropped {rewound} rollups from {earliest:%Y-%m-%d %H:%M}; "
+                f"the maintenance tasks rebuild them"
+            )
+            return
+        behind = [
+            name for name, position in (
+                ('stats', watermark_position(stats.WATERMARK)),
+                ('coverage', watermark_position(coverage.WATERMARK)),
+                ('rollups', rolled_up_until()),
+            )
+            if position is not None and position > earliest
+        ]
+        if behind:
+            self.stderr.write(
+                f"Positions from {earliest:%Y-%m-%d %H:%M} on are behind the {', '.join(behind)} watermarks "
+                f"and will not be counted; rerun with --reset-aggregates to rebuild them"
+            )
@@ -0,0 +1,58 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from dump1090_collector.benchmarks.feeds import serve_feed
+from dump1090_collector.services.feed import (
+    DECODERS,
+    DEFAULT_PORTS,
+    FLUSH_INTERVAL,
+    STREAM_FORMAT,
+    STREAM_HOST,
+    STREAM_PORT,
+    StreamCollector,
+)
+from dump1090_collector.tasks import ingest_flights
+
+
+class Command(BaseCommand):
+    help = (
+        "Ingest dump1090's SBS (30003), raw (30002) or Beast (30005) TCP feed "
+        "continuously, storing changed aircraft in micro-batches. With "
+        "--replay, serves a captured feed file on a local socket, ingests it "
+        "once and exits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default=STREAM_HOST)
+        parser.add_argument('--port', type=int, help="Defaults to DUMP1090_STREAM_PORT, or the format's usual port")
+        parser.add_argument('--format', choices=list(DECODERS), default=STREAM_FORMAT)
+        parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL)
+        parser.add_argument('--replay', metavar='FILE', help="Captured feed to replay instead of connecting to dump1090")
+
+    def handle(self, *args, **options):
+        fmt = options['format']
+        port = options['port'] or (STREAM_PORT if fmt == STREAM_FORMAT else DEFAULT_PORTS[fmt])
+        if options['replay']:
+            with open(options['replay'], 'rb') as capture:
+                data = capture.read()
+            with serve_feed(data) as (host, replay_port):
+                collector = StreamCollector(ingest_flights, host, replay_port, fmt,
+                                            flush_interval=options['flush_interval'], reconnect=False)
+                started = time.perf_counter()
+                collector.run()
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"Replayed {collector.tracker.messages} messages for {len(collector.tracker.tracks)} aircraft "
+                f"in {collector.batches} batches ({elapsed:.2f}s)"
+            )
+            return
+
+        collector = StreamCollector(ingest_flights, options['host'], port, fmt, flush_interval=options['flush_interval'])
+        signal.signal(signal.SIGTERM, lambda *_: collector.stop())
+        try:
+            collector.run()
+        except KeyboardInterrupt:
+            collector.stop()
+            collector.flush()
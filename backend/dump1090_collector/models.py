@@ -1,9 +1,15 @@
 from django.db import models
 
+# FlightData's legacy route columns, left out of the API and the archive.
+LEGACY_ROUTE_FIELDS = ['airline', 'origin_airport', 'destination_airport']
+
 
 class FlightData(models.Model):
+    flight_hex = models.CharField(max_length=10, blank=True, null=True)
     squawk_code = models.IntegerField(blank=True, null=True)
     flight_callsign = models.CharField(max_length=20, blank=True, null=True)
+    # Trimmed, upper-cased copy of flight_callsign for indexed lookups.
+    callsign_norm = models.CharField(max_length=20, blank=True, null=True)
     latitude = models.FloatField(default=0.0)
     longitude = models.FloatField(default=0.0)
     valid_position = models.BooleanField(default=False)
@@ -14,14 +20,92 @@ class FlightData(models.Model):
     speed_in_knots = models.IntegerField(default=0)
     messages_received = models.IntegerField(default=0)
     seen = models.IntegerField(default=0)
-    timestamp = models.DateTimeField(null=True, blank=True)
+    timestamp = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Lat/lon grid bucket of valid positions (services.spatial.grid_cell),
+    # indexed with timestamp for bbox and radius queries.
+    grid_cell = models.IntegerField(blank=True, null=True)
 
     aircraft = models.ForeignKey(
         'Aircraft',
         on_delete=models.SET_NULL,
         blank=True,
         null=True,
-        related_name='flights'
+        related_name='flights',
+        db_index=False,  # covered by flightdata_aircraft_ts_idx
+    )
+    # The flight session this position belongs to (services.flights), which
+    # also carries the airline and route.
+    flight = models.ForeignKey(
+        'Flight',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='positions',
+        db_index=False,  # covered by flightdata_flight_ts_idx
+    )
+    # Route columns from before flight sessions, no longer written. Kept so
+    # the generated migration does not drop them before build_flights has
+    # copied them onto Flight; removed in a later release.
+    airline = models.ForeignKey(
+        'Airline',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+        db_index=False,
+    )
+    origin_airport = models.ForeignKey(
+        'Airport',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+        db_index=False,
+    )
+    destination_airport = models.ForeignKey(
+        'Airport',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+        db_index=False,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['aircraft', 'timestamp'], name='flightdata_aircraft_ts_idx'),
+            models.Index(fields=['callsign_norm', 'timestamp'], name='flightdata_callsign_ts_idx'),
+            models.Index(fields=['flight_hex', 'timestamp'], name='flightdata_hex_ts_idx'),
+            models.Index(fields=['grid_cell', 'timestamp'], name='flightdata_cell_ts_idx'),
+            models.Index(fields=['flight', 'timestamp'], name='flightdata_flight_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.flight_callsign or 'Unknown'} ({self.aircraft.hex_id if self.aircraft else 'No AC'})"
+
+
+class Flight(models.Model):
+    """
+    One flight session: the positions of one hex id under one callsign with no
+    gap longer than DUMP1090_FLIGHT_GAP, opened and extended by the collector.
+    Kept like the rollups, for DUMP1090_ROLLUP_RETENTION_DAYS after it ends.
+    """
+    flight_hex = models.CharField(max_length=10)
+    callsign = models.CharField(max_length=20, blank=True, null=True)  # normalized
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    min_altitude = models.IntegerField(blank=True, null=True)
+    max_altitude = models.IntegerField(blank=True, null=True)
+    max_range_nm = models.FloatField(blank=True, null=True)  # from the receiver, when configured
+    points = models.IntegerField(default=0)
+
+    aircraft = models.ForeignKey(
+        'Aircraft',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='flight_sessions',
+        db_index=False,  # covered by flight_aircraft_first_seen_idx
     )
     airline = models.ForeignKey(
         'Airline',
@@ -45,12 +129,145 @@ class FlightData(models.Model):
         related_name='destination_flights'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['flight_hex', 'last_seen'], name='flight_hex_last_seen_idx'),
+            models.Index(fields=['callsign', 'first_seen'], name='flight_callsign_first_seen_idx'),
+            models.Index(fields=['aircraft', 'first_seen'], name='flight_aircraft_first_seen_idx'),
+            models.Index(fields=['first_seen', 'id'], name='flight_first_seen_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.flight_callsign or 'Unknown'} ({self.aircraft.hex_id if self.aircraft else 'No AC'})"
+        return f"{self.callsign or 'Unknown'} ({self.flight_hex}) {self.first_seen:%Y-%m-%d %H:%M}"
+
+
+class FlightDataRollup(models.Model):
+    """One averaged position per aircraft per minute, kept after raw FlightData expires."""
+    bucket = models.DateTimeField()
+    flight_hex = models.CharField(max_length=10)
+    flight_callsign = models.CharField(max_length=20, blank=True, null=True)  # normalized
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    altitude = models.IntegerField(blank=True, null=True)
+    max_altitude = models.IntegerField(blank=True, null=True)
+    track = models.IntegerField(blank=True, null=True)
+    speed_in_knots = models.IntegerField(blank=True, null=True)
+    points = models.IntegerField(default=0)
+
+    aircraft = models.ForeignKey(
+        'Aircraft',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='rollups'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['flight_hex', 'bucket'], name='unique_rollup_hex_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['aircraft', 'bucket'], name='rollup_aircraft_bucket_idx'),
+            models.Index(fields=['flight_callsign', 'bucket'], name='rollup_callsign_bucket_idx'),
+            models.Index(fields=['bucket'], name='rollup_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.flight_hex} @ {self.bucket:%Y-%m-%d %H:%M}"
+
+
+class Watermark(models.Model):
+    """How far an incremental job has read FlightData, by timestamp."""
+    name = models.CharField(max_length=50, unique=True)
+    position = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.position:%Y-%m-%d %H:%M:%S}"
+
+
+class CoverageSector(models.Model):
+    """The furthest position heard in one bearing sector from the receiver."""
+    bearing = models.IntegerField(unique=True)  # start of the sector, degrees
+    max_range_nm = models.FloatField()
+    altitude = models.IntegerField(blank=True, null=True)
+    timestamp = models.DateTimeField()
+
+
+class CoveragePolarCell(models.Model):
+    """Positions heard per bearing sector and range ring around the receiver."""
+    bearing = models.IntegerField()  # start of the sector, degrees
+    range_nm = models.IntegerField()  # inner edge of the ring
+    positions = models.IntegerField(default=0)
+    min_altitude = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bearing', 'range_nm'], name='unique_coverage_polar_cell'),
+        ]
+
+
+class CoverageGridCell(models.Model):
+    """Positions heard per lat/lon grid cell (services.spatial.grid_cell)."""
+    cell = models.IntegerField(unique=True)
+    positions = models.IntegerField(default=0)
+    min_altitude = models.IntegerField(blank=True, null=True)
+
+
+class HourlyTraffic(models.Model):
+    """Traffic counted per hour by the aggregate_stats job, kept after raw FlightData expires."""
+    hour = models.DateTimeField(unique=True)
+    positions = models.IntegerField(default=0)
+    messages = models.BigIntegerField(default=0)  # from the per-aircraft messages_received counters
+    aircraft = models.IntegerField(default=0)  # distinct hex ids, estimated from aircraft_sketch
+    # HyperLogLog registers over the hex ids heard (services.stats), merged
+    # across runs and across hours for distinct counts over any range.
+    aircraft_sketch = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00}: {self.aircraft} aircraft"
+
+
+class DailyCallsign(models.Model):
+    """A callsign heard on a day, with its route, for the airline and route leaderboards."""
+    day = models.DateField()
+    callsign = models.CharField(max_length=20)  # normalized
+    positions = models.IntegerField(default=0)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    airline = models.ForeignKey(
+        'Airline',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='daily_callsigns'
+    )
+    origin_airport = models.ForeignKey(
+        'Airport',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='origin_daily_callsigns'
+    )
+    destination_airport = models.ForeignKey(
+        'Airport',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='destination_daily_callsigns'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'callsign'], name='unique_daily_callsign'),
+        ]
+
+    def __str__(self):
+        return f"{self.callsign} on {self.day}"
 
 
 class Aircraft(models.Model):
-    hex_id = models.CharField(max_length=6, unique=False)
+    hex_id = models.CharField(max_length=6, unique=False, db_index=True)
     aircraft_type = models.CharField(max_length=50, blank=True, null=True)
     icao_type = models.CharField(max_length=50, blank=True, null=True)
     manufacturer = models.CharField(max_length=100, blank=True, null=True)
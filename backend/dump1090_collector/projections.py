@@ -0,0 +1,62 @@
+from .models import LEGACY_ROUTE_FIELDS, Aircraft, Airline, Airport, Flight, FlightData
+from .serializers import AircraftSerializer, AirlineSerializer, AirportSerializer, FlightSerializer
+
+# layout query parameter: "nested" repeats full related objects on every
+# row; "flat" returns rows carrying only foreign key ids plus side tables
+# listing each related object once; "columns" is "flat" with the rows
+# transposed into one array per field.
+LAYOUTS = ('nested', 'flat', 'columns')
+
+SIDE_TABLES = {
+    Aircraft: ('aircraft', AircraftSerializer),
+    Airline: ('airlines', AirlineSerializer),
+    Airport: ('airports', AirportSerializer),
+    Flight: ('flights', FlightSerializer),
+}
+
+
+def concrete_fields(model):
+    """Concrete fields served by the API, without FlightData's legacy route columns."""
+    hidden = LEGACY_ROUTE_FIELDS if model is FlightData else ()
+    return [field for field in model._meta.concrete_fields if field.name not in hidden]
+
+
+def flat_fields(model):
+    """Concrete column names, with foreign keys as ``<name>_id``."""
+    return [field.attname for field in concrete_fields(model)]
+
+
+def flat_queryset(queryset):
+    """Rows as plain dicts straight from the cursor, skipping model instances and joins."""
+    return queryset.select_related(None).values(*flat_fields(queryset.model))
+
+
+def side_tables(rows, model):
+    """
+    Load every related object referenced by ``rows`` with one query per
+    related model, keyed by id.
+    """
+    ids = {}
+    for field in concrete_fields(model):
+        if field.is_relation and field.related_model in SIDE_TABLES:
+            ids.setdefault(field.related_model, set()).update(
+                row[field.attname] for row in rows if row[field.attname] is not None
+            )
+    tables = {}
+    for related_model, pks in ids.items():
+        name, serializer_class = SIDE_TABLES[related_model]
+        relations = [field.name for field in related_model._meta.concrete_fields if field.is_relation]
+        objects = related_model.objects.select_related(*relations).filter(pk__in=pks) if pks else []
+        tables[name] = {str(data['id']): data for data in serializer_class(objects, many=True).data}
+    return tables
+
+
+def project(rows, model, layout):
+    """Build the ``flat`` or ``columns`` payload for a page of ``flat_queryset`` rows."""
+    rows = list(rows)
+    if layout == 'columns':
+        data = {'columns': {name: [row[name] for row in rows] for name in flat_fields(model)}}
+    else:
+        data = {'positions': rows}
+    data.update(side_tables(rows, model))
+    return data
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import FlightData, Aircraft, Airline, Airport
+from .models import LEGACY_ROUTE_FIELDS, Flight, FlightData, FlightDataRollup, Aircraft, Airline, Airport
 
 
 class AircraftSerializer(serializers.ModelSerializer):
@@ -20,12 +20,35 @@ class AirportSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class FlightDataSerializer(serializers.ModelSerializer):
-    aircraft = AircraftSerializer(read_only=True)
+class FlightSerializer(serializers.ModelSerializer):
     airline = AirlineSerializer(read_only=True)
     origin_airport = AirportSerializer(read_only=True)
     destination_airport = AirportSerializer(read_only=True)
 
+    class Meta:
+        model = Flight
+        fields = '__all__'
+
+
+class FlightDataSerializer(serializers.ModelSerializer):
+    aircraft = AircraftSerializer(read_only=True)
+    flight = FlightSerializer(read_only=True)
+
     class Meta:
         model = FlightData
+        exclude = LEGACY_ROUTE_FIELDS
+
+
+class FlightPositionSerializer(FlightDataSerializer):
+    """A flight's positions, without repeating the flight on every row."""
+    flight = None
+
+    class Meta:
+        model = FlightData
+        exclude = ['flight', *LEGACY_ROUTE_FIELDS]
+
+
+class FlightDataRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FlightDataRollup
         fields = '__all__'
@@ -0,0 +1,285 @@
+import functools
+import logging
+import os
+import re
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import islice
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, models, transaction
+from django.db.models import Max
+from django.utils import timezone
+from pyarrow import ipc
+
+from ..models import LEGACY_ROUTE_FIELDS, FlightData, FlightDataRollup, Watermark
+from .partitions import PARTITION_INTERVAL, RETENTION_DELETE_BATCH, is_partitioned, list_partitions, qn
+from .tracks import empty_positions
+from .watermarks import watermark_position
+
+logger = logging.getLogger(__name__)
+
+# Positions older than ARCHIVE_AFTER_DAYS whole days are moved out of
+# FlightData into one compressed Arrow IPC file per UTC day under ARCHIVE_DIR.
+# None leaves every position in the database.
+ARCHIVE_DIR = getattr(settings, 'DUMP1090_ARCHIVE_DIR', None)
+ARCHIVE_AFTER_DAYS = getattr(settings, 'DUMP1090_ARCHIVE_AFTER_DAYS', None)
+ARCHIVE_COMPRESSION = getattr(settings, 'DUMP1090_ARCHIVE_COMPRESSION', 'zstd')
+ARCHIVE_BATCH_SIZE = getattr(settings, 'DUMP1090_ARCHIVE_BATCH_SIZE', 16384)
+# Incremental jobs that must have read positions before they leave the database.
+UPSTREAM_WATERMARKS = ('stats', 'coverage')
+WATERMARK = 'archive'
+UNTIL_KEY = 'archive:until'
+FILE_RE = re.compile(r'^flightdata-(\d{4}-\d{2}-\d{2})\.arrow$')
+
+FIELDS = [field for field in FlightData._meta.concrete_fields if field.name not in LEGACY_ROUTE_FIELDS]
+COLUMNS = [field.attname for field in FIELDS]
+
+
+def arrow_type(field):
+    if field.is_relation or isinstance(field, (models.AutoField, models.BigAutoField, models.BigIntegerField)):
+        return pa.int64()
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.IntegerField):
+        return pa.int32()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    # Files are sorted by hex, so compression takes care of repeated strings.
+    return pa.string()
+
+
+SCHEMA = pa.schema([pa.field(field.attname, arrow_type(field)) for field in FIELDS])
+
+
+def day_path(day):
+    return os.path.join(ARCHIVE_DIR, f'flightdata-{day:%Y-%m-%d}.arrow')
+
+
+def day_bounds(day):
+    start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def archived_until():
+    """
+    Positions before this moment are read from the archive rather than
+    FlightData; None before the first export. Cached, since every history
+    request asks.
+    """
+    if not ARCHIVE_DIR:
+        return None
+    until = cache.get(UNTIL_KEY)
+    if until is None:
+        until = watermark_position(WATERMARK) or ''
+        cache.set(UNTIL_KEY, until, timeout=None)
+    return until or None
+
+
+def archive_cutoff(now, after_days):
+    """
+    Midnight UTC before which days are closed: at least ``after_days`` old and
+    already read by the stats, coverage and rollup jobs.
+    """
+    cutoffs = [now - timedelta(days=after_days)]
+    cutoffs += [position for position in map(watermark_position, UPSTREAM_WATERMARKS) if position is not None]
+    latest_rollup = FlightDataRollup.objects.aggregate(latest=Max('bucket'))['latest']
+    if latest_rollup is not None:
+        cutoffs.append(latest_rollup)
+    return day_bounds(min(cutoffs).astimezone(dt_timezone.utc).date())[0]
+
+
+def record_batches(queryset):
+    """The ``queryset``'s rows as Arrow record batches of ARCHIVE_BATCH_SIZE rows, built column by column."""
+    rows = queryset.values_list(*COLUMNS).iterator(chunk_size=ARCHIVE_BATCH_SIZE)
+    while chunk := list(islice(rows, ARCHIVE_BATCH_SIZE)):
+        yield pa.record_batch(
+            [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), SCHEMA)], schema=SCHEMA,
+        )
+
+
+def write_day(day, queryset):
+    """
+    Write the ``queryset``'s positions to the day's file, keeping positions
+    archived there earlier unless they are exported again. The file is
+    replaced atomically. Returns the exported ids.
+    """
+    path = day_path(day)
+    partial = f'{path}.partial'
+    exported = []
+    options = ipc.IpcWriteOptions(compression=ARCHIVE_COMPRESSION)
+    with open(partial, 'wb') as sink:
+        with ipc.new_file(sink, SCHEMA, options=options) as writer:
+            for batch in record_batches(queryset):
+                writer.write_batch(batch)
+                exported.append(batch.column('id').to_numpy())
+            ids = np.concatenate(exported) if exported else np.empty(0, dtype=np.int64)
+            if os.path.exists(path):
+                # Positions that arrived late for a day archived before.
+                for batch in ipc.open_file(pa.memory_map(path)).read_all().to_batches(ARCHIVE_BATCH_SIZE):
+                    writer.write_batch(batch.filter(pc.invert(pc.is_in(batch.column('id'), value_set=pa.array(ids)))))
+        # The writer has written the footer on closing; make the whole file
+        # durable before it replaces the old one and the rows are deleted.
+        sink.flush()
+        os.fsync(sink.fileno())
+    os.replace(partial, path)
+    directory = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+    return ids
+
+
+def delete_archived(start, end, ids):
+    """
+    Remove exported positions from FlightData: the day's partition in one
+    go when it holds exactly these rows, by id in batches otherwise.
+    """
+    if is_partitioned() and PARTITION_INTERVAL == 'day':
+        for name, partition_start, partition_end in list_partitions():
+            if (partition_start, partition_end) == (start, end):
+                with connection.cursor() as cursor:
+                    cursor.execute(f"SELECT count(*) FROM {qn(name)}")
+                    if cursor.fetchone()[0] == len(ids):
+                        cursor.execute(f"DROP TABLE {qn(name)}")
+                        return
+    day = FlightData.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    for offset in range(0, len(ids), RETENTION_DELETE_BATCH):
+        day.filter(id__in=ids[offset:offset + RETENTION_DELETE_BATCH].tolist()).delete()
+
+
+def archive_day(day):
+    """
+    Export one UTC day of positions to its archive file and delete them from
+    FlightData, in one transaction holding the archive watermark lock.
+    Returns the number of positions moved.
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    start, end = day_bounds(day)
+    with transaction.atomic():
+        Watermark.objects.get_or_create(name=WATERMARK, defaults={'position': end})
+        watermark = Watermark.objects.select_for_update().get(name=WATERMARK)
+        # Grouped by aircraft, so one aircraft's positions fall in few record batches.
+        day_positions = FlightData.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        ids = write_day(day, day_positions.order_by('flight_hex', 'timestamp', 'id'))
+        delete_archived(start, end, ids)
+        if watermark.position < end:
+            watermark.position = end
+            watermark.save(update_fields=['position'])
+    cache.delete(UNTIL_KEY)
+    logger.info("Archived %s positions from %s", len(ids), day)
+    return len(ids)
+
+
+def archive_closed_days(now=None, after_days=ARCHIVE_AFTER_DAYS):
+    """
+    Move every closed day of positions (see archive_cutoff) out of FlightData,
+    oldest first. Returns (day, positions) per day archived.
+    """
+    if not ARCHIVE_DIR or after_days is None:
+        return []
+    cutoff = archive_cutoff(now or timezone.now(), after_days)
+    oldest = FlightData.objects.filter(timestamp__lt=cutoff).order_by('timestamp').values_list('timestamp', flat=True)
+    archived = []
+    while (first := oldest.first()) is not None:
+        day = first.astimezone(dt_timezone.utc).date()
+        archived.append((day, archive_day(day)))
+    return archived
+
+
+def archive_files(start=None, end=None):
+    """(path, day start, day end) of archive files with positions in [start, end), oldest first."""
+    if not ARCHIVE_DIR or not os.path.isdir(ARCHIVE_DIR):
+        return []
+    files = []
+    for name in sorted(os.listdir(ARCHIVE_DIR)):
+        match = FILE_RE.match(name)
+        if match is None:
+            continue
+        day_start, day_end = day_bounds(datetime.strptime(match.group(1), '%Y-%m-%d').date())
+        if (start is None or day_end > start) and (end is None or day_start < end):
+            files.append((os.path.join(ARCHIVE_DIR, name), day_start, day_end))
+    return files
+
+
+def scalar(name, value):
+    """``value`` as an Arrow scalar comparable with the archived ``name`` column."""
+    return pa.scalar(value, type=SCHEMA.field(name).type)
+
+
+def reader(source, names):
+    return ipc.open_file(source, options=ipc.IpcReadOptions(included_fields=[COLUMNS.index(name) for name in names]))
+
+
+def read_archive(start=None, end=None, columns=COLUMNS, **equals):
+    """
+    Archived positions in [start, end) whose ``equals`` columns have the given
+    values, as an Arrow table of ``columns`` ordered by time. Files are
+    memory-mapped; per record batch the filtered columns are read first, and
+    the rest only for batches with matching rows. Days wholly inside the
+    range skip the time filter.
+    """
+    until = archived_until()
+    end = until if end is None or until is None else min(end, until)
+    batches = []
+    for path, day_start, day_end in archive_files(start, end) if until is not None else []:
+        bounds = {}
+        if start is not None and start > day_start:
+            bounds['greater_equal'] = start
+        if end < day_end:
+            bounds['less'] = end
+        source = pa.memory_map(path)
+        data_reader = reader(source, dict.fromkeys([*columns, 'timestamp', 'id']))
+        if not bounds and not equals:
+            batches += [data_reader.get_batch(index) for index in range(data_reader.num_record_batches)]
+            continue
+        key_reader = reader(source, dict.fromkeys([*equals, *(['timestamp'] if bounds else [])]))
+        for index in range(key_reader.num_record_batches):
+            batch = key_reader.get_batch(index)
+            masks = [getattr(pc, compare)(batch['timestamp'], scalar('timestamp', value))
+                     for compare, value in bounds.items()]
+            masks += [pc.equal(batch[name], scalar(name, value)) for name, value in equals.items()]
+            mask = functools.reduce(pc.and_kleene, masks)
+            if pc.any(mask).as_py():
+                batches.append(data_reader.get_batch(index).filter(mask))
+    if not batches:
+        return SCHEMA.empty_table().select(columns)
+    table = pa.Table.from_batches(batches)
+    return table.sort_by([('timestamp', 'ascending'), ('id', 'ascending')]).select(columns)
+
+
+def archived_rows(start=None, end=None, **equals):
+    """read_archive as FlightData.values() dicts, foreign keys as ``<name>_id``."""
+    return read_archive(start, end, **equals).to_pylist()
+
+
+def archived_positions(start=None, end=None, **equals):
+    """read_archive in tracks.load_positions' shape: valid positions as NumPy arrays ordered by time."""
+    table = read_archive(start, end, ['timestamp', 'latitude', 'longitude', 'altitude', 'callsign_norm',
+                                      'valid_position'], **equals)
+    table = table.filter(pc.and_kleene(
+        pc.equal(table['valid_position'], True),
+        pc.invert(pc.and_kleene(pc.equal(table['latitude'], 0), pc.equal(table['longitude'], 0))),
+    ))
+    if not len(table):
+        return empty_positions()
+    return {
+        't': pc.cast(table['timestamp'], pa.int64()).to_numpy() / 1e6,
+        'lat': table['latitude'].to_numpy(),
+        'lon': table['longitude'].to_numpy(),
+        'alt': pc.cast(table['altitude'], pa.float64()).to_numpy(zero_copy_only=False),
+        'callsign': np.array([value or '' for value in table['callsign_norm'].to_pylist()], dtype=str),
+    }
+
+
+def with_archived(archived, positions):
+    """Archived positions followed by the ones from FlightData, both in tracks.load_positions' shape."""
+    if not len(archived['t']):
+        return positions
+    return {name: np.concatenate([archived[name], positions[name]]) for name in positions}
@@ -0,0 +1,317 @@
+import io
+import logging
+from datetime import datetime
+from functools import partial
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from ..models import LEGACY_ROUTE_FIELDS, FlightData, Aircraft, Airline, Airport
+from .services import aircraft_defaults, airline_fields, airport_fields
+from .extractors import extract_aircraft_info, extract_callsign_info, extract_flight_data
+from .store_data import extract_route_info, build_flight_data
+from .flights import assign_flights
+from .identity_map import aircraft_map, airline_map, airport_map, content_hash, sync_identity_maps
+
+BULK_BATCH_SIZE = getattr(settings, 'DUMP1090_BULK_BATCH_SIZE', 500)
+COPY_FIELDS = [
+    field for field in FlightData._meta.concrete_fields
+    if not field.primary_key and field.name not in LEGACY_ROUTE_FIELDS
+]
+
+AIRCRAFT_FIELDS = [
+    'hex_id',
+    'aircraft_type',
+    'icao_type',
+    'manufacturer',
+    'mode_s',
+    'registration',
+    'registered_owner_country_iso_name',
+    'registered_owner_country_name',
+    'registered_owner_operator_flag_code',
+    'registered_owner',
+    'url_photo',
+    'url_photo_thumbnail',
+]
+
+
+def resolve_aircraft(lookups, identity_updates):
+    """
+    Resolve a list of ``(aircraft_info, flight_hex)`` pairs to Aircraft ids,
+    mirroring get_or_create_aircraft: match on registration when there is one,
+    otherwise on hex id, and refresh the enrichment columns of matched rows.
+
+    Lookups whose key and enrichment payload are already in the identity map
+    never reach the database.
+    """
+    result = [None] * len(lookups)
+    pending = []
+    for index, (aircraft_info, flight_hex) in enumerate(lookups):
+        registration = (aircraft_info.get('registration') or '').strip()
+        fields = {**aircraft_defaults(aircraft_info, flight_hex), 'registration': registration}
+        key = ('registration', registration) if registration else ('hex_id', flight_hex)
+        digest = content_hash(fields)
+        entry = aircraft_map.get(key)
+        if entry is not None and entry[1] == digest:
+            result[index] = entry[0]
+        else:
+            pending.append((index, key, fields, digest))
+
+    if not pending:
+        return result
+
+    registrations = {key[1] for _, key, _, _ in pending if key[0] == 'registration'}
+    hexes = {key[1] for _, key, _, _ in pending if key[0] == 'hex_id'}
+    by_key = {}
+    existing = Aircraft.objects.filter(
+        Q(registration__in=registrations) | Q(hex_id__in=hexes)
+    ).order_by('pk')
+    for aircraft_obj in existing:
+        for key, wanted in ((('registration', aircraft_obj.registration), registrations),
+                            (('hex_id', aircraft_obj.hex_id), hexes)):
+            if key[1] not in wanted:
+                continue
+            if key in by_key:
+                logging.warning("Multiple Aircraft objects found for %s=%s. Using the first one.", *key)
+            by_key.setdefault(key, aircraft_obj)
+
+    to_create = []
+    to_update = {}
+    resolved = []
+    for index, key, fields, digest in pending:
+        aircraft_obj = by_key.get(key)
+        if aircraft_obj is None:
+            aircraft_obj = Aircraft(**fields)
+            to_create.append(aircraft_obj)
+            by_key[key] = aircraft_obj
+        elif aircraft_obj.pk is not None:
+            changed = False
+            for name, value in fields.items():
+                if getattr(aircraft_obj, name) != value:
+                    setattr(aircraft_obj, name, value)
+                    changed = True
+            if changed:
+                to_update[aircraft_obj.pk] = aircraft_obj
+        else:
+            for name, value in fields.items():
+                setattr(aircraft_obj, name, value)
+        resolved.append((index, key, digest, aircraft_obj))
+
+    if to_create:
+        Aircraft.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+    if to_update:
+        Aircraft.objects.bulk_update(to_update.values(), AIRCRAFT_FIELDS, batch_size=BULK_BATCH_SIZE)
+    for index, key, digest, aircraft_obj in resolved:
+        result[index] = aircraft_obj.pk
+        identity_updates.append((aircraft_map, key, aircraft_obj.pk, digest))
+    return result
+
+
+def resolve_airlines(airline_infos, identity_updates):
+    """
+    Resolve airline payloads to Airline ids keyed on (icao, iata), creating
+    the missing ones. Existing rows are left untouched, as in
+    get_or_create_airline.
+    """
+    result = [None] * len(airline_infos)
+    pending = []
+    for index, airline_info in enumerate(airline_infos):
+        key = (airline_info.get('icao', ''), airline_info.get('iata', ''))
+        entry = airline_map.get(key)
+        if entry is not None:
+            result[index] = entry[0]
+        else:
+            pending.append((index, key, airline_info))
+
+    if not pending:
+        return result
+
+    by_key = {}
+    existing = Airline.objects.filter(
+        icao__in={key[0] for _, key, _ in pending},
+        iata__in={key[1] for _, key, _ in pending},
+    ).order_by('pk')
+    for airline_obj in existing:
+        by_key.setdefault((airline_obj.icao, airline_obj.iata), airline_obj)
+
+    to_create = []
+    resolved = []
+    for index, key, airline_info in pending:
+        airline_obj = by_key.get(key)
+        if airline_obj is None:
+            airline_obj = Airline(**airline_fields(airline_info))
+            to_create.append(airline_obj)
+            by_key[key] = airline_obj
+        resolved.append((index, key, airline_obj))
+
+    if to_create:
+        Airline.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+    for index, key, airline_obj in resolved:
+        result[index] = airline_obj.pk
+        identity_updates.append((airline_map, key, airline_obj.pk, None))
+    return result
+
+
+def resolve_airports(airport_infos, identity_updates):
+    """
+    Resolve airport payloads to Airport ids. Like get_or_create_airport, an
+    airport matches when either its IATA or its ICAO code matches, and the
+    lowest primary key wins.
+    """
+    result = [None] * len(airport_infos)
+    pending = []
+    for index, airport_info in enumerate(airport_infos):
+        fields = airport_fields(airport_info)
+        key = (fields['iata_code'], fields['icao_code'])
+        entry = airport_map.get(key)
+        if entry is not None:
+            result[index] = entry[0]
+        else:
+            pending.append((index, key, fields))
+
+    if not pending:
+        return result
+
+    by_iata = {}
+    by_icao = {}
+    iata_codes = {key[0] for _, key, _ in pending}
+    icao_codes = {key[1] for _, key, _ in pending}
+    existing = Airport.objects.filter(Q(iata_code__in=iata_codes) | Q(icao_code__in=icao_codes)).order_by('pk')
+    for airport_obj in existing:
+        by_iata.setdefault(airport_obj.iata_code, airport_obj)
+        by_icao.setdefault(airport_obj.icao_code, airport_obj)
+
+    to_create = []
+    resolved = []
+    for index, key, fields in pending:
+        candidates = [
+            airport_obj for airport_obj in (by_iata.get(key[0]), by_icao.get(key[1]))
+            if airport_obj is not None
+        ]
+        # Existing rows always sort before the ones created in this batch.
+        existing_candidates = [airport_obj for airport_obj in candidates if airport_obj.pk is not None]
+        if existing_candidates:
+            airport_obj = min(existing_candidates, key=lambda obj: obj.pk)
+        elif candidates:
+            airport_obj = min(candidates, key=to_create.index)
+        else:
+            airport_obj = Airport(**fields)
+            to_create.append(airport_obj)
+            by_iata.setdefault(airport_obj.iata_code, airport_obj)
+            by_icao.setdefault(airport_obj.icao_code, airport_obj)
+        resolved.append((index, key, airport_obj))
+
+    if to_create:
+        Airport.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+    for index, key, airport_obj in resolved:
+        result[index] = airport_obj.pk
+        identity_updates.append((airport_map, key, airport_obj.pk, None))
+    return result
+
+
+def apply_identity_updates(identity_updates):
+    for identity_map, key, pk, digest in identity_updates:
+        identity_map.put(key, pk, digest)
+
+
+def resolve_present(resolver, items, identity_updates):
+    """Run ``resolver`` over the items that are not None, keeping None in place."""
+    present = [index for index, item in enumerate(items) if item is not None]
+    result = [None] * len(items)
+    if present:
+        for index, pk in zip(present, resolver([items[index] for index in present], identity_updates)):
+            result[index] = pk
+    return result
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    if value is True or value is False:
+        return 't' if value else 'f'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def copy_flight_data(flight_data):
+    """
+    Insert unsaved FlightData rows with one text COPY. Several times faster
+    than bulk_create for large batches, which spends most of its time
+    compiling SQL value by value, but the rows don't get their ids back.
+    PostgreSQL only.
+    """
+    buffer = io.StringIO()
+    for position in flight_data:
+        values = []
+        for field in COPY_FIELDS:
+            # Flights may have been saved after being assigned, so read their ids off the objects.
+            if field.is_relation and field.is_cached(position):
+                related = field.get_cached_value(position)
+                value = related.pk if related is not None else None
+            else:
+                value = field.get_prep_value(getattr(position, field.attname))
+            values.append(copy_value(value))
+        buffer.write('\t'.join(values))
+        buffer.write('\n')
+    buffer.seek(0)
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in COPY_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {connection.ops.quote_name(FlightData._meta.db_table)} ({columns}) FROM STDIN', buffer)
+
+
+def store_snapshot(entries, timestamps=None, copy=False):
+    """
+    Store a whole dump1090 poll in a handful of set-based queries.
+
+    ``entries`` is an iterable of ``(flight, adsbdb_aircraft_data,
+    adsbdb_callsign_data)`` tuples, i.e. the arguments store_data takes for a
+    single aircraft. Foreign keys for the whole snapshot are resolved together
+    and every FlightData row is written with one bulk_create.
+
+    Passing None instead of an adsbdb payload means the lookup is still
+    pending: the aircraft or the flight's route is left empty for the
+    enrichment task to back-fill. ``timestamps`` optionally gives each
+    entry's position time, e.g. when replaying captured snapshots; rows are
+    stamped with the current time otherwise. With ``copy`` on PostgreSQL the
+    positions are written with copy_flight_data and returned without ids.
+    """
+    rows = []
+    for index, (flight, adsbdb_aircraft_data, adsbdb_callsign_data) in enumerate(entries):
+        flight_fields = extract_flight_data(flight, timestamps[index] if timestamps else None)
+        aircraft_lookup = None
+        if adsbdb_aircraft_data is not None:
+            aircraft_lookup = (extract_aircraft_info(adsbdb_aircraft_data), flight_fields["flight_hex"])
+        route_info = (None, None, None)
+        if adsbdb_callsign_data is not None:
+            route_info = extract_route_info(extract_callsign_info(adsbdb_callsign_data))
+        rows.append((flight_fields, aircraft_lookup, *route_info))
+
+    if not rows:
+        return []
+
+    sync_identity_maps()
+    identity_updates = []
+    with transaction.atomic():
+        aircraft_ids = resolve_present(resolve_aircraft, [row[1] for row in rows], identity_updates)
+        airline_ids = resolve_present(resolve_airlines, [row[2] for row in rows], identity_updates)
+        # Origin and destination are interleaved so airports are matched in
+        # the same order store_data would see them.
+        airport_ids = resolve_present(
+            resolve_airports, [info for row in rows for info in (row[3], row[4])], identity_updates
+        )
+        flight_data = [build_flight_data(row[0], aircraft_id=aircraft_ids[i]) for i, row in enumerate(rows)]
+        # Rows whose callsign lookup is pending leave their flight's route for the enrichment task.
+        assign_flights(flight_data, [
+            None if row[2] is None else (airline_ids[i], airport_ids[2 * i], airport_ids[2 * i + 1])
+            for i, row in enumerate(rows)
+        ])
+        if copy and connection.vendor == 'postgresql':
+            copy_flight_data(flight_data)
+        else:
+            flight_data = FlightData.objects.bulk_create(flight_data, batch_size=BULK_BATCH_SIZE)
+        # Only remember ids of rows that actually made it to the database.
+        transaction.on_commit(partial(apply_identity_updates, identity_updates))
+    return flight_data
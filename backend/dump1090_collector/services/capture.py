@@ -0,0 +1,172 @@
+import heapq
+import io
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone as dt_timezone
+from itertools import chain
+
+import pyarrow as pa
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# With DUMP1090_CAPTURE on, every polled aircraft.json is appended, with the
+# time it was fetched, to a zstd-compressed JSON lines segment per receiver
+# and CAPTURE_SEGMENT_SECONDS under CAPTURE_DIR. Each snapshot is its own
+# zstd frame, so any process can append to a segment and a segment cut short
+# by a crash still reads up to its last whole snapshot.
+CAPTURE_ENABLED = getattr(settings, 'DUMP1090_CAPTURE', False)
+CAPTURE_DIR = getattr(settings, 'DUMP1090_CAPTURE_DIR', None)
+CAPTURE_SEGMENT_SECONDS = getattr(settings, 'DUMP1090_CAPTURE_SEGMENT_SECONDS', 3600)
+CAPTURE_RETENTION_DAYS = getattr(settings, 'DUMP1090_CAPTURE_RETENTION_DAYS', None)
+CAPTURE_COMPRESSION_LEVEL = getattr(settings, 'DUMP1090_CAPTURE_COMPRESSION_LEVEL', 3)
+SEGMENT_RE = re.compile(r'^(\d{8}T\d{6}Z)\.jsonl\.zst$')
+SEGMENT_FORMAT = '%Y%m%dT%H%M%SZ'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+_codec = None
+
+
+def codec():
+    global _codec
+    if _codec is None:
+        _codec = pa.Codec('zstd', compression_level=CAPTURE_COMPRESSION_LEVEL)
+    return _codec
+
+
+def segment_path(directory, receiver, fetched):
+    start = fetched - fetched % CAPTURE_SEGMENT_SECONDS
+    name = datetime.fromtimestamp(start, tz=dt_timezone.utc).strftime(SEGMENT_FORMAT)
+    return os.path.join(directory, receiver, f'{name}.jsonl.zst')
+
+
+def capture_snapshot(receiver, snapshot, fetched=None, directory=None):
+    """
+    Append ``receiver``'s ``snapshot`` (the aircraft.json document) to its
+    current segment under ``directory`` (CAPTURE_DIR while capture is on,
+    otherwise nothing is written). Failures are logged rather than failing
+    the poll.
+    """
+    directory = directory or (CAPTURE_DIR if CAPTURE_ENABLED else None)
+    if not directory:
+        return
+    fetched = time.time() if fetched is None else fetched
+    path = segment_path(directory, receiver, fetched)
+    line = json.dumps({'receiver': receiver, 'fetched': fetched, 'snapshot': snapshot}, separators=(',', ':'))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One unbuffered write per snapshot, so appends from different processes never interleave.
+        with open(path, 'ab', buffering=0) as segment:
+            segment.write(codec().compress((line + '\n').encode(), asbytes=True))
+    except OSError as e:
+        logger.warning("Could not capture %s snapshot to %s: %s", receiver, path, e)
+
+
+def capture_segments(paths=None, receivers=None, start=None, end=None):
+    """
+    (receiver, segment start, path) of the segments under ``paths`` (capture
+    directories, receiver directories or segment files; CAPTURE_DIR by
+    default) that may hold snapshots fetched in [start, end), in time order.
+    """
+    found = []
+
+    def add(path):
+        match = SEGMENT_RE.match(os.path.basename(path))
+        if match is None:
+            return
+        receiver = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        segment_start = datetime.strptime(match.group(1), SEGMENT_FORMAT).replace(tzinfo=dt_timezone.utc).timestamp()
+        if receivers and receiver not in receivers:
+            return
+        if (start is not None and segment_start + CAPTURE_SEGMENT_SECONDS <= start) or (
+                end is not None and segment_start >= end):
+            return
+        found.append((receiver, segment_start, path))
+
+    for path in paths or ([CAPTURE_DIR] if CAPTURE_DIR else []):
+        if os.path.isfile(path):
+            add(path)
+            continue
+        for root, _, names in os.walk(path):
+            for name in names:
+                add(os.path.join(root, name))
+    return sorted(set(found), key=lambda segment: (segment[1], segment[0], segment[2]))
+
+
+def complete_frames(data):
+    """Length of the whole zstd frames at the start of ``data``, i.e. where a cut-off write begins."""
+    end = position = 0
+    while position + 6 <= len(data) and data[position:position + 4] == ZSTD_MAGIC:
+        descriptor = data[position + 4]
+        single_segment = descriptor & 0x20
+        content_size = (1 if single_segment else 0, 2, 4, 8)[descriptor >> 6]
+        position += 5 + (0 if single_segment else 1) + (0, 1, 2, 4)[descriptor & 3] + content_size
+        last = False
+        while not last and position + 3 <= len(data):
+            header = int.from_bytes(data[position:position + 3], 'little')
+            last, block_type, size = header & 1, (header >> 1) & 3, header >> 3
+            position += 3 + (1 if block_type == 1 else size)
+        position += 4 if descriptor & 0x04 else 0
+        if not last or position > len(data):
+            break
+        end = position
+    return end
+
+
+def decode_lines(stream, skip=0):
+    for number, line in enumerate(io.BufferedReader(stream, 1 << 20)):
+        if number >= skip:
+            yield json.loads(line)
+
+
+def read_segment(path):
+    """The captured records in one segment, up to the last whole snapshot if it was cut off."""
+    read = 0
+    try:
+        for record in decode_lines(pa.input_stream(path, compression='zstd')):
+            read += 1
+            yield record
+        return
+    except (OSError, ValueError) as e:
+        logger.warning("%s ends in a damaged snapshot: %s", path, e)
+    # The decoder fails before handing out its buffered frames; decode the whole ones again.
+    with open(path, 'rb') as segment:
+        data = segment.read()
+    whole = pa.BufferReader(data[:complete_frames(data)])
+    try:
+        yield from decode_lines(pa.CompressedInputStream(whole, 'zstd'), skip=read)
+    except (OSError, ValueError) as e:
+        logger.warning("Stopped reading %s: %s", path, e)
+
+
+def read_captures(segments, start=None, end=None):
+    """
+    Every record in ``segments`` (as from capture_segments) fetched in
+    [start, end), merged across receivers in fetch order.
+    """
+    by_receiver = {}
+    for receiver, _, path in segments:
+        by_receiver.setdefault(receiver, []).append(path)
+    records = heapq.merge(
+        *(chain.from_iterable(read_segment(path) for path in paths) for paths in by_receiver.values()),
+        key=lambda record: record['fetched'],
+    )
+    for record in records:
+        if (start is None or record['fetched'] >= start) and (end is None or record['fetched'] < end):
+            yield record
+
+
+def prune_captures(now=None, retention_days=CAPTURE_RETENTION_DAYS):
+    """Delete segments that ended more than ``retention_days`` ago; returns how many."""
+    if not CAPTURE_DIR or retention_days is None or not os.path.isdir(CAPTURE_DIR):
+        return 0
+    cutoff = (time.time() if now is None else now) - retention_days * 86400
+    pruned = 0
+    for _, segment_start, path in capture_segments([CAPTURE_DIR]):
+        if segment_start + CAPTURE_SEGMENT_SECONDS <= cutoff:
+            os.remove(path)
+            pruned += 1
+    return pruned
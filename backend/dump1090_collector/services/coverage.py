@@ -0,0 +1,172 @@
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import CoverageGridCell, CoveragePolarCell, CoverageSector, FlightData
+from .spatial import GRID_CELL_DEGREES, GRID_COLUMNS, GRID_ROWS
+from .tracks import bearing, distance_nm, load_positions
+from .upserts import least, upsert
+from .watermarks import reset_watermark, watermark_position, watermark_window
+
+logger = logging.getLogger(__name__)
+
+RECEIVER_LAT = getattr(settings, 'DUMP1090_RECEIVER_LAT', None)
+RECEIVER_LON = getattr(settings, 'DUMP1090_RECEIVER_LON', None)
+BEARING_STEP = getattr(settings, 'DUMP1090_COVERAGE_BEARING_STEP', 2)  # degrees
+RANGE_STEP = getattr(settings, 'DUMP1090_COVERAGE_RANGE_STEP', 5)  # nm
+# Positions further out than this are bad decodes, not coverage.
+MAX_RANGE = getattr(settings, 'DUMP1090_COVERAGE_MAX_RANGE', 400)  # nm
+# Each run reads positions from the watermark up to COVERAGE_LAG seconds ago,
+# at most COVERAGE_MAX_SPAN seconds of them, so a backlog is caught up over
+# several runs and the full history is never rescanned.
+COVERAGE_LAG = getattr(settings, 'DUMP1090_COVERAGE_LAG', 120)
+COVERAGE_MAX_SPAN = getattr(settings, 'DUMP1090_COVERAGE_MAX_SPAN', 6 * 60 * 60)
+WATERMARK = 'coverage'
+
+
+def receiver():
+    if RECEIVER_LAT is None or RECEIVER_LON is None:
+        return None
+    return RECEIVER_LAT, RECEIVER_LON
+
+
+def grid_cells(lat, lon):
+    """services.spatial.grid_cell for arrays of positions."""
+    rows = np.minimum(np.floor((lat + 90) / GRID_CELL_DEGREES), GRID_ROWS - 1)
+    columns = np.floor((lon + 180) / GRID_CELL_DEGREES) % GRID_COLUMNS
+    return (rows * GRID_COLUMNS + columns).astype(np.int64)
+
+
+def group(keys, alt):
+    """Distinct keys with their position count and lowest altitude (NaN when none is known)."""
+    order = np.argsort(keys, kind='stable')
+    keys, alt = keys[order], alt[order]
+    unique, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    lowest = np.fmin.reduceat(alt, starts) if len(keys) else np.empty(0)
+    return unique.tolist(), counts.tolist(), lowest.tolist()
+
+
+def as_altitude(value):
+    return None if value != value else int(value)  # NaN
+
+
+def add_to_cells(model, keys, counts, lowest):
+    """Add position counts and lowest altitudes onto the stored cells; ``keys`` maps key fields to values."""
+    upsert(model, list(keys), {**keys, 'positions': counts, 'min_altitude': [as_altitude(value) for value in lowest]}, {
+        'positions': "stored.positions + excluded.positions",
+        'min_altitude': least("stored.min_altitude", "excluded.min_altitude"),
+    })
+
+
+def aggregate_grid(positions):
+    cells, counts, lowest = group(grid_cells(positions['lat'], positions['lon']), positions['alt'])
+    add_to_cells(CoverageGridCell, {'cell': cells}, counts, lowest)
+
+
+def aggregate_polar(positions, origin):
+    lat, lon = np.full(len(positions['lat']), origin[0]), np.full(len(positions['lon']), origin[1])
+    distance = distance_nm(lat, lon, positions['lat'], positions['lon'])
+    in_range = distance <= MAX_RANGE
+    distance = distance[in_range]
+    sector = (bearing(lat, lon, positions['lat'], positions['lon'])[in_range] // BEARING_STEP).astype(np.int64)
+    alt, t = positions['alt'][in_range], positions['t'][in_range]
+
+    rings = (distance // RANGE_STEP).astype(np.int64)
+    rings_per_sector = MAX_RANGE // RANGE_STEP + 1
+    keys, counts, lowest = group(sector * rings_per_sector + rings, alt)
+    keys = np.array(keys, dtype=np.int64)
+    add_to_cells(CoveragePolarCell, {
+        'bearing': (keys // rings_per_sector * BEARING_STEP).tolist(),
+        'range_nm': (keys % rings_per_sector * RANGE_STEP).tolist(),
+    }, counts, lowest)
+
+    # Furthest position per sector: sort by sector, then by distance descending.
+    order = np.lexsort((-distance, sector))
+    firsts = order[np.unique(sector[order], return_index=True)[1]]
+    stored = {row.bearing: row for row in CoverageSector.objects.all()}
+    updated = []
+    for index in firsts.tolist():
+        sector_bearing = int(sector[index]) * BEARING_STEP
+        row = stored.get(sector_bearing)
+        if row is not None and row.max_range_nm >= distance[index]:
+            continue
+        updated.append(CoverageSector(
+            bearing=sector_bearing,
+            max_range_nm=round(float(distance[index]), 2),
+            altitude=as_altitude(alt[index]),
+            timestamp=datetime.fromtimestamp(float(t[index]), tz=dt_timezone.utc),
+        ))
+    CoverageSector.objects.bulk_create(updated, update_conflicts=True, unique_fields=['bearing'],
+                                       update_fields=['max_range_nm', 'altitude', 'timestamp'])
+
+
+def aggregate_coverage(now=None):
+    """
+    Bin positions stored since the coverage watermark into the lat/lon grid
+    and, when the receiver position is configured, into bearing/range cells
+    and the max range per bearing sector, then advance the watermark, all in
+    one transaction. Returns the number of positions binned, or None when
+    already caught up.
+    """
+    with watermark_window(WATERMARK, now or timezone.now(), COVERAGE_LAG, COVERAGE_MAX_SPAN) as window:
+        if window is None:
+            return None
+        start, end = window
+        positions = load_positions(FlightData.objects.filter(timestamp__gte=start, timestamp__lt=end))
+        if len(positions['t']):
+            aggregate_grid(positions)
+            origin = receiver()
+            if origin is not None:
+                aggregate_polar(positions, origin)
+    logger.info("Binned %s positions into coverage between %s and %s", len(positions['t']), start, end)
+    return len(positions['t'])
+
+
+def reset_coverage():
+    """Forget all coverage, e.g. after moving the antenna; the next runs rebuild it from the oldest position."""
+    with transaction.atomic():
+        for model in (CoverageGridCell, CoveragePolarCell, CoverageSector):
+            model.objects.all().delete()
+        reset_watermark(WATERMARK)
+
+
+def coverage_summary():
+    """Everything binned so far, as parallel columns per layer."""
+    watermark = watermark_position(WATERMARK)
+    origin = receiver()
+    sectors = list(CoverageSector.objects.order_by('bearing').values_list(
+        'bearing', 'max_range_nm', 'altitude', 'timestamp'))
+    polar = list(CoveragePolarCell.objects.order_by('bearing', 'range_nm').values_list(
+        'bearing', 'range_nm', 'positions', 'min_altitude'))
+    grid = list(CoverageGridCell.objects.order_by('cell').values_list('cell', 'positions', 'min_altitude'))
+    return {
+        'receiver': {'lat': origin[0], 'lon': origin[1]} if origin else None,
+        'watermark': watermark,
+        'sectors': {
+            'bearing_step': BEARING_STEP,
+            'bearing': [row[0] for row in sectors],
+            'max_range_nm': [row[1] for row in sectors],
+            'altitude': [row[2] for row in sectors],
+            'timestamp': [row[3] for row in sectors],
+        },
+        'polar': {
+            'bearing_step': BEARING_STEP,
+            'range_step': RANGE_STEP,
+            'bearing': [row[0] for row in polar],
+            'range_nm': [row[1] for row in polar],
+            'positions': [row[2] for row in polar],
+            'min_altitude': [row[3] for row in polar],
+        },
+        'grid': {
+            'cell_degrees': GRID_CELL_DEGREES,
+            # South-west corner of each cell.
+            'lat': [round(cell // GRID_COLUMNS * GRID_CELL_DEGREES - 90, 4) for cell, _, _ in grid],
+            'lon': [round(cell % GRID_COLUMNS * GRID_CELL_DEGREES - 180, 4) for cell, _, _ in grid],
+            'positions': [row[1] for row in grid],
+            'min_altitude': [row[2] for row in grid],
+        },
+    }
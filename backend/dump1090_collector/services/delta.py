@@ -0,0 +1,77 @@
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DELTA_ENABLED = getattr(settings, 'DUMP1090_DELTA_ENABLED', True)
+DELTA_HEARTBEAT = getattr(settings, 'DUMP1090_DELTA_HEARTBEAT', 30)
+DELTA_STATE_TTL = getattr(settings, 'DUMP1090_DELTA_STATE_TTL', 300)
+DELTA_KEY = 'delta:{}'
+
+# Fields whose change makes a new position row worth storing.
+DELTA_FIELDS = ('lat', 'lon', 'altitude', 'track', 'speed', 'squawk', 'flight')
+
+
+def flight_state(flight):
+    return tuple(flight.get(field) for field in DELTA_FIELDS)
+
+
+def filter_changed(flights, now=None, heartbeat=DELTA_HEARTBEAT, states=None):
+    """
+    Drop flights that have not changed since the last row stored for their
+    hex code. A flight is kept when dump1090 received new messages for it
+    (when it reports a message count) and one of DELTA_FIELDS differs from
+    the stored state, or when
+    ``heartbeat`` seconds have passed since its last stored row.
+
+    The last stored state lives in the shared cache so every worker sees the
+    same picture, unless a ``states`` dict is given to read them from
+    instead (replays keep their own). Returns ``(changed_flights,
+    suppressed_count, updates)``; pass ``updates`` to remember_states (or
+    merge them into ``states``) once the rows are stored.
+    """
+    if not DELTA_ENABLED:
+        return list(flights), 0, {}
+
+    now = time.time() if now is None else now
+    keys = {}
+    for flight in flights:
+        hex_code = (flight.get('hex') or '').strip()
+        if hex_code:
+            keys[hex_code] = DELTA_KEY.format(hex_code)
+    if states is not None:
+        previous = {key: states[key] for key in keys.values() if key in states}
+    else:
+        previous = cache.get_many(list(keys.values())) if keys else {}
+
+    changed = []
+    updates = {}
+    suppressed = 0
+    for flight in flights:
+        hex_code = (flight.get('hex') or '').strip()
+        if not hex_code:
+            changed.append(flight)
+            continue
+        state = flight_state(flight)
+        messages = flight.get('messages')
+        last = previous.get(keys[hex_code])
+        if last is not None and now - last['stored_at'] < heartbeat:
+            stale = state == tuple(last['state'])
+            # Without a message counter (some feeds, replayed records) only
+            # the state can tell whether the aircraft changed.
+            if messages is not None:
+                stale = stale or messages == last['messages']
+            if stale:
+                suppressed += 1
+                continue
+        changed.append(flight)
+        updates[keys[hex_code]] = {'state': state, 'messages': messages, 'stored_at': now}
+
+    return changed, suppressed, updates
+
+
+def remember_states(states):
+    if states:
+        cache.set_many(states, timeout=DELTA_STATE_TTL)
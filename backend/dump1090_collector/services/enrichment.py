@@ -0,0 +1,96 @@
+import logging
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import DailyCallsign, Flight, FlightData
+from .bulk_store import resolve_aircraft, resolve_airlines, resolve_airports, apply_identity_updates
+from .extractors import extract_aircraft_info, extract_callsign_info, normalize_callsign, normalize_hex
+from .identity_map import sync_identity_maps
+from .store_data import extract_route_info
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_PENDING_TTL = getattr(settings, 'ENRICHMENT_PENDING_TTL', 120)
+ENRICHMENT_BACKFILL_WINDOW = getattr(settings, 'ENRICHMENT_BACKFILL_WINDOW', 3600)
+PENDING_KEY = 'enrichment:pending:{}:{}'
+
+
+def claim_pending(kind, keys):
+    """
+    Mark ``keys`` as queued for enrichment and return the ones that were not
+    already queued, so each hex or callsign is only in the queue once.
+    """
+    return [key for key in keys if cache.add(PENDING_KEY.format(kind, key), 1, timeout=ENRICHMENT_PENDING_TTL)]
+
+
+def release_pending(kind, keys):
+    if keys:
+        cache.delete_many([PENDING_KEY.format(kind, key) for key in keys])
+
+
+def backfill_aircraft(aircraft_data):
+    """
+    Attach Aircraft rows to recent positions stored before their adsbdb
+    lookup finished. ``aircraft_data`` maps hex codes to adsbdb payloads.
+    """
+    if not aircraft_data:
+        return 0
+    since = timezone.now() - timedelta(seconds=ENRICHMENT_BACKFILL_WINDOW)
+    hex_codes = [normalize_hex(hex_code) for hex_code in aircraft_data]
+    payloads = list(aircraft_data.values())
+    sync_identity_maps()
+    identity_updates = []
+    updated = 0
+    with transaction.atomic():
+        aircraft_ids = resolve_aircraft(
+            [(extract_aircraft_info(payload), hex_code) for payload, hex_code in zip(payloads, hex_codes)],
+            identity_updates,
+        )
+        for hex_code, aircraft_id in zip(hex_codes, aircraft_ids):
+            updated += FlightData.objects.filter(
+                flight_hex=hex_code, aircraft__isnull=True, timestamp__gte=since
+            ).update(aircraft_id=aircraft_id)
+        transaction.on_commit(partial(apply_identity_updates, identity_updates))
+    logger.debug("Back-filled aircraft on %s positions", updated)
+    return updated
+
+
+def backfill_routes(callsign_data):
+    """
+    Attach airline and origin/destination airports to recent flights opened
+    before their callsign lookup finished. ``callsign_data`` maps
+    callsigns to adsbdb payloads.
+    """
+    if not callsign_data:
+        return 0
+    since = timezone.now() - timedelta(seconds=ENRICHMENT_BACKFILL_WINDOW)
+    callsigns = list(callsign_data)
+    routes = [extract_route_info(extract_callsign_info(callsign_data[callsign])) for callsign in callsigns]
+    sync_identity_maps()
+    identity_updates = []
+    updated = 0
+    with transaction.atomic():
+        airline_ids = resolve_airlines([route[0] for route in routes], identity_updates)
+        airport_ids = resolve_airports([info for route in routes for info in route[1:]], identity_updates)
+        for i, callsign in enumerate(callsigns):
+            updated += Flight.objects.filter(
+                callsign=normalize_callsign(callsign), airline__isnull=True, last_seen__gte=since
+            ).update(
+                airline_id=airline_ids[i],
+                origin_airport_id=airport_ids[2 * i],
+                destination_airport_id=airport_ids[2 * i + 1],
+            )
+            DailyCallsign.objects.filter(
+                callsign=normalize_callsign(callsign), airline__isnull=True, last_seen__gte=since
+            ).update(
+                airline_id=airline_ids[i],
+                origin_airport_id=airport_ids[2 * i],
+                destination_airport_id=airport_ids[2 * i + 1],
+            )
+        transaction.on_commit(partial(apply_identity_updates, identity_updates))
+    logger.debug("Back-filled routes on %s flights", updated)
+    return updated
@@ -0,0 +1,144 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import inc
+
+logger = logging.getLogger(__name__)
+
+HIT = 'hit'
+UNKNOWN = 'unknown'
+ERROR = 'error'
+UNKNOWN_RESPONSES = ('unknown aircraft', 'unknown callsign')
+
+ENRICHMENT_TTLS = {
+    HIT: getattr(settings, 'CACHE_TTL', 600),
+    UNKNOWN: getattr(settings, 'ENRICHMENT_UNKNOWN_TTL', 6 * 60 * 60),
+    ERROR: getattr(settings, 'ENRICHMENT_ERROR_TTL', 60),
+}
+ENRICHMENT_CACHE_JITTER = getattr(settings, 'ENRICHMENT_CACHE_JITTER', 0.1)
+ENRICHMENT_L1_TTL = getattr(settings, 'ENRICHMENT_L1_TTL', 60)
+ENRICHMENT_L1_SIZE = getattr(settings, 'ENRICHMENT_L1_SIZE', 10000)
+
+_MISSING = object()
+
+
+def classify(payload):
+    """Sort an adsbdb answer into a positive hit, an "unknown" answer or a transport error."""
+    if not payload:
+        return ERROR
+    if isinstance(payload, dict) and payload.get('response') in UNKNOWN_RESPONSES:
+        return UNKNOWN
+    return HIT
+
+
+def jittered(ttl, jitter=ENRICHMENT_CACHE_JITTER, rng=random):
+    """Spread expiry by +/- ``jitter`` so keys cached together do not expire together."""
+    return max(1, int(round(ttl * (1 + rng.uniform(-jitter, jitter)))))
+
+
+class LocalCache:
+    """Small per-process LRU with per-entry expiry, holding decoded payloads."""
+
+    def __init__(self, max_size=ENRICHMENT_L1_SIZE, clock=time.monotonic):
+        self.max_size = max_size
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return _MISSING
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class EnrichmentCache:
+    """
+    Two-level cache for adsbdb payloads: an in-process LocalCache in front of
+    the shared Django cache. Payloads are stored with a TTL that depends on
+    their classification, so "unknown" answers and transport errors are
+    cached too instead of being refetched every poll. Cached errors read
+    back as ``{}``.
+    """
+
+    def __init__(self, local=None, ttls=None):
+        self.local = local if local is not None else LocalCache()
+        self.ttls = ttls or ENRICHMENT_TTLS
+
+    def get_many(self, keys):
+        result = {}
+        remaining = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is _MISSING:
+                remaining.append(key)
+            else:
+                result[key] = value
+        inc('dump1090_enrichment_cache_total', len(result), level='local', result='hit')
+        inc('dump1090_enrichment_cache_total', len(remaining), level='local', result='miss')
+        if not remaining:
+            return result
+
+        shared = len(result)
+        for key, cached_data in cache.get_many(remaining).items():
+            if cached_data is None or cached_data == '':
+                continue
+            try:
+                payload = json.loads(cached_data)
+            except (TypeError, json.JSONDecodeError) as e:
+                logger.warning("Cache decode error for key %s: %s", key, e)
+                continue
+            result[key] = payload
+            self.local.set(key, payload, min(ENRICHMENT_L1_TTL, self.ttls[classify(payload)]))
+        shared = len(result) - shared
+        inc('dump1090_enrichment_cache_total', shared, level='shared', result='hit')
+        inc('dump1090_enrichment_cache_total', len(remaining) - shared, level='shared', result='miss')
+        return result
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set(self, key, payload):
+        payload = payload or {}
+        ttl = jittered(self.ttls[classify(payload)])
+        cache.set(key, json.dumps(payload), timeout=ttl)
+        self.local.set(key, payload, min(ENRICHMENT_L1_TTL, ttl))
+
+    def get_or_fetch(self, key, fetch_fn):
+        payload = self.get(key)
+        if payload is not None:
+            return payload
+        payload = fetch_fn(key)
+        self.set(key, payload)
+        return payload
+
+    def clear_local(self):
+        self.local.clear()
+
+
+enrichment_cache = EnrichmentCache()
@@ -32,11 +32,22 @@ def extract_callsign_info(adsbdb_callsign_data):
     return callsign_response
 
 
-def extract_flight_data(flight):
+def normalize_hex(hex_code):
+    """Canonical ICAO address: trimmed and upper-cased."""
+    return (hex_code or '').strip().upper()
+
+
+def normalize_callsign(callsign):
+    """Canonical callsign used for indexed lookups: trimmed and upper-cased, None when blank."""
+    return (callsign or '').strip().upper() or None
+
+
+def extract_flight_data(flight, timestamp=None):
     return {
-        "flight_hex": flight.get('hex', '').strip(),
+        "flight_hex": normalize_hex(flight.get('hex', '')),
         "squawk": flight.get('squawk', 0),
         "flight_callsign": flight.get('flight', '').strip(),
+        "callsign_norm": normalize_callsign(flight.get('flight', '')),
         "lat": flight.get('lat', 0.0),
         "lon": flight.get('lon', 0.0),
         "valid_position": bool(flight.get('validposition', 0)),
@@ -47,5 +58,5 @@ def extract_flight_data(flight):
         "speed_in_knots": flight.get('speed', 0),
         "messages_received": flight.get('messages', 0),
         "seen": flight.get('seen', 0),
-        "timestamp": timezone.now(),
+        "timestamp": timestamp or timezone.now(),
     }
@@ -0,0 +1,312 @@
+import logging
+import socket
+import time
+from django.conf import settings
+
+from .modes import CPR_MAX_PAIR_AGE, cpr_global, cpr_local, decode
+
+logger = logging.getLogger(__name__)
+
+STREAM_HOST = getattr(settings, 'DUMP1090_STREAM_HOST', 'dump1090')
+STREAM_PORT = getattr(settings, 'DUMP1090_STREAM_PORT', 30003)
+STREAM_FORMAT = getattr(settings, 'DUMP1090_STREAM_FORMAT', 'sbs')
+# Changed aircraft are handed to the store at most every FLUSH_INTERVAL
+# seconds, or as soon as MAX_BATCH of them are waiting.
+FLUSH_INTERVAL = getattr(settings, 'DUMP1090_STREAM_FLUSH_INTERVAL', 0.5)
+MAX_BATCH = getattr(settings, 'DUMP1090_STREAM_MAX_BATCH', 500)
+# Aircraft not heard from for this long are forgotten.
+AIRCRAFT_EXPIRY = getattr(settings, 'DUMP1090_STREAM_AIRCRAFT_EXPIRY', 300)
+RECONNECT_DELAY = getattr(settings, 'DUMP1090_STREAM_RECONNECT_DELAY', 5)
+READ_SIZE = 65536
+# A lone CPR frame is resolved against the last position if that is this recent.
+LOCAL_CPR_MAX_AGE = 30
+
+STATE_FIELDS = ('flight', 'altitude', 'speed', 'track', 'vert_rate', 'squawk')
+
+
+class SbsDecoder:
+    """BaseStation CSV lines (port 30003): one ``MSG,<type>,...`` line per message."""
+    NUMERIC_FIELDS = (('altitude', 11, int), ('speed', 12, float), ('track', 13, float),
+                      ('lat', 14, float), ('lon', 15, float), ('vert_rate', 16, int))
+
+    def __init__(self):
+        self.buffer = b''
+
+    def feed(self, data):
+        data = self.buffer + data
+        end = data.rfind(b'\n') + 1
+        self.buffer = data[end:]
+        updates = []
+        for line in data[:end].decode('ascii', 'replace').splitlines():
+            update = self.parse(line)
+            if update is not None:
+                updates.append(update)
+        return updates
+
+    def parse(self, line):
+        fields = line.split(',')
+        if len(fields) < 18 or fields[0] != 'MSG' or not fields[4]:
+            return None
+        update = {'hex': fields[4].strip().lower()}
+        try:
+            if fields[10]:
+                callsign = fields[10].strip()
+                if callsign:
+                    update['flight'] = callsign
+            for name, index, cast in self.NUMERIC_FIELDS:
+                if fields[index]:
+                    update[name] = cast(fields[index])
+            if fields[17]:
+                update['squawk'] = fields[17].strip()
+        except ValueError:
+            return None
+        if 'speed' in update:
+            update['speed'] = round(update['speed'])
+        if 'track' in update:
+            update['track'] = round(update['track'])
+        return update
+
+
+class RawDecoder:
+    """AVR hex lines (port 30002): ``*8D4840D6...;``, optionally ``@<12 hex timestamp>...;``."""
+
+    def __init__(self):
+        self.buffer = b''
+
+    def feed(self, data):
+        lines = (self.buffer + data).split(b'\n')
+        self.buffer = lines.pop()
+        updates = []
+        for line in lines:
+            line = line.strip().rstrip(b';')
+            if line[:1] == b'@':
+                line = line[13:]
+            elif line[:1] == b'*':
+                line = line[1:]
+            else:
+                continue
+            try:
+                update = decode(bytes.fromhex(line.decode('ascii')))
+            except ValueError:
+                continue
+            if update is not None:
+                updates.append(update)
+        return updates
+
+
+class BeastDecoder:
+    """
+    Beast binary frames (port 30005): 0x1a, a type byte, a 6-byte timestamp,
+    a signal byte and the message, with every 0x1a in the body doubled.
+    """
+    ESCAPE = 0x1A
+    MESSAGE_LENGTHS = {0x31: 2, 0x32: 7, 0x33: 14}
+
+    def __init__(self):
+        self.buffer = b''
+
+    def feed(self, data):
+        buffer = self.buffer + data
+        updates = []
+        position = 0
+        while True:
+            start = buffer.find(self.ESCAPE, position)
+            if start < 0 or start + 1 >= len(buffer):
+                position = len(buffer) if start < 0 else start
+                break
+            length = self.MESSAGE_LENGTHS.get(buffer[start + 1])
+            if length is None:
+                position = start + 1
+                continue
+            body, end = self.unescape(buffer, start + 2, 7 + length)
+            if body is None:
+                if end is None:  # incomplete frame, wait for more data
+                    position = start
+                    break
+                position = end  # a frame started mid-body; resync there
+                continue
+            position = end
+            if length > 2:
+                update = decode(bytes(body[7:]))
+                if update is not None:
+                    updates.append(update)
+        self.buffer = buffer[position:]
+        return updates
+
+    def unescape(self, buffer, index, length):
+        """
+        Read ``length`` unescaped bytes from ``index``. Returns (body, end),
+        (None, None) when the buffer runs out, or (None, resync_index) on a
+        lone escape byte.
+        """
+        body = bytearray()
+        while len(body) < length:
+            if index >= len(buffer):
+                return None, None
+            byte = buffer[index]
+            if byte == self.ESCAPE:
+                if index + 1 >= len(buffer):
+                    return None, None
+                if buffer[index + 1] != self.ESCAPE:
+                    return None, index
+                index += 1
+            body.append(byte)
+            index += 1
+        return body, index
+
+
+DECODERS = {'sbs': SbsDecoder, 'raw': RawDecoder, 'beast': BeastDecoder}
+DEFAULT_PORTS = {'sbs': 30003, 'raw': 30002, 'beast': 30005}
+
+
+class Track:
+    __slots__ = ('fields', 'messages', 'seen', 'seen_pos', 'even', 'odd')
+
+    def __init__(self):
+        self.fields = {}
+        self.messages = 0
+        self.seen = 0.0
+        self.seen_pos = None
+        self.even = None
+        self.odd = None
+
+
+class AircraftTracker:
+    """
+    Per-aircraft state built up message by message, and the set of aircraft
+    that changed since the last flush. ``flush`` returns those aircraft in
+    the shape of dump1090 aircraft.json entries so they go through the same
+    store as polled snapshots.
+    """
+
+    def __init__(self, expiry=AIRCRAFT_EXPIRY):
+        self.expiry = expiry
+        self.tracks = {}
+        self.dirty = set()
+        self.messages = 0
+
+    def apply(self, update, now):
+        hex_code = update['hex']
+        track = self.tracks.get(hex_code)
+        if track is None:
+            if update.get('ap'):
+                return False
+            track = self.tracks[hex_code] = Track()
+        self.messages += 1
+        track.messages += 1
+        track.seen = now
+        for field in STATE_FIELDS:
+            if field in update:
+                track.fields[field] = update[field]
+        if 'lat' in update and 'lon' in update:
+            self.set_position(track, (update['lat'], update['lon']), now)
+        elif 'cpr' in update:
+            self.resolve(track, update['cpr'], now)
+        self.dirty.add(hex_code)
+        return True
+
+    def resolve(self, track, cpr, now):
+        odd, lat_cpr, lon_cpr = cpr
+        frame = ((lat_cpr, lon_cpr), now)
+        if odd:
+            track.odd = frame
+        else:
+            track.even = frame
+        if track.even and track.odd and abs(track.even[1] - track.odd[1]) <= CPR_MAX_PAIR_AGE:
+            position = cpr_global(track.even[0], track.odd[0], odd_is_newer=bool(odd))
+        elif track.seen_pos is not None and now - track.seen_pos <= LOCAL_CPR_MAX_AGE:
+            position = cpr_local((track.fields['lat'], track.fields['lon']), odd, lat_cpr, lon_cpr)
+        else:
+            position = None
+        if position is not None:
+            self.set_position(track, position, now)
+
+    @staticmethod
+    def set_position(track, position, now):
+        track.fields['lat'], track.fields['lon'] = position
+        track.seen_pos = now
+
+    def flush(self, now):
+        """Changed aircraft as aircraft.json entries; forgets aircraft past the expiry."""
+        flights = []
+        for hex_code in self.dirty:
+            track = self.tracks[hex_code]
+            flight = {'hex': hex_code, 'messages': track.messages, 'seen': round(now - track.seen, 1)}
+            flight.update(track.fields)
+            flight['validposition'] = int(track.seen_pos is not None)
+            flight['validtrack'] = int('track' in track.fields)
+            if track.seen_pos is not None:
+                flight['seen_pos'] = round(now - track.seen_pos, 1)
+            flights.append(flight)
+        self.dirty.clear()
+        for hex_code in [h for h, track in self.tracks.items() if now - track.seen > self.expiry]:
+            del self.tracks[hex_code]
+        return flights
+
+
+class StreamCollector:
+    """
+    Reads a dump1090 TCP feed, decodes it incrementally into an
+    AircraftTracker and hands changed aircraft to ``ingest`` in micro-batches.
+    Reconnects after RECONNECT_DELAY when the feed drops, unless
+    ``reconnect`` is False (replays), in which case it returns at EOF.
+    """
+
+    def __init__(self, ingest, host=STREAM_HOST, port=STREAM_PORT, fmt=STREAM_FORMAT,
+                 flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH, reconnect=True, clock=time.time):
+        self.ingest = ingest
+        self.host = host
+        self.port = port
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.reconnect = reconnect
+        self.clock = clock
+        self.tracker = AircraftTracker()
+        self.batches = 0
+        self.stopped = False
+
+    def run(self):
+        while not self.stopped:
+            try:
+                with socket.create_connection((self.host, self.port), timeout=RECONNECT_DELAY) as connection:
+                    logger.info("Streaming %s feed from %s:%s", self.fmt, self.host, self.port)
+                    self.consume(connection)
+            except OSError as e:
+                logger.error("dump1090 %s feed at %s:%s failed: %s", self.fmt, self.host, self.port, e)
+            self.flush()
+            if not self.reconnect:
+                return
+            time.sleep(RECONNECT_DELAY)
+
+    def consume(self, connection):
+        decoder = DECODERS[self.fmt]()
+        connection.settimeout(self.flush_interval)
+        last_flush = self.clock()
+        while not self.stopped:
+            try:
+                data = connection.recv(READ_SIZE)
+            except socket.timeout:
+                data = None
+            if data == b'':
+                return
+            now = self.clock()
+            if data:
+                for update in decoder.feed(data):
+                    self.tracker.apply(update, now)
+            if now - last_flush >= self.flush_interval or len(self.tracker.dirty) >= self.max_batch:
+                self.flush(now)
+                last_flush = now
+
+    def flush(self, now=None):
+        flights = self.tracker.flush(self.clock() if now is None else now)
+        if not flights:
+            return
+        self.batches += 1
+        try:
+            self.ingest(flights)
+        except Exception as e:
+            logger.error("Could not store %s streamed aircraft: %s", len(flights), e, exc_info=True)
+
+    def stop(self):
+        self.stopped = True
@@ -0,0 +1,215 @@
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf, Trim, Upper
+
+from ..models import DailyCallsign, Flight, FlightData
+from .coverage import MAX_RANGE, receiver
+from .tracks import TRACK_GAP, distance_nm
+from .upserts import greatest, least, update_column, upsert
+
+logger = logging.getLogger(__name__)
+
+# Seconds without a position after which the next one opens a new flight, the
+# same rule build_tracks splits on.
+FLIGHT_GAP = getattr(settings, 'DUMP1090_FLIGHT_GAP', TRACK_GAP)
+FLIGHT_HISTORY_BATCH_SIZE = getattr(settings, 'DUMP1090_FLIGHT_HISTORY_BATCH_SIZE', 10000)
+ROUTE_FIELDS = ['airline', 'origin_airport', 'destination_airport']
+# First key of the PostgreSQL advisory locks serialising session assignment
+# per hex id; the second is the hex id's hashtext.
+FLIGHT_LOCK_NAMESPACE = 0x0d1090
+
+
+def continues(flight, position):
+    """
+    Whether ``position`` belongs to ``flight``: within FLIGHT_GAP of it and
+    not under a different callsign. A missing callsign never splits a flight.
+    """
+    gap = timedelta(seconds=FLIGHT_GAP)
+    if not flight.first_seen - gap <= position.timestamp <= flight.last_seen + gap:
+        return False
+    return not (flight.callsign and position.callsign_norm and flight.callsign != position.callsign_norm)
+
+
+def position_ranges(positions):
+    """Distance (nm) of each position from the receiver; None when unknown or a bad decode."""
+    origin = receiver()
+    if origin is None:
+        return [None] * len(positions)
+    lat = np.array([position.latitude for position in positions], dtype=float)
+    lon = np.array([position.longitude for position in positions], dtype=float)
+    ranges = distance_nm(np.full(len(lat), origin[0]), np.full(len(lon), origin[1]), lat, lon)
+    return [
+        round(float(range_nm), 2)
+        if position.valid_position and (position.latitude, position.longitude) != (0, 0) and range_nm <= MAX_RANGE
+        else None
+        for position, range_nm in zip(positions, ranges.tolist())
+    ]
+
+
+def lock_hexes(hex_codes):
+    """
+    On PostgreSQL, hold a transaction-level advisory lock per hex id, taken
+    in sorted order so writers cannot deadlock, until the caller's
+    transaction ends. Two workers storing the same aircraft would otherwise
+    both find no session to continue and open one each.
+    """
+    if connection.vendor != 'postgresql' or not hex_codes:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(%s, hashtext(hex)) "
+            "FROM (SELECT hex FROM unnest(%s::text[]) AS hex ORDER BY hex) AS hexes",
+            [FLIGHT_LOCK_NAMESPACE, sorted(hex_codes)],
+        )
+
+
+def candidate_flights(positions):
+    """Stored flights, per hex id, that the ``positions`` might continue."""
+    gap = timedelta(seconds=FLIGHT_GAP)
+    times = [position.timestamp for position in positions]
+    flights = Flight.objects.filter(
+        flight_hex__in={position.flight_hex for position in positions},
+        last_seen__gte=min(times) - gap,
+        first_seen__lte=max(times) + gap,
+    )
+    candidates = {}
+    for flight in flights.order_by('last_seen'):
+        candidates.setdefault(flight.flight_hex, []).append(flight)
+    return candidates
+
+
+def fold(changes, position, range_nm, route):
+    """Add one position to the aggregates collected for its flight in this batch."""
+    changes['points'] += 1
+    changes['first_seen'] = min(changes['first_seen'], position.timestamp)
+    changes['last_seen'] = max(changes['last_seen'], position.timestamp)
+    for name, pick, value in (('min_altitude', min, position.altitude), ('max_altitude', max, position.altitude),
+                              ('max_range_nm', max, range_nm)):
+        if value is not None:
+            changes[name] = value if changes[name] is None else pick(changes[name], value)
+    if position.callsign_norm:
+        changes['callsign'] = position.callsign_norm
+    if position.aircraft_id is not None:
+        changes['aircraft'] = position.aircraft_id
+    if route is not None:
+        changes.update({name: pk for name, pk in zip(ROUTE_FIELDS, route) if pk is not None})
+
+
+def assign_flights(positions, routes=None):
+    """
+    Attach each unsaved FlightData in ``positions`` to its flight session,
+    opening new sessions where none continues, and fold the positions into
+    the sessions' first/last seen, altitude range, max range and point count.
+    ``routes`` optionally gives each position's (airline_id, origin_airport_id,
+    destination_airport_id), None while its callsign lookup is pending.
+    Positions without a hex id or timestamp get no flight. Run it inside a
+    transaction: the hex ids stay locked (see lock_hexes) until it commits.
+    """
+    routes = routes or [None] * len(positions)
+    pending = [(position, route) for position, route in zip(positions, routes)
+               if position.flight_hex and position.timestamp]
+    if not pending:
+        return
+    pending.sort(key=lambda item: item[0].timestamp)
+    ranges = position_ranges([position for position, _ in pending])
+    lock_hexes({position.flight_hex for position, _ in pending})
+    candidates = candidate_flights([position for position, _ in pending])
+
+    changes = {}
+    for (position, route), range_nm in zip(pending, ranges):
+        flights = candidates.setdefault(position.flight_hex, [])
+        flight = next((flight for flight in reversed(flights) if continues(flight, position)), None)
+        if flight is None:
+            flight = Flight(flight_hex=position.flight_hex, first_seen=position.timestamp,
+                            last_seen=position.timestamp)
+            flights.append(flight)
+        entry = changes.setdefault(id(flight), (flight, {
+            'points': 0, 'first_seen': position.timestamp, 'last_seen': position.timestamp,
+            'min_altitude': None, 'max_altitude': None, 'max_range_nm': None, 'callsign': None,
+            'aircraft': None, **{name: None for name in ROUTE_FIELDS},
+        }))[1]
+        fold(entry, position, range_nm, route)
+        # Keep the in-memory flight current so later positions in the batch match against it.
+        flight.first_seen = min(flight.first_seen, position.timestamp)
+        flight.last_seen = max(flight.last_seen, position.timestamp)
+        flight.callsign = flight.callsign or position.callsign_norm
+        position.flight = flight
+
+    save_flights(list(changes.values()))
+
+
+def save_flights(changes):
+    """Create the new flights and merge the batch's aggregates into the stored ones."""
+    stored = [(flight, entry) for flight, entry in changes if flight.pk is not None]
+    created = []
+    for flight, entry in changes:
+        if flight.pk is None:
+            for name, value in entry.items():
+                setattr(flight, f'{name}_id' if name in ('aircraft', *ROUTE_FIELDS) else name, value)
+            created.append(flight)
+    Flight.objects.bulk_create(created)
+
+    fields = ['points', 'first_seen', 'last_seen', 'min_altitude', 'max_altitude', 'max_range_nm',
+              'callsign', 'aircraft', *ROUTE_FIELDS]
+    upsert(Flight, ['id'], {
+        'id': [flight.pk for flight, _ in stored],
+        'flight_hex': [flight.flight_hex for flight, _ in stored],
+        **{name: [entry[name] for _, entry in stored] for name in fields},
+    }, {
+        'points': "stored.points + excluded.points",
+        'first_seen': least("stored.first_seen", "excluded.first_seen"),
+        'last_seen': greatest("stored.last_seen", "excluded.last_seen"),
+        'min_altitude': least("stored.min_altitude", "excluded.min_altitude"),
+        'max_altitude': greatest("stored.max_altitude", "excluded.max_altitude"),
+        'max_range_nm': greatest("stored.max_range_nm", "excluded.max_range_nm"),
+        **{column: f"COALESCE(excluded.{column}, stored.{column})"
+           for column in ('callsign', 'aircraft_id', *(f'{name}_id' for name in ROUTE_FIELDS))},
+    })
+
+
+def build_flights_from_history(batch_size=FLIGHT_HISTORY_BATCH_SIZE):
+    """
+    Group positions stored before flight sessions existed into flights, in
+    time order and batch_size positions at a time. Positions stored before
+    flight_hex existed are grouped by their aircraft's hex id, and each
+    flight takes its route from the positions' legacy route columns, then
+    from the stats job's DailyCallsign rows where it still has none. Only
+    positions without a flight are read, so running it again is cheap.
+    Returns the number of positions assigned.
+    """
+    unassigned = (
+        FlightData.objects.filter(flight__isnull=True, timestamp__isnull=False)
+        .annotate(hex=Coalesce(NullIf('flight_hex', Value('')), Upper(Trim('aircraft__hex_id'))))
+        .filter(hex__isnull=False)
+        .order_by('timestamp', 'id')
+        .only('id', 'flight_hex', 'callsign_norm', 'timestamp', 'altitude', 'latitude', 'longitude',
+              'valid_position', 'aircraft', *ROUTE_FIELDS)
+    )
+    assigned = 0
+    batch = unassigned
+    while positions := list(batch[:batch_size]):
+        for position in positions:
+            position.flight_hex = position.hex
+        routes = [tuple(getattr(position, f'{name}_id') for name in ROUTE_FIELDS) for position in positions]
+        with transaction.atomic():
+            assign_flights(positions, routes)
+            update_column(FlightData, 'flight', [position.pk for position in positions],
+                          [position.flight.pk for position in positions])
+        assigned += len(positions)
+        logger.info("Grouped %s stored positions into flights", assigned)
+        # Seek past the batch rather than rescanning the positions just assigned.
+        last = positions[-1]
+        batch = unassigned.filter(Q(timestamp__gt=last.timestamp) | Q(timestamp=last.timestamp, id__gt=last.pk))
+
+    known = DailyCallsign.objects.filter(
+        callsign=OuterRef('callsign'), day=OuterRef('first_seen__date'), airline__isnull=False,
+    )
+    Flight.objects.filter(airline__isnull=True, callsign__isnull=False).filter(Exists(known)).update(**{
+        name: Subquery(known.values(name)[:1]) for name in ROUTE_FIELDS
+    })
+    return assigned
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_MAP_SIZE = getattr(settings, 'DUMP1090_IDENTITY_MAP_SIZE', 5000)
+GENERATION_KEY = 'identity_map:generation:{}'
+STATS_KEY = 'identity_map:stats'
+
+
+def content_hash(fields):
+    """Stable digest of an enrichment payload, used to detect changes."""
+    encoded = json.dumps(fields, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class IdentityMap:
+    """
+    Bounded LRU map from a natural key (hex id, registration, airline or
+    airport codes) to ``(primary key, content hash)``.
+
+    Maps live in the Celery worker process. Writes made elsewhere (the API
+    viewsets) bump a generation counter in the shared cache; ``sync`` compares
+    it once per poll and the map drops everything when it moved.
+    """
+
+    def __init__(self, name, max_size=IDENTITY_MAP_SIZE):
+        self.name = name
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, pk, digest=None):
+        with self._lock:
+            self._entries[key] = (pk, digest)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def sync(self, generation):
+        if generation != self._generation:
+            if self._generation is not None:
+                logger.info("Identity map %s invalidated (generation %s)", self.name, generation)
+            self.clear()
+            self._generation = generation
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            'size': len(self),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+aircraft_map = IdentityMap('aircraft')
+airline_map = IdentityMap('airline')
+airport_map = IdentityMap('airport')
+
+IDENTITY_MAPS = {
+    identity_map.name: identity_map
+    for identity_map in (aircraft_map, airline_map, airport_map)
+}
+
+
+def sync_identity_maps():
+    keys = {GENERATION_KEY.format(name): identity_map for name, identity_map in IDENTITY_MAPS.items()}
+    try:
+        generations = cache.get_many(keys)
+    except Exception as e:
+        # Without the shared generation we cannot tell whether the maps are
+        # stale, so start from the database again.
+        logger.warning("Could not read identity map generations: %s", e)
+        for identity_map in keys.values():
+            identity_map.clear()
+        return
+    for key, identity_map in keys.items():
+        identity_map.sync(generations.get(key, 0))
+
+
+def invalidate_identity_map(name):
+    """Tell every worker to drop its ``name`` identity map before the next poll."""
+    key = GENERATION_KEY.format(name)
+    IDENTITY_MAPS[name].clear()
+    try:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+    except Exception as e:
+        logger.error("Could not invalidate identity map %s: %s", name, e)
+
+
+def identity_map_stats():
+    return {name: identity_map.stats() for name, identity_map in IDENTITY_MAPS.items()}
+
+
+def publish_identity_map_stats():
+    """Share this worker's counters so the API process can report them."""
+    try:
+        cache.set(STATS_KEY, identity_map_stats(), timeout=None)
+    except Exception as e:
+        logger.warning("Could not publish identity map stats: %s", e)
+
+
+def published_identity_map_stats():
+    return cache.get(STATS_KEY) or {}
@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+
+from .spatial import longitude_spans
+
+logger = logging.getLogger(__name__)
+
+LIVE_TTL = getattr(settings, 'DUMP1090_LIVE_TTL', 300)
+LIVE_MAX_AGE = getattr(settings, 'DUMP1090_LIVE_MAX_AGE', 60)
+LIVE_KEY_PREFIX = getattr(settings, 'DUMP1090_LIVE_KEY_PREFIX', 'collector:live')
+# Each process re-reads the whole picture from Redis at most this often and
+# answers requests in between from that copy.
+LIVE_READ_INTERVAL = getattr(settings, 'DUMP1090_LIVE_READ_INTERVAL', 1.0)
+
+# dump1090 fields kept in the current picture, plus the derived last_seen.
+LIVE_FIELDS = ('hex', 'flight', 'lat', 'lon', 'altitude', 'vert_rate', 'track', 'speed', 'squawk', 'messages')
+
+
+def live_state(flight, now):
+    """The current-picture record for one dump1090 aircraft entry."""
+    state = {field: flight.get(field) for field in LIVE_FIELDS if flight.get(field) is not None}
+    state['hex'] = (flight.get('hex') or '').strip().upper()
+    if 'flight' in state:
+        state['flight'] = state['flight'].strip()
+    state['last_seen'] = now - (flight.get('seen') or 0)
+    return state
+
+
+def bbox_contains(bbox, lat, lon):
+    """Whether a position is inside ``bbox``; min_lon > max_lon crosses the antimeridian."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return min_lat <= lat <= max_lat and any(start <= lon <= end for start, end in longitude_spans(min_lon, max_lon))
+
+
+def in_bbox(state, bbox):
+    if bbox is None:
+        return True
+    lat, lon = state.get('lat'), state.get('lon')
+    return lat is not None and lon is not None and bbox_contains(bbox, lat, lon)
+
+
+class RedisLiveStore:
+    """
+    Current picture in Redis: a hash per hex holding its latest state and a
+    sorted set of hex ids scored by last-seen time. Hash values are JSON so
+    numbers come back as numbers. Hashes expire after LIVE_TTL seconds;
+    stale sorted-set members are trimmed on every update.
+
+    Reads fetch every aircraft seen within the TTL in one pipeline and keep
+    the result, each state alongside its JSON encoding, for
+    ``read_interval`` seconds. A busy endpoint then costs one Redis round
+    trip per process per interval. Age and bbox filters are applied to that
+    copy, and matching states are returned pre-encoded.
+    """
+
+    def __init__(self, client, prefix=LIVE_KEY_PREFIX, ttl=LIVE_TTL, read_interval=LIVE_READ_INTERVAL,
+                 clock=time.monotonic):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.read_interval = read_interval
+        self.index_key = f'{prefix}:last_seen'
+        self._clock = clock
+        self._snapshot = None
+        self._snapshot_expires = 0.0
+        self._lock = threading.Lock()
+
+    def state_key(self, hex_code):
+        return f'{self.prefix}:aircraft:{hex_code}'
+
+    def update(self, states, now=None):
+        now = time.time() if now is None else now
+        if not states:
+            return 0
+        pipe = self.client.pipeline(transaction=False)
+        for state in states:
+            key = self.state_key(state['hex'])
+            pipe.hset(key, mapping={field: json.dumps(value) for field, value in state.items()})
+            pipe.expire(key, self.ttl)
+        pipe.zadd(self.index_key, {state['hex']: state['last_seen'] for state in states})
+        pipe.zremrangebyscore(self.index_key, '-inf', now - self.ttl)
+        pipe.execute()
+        return len(states)
+
+    def current(self, max_age=LIVE_MAX_AGE, bbox=None, now=None):
+        return [state for state, _ in self.matching(max_age, bbox, now)]
+
+    def current_json(self, max_age=LIVE_MAX_AGE, bbox=None, now=None):
+        return [encoded for _, encoded in self.matching(max_age, bbox, now)]
+
+    def matching(self, max_age, bbox, now):
+        now = time.time() if now is None else now
+        return [
+            (state, encoded) for state, encoded in self.snapshot(now)
+            if state['last_seen'] >= now - max_age and in_bbox(state, bbox)
+        ]
+
+    def snapshot(self, now):
+        with self._lock:
+            if self._snapshot is None or self._clock() >= self._snapshot_expires:
+                self._snapshot = self.read_all(now)
+                self._snapshot_expires = self._clock() + self.read_interval
+            return self._snapshot
+
+    def read_all(self, now):
+        hex_codes = self.client.zrangebyscore(self.index_key, now - self.ttl, '+inf')
+        if not hex_codes:
+            return []
+        pipe = self.client.pipeline(transaction=False)
+        for hex_code in hex_codes:
+            pipe.hgetall(self.state_key(hex_code.decode() if isinstance(hex_code, bytes) else hex_code))
+        states = []
+        for raw in pipe.execute():
+            if raw:
+                state = {
+                    (field.decode() if isinstance(field, bytes) else field): json.loads(value)
+                    for field, value in raw.items()
+                }
+                states.append((state, json.dumps(state)))
+        return states
+
+    def clear(self):
+        self._snapshot = None
+        hex_codes = self.client.zrange(self.index_key, 0, -1)
+        keys = [self.state_key(h.decode() if isinstance(h, bytes) else h) for h in hex_codes]
+        self.client.delete(self.index_key, *keys)
+
+
+class LocalLiveStore:
+    """
+    In-process stand-in with the same behaviour, used when the cache is not
+    Redis (tests, local development). Only sees polls run in this process.
+    """
+
+    def __init__(self, ttl=LIVE_TTL):
+        self.ttl = ttl
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def update(self, states, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            for state in states:
+                self._states[state['hex']] = dict(state)
+            for hex_code in [h for h, s in self._states.items() if s['last_seen'] < now - self.ttl]:
+                del self._states[hex_code]
+        return len(states)
+
+    def current(self, max_age=LIVE_MAX_AGE, bbox=None, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            states = sorted(self._states.values(), key=lambda state: state['last_seen'])
+        return [dict(state) for state in states if state['last_seen'] >= now - max_age and in_bbox(state, bbox)]
+
+    def current_json(self, max_age=LIVE_MAX_AGE, bbox=None, now=None):
+        return [json.dumps(state) for state in self.current(max_age, bbox, now)]
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+
+
+_stores = {}
+
+
+def get_live_store():
+    """Per-process live store: Redis when the default cache is django-redis, in-memory otherwise."""
+    pid = os.getpid()
+    store = _stores.get(pid)
+    if store is None:
+        if 'django_redis' in settings.CACHES['default']['BACKEND']:
+            from django_redis import get_redis_connection
+            store = RedisLiveStore(get_redis_connection('default'))
+        else:
+            store = LocalLiveStore()
+        _stores.clear()
+        _stores[pid] = store
+    return store
+
+
+def update_live_picture(flights, now=None):
+    """Record every aircraft in a dump1090 snapshot; failures are logged, never raised."""
+    now = time.time() if now is None else now
+    states = [live_state(flight, now) for flight in flights if (flight.get('hex') or '').strip()]
+    try:
+        return get_live_store().update(states, now=now)
+    except Exception as e:
+        logger.error("Could not update the live picture: %s", e)
+        return 0
@@ -0,0 +1,246 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Hot-path counters and histograms for /metrics. Each process adds to an
+# in-memory buffer and pushes it to a Redis hash (HINCRBYFLOAT, so every
+# worker and container sums into the same series) at most every
+# METRICS_FLUSH_INTERVAL seconds. Disabled, every call returns at once.
+METRICS_ENABLED = getattr(settings, 'DUMP1090_METRICS_ENABLED', True)
+METRICS_FLUSH_INTERVAL = getattr(settings, 'DUMP1090_METRICS_FLUSH_INTERVAL', 1.0)
+METRICS_KEY = getattr(settings, 'DUMP1090_METRICS_KEY', 'collector:metrics')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    'dump1090_poll_seconds': (
+        'histogram', "Receiver poll wall time, fetch to publish.", LATENCY_BUCKETS),
+    'dump1090_stage_seconds': (
+        'histogram', "Time spent in each ingest stage.", LATENCY_BUCKETS),
+    'dump1090_upstream_seconds': (
+        'histogram', "dump1090 and adsbdb HTTP request latency.", LATENCY_BUCKETS),
+    'dump1090_upstream_requests_total': (
+        'counter', "dump1090 and adsbdb HTTP requests by outcome (ok, unknown or error).", None),
+    'dump1090_aircraft_per_poll': (
+        'histogram', "Aircraft per ingested poll or stream batch.", COUNT_BUCKETS),
+    'dump1090_queries_per_poll': (
+        'histogram', "Database queries per ingested poll or stream batch.", COUNT_BUCKETS),
+    'dump1090_positions_total': (
+        'counter', "Aircraft positions by outcome (stored, suppressed unchanged or merged duplicates).", None),
+    'dump1090_enrichment_cache_total': (
+        'counter', "Enrichment cache lookups by level (local or shared) and result (hit or miss).", None),
+}
+
+
+def label_string(labels):
+    return ','.join(f'{name}="{value}"' for name, value in sorted(labels.items()))
+
+
+class MetricsBuffer:
+    """Per-process increments waiting to be pushed to the store."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._pending = defaultdict(float)
+        self._lock = threading.Lock()
+        self.flushed_at = clock()
+
+    def add(self, increments):
+        with self._lock:
+            for field, value in increments:
+                self._pending[field] += value
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            self.flushed_at = self._clock()
+            return pending
+
+    def due(self, interval):
+        return self._clock() - self.flushed_at >= interval
+
+
+class RedisMetricsStore:
+    """Every process's increments summed into one Redis hash."""
+
+    def __init__(self, client, key=METRICS_KEY):
+        self.client = client
+        self.key = key
+
+    def add(self, increments):
+        pipe = self.client.pipeline(transaction=False)
+        for field, value in increments.items():
+            pipe.hincrbyfloat(self.key, field, value)
+        pipe.execute()
+
+    def read(self):
+        return {field.decode(): float(value) for field, value in self.client.hgetall(self.key).items()}
+
+    def clear(self):
+        self.client.delete(self.key)
+
+
+class LocalMetricsStore:
+    """In-process store for development and tests without django-redis."""
+
+    def __init__(self):
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add(self, increments):
+        with self._lock:
+            for field, value in increments.items():
+                self._values[field] += value
+
+    def read(self):
+        with self._lock:
+            return dict(self._values)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+_buffer = MetricsBuffer()
+_stores = {}
+
+
+def get_metrics_store():
+    """Per-process metrics store: Redis when the default cache is django-redis, in-memory otherwise."""
+    pid = os.getpid()
+    store = _stores.get(pid)
+    if store is None:
+        if 'django_redis' in settings.CACHES['default']['BACKEND']:
+            from django_redis import get_redis_connection
+            store = RedisMetricsStore(get_redis_connection('default'))
+        else:
+            store = LocalMetricsStore()
+        _stores.clear()
+        _stores[pid] = store
+    return store
+
+
+def inc(name, value=1, **labels):
+    if METRICS_ENABLED and value:
+        _buffer.add([(f'{name}\t{label_string(labels)}\t', value)])
+
+
+def observe(name, value, **labels):
+    if not METRICS_ENABLED:
+        return
+    labels = label_string(labels)
+    bound = next((bound for bound in METRICS[name][2] if value <= bound), math.inf)
+    _buffer.add([(f'{name}\t{labels}\t{bound}', 1), (f'{name}_sum\t{labels}\t', value)])
+
+
+@contextmanager
+def timed(name, **labels):
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def stage(name):
+    """Time one ingest stage into dump1090_stage_seconds."""
+    return timed('dump1090_stage_seconds', stage=name)
+
+
+@contextmanager
+def counted_queries(name='dump1090_queries_per_poll'):
+    """Observe how many queries the block ran."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        yield
+    observe(name, queries)
+
+
+def flush_metrics(force=False):
+    """Push this process's buffered increments, at most every METRICS_FLUSH_INTERVAL seconds unless ``force``."""
+    if not METRICS_ENABLED or not (force or _buffer.due(METRICS_FLUSH_INTERVAL)):
+        return
+    pending = _buffer.drain()
+    if not pending:
+        return
+    try:
+        get_metrics_store().add(pending)
+    except Exception as e:
+        logger.warning("Could not push metrics: %s", e)
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def format_bound(bound):
+    return '+Inf' if bound == math.inf else format_value(bound)
+
+
+def render_family(name, kind, help_text, samples):
+    """Prometheus text lines for one metric family; ``samples`` are (suffix, labels, value)."""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    for suffix, labels, value in samples:
+        lines.append(f'{name}{suffix}{{{labels}}} {format_value(value)}' if labels
+                     else f'{name}{suffix} {format_value(value)}')
+    return lines
+
+
+def render_metrics(values):
+    """
+    The stored ``values`` in Prometheus text format. Histogram buckets are
+    stored per bucket and made cumulative here.
+    """
+    families = defaultdict(list)
+    for field, value in values.items():
+        name, labels, bound = field.split('\t')
+        base = name[:-len('_sum')] if name.endswith('_sum') and name[:-len('_sum')] in METRICS else name
+        families[base].append((name, labels, bound, value))
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        if name not in families:
+            continue
+        if kind != 'histogram':
+            samples = sorted(('', labels, value) for _, labels, _, value in families[name])
+            lines += render_family(name, kind, help_text, samples)
+            continue
+        counts = defaultdict(dict)
+        sums = defaultdict(float)
+        for field_name, labels, bound, value in families[name]:
+            if field_name.endswith('_sum'):
+                sums[labels] += value
+            else:
+                counts[labels][float(bound)] = value
+        samples = []
+        for labels in sorted(counts):
+            total = 0
+            for bound in (*buckets, math.inf):
+                total += counts[labels].get(float(bound), 0)
+                le = f'le="{format_bound(bound)}"'
+                samples.append(('_bucket', f'{labels},{le}' if labels else le, total))
+            samples += [('_sum', labels, sums[labels]), ('_count', labels, total)]
+        lines += render_family(name, kind, help_text, samples)
+    return lines
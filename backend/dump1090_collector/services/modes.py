@@ -0,0 +1,182 @@
+"""
+Minimal Mode S / ADS-B decoding for the raw (30002) and Beast (30005) feeds:
+CRC check, identification, airborne position (CPR), altitude, velocity and
+squawk. Enough to build the same per-aircraft state dump1090 publishes in
+aircraft.json.
+"""
+import math
+
+CPR_SCALE = 131072  # 2 ** 17
+CPR_MAX_PAIR_AGE = 10  # seconds between the even and odd frame of a global decode
+CALLSIGN_CHARS = '#ABCDEFGHIJKLMNOPQRSTUVWXYZ##### ###############0123456789######'
+LONG_FORMATS = {16, 17, 18, 19, 20, 21, 24}
+
+
+def _crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 16
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0xFFF409) if crc & 0x800000 else crc << 1
+        table.append(crc & 0xFFFFFF)
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def crc_residual(message):
+    """
+    Mode S parity check: zero for an intact DF11/17/18 message, the sender's
+    ICAO address for address/parity formats (DF4/5/20/21).
+    """
+    crc = 0
+    for byte in message[:-3]:
+        crc = ((crc << 8) & 0xFFFFFF) ^ CRC_TABLE[((crc >> 16) ^ byte) & 0xFF]
+    return crc ^ int.from_bytes(message[-3:], 'big')
+
+
+def downlink_format(message):
+    df = message[0] >> 3
+    return 24 if df >= 24 else df
+
+
+def decode_ac13(code):
+    """13-bit altitude code (DF4/20); only 25 ft (Q bit) encoding is decoded."""
+    if code == 0 or code & 0x40:  # unavailable or metric
+        return None
+    if not code & 0x10:
+        return None
+    n = ((code & 0x1F80) >> 2) | ((code & 0x20) >> 1) | (code & 0x0F)
+    return n * 25 - 1000
+
+
+def decode_ac12(code):
+    """12-bit altitude field of an airborne position message."""
+    if code == 0 or not code & 0x10:
+        return None
+    n = ((code & 0xFE0) >> 1) | (code & 0x0F)
+    return n * 25 - 1000
+
+
+def decode_squawk(code):
+    """13-bit identity field (DF5/21) as the four-digit octal string dump1090 reports."""
+    def bit(position):
+        return (code >> (13 - position)) & 1
+    c1, a1, c2, a2, c4, a4, _, b1, d1, b2, d2, b4, d4 = (bit(i) for i in range(1, 14))
+    return f'{a4 * 4 + a2 * 2 + a1}{b4 * 4 + b2 * 2 + b1}{c4 * 4 + c2 * 2 + c1}{d4 * 4 + d2 * 2 + d1}'
+
+
+def decode_callsign(me):
+    chars = ''.join(CALLSIGN_CHARS[(me >> shift) & 0x3F] for shift in range(42, -1, -6))
+    return chars.replace('#', '').strip()
+
+
+def decode_velocity(me):
+    """Ground speed (kt), track (deg) and vertical rate (ft/min) from TC19 subtypes 1-2."""
+    subtype = (me >> 48) & 0x7
+    if subtype not in (1, 2):
+        return {}
+    update = {}
+    v_ew, v_ns = (me >> 32) & 0x3FF, (me >> 21) & 0x3FF
+    if v_ew and v_ns:
+        scale = 4 if subtype == 2 else 1
+        v_we = (v_ew - 1) * scale * (-1 if (me >> 42) & 1 else 1)
+        v_sn = (v_ns - 1) * scale * (-1 if (me >> 31) & 1 else 1)
+        update['speed'] = round(math.hypot(v_we, v_sn))
+        update['track'] = round(math.degrees(math.atan2(v_we, v_sn)) % 360)
+    vr = (me >> 10) & 0x1FF
+    if vr:
+        update['vert_rate'] = (vr - 1) * 64 * (-1 if (me >> 19) & 1 else 1)
+    return update
+
+
+def decode(message):
+    """
+    Decode one Mode S message (bytes) into a partial aircraft update, or
+    None when it is corrupt or carries nothing we keep. Airborne positions
+    come back as a raw ``cpr`` tuple (odd, lat, lon) for the tracker to
+    resolve. Updates from address/parity formats are flagged ``ap`` because
+    their hex is only trustworthy for aircraft already heard via DF17.
+    """
+    if len(message) not in (7, 14):
+        return None
+    df = downlink_format(message)
+    if (len(message) == 14) != (df in LONG_FORMATS):
+        return None
+
+    if df in (17, 18):
+        if crc_residual(message):
+            return None
+        update = {'hex': message[1:4].hex()}
+        me = int.from_bytes(message[4:11], 'big')
+        tc = me >> 51
+        if 1 <= tc <= 4:
+            callsign = decode_callsign(me)
+            if callsign:
+                update['flight'] = callsign
+        elif 9 <= tc <= 18:
+            altitude = decode_ac12((me >> 36) & 0xFFF)
+            if altitude is not None:
+                update['altitude'] = altitude
+            update['cpr'] = ((me >> 34) & 1, ((me >> 17) & 0x1FFFF) / CPR_SCALE, (me & 0x1FFFF) / CPR_SCALE)
+        elif tc == 19:
+            update.update(decode_velocity(me))
+        return update
+
+    if df in (4, 5, 20, 21):
+        update = {'hex': f'{crc_residual(message):06x}', 'ap': True}
+        code = ((message[2] << 8) | message[3]) & 0x1FFF
+        if df in (4, 20):
+            altitude = decode_ac13(code)
+            if altitude is not None:
+                update['altitude'] = altitude
+        else:
+            update['squawk'] = decode_squawk(code)
+        return update
+    return None
+
+
+def cpr_nl(lat):
+    """Number of longitude zones at ``lat``."""
+    if lat == 0:
+        return 59
+    if abs(lat) == 87:
+        return 2
+    if abs(lat) > 87:
+        return 1
+    a = 1 - math.cos(math.pi / 30)
+    b = math.cos(math.radians(abs(lat))) ** 2
+    return int(2 * math.pi / math.acos(1 - a / b))
+
+
+def cpr_global(even, odd, odd_is_newer):
+    """Resolve an even/odd CPR pair of (lat, lon) fractions; None across a zone boundary."""
+    lat_even_cpr, lon_even_cpr = even
+    lat_odd_cpr, lon_odd_cpr = odd
+    j = math.floor(59 * lat_even_cpr - 60 * lat_odd_cpr + 0.5)
+    lat_even = 360 / 60 * (j % 60 + lat_even_cpr)
+    lat_odd = 360 / 59 * (j % 59 + lat_odd_cpr)
+    lat_even -= 360 if lat_even >= 270 else 0
+    lat_odd -= 360 if lat_odd >= 270 else 0
+    if cpr_nl(lat_even) != cpr_nl(lat_odd):
+        return None
+    lat = lat_odd if odd_is_newer else lat_even
+    nl = cpr_nl(lat)
+    m = math.floor(lon_even_cpr * (nl - 1) - lon_odd_cpr * nl + 0.5)
+    zones = max(nl - 1, 1) if odd_is_newer else max(nl, 1)
+    lon = 360 / zones * (m % zones + (lon_odd_cpr if odd_is_newer else lon_even_cpr))
+    lon -= 360 if lon >= 180 else 0
+    return round(lat, 6), round(lon, 6)
+
+
+def cpr_local(reference, odd, lat_cpr, lon_cpr):
+    """Resolve a single CPR frame against a nearby reference position."""
+    ref_lat, ref_lon = reference
+    dlat = 360 / (59 if odd else 60)
+    j = math.floor(ref_lat / dlat) + math.floor((ref_lat % dlat) / dlat - lat_cpr + 0.5)
+    lat = dlat * (j + lat_cpr)
+    dlon = 360 / max(cpr_nl(lat) - odd, 1)
+    m = math.floor(ref_lon / dlon) + math.floor((ref_lon % dlon) / dlon - lon_cpr + 0.5)
+    lon = dlon * (m + lon_cpr)
+    return round(lat, 6), round(lon, 6)
@@ -0,0 +1,70 @@
+import logging
+from django.conf import settings
+from django.db.models import Exists, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import NullIf, Trim, Upper
+
+from ..models import Aircraft, FlightData, FlightDataRollup
+from .spatial import grid_cell_expression
+
+logger = logging.getLogger(__name__)
+
+NORMALIZE_BATCH_SIZE = getattr(settings, 'DUMP1090_NORMALIZE_BATCH_SIZE', 50000)
+
+# Anything with lower-case letters or padding still needs normalizing.
+UNNORMALIZED = r'[a-z ]'
+
+
+def update_in_batches(queryset, batch_size=NORMALIZE_BATCH_SIZE, **updates):
+    """Run ``queryset.update`` over primary key ranges so no single statement locks the whole table."""
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+    updated = 0
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        updated += queryset.filter(pk__gte=start, pk__lt=start + batch_size).update(**updates)
+    return updated
+
+
+def normalize_existing_rows(batch_size=NORMALIZE_BATCH_SIZE):
+    """
+    Bring rows stored before identifiers were normalized at ingest in line:
+    fill flight_hex from the linked aircraft's normalized hex id on positions
+    stored before the column existed, upper-case hex ids and fill callsign_norm, plus
+    grid_cell for valid positions stored before it existed. Only rows that
+    need it are rewritten, so running it again is cheap.
+    """
+    aircraft_hex = Aircraft.objects.filter(pk=OuterRef('aircraft_id')).values(hex=Upper(Trim('hex_id')))[:1]
+    result = {
+        'flightdata_hex_backfill': update_in_batches(
+            FlightData.objects.filter(flight_hex__isnull=True, aircraft__isnull=False), batch_size,
+            flight_hex=Subquery(aircraft_hex),
+        ),
+        'flightdata_hex': update_in_batches(
+            FlightData.objects.filter(flight_hex__regex=UNNORMALIZED), batch_size,
+            flight_hex=Upper(Trim('flight_hex')),
+        ),
+        'flightdata_callsign': update_in_batches(
+            FlightData.objects.filter(callsign_norm__isnull=True, flight_callsign__isnull=False), batch_size,
+            callsign_norm=NullIf(Upper(Trim('flight_callsign')), Value('')),
+        ),
+        'flightdata_grid_cell': update_in_batches(
+            FlightData.objects.filter(grid_cell__isnull=True, valid_position=True), batch_size,
+            grid_cell=grid_cell_expression(),
+        ),
+        'aircraft_hex': update_in_batches(
+            Aircraft.objects.filter(hex_id__regex=UNNORMALIZED), batch_size,
+            hex_id=Upper(Trim('hex_id')),
+        ),
+        'rollup_callsign': update_in_batches(
+            FlightDataRollup.objects.filter(flight_callsign__regex=UNNORMALIZED), batch_size,
+            flight_callsign=NullIf(Upper(Trim('flight_callsign')), Value('')),
+        ),
+    }
+    # Rollups are unique per hex and minute: drop any whose normalized twin
+    # already exists before renaming the rest.
+    stale_rollups = FlightDataRollup.objects.filter(flight_hex__regex=UNNORMALIZED)
+    twins = FlightDataRollup.objects.filter(bucket=OuterRef('bucket'), flight_hex=Upper(Trim(OuterRef('flight_hex'))))
+    stale_rollups.filter(Exists(twins)).delete()
+    result['rollup_hex'] = update_in_batches(stale_rollups, batch_size, flight_hex=Upper(Trim('flight_hex')))
+    logger.info("Normalized identifiers on existing rows: %s", result)
+    return result
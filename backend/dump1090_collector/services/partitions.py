@@ -0,0 +1,317 @@
+import logging
+import re
+from datetime import timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import Flight, FlightData, FlightDataRollup
+
+logger = logging.getLogger(__name__)
+
+PARTITION_INTERVAL = getattr(settings, 'DUMP1090_PARTITION_INTERVAL', 'day')
+PARTITION_PREMAKE = getattr(settings, 'DUMP1090_PARTITION_PREMAKE', 3)
+RAW_RETENTION_DAYS = getattr(settings, 'DUMP1090_RAW_RETENTION_DAYS', 30)
+ROLLUP_RETENTION_DAYS = getattr(settings, 'DUMP1090_ROLLUP_RETENTION_DAYS', 365)
+RETENTION_DELETE_BATCH = getattr(settings, 'DUMP1090_RETENTION_DELETE_BATCH', 10000)
+
+TABLE = FlightData._meta.db_table
+BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def qn(name):
+    return connection.ops.quote_name(name)
+
+
+def supports_partitioning():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned():
+    if not supports_partitioning():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def partition_step(interval=PARTITION_INTERVAL):
+    return timedelta(days=7 if interval == 'week' else 1)
+
+
+def partition_start(moment, interval=PARTITION_INTERVAL):
+    """Start of the day (or ISO week) containing ``moment``, in UTC."""
+    start = moment.astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == 'week':
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def partition_name(start):
+    return f'{TABLE}_p{start:%Y%m%d}'
+
+
+def list_partitions():
+    """Return ``(name, start, end)`` for each partition; the default partition has no bounds."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            ORDER BY child.relname
+            """,
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        match = BOUND_RE.search(bound or '')
+        if match:
+            partitions.append((name, parse_datetime(match.group(1)), parse_datetime(match.group(2))))
+        else:
+            partitions.append((name, None, None))
+    return partitions
+
+
+def ensure_partitions(now=None, ahead=PARTITION_PREMAKE, since=None):
+    """
+    Create the partitions covering ``since`` (default: now) up to ``ahead``
+    intervals in the future. Returns the names of the partitions created.
+    """
+    now = now or timezone.now()
+    step = partition_step()
+    start = partition_start(since or now)
+    last = partition_start(now) + step * ahead
+    starts = []
+    while start <= last:
+        starts.append(start)
+        start += step
+    return create_partitions(starts)
+
+
+def create_partitions(starts):
+    """
+    Create the partitions starting at ``starts`` that do not exist yet. Rows
+    that landed in the default partition meanwhile are moved into the new
+    partition, since Postgres refuses to create it while the default one
+    holds rows in its range. A partition that cannot be created is logged
+    and skipped so the rest of maintenance still runs.
+    """
+    step = partition_step()
+    partitions = list_partitions()
+    existing = {name for name, _, _ in partitions}
+    default = next((name for name, start, _ in partitions if start is None), None)
+    created = []
+    for start in starts:
+        name = partition_name(start)
+        if name in existing:
+            continue
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                if default is None:
+                    cursor.execute(
+                        f"CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(TABLE)} "
+                        f"FOR VALUES FROM (%s) TO (%s)",
+                        [start, start + step],
+                    )
+                else:
+                    moved = create_partition_from_default(cursor, name, default, start, start + step)
+                    if moved:
+                        logger.warning("Moved %s rows from %s into %s", moved, default, name)
+            created.append(name)
+        except DatabaseError as e:
+            logger.error("Could not create FlightData partition %s: %s", name, e)
+    if created:
+        logger.info("Created FlightData partitions: %s", ", ".join(created))
+    return created
+
+
+def create_partition_from_default(cursor, name, default, start, end):
+    """
+    Create one partition while a default partition exists: detach the
+    default, create the partition, move the default's rows in its range
+    across and reattach the default. Returns the number of rows moved.
+    """
+    cursor.execute(f"ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(default)}")
+    cursor.execute(
+        f"CREATE TABLE {qn(name)} PARTITION OF {qn(TABLE)} FOR VALUES FROM (%s) TO (%s)", [start, end]
+    )
+    in_range = f"{qn('timestamp')} >= %s AND {qn('timestamp')} < %s"
+    cursor.execute(f"INSERT INTO {qn(TABLE)} SELECT * FROM {qn(default)} WHERE {in_range}", [start, end])
+    cursor.execute(f"DELETE FROM {qn(default)} WHERE {in_range}", [start, end])
+    moved = cursor.rowcount
+    cursor.execute(f"ALTER TABLE {qn(TABLE)} ATTACH PARTITION {qn(default)} DEFAULT")
+    return moved
+
+
+def drop_expired_partitions(now=None, retention_days=RAW_RETENTION_DAYS):
+    """Drop every partition whose whole range is older than the retention period."""
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    dropped = []
+    with connection.cursor() as cursor:
+        for name, _, end in list_partitions():
+            if end is not None and end <= cutoff:
+                cursor.execute(f"DROP TABLE {qn(name)}")
+                dropped.append(name)
+    if dropped:
+        logger.info("Dropped expired FlightData partitions: %s", ", ".join(dropped))
+    return dropped
+
+
+def delete_expired_default_rows(cutoff, batch_size=RETENTION_DELETE_BATCH):
+    """
+    Batched DELETE of expired rows from the default partition, which catches
+    positions outside every bounded partition (replays and backfills into
+    ranges already dropped) and is never dropped itself.
+    """
+    deleted = 0
+    with connection.cursor() as cursor:
+        for name, start, _ in list_partitions():
+            if start is not None:
+                continue
+            while True:
+                cursor.execute(
+                    f"DELETE FROM {qn(name)} WHERE ctid IN ("
+                    f"SELECT ctid FROM {qn(name)} WHERE {qn('timestamp')} < %s LIMIT %s)",
+                    [cutoff, batch_size],
+                )
+                deleted += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    break
+    return deleted
+
+
+def delete_expired_rows(queryset, field, cutoff, batch_size=RETENTION_DELETE_BATCH):
+    """Batched DELETE for tables that are not partitioned."""
+    deleted = 0
+    while True:
+        ids = list(queryset.filter(**{f'{field}__lt': cutoff}).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += queryset.filter(pk__in=ids).delete()[0]
+
+
+def apply_retention(now=None, raw_days=RAW_RETENTION_DAYS, rollup_days=ROLLUP_RETENTION_DAYS):
+    """
+    Expire old positions: whole partitions are dropped when FlightData is
+    partitioned, plus expired rows in the default partition, otherwise rows
+    are deleted in batches. Rollups and flight sessions, both summaries of
+    the positions, have their own, longer, retention. A retention of None
+    keeps everything.
+    """
+    now = now or timezone.now()
+    result = {'dropped_partitions': [], 'deleted_rows': 0, 'deleted_rollups': 0, 'deleted_flights': 0}
+    if raw_days is not None:
+        if is_partitioned():
+            result['dropped_partitions'] = drop_expired_partitions(now, raw_days)
+            result['deleted_rows'] = delete_expired_default_rows(now - timedelta(days=raw_days))
+        else:
+            result['deleted_rows'] = delete_expired_rows(
+                FlightData.objects.all(), 'timestamp', now - timedelta(days=raw_days)
+            )
+    if rollup_days is not None:
+        result['deleted_rollups'] = delete_expired_rows(
+            FlightDataRollup.objects.all(), 'bucket', now - timedelta(days=rollup_days)
+        )
+        result['deleted_flights'] = delete_expired_rows(
+            Flight.objects.all(), 'last_seen', now - timedelta(days=rollup_days)
+        )
+    return result
+
+
+def convert_to_partitioned(now=None):
+    """
+    One-off conversion of the FlightData table into a table partitioned by
+    range on ``timestamp``.
+
+    PostgreSQL requires a partitioned table's primary key to contain the
+    partition column, so the new table's primary key is ``(id, timestamp)``
+    and ``timestamp`` becomes NOT NULL; ``id`` keeps its sequence. Other
+    indexes and foreign keys are recreated under their original names and
+    existing rows are copied into daily/weekly partitions. Rows without a
+    timestamp have no partition and are moved aside to
+    ``<table>_undated``; positions outside every partition later land in a
+    default partition. Returns False if the table was already partitioned.
+    """
+    if not supports_partitioning():
+        raise RuntimeError("FlightData partitioning requires PostgreSQL")
+    if is_partitioned():
+        return False
+
+    legacy = f'{TABLE}_unpartitioned'
+    sequence = f'{TABLE}_row_id_seq'
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Foreign keys are deferred; flush pending checks so the old table can be dropped.
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(f"LOCK TABLE {qn(TABLE)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(
+            """
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = %s
+            """,
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'f', 'c')
+            """,
+            [TABLE],
+        )
+        constraints = cursor.fetchall()
+        primary_key_indexes = {name for name, contype, _ in constraints if contype == 'p'}
+
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} RENAME TO {qn(legacy)}")
+        for position, (index_name, _) in enumerate(indexes):
+            cursor.execute(f"ALTER INDEX {qn(index_name)} RENAME TO {qn(f'{legacy}_idx{position}')}")
+
+        cursor.execute(
+            f"CREATE TABLE {qn(TABLE)} (LIKE {qn(legacy)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE ({qn('timestamp')})"
+        )
+        cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(TABLE)}.{qn('id')}")
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ALTER COLUMN {qn('id')} SET DEFAULT nextval(%s)", [sequence]
+        )
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} ALTER COLUMN {qn('timestamp')} SET NOT NULL")
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(f'{TABLE}_pkey')} PRIMARY KEY ({qn('id')}, {qn('timestamp')})"
+        )
+        for index_name, definition in indexes:
+            if index_name in primary_key_indexes:
+                continue
+            if definition.startswith('CREATE UNIQUE'):
+                logger.warning("Skipping unique index %s, unsupported on a partitioned table", index_name)
+                continue
+            cursor.execute(definition)
+        for name, contype, definition in constraints:
+            if contype != 'p':
+                cursor.execute(f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} {definition}")
+
+        # Only intervals that hold rows get a partition, plus the upcoming ones.
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc(%s, {qn('timestamp')} AT TIME ZONE 'UTC') FROM {qn(legacy)} "
+            f"WHERE {qn('timestamp')} IS NOT NULL",
+            ['week' if PARTITION_INTERVAL == 'week' else 'day'],
+        )
+        create_partitions(sorted(start.replace(tzinfo=dt_timezone.utc) for start, in cursor.fetchall()))
+        ensure_partitions(now=now)
+        cursor.execute(f"SELECT MAX({qn('id')}) FROM {qn(legacy)}")
+        max_id = cursor.fetchone()[0]
+        cursor.execute(f"CREATE TABLE {qn(f'{TABLE}_default')} PARTITION OF {qn(TABLE)} DEFAULT")
+        cursor.execute(f"SELECT COUNT(*) FROM {qn(legacy)} WHERE {qn('timestamp')} IS NULL")
+        undated = cursor.fetchone()[0]
+        if undated:
+            cursor.execute(
+                f"CREATE TABLE {qn(f'{TABLE}_undated')} AS SELECT * FROM {qn(legacy)} WHERE {qn('timestamp')} IS NULL"
+            )
+            logger.warning("Moved %s positions without a timestamp to %s_undated", undated, TABLE)
+        cursor.execute(f"INSERT INTO {qn(TABLE)} SELECT * FROM {qn(legacy)} WHERE {qn('timestamp')} IS NOT NULL")
+        cursor.execute("SELECT setval(%s, %s, false)", [sequence, (max_id or 0) + 1])
+        cursor.execute(f"DROP TABLE {qn(legacy)}")
+    logger.info("Converted %s to a partitioned table", TABLE)
+    return True
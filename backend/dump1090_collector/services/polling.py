@@ -0,0 +1,153 @@
+import logging
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import render_family
+
+logger = logging.getLogger(__name__)
+
+# 'fixed' polls every beat tick; 'adaptive' stretches a receiver's interval
+# to its measured poll latency and the poll queue's depth. Either way only
+# one poll per receiver is in flight, and ticks that find it busy are skipped.
+POLL_SCHEDULER = getattr(settings, 'DUMP1090_POLL_SCHEDULER', 'fixed')
+POLLING_TIME = getattr(settings, 'DUMP1090_POLLING_TIME', 10)
+POLL_MAX_INTERVAL = getattr(settings, 'DUMP1090_POLL_MAX_INTERVAL', 30)
+POLL_LOCK_TTL = getattr(settings, 'DUMP1090_POLL_LOCK_TTL', 60)
+POLL_LATENCY_HEADROOM = getattr(settings, 'DUMP1090_POLL_LATENCY_HEADROOM', 1.5)
+POLL_QUEUE_LIMIT = getattr(settings, 'DUMP1090_POLL_QUEUE_LIMIT', 10)
+POLL_QUEUE = 'dump1090_queue'
+LATENCY_SMOOTHING = 0.3
+LOCK_KEY = 'poll:lock:{}'
+STATE_KEY = 'poll:state:{}'
+COUNT_KEY = 'poll:count:{}:{}'
+COUNTERS = ('polls', 'failed', 'skipped_busy', 'skipped_not_due', 'stale_dropped')
+
+
+def count(receiver, name):
+    key = COUNT_KEY.format(receiver, name)
+    try:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+    except Exception as e:
+        logger.warning("Could not count %s for %s: %s", name, receiver, e)
+
+
+def poll_state(receiver):
+    return cache.get(STATE_KEY.format(receiver)) or {}
+
+
+def adapt_interval(interval, latency, queue_depth):
+    """
+    The next polling interval: POLLING_TIME, or longer while polls take more
+    than that (with POLL_LATENCY_HEADROOM to spare), doubling while more
+    than POLL_QUEUE_LIMIT polls are waiting. Capped at POLL_MAX_INTERVAL.
+    """
+    target = max(POLLING_TIME, latency * POLL_LATENCY_HEADROOM)
+    if queue_depth is not None and queue_depth > POLL_QUEUE_LIMIT:
+        target = max(target, interval * 2)
+    return min(POLL_MAX_INTERVAL, target)
+
+
+def queue_depth(queue=POLL_QUEUE):
+    """Messages waiting on the broker's ``queue``, or None when the broker can't say."""
+    from amqp.exceptions import ChannelError
+    from celery import current_app
+    try:
+        with current_app.connection_or_acquire() as connection:
+            connection.ensure_connection(max_retries=1)
+            try:
+                return connection.default_channel.queue_declare(queue=queue, passive=True).message_count
+            except ChannelError:
+                # Redis drops a queue's list once it is empty.
+                return 0
+    except Exception as e:
+        logger.debug("Could not read the depth of %s: %s", queue, e)
+        return None
+
+
+def acquire_poll(receiver, now=None):
+    """
+    Take ``receiver``'s poll lock for this tick and return its token, or
+    return None when the tick is skipped: a poll is still running
+    (skipped_busy) or, in adaptive mode, its interval has not passed yet
+    (skipped_not_due).
+    """
+    now = time.time() if now is None else now
+    if POLL_SCHEDULER == 'adaptive':
+        state = poll_state(receiver)
+        # Half a tick of slack so beat jitter doesn't push a due poll to the next tick.
+        if 'started' in state and now - state['started'] < state['interval'] - POLLING_TIME / 2:
+            count(receiver, 'skipped_not_due')
+            return None
+    token = uuid.uuid4().hex
+    if not cache.add(LOCK_KEY.format(receiver), token, timeout=POLL_LOCK_TTL):
+        count(receiver, 'skipped_busy')
+        return None
+    return token
+
+
+def release_poll(receiver, token, started, finished=None, failed=False, depth=None):
+    """
+    Record a finished poll (its smoothed latency, how late it started and
+    the queue ``depth``), adapt the receiver's interval and release its lock.
+    """
+    finished = time.time() if finished is None else finished
+    state = poll_state(receiver)
+    latency = finished - started
+    if 'latency' in state:
+        latency = state['latency'] + LATENCY_SMOOTHING * (latency - state['latency'])
+    interval = state.get('interval', POLLING_TIME)
+    lag = max(0.0, started - state['started'] - interval) if 'started' in state else 0.0
+    cache.set(STATE_KEY.format(receiver), {
+        'started': started,
+        'finished': finished,
+        'latency': latency,
+        'lag': lag,
+        'queue_depth': depth,
+        'interval': adapt_interval(interval, latency, depth),
+    }, timeout=None)
+    count(receiver, 'failed' if failed else 'polls')
+    key = LOCK_KEY.format(receiver)
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def poll_metrics(receivers):
+    """Per receiver: the last poll's state plus tick counters, as shared by every worker."""
+    keys = {STATE_KEY.format(receiver) for receiver in receivers}
+    keys |= {COUNT_KEY.format(receiver, name) for receiver in receivers for name in COUNTERS}
+    values = cache.get_many(list(keys))
+    return {
+        receiver: {
+            **values.get(STATE_KEY.format(receiver), {}),
+            **{name: values.get(COUNT_KEY.format(receiver, name), 0) for name in COUNTERS},
+        }
+        for receiver in receivers
+    }
+
+
+# /metrics families built from poll_metrics: (name, state key, help).
+POLL_GAUGES = (
+    ('dump1090_poll_interval_seconds', 'interval', "Current polling interval per receiver."),
+    ('dump1090_poll_latency_seconds', 'latency', "Smoothed poll latency per receiver."),
+    ('dump1090_poll_lag_seconds', 'lag', "How late the last poll started against its interval."),
+    ('dump1090_poll_queue_depth', 'queue_depth', "Polls waiting on dump1090_queue at the last poll."),
+)
+
+
+def render_poll_metrics(metrics):
+    """poll_metrics as Prometheus gauges and a per-outcome tick counter."""
+    lines = []
+    for name, key, help_text in POLL_GAUGES:
+        samples = [('', f'receiver="{receiver}"', values[key])
+                   for receiver, values in metrics.items() if values.get(key) is not None]
+        if samples:
+            lines += render_family(name, 'gauge', help_text, samples)
+    samples = [('', f'receiver="{receiver}",outcome="{outcome}"', values[outcome])
+               for receiver, values in metrics.items() for outcome in COUNTERS]
+    if samples:
+        lines += render_family('dump1090_poll_ticks_total', 'counter',
+                               "Beat ticks per receiver by outcome.", samples)
+    return lines
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from django.conf import settings
+
+from asgiref.sync import sync_to_async
+
+from .live import LIVE_MAX_AGE, bbox_contains, get_live_store, live_state
+from .spatial import longitude_spans
+
+logger = logging.getLogger(__name__)
+
+DELTA_CHANNEL = getattr(settings, 'DUMP1090_DELTA_CHANNEL', 'collector:live:deltas')
+SUBSCRIBER_QUEUE_SIZE = getattr(settings, 'DUMP1090_PUSH_QUEUE_SIZE', 64)
+# Seconds of silence after which a comment line is sent to keep proxies from
+# closing the stream.
+KEEPALIVE_INTERVAL = getattr(settings, 'DUMP1090_PUSH_KEEPALIVE', 15)
+CELL_DEGREES = 1.0
+
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {data}\n\n'
+
+
+class LocalPubSub:
+    """
+    In-process stand-in for Redis pub/sub, used when the cache is not Redis
+    and by the fan-out benchmark. ``publish`` may be called from any thread;
+    ``listen`` is an async generator bound to the caller's event loop.
+    """
+
+    def __init__(self):
+        self._listeners = set()
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            listeners = [listener for listener in self._listeners if listener[0] == channel]
+        for _, loop, queue in listeners:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+        return len(listeners)
+
+    async def listen(self, channel):
+        listener = (channel, asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._listeners.add(listener)
+        try:
+            while True:
+                yield await listener[2].get()
+        finally:
+            with self._lock:
+                self._listeners.discard(listener)
+
+
+class RedisPubSub:
+    """Redis pub/sub on the cache's Redis server."""
+
+    def __init__(self, url):
+        self.url = url
+        self._client = None
+
+    def publish(self, channel, message):
+        if self._client is None:
+            from django_redis import get_redis_connection
+            self._client = get_redis_connection('default')
+        return self._client.publish(channel, message)
+
+    async def listen(self, channel):
+        import redis.asyncio
+        client = redis.asyncio.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        try:
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    yield message['data']
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_pubsubs = {}
+
+
+def get_pubsub():
+    """Per-process pub/sub: Redis when the default cache is django-redis, in-process otherwise."""
+    pid = os.getpid()
+    pubsub = _pubsubs.get(pid)
+    if pubsub is None:
+        cache_settings = settings.CACHES['default']
+        if 'django_redis' in cache_settings['BACKEND']:
+            pubsub = RedisPubSub(cache_settings['LOCATION'])
+        else:
+            pubsub = LocalPubSub()
+        _pubsubs.clear()
+        _pubsubs[pid] = pubsub
+    return pubsub
+
+
+def publish_delta(flights, now=None):
+    """
+    Broadcast the current-picture state of the aircraft that changed in this
+    poll. Failures are logged, never raised.
+    """
+    now = time.time() if now is None else now
+    states = [live_state(flight, now) for flight in flights if (flight.get('hex') or '').strip()]
+    if not states:
+        return 0
+    message = json.dumps({'now': now, 'aircraft': states})
+    try:
+        return get_pubsub().publish(DELTA_CHANNEL, message)
+    except Exception as e:
+        logger.error("Could not publish live delta: %s", e)
+        return 0
+
+
+def cells(bbox):
+    """Grid cells covered by ``bbox``; None means the whole world. min_lon > max_lon crosses the antimeridian."""
+    if bbox is None:
+        return None
+    min_lon, min_lat, max_lon, max_lat = bbox
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    return {
+        (x, y)
+        for start, end in longitude_spans(max(min_lon, -180.0), min(max_lon, 180.0))
+        for x in range(math.floor(start / CELL_DEGREES), math.floor(end / CELL_DEGREES) + 1)
+        for y in range(math.floor(min_lat / CELL_DEGREES), math.floor(max_lat / CELL_DEGREES) + 1)
+    }
+
+
+def cell_of(state):
+    lat, lon = state.get('lat'), state.get('lon')
+    if lat is None or lon is None:
+        return None
+    return math.floor(lon / CELL_DEGREES), math.floor(lat / CELL_DEGREES)
+
+
+class Subscription:
+    def __init__(self, bbox, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.bbox = tuple(bbox) if bbox is not None else None
+        self.cells = cells(self.bbox)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, event):
+        """Queue an event; a subscriber that falls behind loses its oldest events."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class DeltaHub:
+    """
+    Fans the delta channel out to every subscriber in this process over a
+    single pub/sub subscription. Each message is decoded once, aircraft are
+    bucketed into 1 degree cells, and each distinct bounding box is filtered
+    and encoded once however many subscribers share it.
+    """
+
+    def __init__(self, pubsub=None, channel=DELTA_CHANNEL):
+        self.pubsub = pubsub
+        self.channel = channel
+        self.subscriptions = set()
+        self._task = None
+        self.messages = 0
+
+    def subscribe(self, bbox=None, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        subscription = Subscription(bbox, queue_size)
+        self.subscriptions.add(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+        if not self.subscriptions and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self):
+        pubsub = self.pubsub or get_pubsub()
+        while True:
+            try:
+                async for message in pubsub.listen(self.channel):
+                    self.dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Live delta subscription failed, reconnecting: %s", e)
+                await asyncio.sleep(1)
+
+    def dispatch(self, message):
+        self.messages += 1
+        delta = json.loads(message)
+        # Encode each aircraft once; per-bbox payloads are spliced together
+        # from these strings.
+        by_cell = {}
+        encoded = []
+        for state in delta['aircraft']:
+            entry = (state.get('lat'), state.get('lon'), json.dumps(state))
+            encoded.append(entry[2])
+            by_cell.setdefault(cell_of(state), []).append(entry)
+        prefix = f'{{"now":{delta["now"]},"aircraft":['
+
+        events = {}
+        for subscription in list(self.subscriptions):
+            event = events.get(subscription.bbox)
+            if event is None:
+                if subscription.cells is None:
+                    aircraft = encoded
+                else:
+                    aircraft = self.within(subscription, by_cell)
+                event = sse_event('delta', prefix + ','.join(aircraft) + ']}') if aircraft else ''
+                events[subscription.bbox] = event
+            if event:
+                subscription.offer(event)
+
+    @staticmethod
+    def within(subscription, by_cell):
+        aircraft = []
+        for cell in subscription.cells & by_cell.keys():
+            for lat, lon, encoded in by_cell[cell]:
+                if bbox_contains(subscription.bbox, lat, lon):
+                    aircraft.append(encoded)
+        return aircraft
+
+
+_hubs = {}
+
+
+def get_delta_hub():
+    """The hub for the running event loop."""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        for stale in [other for other in _hubs if other.is_closed()]:
+            del _hubs[stale]
+        hub = _hubs[loop] = DeltaHub()
+    return hub
+
+
+async def live_events(bbox=None, max_age=LIVE_MAX_AGE, hub=None, keepalive=KEEPALIVE_INTERVAL):
+    """
+    Server-sent events for one client: a ``snapshot`` of the current picture
+    followed by a ``delta`` for every poll that changed an aircraft inside
+    ``bbox``. Subscribes before reading the snapshot so nothing falls in
+    between.
+    """
+    hub = hub or get_delta_hub()
+    subscription = hub.subscribe(bbox)
+    try:
+        now = time.time()
+        aircraft = await sync_to_async(get_live_store().current_json)(max_age=max_age, bbox=bbox, now=now)
+        yield sse_event('snapshot', f'{{"now":{now},"aircraft":[{",".join(aircraft)}]}}')
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+    finally:
+        hub.unsubscribe(subscription)
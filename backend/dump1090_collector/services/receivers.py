@@ -0,0 +1,74 @@
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Receivers polled for aircraft.json, by name. Each gets its own beat poll.
+RECEIVERS = getattr(settings, 'DUMP1090_RECEIVERS', {'default': 'http://dump1090:8080'})
+# With more than one receiver, an aircraft is stored once per MERGE_WINDOW
+# seconds of observation time, from whichever receiver reports it first.
+MERGE_WINDOW = getattr(settings, 'DUMP1090_MERGE_WINDOW', getattr(settings, 'DUMP1090_POLLING_TIME', 10))
+MERGE_CLAIM_TTL = getattr(settings, 'DUMP1090_MERGE_CLAIM_TTL', 60)
+CLAIM_KEY = 'receivers:claim:{}:{}'
+
+
+def default_receiver():
+    return next(iter(RECEIVERS))
+
+
+def receiver_url(name):
+    """Base URL of the named receiver's dump1090, or None when it is not registered."""
+    return RECEIVERS.get(name)
+
+
+def claim(keys, value, timeout=MERGE_CLAIM_TTL):
+    """
+    Set every key in ``keys`` that is not set yet and return the ones this
+    call set. One pipelined round trip on django-redis; one add per key on
+    other cache backends.
+    """
+    if not keys:
+        return []
+    if 'django_redis' in settings.CACHES['default']['BACKEND']:
+        from django_redis import get_redis_connection
+        pipe = get_redis_connection('default').pipeline(transaction=False)
+        encoded = cache.client.encode(value)
+        for key in keys:
+            pipe.set(cache.make_key(key), encoded, nx=True, ex=timeout)
+        return [key for key, claimed in zip(keys, pipe.execute()) if claimed]
+    return [key for key in keys if cache.add(key, value, timeout=timeout)]
+
+
+def merge_receivers(flights, receiver, now=None, window=MERGE_WINDOW):
+    """
+    Drop aircraft that another receiver already reported for the same
+    ``window``-second slot of observation time (``now`` less the entry's
+    ``seen_pos``/``seen`` age), so an aircraft heard by several receivers
+    gives one position stream. Claims live in the shared cache, so polls
+    running on different workers agree. A no-op with a single receiver.
+    Returns ``(flights, merged_count)``.
+    """
+    if len(RECEIVERS) < 2:
+        return list(flights), 0
+    now = time.time() if now is None else now
+    keys = []
+    for flight in flights:
+        hex_code = (flight.get('hex') or '').strip().lower()
+        if not hex_code:
+            keys.append(None)
+            continue
+        observed = now - (flight.get('seen_pos', flight.get('seen')) or 0)
+        keys.append(CLAIM_KEY.format(hex_code, int(observed // window)))
+    claimed = set(claim(list(dict.fromkeys(key for key in keys if key)), receiver))
+    kept = []
+    for flight, key in zip(flights, keys):
+        if key is None or key in claimed:
+            kept.append(flight)
+            # A hex listed twice in one snapshot is only stored once.
+            claimed.discard(key)
+    merged = len(flights) - len(kept)
+    if merged:
+        logger.debug("Merged %s positions from %s already reported by other receivers", merged, receiver)
+    return kept, merged
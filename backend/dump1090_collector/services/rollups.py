@@ -0,0 +1,125 @@
+import logging
+import math
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Q
+from django.db.models.functions import Cos, Radians, Sin, TruncMinute
+from django.utils import timezone
+
+from ..models import FlightData, FlightDataRollup
+
+logger = logging.getLogger(__name__)
+
+# Buckets younger than ROLLUP_LAG seconds are recomputed on the next run, so
+# late rows still make it into their minute.
+ROLLUP_LAG = getattr(settings, 'DUMP1090_ROLLUP_LAG', 120)
+ROLLUP_MAX_SPAN = getattr(settings, 'DUMP1090_ROLLUP_MAX_SPAN', 6 * 60 * 60)
+ROLLUP_BATCH_SIZE = getattr(settings, 'DUMP1090_ROLLUP_BATCH_SIZE', 1000)
+ROLLUP_FIELDS = [
+    'flight_callsign', 'latitude', 'longitude', 'altitude', 'max_altitude',
+    'track', 'speed_in_knots', 'points', 'aircraft',
+]
+
+
+def minute(moment):
+    return moment.replace(second=0, microsecond=0)
+
+
+def mean_track(sin_avg, cos_avg):
+    """Circular mean of a heading, so 350 and 10 average to 0 rather than 180."""
+    if sin_avg is None or cos_avg is None:
+        return None
+    return int(round(math.degrees(math.atan2(sin_avg, cos_avg)))) % 360
+
+
+def rollup_window(now):
+    """
+    Pick the range to (re)aggregate: from ROLLUP_LAG before the newest rollup
+    bucket (or from the oldest position) up to the start of the current
+    minute, capped at ROLLUP_MAX_SPAN so a long backlog is caught up in
+    several runs.
+    """
+    end = minute(now)
+    positions = FlightData.objects.filter(timestamp__isnull=False)
+    latest = rolled_up_until()
+    if latest is not None:
+        positions = positions.filter(timestamp__gte=latest - timedelta(seconds=ROLLUP_LAG))
+    # Start at the first position in range so gaps in coverage are skipped.
+    oldest = positions.order_by('timestamp').values_list('timestamp', flat=True).first()
+    if oldest is None:
+        return None
+    start = minute(oldest)
+    return start, min(end, start + timedelta(seconds=ROLLUP_MAX_SPAN))
+
+
+def rollup_positions(now=None):
+    """
+    Aggregate raw positions into one FlightDataRollup row per hex per minute.
+    Re-running over the same minutes overwrites their rollups, so the job is
+    idempotent. Returns the number of rollup rows written.
+    """
+    window = rollup_window(now or timezone.now())
+    if window is None or window[0] >= window[1]:
+        return 0
+    start, end = window
+
+    rows = (
+        FlightData.objects
+        .filter(timestamp__gte=start, timestamp__lt=end)
+        .exclude(Q(flight_hex__isnull=True) | Q(flight_hex=''))
+        .exclude(latitude=0, longitude=0)
+        .annotate(bucket=TruncMinute('timestamp'))
+        .values('flight_hex', 'bucket')
+        .annotate(
+            callsign=Max('callsign_norm'),
+            avg_latitude=Avg('latitude'),
+            avg_longitude=Avg('longitude'),
+            avg_altitude=Avg('altitude'),
+            peak_altitude=Max('altitude'),
+            track_sin=Avg(Sin(Radians('track'))),
+            track_cos=Avg(Cos(Radians('track'))),
+            avg_speed=Avg('speed_in_knots'),
+            point_count=Count('id'),
+            aircraft_ref=Max('aircraft'),
+        )
+        .order_by()
+    )
+    rollups = [
+        FlightDataRollup(
+            bucket=row['bucket'],
+            flight_hex=row['flight_hex'],
+            flight_callsign=row['callsign'],
+            latitude=row['avg_latitude'],
+            longitude=row['avg_longitude'],
+            altitude=None if row['avg_altitude'] is None else int(round(row['avg_altitude'])),
+            max_altitude=row['peak_altitude'],
+            track=mean_track(row['track_sin'], row['track_cos']),
+            speed_in_knots=None if row['avg_speed'] is None else int(round(row['avg_speed'])),
+            points=row['point_count'],
+            aircraft_id=row['aircraft_ref'],
+        )
+        for row in rows
+    ]
+    FlightDataRollup.objects.bulk_create(
+        rollups,
+        batch_size=ROLLUP_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['flight_hex', 'bucket'],
+        update_fields=ROLLUP_FIELDS,
+    )
+    logger.info("Rolled up %s aircraft-minutes between %s and %s", len(rollups), start, end)
+    return len(rollups)
+
+
+def rewind_rollups(since):
+    """
+    Drop the rollups from the minute of ``since`` on, so the next runs
+    recompute them from raw positions, e.g. after history was replayed into
+    minutes already rolled up. Returns the number of rollups dropped.
+    """
+    deleted, _ = FlightDataRollup.objects.filter(bucket__gte=minute(since)).delete()
+    return deleted
+
+
+def rolled_up_until():
+    return FlightDataRollup.objects.aggregate(latest=Max('bucket'))['latest']
@@ -2,9 +2,8 @@ import logging
 from ..models import Aircraft, Airline, Airport
 
 
-def get_or_create_aircraft(aircraft_info, flight_hex):
-    registration = (aircraft_info.get('registration') or '').strip()
-    defaults = {
+def aircraft_defaults(aircraft_info, flight_hex):
+    return {
         'hex_id': flight_hex,
         'aircraft_type': aircraft_info.get('type', ''),
         'icao_type': aircraft_info.get('icao_type', ''),
@@ -17,6 +16,36 @@ def get_or_create_aircraft(aircraft_info, flight_hex):
         'url_photo': aircraft_info.get('url_photo', ''),
         'url_photo_thumbnail': aircraft_info.get('url_photo_thumbnail', ''),
     }
+
+
+def airline_fields(airline_info):
+    return {
+        'icao': airline_info.get('icao', ''),
+        'iata': airline_info.get('iata', ''),
+        'name': airline_info.get('name', ''),
+        'country': airline_info.get('country', ''),
+        'country_iso': airline_info.get('country_iso', ''),
+        'callsign': airline_info.get('callsign', '').strip(),
+    }
+
+
+def airport_fields(airport_info):
+    return {
+        'iata_code': airport_info.get('iata_code', '') or '',
+        'icao_code': airport_info.get('icao_code', '') or '',
+        'name': airport_info.get('name', ''),
+        'country_iso_name': airport_info.get('country_iso_name', ''),
+        'country_name': airport_info.get('country_name', ''),
+        'elevation': airport_info.get('elevation', 0),
+        'latitude': airport_info.get('latitude', 0),
+        'longitude': airport_info.get('longitude', 0),
+        'municipality': airport_info.get('municipality', ''),
+    }
+
+
+def get_or_create_aircraft(aircraft_info, flight_hex):
+    registration = (aircraft_info.get('registration') or '').strip()
+    defaults = aircraft_defaults(aircraft_info, flight_hex)
     if registration:
         qs = Aircraft.objects.filter(registration=registration)
         count = qs.count()
@@ -53,7 +82,6 @@ def get_or_create_aircraft(aircraft_info, flight_hex):
 
 
 def get_or_create_airline(airline_info):
-    airline_name = airline_info.get('name', '')
     airline_icao = airline_info.get('icao', '')
     airline_iata = airline_info.get('iata', '')
     qs = Airline.objects.filter(icao=airline_icao, iata=airline_iata)
@@ -62,15 +90,7 @@ def get_or_create_airline(airline_info):
             logging.warning("Multiple Airline objects found for icao=%s, iata=%s. Using the first one.", airline_icao, airline_iata)
         return qs.first()
     else:
-        airline_obj = Airline.objects.create(
-            icao=airline_icao,
-            iata=airline_iata,
-            name=airline_name,
-            country=airline_info.get('country', ''),
-            country_iso=airline_info.get('country_iso', ''),
-            callsign=airline_info.get('callsign', '').strip(),
-        )
-        return airline_obj
+        return Airline.objects.create(**airline_fields(airline_info))
 
 
 def get_or_create_airport(airport_info):
@@ -81,14 +101,4 @@ def get_or_create_airport(airport_info):
     airport = airport_qs.first()
     if airport:
         return airport
-    return Airport.objects.create(
-        iata_code=iata,
-        icao_code=icao,
-        name=airport_info.get('name', ''),
-        country_iso_name=airport_info.get('country_iso_name', ''),
-        country_name=airport_info.get('country_name', ''),
-        elevation=airport_info.get('elevation', 0),
-        latitude=airport_info.get('latitude', 0),
-        longitude=airport_info.get('longitude', 0),
-        municipality=airport_info.get('municipality', ''),
-    )
+    return Airport.objects.create(**airport_fields(airport_info))
@@ -0,0 +1,100 @@
+import math
+from django.conf import settings
+from django.db.models import F, IntegerField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Floor, Least, Mod, Power, Radians, Sin, Sqrt
+
+# Positions are bucketed into a fixed lat/lon grid; FlightData.grid_cell
+# holds the bucket and is indexed with the timestamp. Spatial filters turn a
+# bbox into the list of cells it touches, so Postgres does one index seek
+# per cell (bounded by the time window) before the exact lat/lon check.
+GRID_CELL_DEGREES = getattr(settings, 'DUMP1090_GRID_CELL_DEGREES', 0.1)
+GRID_ROWS = math.ceil(180 / GRID_CELL_DEGREES)
+GRID_COLUMNS = math.ceil(360 / GRID_CELL_DEGREES)
+# Larger areas skip the cell list and rely on the lat/lon check alone.
+MAX_QUERY_CELLS = getattr(settings, 'DUMP1090_MAX_QUERY_CELLS', 1024)
+
+EARTH_RADIUS_NM = 3440.065
+
+
+def grid_row(lat):
+    return min(math.floor((lat + 90) / GRID_CELL_DEGREES), GRID_ROWS - 1)
+
+
+def grid_column(lon):
+    return math.floor((lon + 180) / GRID_CELL_DEGREES) % GRID_COLUMNS
+
+
+def grid_cell(lat, lon):
+    """The grid cell of a position, or None without one."""
+    if lat is None or lon is None:
+        return None
+    return grid_row(lat) * GRID_COLUMNS + grid_column(lon)
+
+
+def grid_cell_expression(lat='latitude', lon='longitude'):
+    """``grid_cell`` computed in the database, for backfilling existing rows."""
+    row = Least(Cast(Floor((F(lat) + 90) / GRID_CELL_DEGREES), IntegerField()), Value(GRID_ROWS - 1))
+    column = Mod(Cast(Floor((F(lon) + 180) / GRID_CELL_DEGREES), IntegerField()), Value(GRID_COLUMNS))
+    return row * GRID_COLUMNS + column
+
+
+def longitude_spans(min_lon, max_lon):
+    """A bbox's longitude range as one or two spans; min_lon > max_lon crosses the antimeridian."""
+    if min_lon <= max_lon:
+        return [(min_lon, max_lon)]
+    return [(min_lon, 180.0), (-180.0, max_lon)]
+
+
+def cells_in_bbox(min_lon, min_lat, max_lon, max_lat):
+    """Every grid cell the bbox touches, or None when there are more than MAX_QUERY_CELLS."""
+    rows = range(grid_row(max(min_lat, -90.0)), grid_row(min(max_lat, 90.0)) + 1)
+    columns = []
+    for start, end in longitude_spans(min_lon, max_lon):
+        first, last = math.floor((start + 180) / GRID_CELL_DEGREES), math.floor((end + 180) / GRID_CELL_DEGREES)
+        columns.extend(column % GRID_COLUMNS for column in range(first, min(last, first + GRID_COLUMNS - 1) + 1))
+    columns = sorted(set(columns))
+    if len(rows) * len(columns) > MAX_QUERY_CELLS:
+        return None
+    return [row * GRID_COLUMNS + column for row in rows for column in columns]
+
+
+def filter_bbox(queryset, min_lon, min_lat, max_lon, max_lat):
+    """Positions inside the bbox, through the grid cell index where the area allows."""
+    cells = cells_in_bbox(min_lon, min_lat, max_lon, max_lat)
+    if cells is not None:
+        queryset = queryset.filter(grid_cell__in=cells)
+    longitudes = Q()
+    for start, end in longitude_spans(min_lon, max_lon):
+        longitudes |= Q(longitude__gte=start, longitude__lte=end)
+    return queryset.filter(longitudes, valid_position=True, latitude__gte=min_lat, latitude__lte=max_lat)
+
+
+def radius_bbox(lat, lon, radius_nm):
+    """A bbox enclosing the circle, as (min_lon, min_lat, max_lon, max_lat)."""
+    lat_span = radius_nm / 60
+    min_lat, max_lat = max(lat - lat_span, -90.0), min(lat + lat_span, 90.0)
+    widest = max(abs(min_lat), abs(max_lat))
+    if widest >= 90 or radius_nm / 60 / math.cos(math.radians(widest)) >= 180:
+        return -180.0, min_lat, 180.0, max_lat
+    lon_span = radius_nm / 60 / math.cos(math.radians(widest))
+    min_lon, max_lon = lon - lon_span, lon + lon_span
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def distance_nm_expression(lat, lon):
+    """Great-circle distance (haversine) from a point, in the database."""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    dlat = Radians(F('latitude')) - lat1
+    dlon = Radians(F('longitude')) - lon1
+    a = Power(Sin(dlat / 2), 2) + math.cos(lat1) * Cos(Radians(F('latitude'))) * Power(Sin(dlon / 2), 2)
+    return 2 * EARTH_RADIUS_NM * ASin(Least(Sqrt(a), Value(1.0)))
+
+
+def filter_radius(queryset, lat, lon, radius_nm):
+    """Positions within ``radius_nm`` nautical miles of a point."""
+    queryset = filter_bbox(queryset, *radius_bbox(lat, lon, radius_nm))
+    return queryset.alias(distance_nm=distance_nm_expression(lat, lon)).filter(distance_nm__lte=radius_nm)
@@ -0,0 +1,241 @@
+import logging
+import math
+from datetime import timedelta
+from hashlib import blake2b
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from ..models import DailyCallsign, FlightData, HourlyTraffic
+from .upserts import greatest, least, upsert
+from .watermarks import reset_watermark, watermark_position, watermark_window
+
+logger = logging.getLogger(__name__)
+
+# Like coverage: each run reads from the watermark up to STATS_LAG seconds
+# ago, at most STATS_MAX_SPAN seconds of positions.
+STATS_LAG = getattr(settings, 'DUMP1090_STATS_LAG', 120)
+STATS_MAX_SPAN = getattr(settings, 'DUMP1090_STATS_MAX_SPAN', 6 * 60 * 60)
+# messages_received counts up from when dump1090 first heard an aircraft and
+# restarts once it has not been heard for 300 seconds, so looking back that far
+# finds the previous counter of every aircraft still being tracked.
+MESSAGE_LOOKBACK = getattr(settings, 'DUMP1090_STATS_MESSAGE_LOOKBACK', 300)
+# 2**SKETCH_PRECISION one-byte registers (4 KiB) per hour, for about
+# 1.04 / sqrt(4096), i.e. 1.6%, standard error on distinct aircraft counts.
+SKETCH_PRECISION = getattr(settings, 'DUMP1090_STATS_SKETCH_PRECISION', 12)
+WATERMARK = 'stats'
+
+
+def empty_sketch():
+    return np.zeros(1 << SKETCH_PRECISION, dtype=np.uint8)
+
+
+def add_to_sketch(registers, values):
+    """HyperLogLog: keep, per register, the longest run of leading zeros hashed into it."""
+    width = 64 - SKETCH_PRECISION
+    for value in values:
+        hashed = int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), 'big')
+        index = hashed >> width
+        rank = width - (hashed & ((1 << width) - 1)).bit_length() + 1
+        if rank > registers[index]:
+            registers[index] = rank
+    return registers
+
+
+def load_sketch(data):
+    return np.frombuffer(bytes(data), dtype=np.uint8).copy() if data else empty_sketch()
+
+
+def estimate(registers):
+    """Distinct values added to the ``registers``, with linear counting while most are empty."""
+    size = len(registers)
+    raw = 0.7213 / (1 + 1.079 / size) * size * size / np.sum(np.ldexp(1.0, -registers.astype(int)))
+    empty = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * size and empty:
+        return int(round(size * math.log(size / empty)))
+    return int(round(raw))
+
+
+def count_window(rows, start):
+    """
+    One pass over (hex, callsign, timestamp, messages, airline, origin,
+    destination) rows ordered by hex and time. Rows before ``start`` only
+    provide the previous message counter. Returns per-hour and per-callsign-day
+    tallies.
+    """
+    hours, callsigns = {}, {}
+    previous_hex = previous_messages = None
+    for hex_code, callsign, timestamp, messages, airline, origin, destination in rows:
+        if hex_code != previous_hex:
+            previous_messages = None
+        if timestamp >= start:
+            hour = hours.setdefault(timestamp.replace(minute=0, second=0, microsecond=0),
+                                    {'positions': 0, 'messages': 0, 'hexes': set()})
+            hour['positions'] += 1
+            hour['hexes'].add(hex_code.upper())
+            # No earlier counter, or it went down: dump1090 started counting afresh.
+            if previous_messages is None or messages < previous_messages:
+                hour['messages'] += messages
+            else:
+                hour['messages'] += messages - previous_messages
+            if callsign:
+                day = callsigns.setdefault((timestamp.date(), callsign), {
+                    'positions': 0, 'first_seen': timestamp, 'last_seen': timestamp,
+                    'airline': None, 'origin_airport': None, 'destination_airport': None,
+                })
+                day['positions'] += 1
+                day['first_seen'] = min(day['first_seen'], timestamp)
+                day['last_seen'] = max(day['last_seen'], timestamp)
+                if airline is not None:
+                    day.update(airline=airline, origin_airport=origin, destination_airport=destination)
+        previous_hex, previous_messages = hex_code, messages
+    return hours, callsigns
+
+
+def merge_hours(hours):
+    stored = {row.hour: row for row in HourlyTraffic.objects.filter(hour__in=hours)}
+    rows = []
+    for hour, counts in hours.items():
+        row = stored.get(hour) or HourlyTraffic(hour=hour)
+        registers = add_to_sketch(load_sketch(row.aircraft_sketch), counts['hexes'])
+        row.positions += counts['positions']
+        row.messages += counts['messages']
+        row.aircraft = estimate(registers)
+        row.aircraft_sketch = registers.tobytes()
+        rows.append(row)
+    HourlyTraffic.objects.bulk_create(rows, update_conflicts=True, unique_fields=['hour'],
+                                      update_fields=['positions', 'messages', 'aircraft', 'aircraft_sketch'])
+
+
+def merge_callsigns(callsigns):
+    route_fields = ['airline', 'origin_airport', 'destination_airport']
+    upsert(DailyCallsign, ['day', 'callsign'], {
+        'day': [day for day, _ in callsigns],
+        'callsign': [callsign for _, callsign in callsigns],
+        **{field: [counts[field] for counts in callsigns.values()]
+           for field in ['positions', 'first_seen', 'last_seen', *route_fields]},
+    }, {
+        'positions': "stored.positions + excluded.positions",
+        'first_seen': least("stored.first_seen", "excluded.first_seen"),
+        'last_seen': greatest("stored.last_seen", "excluded.last_seen"),
+        # Positions stored before their route lookup finished keep the route already known.
+        **{f'{field}_id': f"COALESCE(excluded.{field}_id, stored.{field}_id)" for field in route_fields},
+    })
+
+
+def aggregate_stats(now=None):
+    """
+    Count positions stored since the stats watermark into HourlyTraffic
+    (positions, messages, distinct aircraft) and DailyCallsign (one row per
+    callsign per day with its route), then advance the watermark, all in one
+    transaction. Returns the number of positions counted, or None when
+    already caught up.
+    """
+    with watermark_window(WATERMARK, now or timezone.now(), STATS_LAG, STATS_MAX_SPAN) as window:
+        if window is None:
+            return None
+        start, end = window
+        rows = (
+            FlightData.objects
+            .filter(timestamp__gte=start - timedelta(seconds=MESSAGE_LOOKBACK), timestamp__lt=end)
+            .exclude(Q(flight_hex__isnull=True) | Q(flight_hex=''))
+            .order_by('flight_hex', 'timestamp')
+            .values_list('flight_hex', 'callsign_norm', 'timestamp', 'messages_received',
+                         'flight__airline', 'flight__origin_airport', 'flight__destination_airport')
+        )
+        hours, callsigns = count_window(rows.iterator(chunk_size=10000), start)
+        merge_hours(hours)
+        merge_callsigns(callsigns)
+    positions = sum(hour['positions'] for hour in hours.values())
+    logger.info("Counted %s positions into stats between %s and %s", positions, start, end)
+    return positions
+
+
+def reset_stats():
+    """Forget all stats; the next runs recount them from the oldest stored position."""
+    with transaction.atomic():
+        HourlyTraffic.objects.all().delete()
+        DailyCallsign.objects.all().delete()
+        reset_watermark(WATERMARK)
+
+
+def hourly_traffic(hours, now=None):
+    """
+    The last ``hours`` hours of traffic as parallel columns, with the message
+    rate per second over the part of each hour counted so far, plus the
+    distinct aircraft over the whole range from the merged sketches.
+    """
+    now = now or timezone.now()
+    counted_until = watermark_position(WATERMARK)
+    since = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+    rows = list(HourlyTraffic.objects.filter(hour__gte=since).order_by('hour'))
+    merged = empty_sketch()
+    for row in rows:
+        np.maximum(merged, load_sketch(row.aircraft_sketch), out=merged)
+    seconds = [
+        max(1.0, min(3600.0, (counted_until - row.hour).total_seconds())) if counted_until else 3600.0
+        for row in rows
+    ]
+    return {
+        'counted_until': counted_until,
+        'unique_aircraft': estimate(merged) if rows else 0,
+        'hour': [row.hour for row in rows],
+        'positions': [row.positions for row in rows],
+        'messages': [row.messages for row in rows],
+        'message_rate': [round(row.messages / elapsed, 2) for row, elapsed in zip(rows, seconds)],
+        'aircraft': [row.aircraft for row in rows],
+    }
+
+
+def recent_callsigns(days, now=None):
+    today = (now or timezone.now()).date()
+    return DailyCallsign.objects.filter(day__gt=today - timedelta(days=days)).order_by()
+
+
+def airline_leaderboard(days, limit, now=None):
+    """Airlines by flights, i.e. callsign-days, heard over the last ``days`` days."""
+    rows = (
+        recent_callsigns(days, now)
+        .filter(airline__isnull=False)
+        .values('airline', 'airline__name', 'airline__icao', 'airline__iata')
+        .annotate(flights=Count('id'), positions=Sum('positions'))
+        .order_by('-flights', '-positions', 'airline')
+    )
+    return [
+        {
+            'airline': {'id': row['airline'], 'name': row['airline__name'],
+                        'icao': row['airline__icao'], 'iata': row['airline__iata']},
+            'flights': row['flights'],
+            'positions': row['positions'],
+        }
+        for row in rows[:limit]
+    ]
+
+
+def route_leaderboard(days, limit, now=None):
+    """Origin/destination pairs by flights, i.e. callsign-days, heard over the last ``days`` days."""
+    airport_fields = ['name', 'icao_code', 'iata_code']
+    rows = (
+        recent_callsigns(days, now)
+        .filter(origin_airport__isnull=False, destination_airport__isnull=False)
+        .values('origin_airport', 'destination_airport',
+                *[f'{end}_airport__{field}' for end in ('origin', 'destination') for field in airport_fields])
+        .annotate(flights=Count('id'), positions=Sum('positions'), airlines=Count('airline', distinct=True))
+        .order_by('-flights', '-positions', 'origin_airport', 'destination_airport')
+    )
+    return [
+        {
+            **{
+                end: {'id': row[f'{end}_airport'],
+                      **{field: row[f'{end}_airport__{field}'] for field in airport_fields}}
+                for end in ('origin', 'destination')
+            },
+            'flights': row['flights'],
+            'positions': row['positions'],
+            'airlines': row['airlines'],
+        }
+        for row in rows[:limit]
+    ]
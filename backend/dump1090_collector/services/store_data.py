@@ -1,23 +1,28 @@
 from ..models import FlightData
 from .services import get_or_create_aircraft, get_or_create_airline, get_or_create_airport
 from .extractors import extract_aircraft_info, extract_callsign_info, extract_flight_data
+from .spatial import grid_cell
+from .flights import assign_flights
 
 
-def store_data(flight, adsbdb_aircraft_data, adsbdb_callsign_data):
-    aircraft_info = extract_aircraft_info(adsbdb_aircraft_data)
-    callsign_info = extract_callsign_info(adsbdb_callsign_data)
+def extract_route_info(callsign_info):
     flightroute_info = callsign_info.get('flightroute') or {}
     airline_info = flightroute_info.get('airline', {}) or {}
     origin_info = flightroute_info.get('origin', {}) or {}
     destination_info = flightroute_info.get('destination', {}) or {}
-    flight_fields = extract_flight_data(flight)
-    aircraft_obj = get_or_create_aircraft(aircraft_info, flight_fields["flight_hex"])
-    airline_obj = get_or_create_airline(airline_info)
-    origin_airport = get_or_create_airport(origin_info)
-    destination_airport = get_or_create_airport(destination_info)
-    flight_data = FlightData.objects.create(
+    return airline_info, origin_info, destination_info
+
+
+def build_flight_data(flight_fields, **relations):
+    """
+    Build an unsaved FlightData row. ``relations`` holds the foreign keys,
+    either as objects (``aircraft=...``) or as ids (``aircraft_id=...``).
+    """
+    return FlightData(
+        flight_hex=flight_fields["flight_hex"],
         squawk_code=flight_fields["squawk"],
         flight_callsign=flight_fields["flight_callsign"],
+        callsign_norm=flight_fields["callsign_norm"],
         latitude=flight_fields["lat"],
         longitude=flight_fields["lon"],
         valid_position=flight_fields["valid_position"],
@@ -29,9 +34,21 @@ def store_data(flight, adsbdb_aircraft_data, adsbdb_callsign_data):
         messages_received=flight_fields["messages_received"],
         seen=flight_fields["seen"],
         timestamp=flight_fields["timestamp"],
-        aircraft=aircraft_obj,
-        airline=airline_obj,
-        origin_airport=origin_airport,
-        destination_airport=destination_airport,
+        grid_cell=grid_cell(flight_fields["lat"], flight_fields["lon"]) if flight_fields["valid_position"] else None,
+        **relations,
     )
+
+
+def store_data(flight, adsbdb_aircraft_data, adsbdb_callsign_data):
+    aircraft_info = extract_aircraft_info(adsbdb_aircraft_data)
+    callsign_info = extract_callsign_info(adsbdb_callsign_data)
+    airline_info, origin_info, destination_info = extract_route_info(callsign_info)
+    flight_fields = extract_flight_data(flight)
+    aircraft_obj = get_or_create_aircraft(aircraft_info, flight_fields["flight_hex"])
+    airline_obj = get_or_create_airline(airline_info)
+    origin_airport = get_or_create_airport(origin_info)
+    destination_airport = get_or_create_airport(destination_info)
+    flight_data = build_flight_data(flight_fields, aircraft=aircraft_obj)
+    assign_flights([flight_data], [(airline_obj.pk, origin_airport.pk, destination_airport.pk)])
+    flight_data.save()
     return flight_data
@@ -0,0 +1,350 @@
+import io
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.db.models import CharField, F, Func, Value
+from django.db.models.functions import Coalesce
+
+EARTH_RADIUS_NM = 3440.065
+
+# A new flight starts after this many seconds without a position, or when
+# the callsign changes.
+TRACK_GAP = getattr(settings, 'DUMP1090_TRACK_GAP', 30 * 60)
+# Positions implying a faster ground speed both into and out of them are
+# treated as bad decodes and dropped.
+TRACK_MAX_SPEED = getattr(settings, 'DUMP1090_TRACK_MAX_SPEED', 1000)  # knots
+OUTLIER_PASSES = 3
+CALLSIGN_WIDTH = 8
+
+
+class CallsignChars(Func):
+    """
+    Callsign as char(CALLSIGN_WIDTH), so binary COPY rows have a fixed width
+    as long as callsigns are ASCII (the ADS-B character set).
+    """
+    template = f"coalesce(%(expressions)s, '')::char({CALLSIGN_WIDTH})"
+    output_field = CharField()
+
+
+# One binary COPY row: field count, then (length, value) per column.
+# Timestamps arrive as microseconds since 2000-01-01 UTC.
+COPY_ROW = np.dtype([
+    ('fields', '>i2'),
+    ('lat_len', '>i4'), ('lat', '>f8'),
+    ('lon_len', '>i4'), ('lon', '>f8'),
+    ('t_len', '>i4'), ('t', '>i8'),
+    ('alt_len', '>i4'), ('alt', '>i4'),
+    ('callsign_len', '>i4'), ('callsign', f'S{CALLSIGN_WIDTH}'),
+])
+COPY_HEADER_SIZE = 19
+COPY_TRAILER_SIZE = 2
+POSTGRES_EPOCH = 946684800
+NO_ALTITUDE = -2 ** 31
+
+
+def load_positions(queryset):
+    """
+    Valid positions from ``queryset`` as parallel NumPy arrays ordered by
+    time: t (epoch seconds), lat, lon, alt (NaN when unknown) and callsign
+    ('' when unknown).
+    """
+    queryset = (
+        queryset.filter(valid_position=True, timestamp__isnull=False)
+        .exclude(latitude=0, longitude=0)
+        .order_by('timestamp')
+    )
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        positions = load_positions_postgres(queryset, connection)
+        if positions is not None:
+            return positions
+    return load_positions_generic(queryset)
+
+
+def load_positions_generic(queryset):
+    rows = queryset.values_list('timestamp', 'latitude', 'longitude', 'altitude', 'callsign_norm')
+    if not rows:
+        return empty_positions()
+    t, lat, lon, alt, callsign = zip(*rows)
+    return {
+        't': np.array([value.timestamp() for value in t], dtype=float),
+        'lat': np.array(lat, dtype=float),
+        'lon': np.array(lon, dtype=float),
+        'alt': np.array([np.nan if value is None else value for value in alt], dtype=float),
+        'callsign': np.array([value or '' for value in callsign], dtype=str),
+    }
+
+
+def load_positions_postgres(queryset, connection):
+    """
+    Binary COPY of fixed-width rows parsed with one ``np.frombuffer``,
+    several times faster than fetching a month of rows as Python tuples.
+    Returns None when a non-ASCII callsign breaks the fixed width.
+    """
+    queryset = queryset.values_list(
+        'latitude', 'longitude', 'timestamp',
+        Coalesce('altitude', Value(NO_ALTITUDE)), CallsignChars(F('callsign_norm')),
+    )
+    sql, params = queryset.query.sql_with_params()
+    buffer = io.BytesIO()
+    with connection.cursor() as cursor:
+        query = cursor.mogrify(sql, params).decode()
+        cursor.copy_expert(f'COPY ({query}) TO STDOUT WITH (FORMAT binary)', buffer)
+    data = buffer.getbuffer()[COPY_HEADER_SIZE:-COPY_TRAILER_SIZE]
+    if len(data) % COPY_ROW.itemsize:
+        return None
+    rows = np.frombuffer(data, dtype=COPY_ROW)
+    if (rows['callsign_len'] != CALLSIGN_WIDTH).any():
+        return None
+    alt = rows['alt'].astype(float)
+    alt[rows['alt'] == NO_ALTITUDE] = np.nan
+    return {
+        't': rows['t'] / 1e6 + POSTGRES_EPOCH,
+        'lat': rows['lat'].astype(float),
+        'lon': rows['lon'].astype(float),
+        'alt': alt,
+        'callsign': np.char.strip(rows['callsign'].astype(f'U{CALLSIGN_WIDTH}')),
+    }
+
+
+def empty_positions():
+    empty = np.empty(0)
+    return {'t': empty, 'lat': empty, 'lon': empty, 'alt': empty, 'callsign': np.empty(0, dtype=str)}
+
+
+def distance_nm(lat1, lon1, lat2, lon2):
+    """Great-circle distance between arrays of points."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bearing(lat1, lon1, lat2, lon2):
+    """Initial great-circle bearing in degrees, 0-360."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+
+def leg_speeds(t, lat, lon):
+    """Implied ground speed (kt) of each leg between consecutive points."""
+    hours = np.maximum(np.diff(t), 1.0) / 3600
+    return distance_nm(lat[:-1], lon[:-1], lat[1:], lon[1:]) / hours
+
+
+def drop_outliers(positions, max_speed=TRACK_MAX_SPEED, gap=TRACK_GAP):
+    """
+    Remove positions that could only be reached faster than ``max_speed``
+    from both neighbours, i.e. single-point spikes from bad decodes. Legs
+    across a gap don't count. Repeats a few times so adjacent spikes go too.
+    """
+    for _ in range(OUTLIER_PASSES):
+        t, lat, lon = positions['t'], positions['lat'], positions['lon']
+        if len(t) < 3:
+            break
+        fast = (leg_speeds(t, lat, lon) > max_speed) & (np.diff(t) <= gap)
+        bad = np.zeros(len(t), dtype=bool)
+        bad[1:-1] = fast[:-1] & fast[1:]
+        # An endpoint is only judged by its one leg when the next leg is sane.
+        bad[0] = fast[0] and not fast[1]
+        bad[-1] = fast[-1] and not fast[-2]
+        if not bad.any():
+            break
+        positions = {name: values[~bad] for name, values in positions.items()}
+    return positions
+
+
+def segment_starts(t, callsign, gap=TRACK_GAP):
+    """
+    Indexes where a new flight begins: the first point, any point more than
+    ``gap`` seconds after the previous one, and any callsign change. Unknown
+    callsigns carry the last known one forward, so a dropped callsign does
+    not split a flight.
+    """
+    if len(t) == 0:
+        return np.empty(0, dtype=int)
+    known = callsign != ''
+    carried = np.where(known, np.arange(len(t)), 0)
+    np.maximum.accumulate(carried, out=carried)
+    filled = callsign[carried]
+    filled[~known[carried]] = ''
+    changed = (filled[1:] != filled[:-1]) & (filled[1:] != '') & (filled[:-1] != '')
+    split = (np.diff(t) > gap) | changed
+    return np.concatenate(([0], np.flatnonzero(split) + 1))
+
+
+def leg_distances(lat, lon):
+    """Distance (nm) into each point from its predecessor; 0 for the first point."""
+    legs = np.zeros(len(lat))
+    if len(lat) > 1:
+        legs[1:] = distance_nm(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    return legs
+
+
+def derive(t, lat, lon, alt, legs):
+    """
+    Ground speed (kt), heading (deg) and climb (ft/min) into each point from
+    its predecessor; NaN for the first point.
+    """
+    speed = np.full(len(t), np.nan)
+    heading = np.full(len(t), np.nan)
+    climb = np.full(len(t), np.nan)
+    if len(t) > 1:
+        seconds = np.maximum(np.diff(t), 1.0)
+        speed[1:] = legs[1:] / seconds * 3600
+        heading[1:] = bearing(lat[:-1], lon[:-1], lat[1:], lon[1:])
+        climb[1:] = np.diff(alt) / seconds * 60
+    return speed, heading, climb
+
+
+def iso(epoch):
+    return datetime.fromtimestamp(float(epoch), tz=timezone.utc).isoformat()
+
+
+def as_list(values, decimals):
+    """Rounded JSON-ready list with NaN as None."""
+    rounded = np.round(values, decimals)
+    result = rounded.tolist()
+    for index in np.flatnonzero(np.isnan(rounded)).tolist():
+        result[index] = None
+    return result
+
+
+def build_tracks(positions, gap=TRACK_GAP, max_speed=TRACK_MAX_SPEED, include_points=True):
+    """
+    Split cleaned positions into flights and describe each one: callsign,
+    time span, point count, distance flown and altitude range, plus per-point
+    columns (timestamp as epoch seconds, lat, lon, altitude, ground_speed,
+    heading, climb) when ``include_points``.
+    """
+    positions = drop_outliers(positions, max_speed, gap)
+    t, lat, lon, alt, callsign = (positions[name] for name in ('t', 'lat', 'lon', 'alt', 'callsign'))
+    starts = segment_starts(t, callsign, gap)
+    ends = np.append(starts[1:], len(t))
+
+    legs = leg_distances(lat, lon)
+    # The first point of each flight has no predecessor within the flight.
+    legs[starts] = 0.0
+    distance = np.add.reduceat(legs, starts) if len(starts) else np.empty(0)
+    if include_points:
+        speed, heading, climb = derive(t, lat, lon, alt, legs)
+        for column in (speed, heading, climb):
+            column[starts] = np.nan
+
+    tracks = []
+    for index, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        names = Counter(callsign[start:end].tolist())
+        names.pop('', None)
+        altitudes = alt[start:end]
+        altitudes = altitudes[~np.isnan(altitudes)]
+        track = {
+            'callsign': names.most_common(1)[0][0] if names else None,
+            'start': iso(t[start]),
+            'end': iso(t[end - 1]),
+            'points': end - start,
+            'distance_nm': round(float(distance[index]), 1),
+            'min_altitude': int(altitudes.min()) if len(altitudes) else None,
+            'max_altitude': int(altitudes.max()) if len(altitudes) else None,
+        }
+        if include_points:
+            track['columns'] = {
+                'timestamp': t[start:end].tolist(),
+                'lat': as_list(lat[start:end], 5),
+                'lon': as_list(lon[start:end], 5),
+                'altitude': as_list(alt[start:end], 0),
+                'ground_speed': as_list(speed[start:end], 1),
+                'heading': as_list(heading[start:end], 1),
+                'climb': as_list(climb[start:end], 0),
+            }
+        tracks.append(track)
+    return tracks
+
+
+def project_nm(lat, lon):
+    """
+    Local equirectangular projection to nautical miles, good enough for the
+    few hundred miles of one flight. Longitudes are unwrapped first so a
+    path crossing the antimeridian stays continuous.
+    """
+    lon = np.unwrap(lon, period=360)
+    scale = np.cos(np.radians(np.mean(lat))) if len(lat) else 1.0
+    return lon * 60 * scale, lat * 60
+
+
+def segment_distances(x, y, a, b):
+    """Distance from each point to the segment between points ``a`` and ``b``."""
+    dx, dy = x[b] - x[a], y[b] - y[a]
+    length = dx * dx + dy * dy
+    with np.errstate(invalid='ignore', divide='ignore'):
+        along = np.clip(((x - x[a]) * dx + (y - y[a]) * dy) / length, 0.0, 1.0)
+    along[length == 0] = 0.0
+    return np.hypot(x - (x[a] + along * dx), y - (y[a] + along * dy))
+
+
+def significance(x, y, floor=0.0):
+    """
+    Ramer-Douglas-Peucker run level by level: every open segment is split at
+    its farthest point in the same pass, so there are about log2(n) passes
+    over the whole array rather than one Python call per segment.
+
+    Returns each point's tolerance threshold: RDP with tolerance ``t`` keeps
+    exactly the points whose value is above ``t``. A point's value is its
+    distance from the segment it split, capped by the segment's own split
+    so the hierarchy stays monotonic. Endpoints are infinite; segments whose
+    farthest point is within ``floor`` are not split further.
+    """
+    n = len(x)
+    values = np.zeros(n)
+    if n == 0:
+        return values
+    values[[0, -1]] = np.inf
+    caps = np.full(n, np.inf)  # indexed by the first point of a segment
+    kept = np.array([0, n - 1]) if n > 1 else np.array([0])
+    points = np.arange(n)
+    while len(kept) > 1:
+        segment = np.minimum(np.searchsorted(kept, points, side='right') - 1, len(kept) - 2)
+        starts, ends = kept[segment], kept[segment + 1]
+        distances = segment_distances(x, y, starts, ends)
+        farthest = np.maximum.reduceat(distances, kept[:-1])
+        splits = (distances == farthest[segment]) & (distances > floor)
+        if not splits.any():
+            break
+        # The first farthest point of each segment that still needs splitting.
+        split_segments, first = np.unique(segment[splits], return_index=True)
+        split_points = np.flatnonzero(splits)[first]
+        values[split_points] = np.minimum(farthest[split_segments], caps[kept[split_segments]])
+        caps[kept[split_segments]] = values[split_points]
+        caps[split_points] = values[split_points]
+        kept = np.union1d(kept, split_points)
+    return values
+
+
+def simplify(lat, lon, tolerance=None, max_points=None):
+    """
+    Indexes of the points to keep when simplifying a path: those more than
+    ``tolerance`` nautical miles off the simplified line, and at most the
+    ``max_points`` most significant of them. Endpoints are always kept.
+    """
+    x, y = project_nm(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+    values = significance(x, y, floor=tolerance if max_points is None else 0.0)
+    keep = values > (tolerance or 0.0)
+    if max_points is not None and keep.sum() > max_points:
+        keep[:] = False
+        keep[np.argsort(-values, kind='stable')[:max_points]] = True
+    return np.flatnonzero(keep)
+
+
+def simplified_ids(queryset, tolerance=None, max_points=None):
+    """Ids of the rows of an ordered path queryset that survive ``simplify``."""
+    rows = queryset.filter(latitude__isnull=False, longitude__isnull=False).values_list(
+        'id', 'latitude', 'longitude'
+    )
+    if not rows:
+        return []
+    ids, lat, lon = zip(*rows)
+    return [ids[index] for index in simplify(lat, lon, tolerance, max_points).tolist()]
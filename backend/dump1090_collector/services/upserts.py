@@ -0,0 +1,74 @@
+from django.db import connection
+
+
+def least(left, right):
+    """SQL for the smaller of two possibly NULL values, ignoring NULL like Postgres' LEAST."""
+    if connection.vendor == 'postgresql':
+        return f"LEAST({left}, {right})"
+    return f"COALESCE(MIN({left}, {right}), {left}, {right})"
+
+
+def greatest(left, right):
+    if connection.vendor == 'postgresql':
+        return f"GREATEST({left}, {right})"
+    return f"COALESCE(MAX({left}, {right}), {left}, {right})"
+
+
+def upsert(model, unique_fields, values, updates):
+    """
+    Insert rows into ``model``'s table, given as parallel lists per field name
+    in ``values``; rows clashing on ``unique_fields`` get the ``updates`` SQL
+    (column -> expression over ``stored.<column>``, the current value, and
+    ``excluded.<column>``, the new one) instead. Lets the database merge
+    increments into summary rows without loading them first. Postgres takes
+    every row in one statement.
+    """
+    fields = [model._meta.get_field(name) for name in values]
+    if not fields or not values[fields[0].name]:
+        return
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    assignments = ', '.join(f"{quote(column)} = {expression}" for column, expression in updates.items())
+    conflict = ', '.join(quote(model._meta.get_field(name).column) for name in unique_fields)
+    postgres = connection.vendor == 'postgresql'
+    if postgres:
+        arrays = ', '.join(f"%s::{field.db_type(connection)}[]" for field in fields)
+        source = f"SELECT * FROM unnest({arrays})"
+    else:
+        source = f"VALUES ({', '.join(['%s'] * len(fields))})"
+    sql = (
+        f"INSERT INTO {quote(model._meta.db_table)} AS stored ({columns}) {source} "
+        f"ON CONFLICT ({conflict}) DO UPDATE SET {assignments}"
+    )
+    with connection.cursor() as cursor:
+        if postgres:
+            cursor.execute(sql, list(values.values()))
+        else:
+            # No unnest() outside Postgres; upsert row by row (tests only).
+            rows = zip(*[[field.get_db_prep_save(value, connection) for value in values[field.name]]
+                         for field in fields])
+            cursor.executemany(sql, list(rows))
+
+
+def update_column(model, field_name, ids, values):
+    """Set ``field_name`` to ``values[i]`` on the row with primary key ``ids[i]``; one statement on Postgres."""
+    if not ids:
+        return
+    field = model._meta.get_field(field_name)
+    if connection.vendor != 'postgresql':
+        by_value = {}
+        for pk, value in zip(ids, values):
+            by_value.setdefault(value, []).append(pk)
+        for value, pks in by_value.items():
+            model.objects.filter(pk__in=pks).update(**{field.attname: value})
+        return
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    pk = model._meta.pk
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET {quote(field.column)} = changes.value "
+            f"FROM unnest(%s::{pk.db_type(connection)}[], %s::{field.db_type(connection)}[]) AS changes (pk, value) "
+            f"WHERE {table}.{quote(pk.column)} = changes.pk",
+            [list(ids), list(values)],
+        )
@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from django.db import transaction
+
+from ..models import FlightData, Watermark
+
+
+@contextmanager
+def watermark_window(name, now, lag, max_span):
+    """
+    Claim the next range of FlightData timestamps for the incremental job
+    ``name``: from its watermark (the oldest position on the first run) up to
+    ``lag`` seconds before ``now``, at most ``max_span`` seconds of it. Yields
+    (start, end), or None when caught up, inside a transaction holding the
+    watermark row lock, and moves the watermark to ``end`` if the block
+    succeeds.
+    """
+    with transaction.atomic():
+        if not Watermark.objects.filter(name=name).exists():
+            oldest = FlightData.objects.filter(timestamp__isnull=False).order_by('timestamp')
+            oldest = oldest.values_list('timestamp', flat=True).first()
+            if oldest is None:
+                yield None
+                return
+            Watermark.objects.get_or_create(name=name, defaults={'position': oldest})
+        # Holding the watermark row lock keeps concurrent runs from reading the same rows twice.
+        watermark = Watermark.objects.select_for_update().get(name=name)
+        start = watermark.position
+        end = min(now - timedelta(seconds=lag), start + timedelta(seconds=max_span))
+        if start >= end:
+            yield None
+            return
+        yield start, end
+        watermark.position = end
+        watermark.save(update_fields=['position'])
+
+
+def watermark_position(name):
+    return Watermark.objects.filter(name=name).values_list('position', flat=True).first()
+
+
+def reset_watermark(name):
+    Watermark.objects.filter(name=name).delete()
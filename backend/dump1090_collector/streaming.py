@@ -0,0 +1,34 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+STREAM_CHUNK_SIZE = 2000
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def stream_rows(queryset, represent, fmt):
+    """
+    Read ``queryset`` from a server-side cursor (``.iterator()``) and yield
+    each row, converted by ``represent``, as an NDJSON line or as a piece of
+    a JSON array. Only one chunk of rows is held in memory however long the
+    result is. Plain lists of rows are streamed as they are.
+    """
+    encoder = DjangoJSONEncoder()
+    rows = queryset.iterator(chunk_size=STREAM_CHUNK_SIZE) if hasattr(queryset, 'iterator') else iter(queryset)
+    if fmt == 'ndjson':
+        for row in rows:
+            yield encoder.encode(represent(row)) + '\n'
+        return
+    separator = '['
+    for row in rows:
+        yield separator + encoder.encode(represent(row))
+        separator = ',\n'
+    yield '[]' if separator == '[' else ']'
+
+
+def streaming_response(queryset, represent, fmt):
+    response = StreamingHttpResponse(stream_rows(queryset, represent, fmt), content_type=STREAM_FORMATS[fmt])
+    response['Cache-Control'] = 'no-cache'
+    return response
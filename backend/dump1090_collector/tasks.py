@@ -1,78 +1,352 @@
 from celery import shared_task
+from celery.signals import task_revoked
 from django.conf import settings
-from django.core.cache import cache
 from contextlib import suppress
 from functools import partial
 from concurrent.futures import ThreadPoolExecutor
-import json
 import logging
-from typing import Optional, Dict, Any
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional, Dict, Any, Tuple
 
 from dump1090_collector.fetch_helper import (
     fetch_adsbdbAircraftData,
     fetch_adsbdbCallsignData,
     fetch_dump1090_data,
 )
-from dump1090_collector.services.store_data import store_data
+from dump1090_collector.models import FlightData
+from dump1090_collector.services.bulk_store import store_snapshot
+from dump1090_collector.services.identity_map import publish_identity_map_stats
+from dump1090_collector.services.enrichment_cache import enrichment_cache
+from dump1090_collector.services.delta import filter_changed, remember_states
+from dump1090_collector.services.live import update_live_picture
+from dump1090_collector.services.metrics import counted_queries, flush_metrics, inc, observe, stage
+from dump1090_collector.services.polling import POLL_SCHEDULER, acquire_poll, count, queue_depth, release_poll
+from dump1090_collector.services.receivers import default_receiver, merge_receivers, receiver_url
+from dump1090_collector.services.push import publish_delta
+from dump1090_collector.services.enrichment import (
+    backfill_aircraft,
+    backfill_routes,
+    claim_pending,
+    release_pending,
+)
+from dump1090_collector.services.archive import archive_closed_days
+from dump1090_collector.services.capture import capture_snapshot, prune_captures
+from dump1090_collector.services.partitions import apply_retention, ensure_partitions, is_partitioned
+from dump1090_collector.services.rollups import rollup_positions
+from dump1090_collector.services.coverage import aggregate_coverage
+from dump1090_collector.services.stats import aggregate_stats
 
 logger = logging.getLogger(__name__)
 
 POLLING_TIME = getattr(settings, 'DUMP1090_POLLING_TIME', 10)
-CACHE_TTL = getattr(settings, 'CACHE_TTL', 600)
 MAX_WORKERS = getattr(settings, 'DUMP1090_MAX_WORKERS', 4)
+# 'poll' fetches aircraft.json on the beat schedule; 'stream' leaves
+# ingestion to the stream_dump1090 command.
+INGEST_MODE = getattr(settings, 'DUMP1090_INGEST', 'poll')
+# History replays skip snapshots fetched within REPLAY_OVERLAP seconds of a
+# position that is already stored, so replaying over stored history does not
+# store it twice.
+REPLAY_OVERLAP = getattr(settings, 'DUMP1090_REPLAY_OVERLAP', POLLING_TIME / 2)
 
 
 def get_cached_data(key: str, fetch_fn: callable) -> Optional[Dict[str, Any]]:
     """Helper function to handle cache with automatic fetch fallback."""
-    cached_data = cache.get(key)
-    if cached_data:
-        try:
-            return json.loads(cached_data)
-        except json.JSONDecodeError as e:
-            logger.warning("Cache decode error for key %s: %s", key, e)
-    
-    fresh_data = fetch_fn(key)
-    if fresh_data:
-        cache.set(key, json.dumps(fresh_data), timeout=CACHE_TTL)
-    return fresh_data
-
-
-def process_flight(flight: Dict[str, Any]) -> None:
-    """Process individual flight data with proper error isolation."""
-    
-    if not isinstance(flight, dict):
-        logger.error("Received non-dictionary flight data: %s", flight)
-        return
+    return enrichment_cache.get_or_fetch(key, fetch_fn)
+
 
-    hex_code = flight.get('hex')
-    callsign = flight.get('flight')
+def get_cached_many(keys) -> Dict[str, Dict[str, Any]]:
+    """Fetch every cached adsbdb payload for ``keys``; only L1 misses go to the shared cache."""
+    return enrichment_cache.get_many(keys)
 
-    aircraft_data = get_cached_data(hex_code, fetch_adsbdbAircraftData) if hex_code else {}
-    callsign_data = get_cached_data(callsign, fetch_adsbdbCallsignData) if callsign else {}
 
-    store_data(flight, aircraft_data, callsign_data)
+def flight_keys(flight: Dict[str, Any]) -> Tuple[str, str]:
+    return (flight.get('hex') or '').strip(), (flight.get('flight') or '').strip()
+
+
+def queue_enrichment(hex_codes, callsigns) -> None:
+    """Hand lookups that missed the cache to the enrichment queue, once per key."""
+    hex_codes = claim_pending('aircraft', sorted(hex_codes))
+    callsigns = claim_pending('callsign', sorted(callsigns))
+    if hex_codes or callsigns:
+        enrich_pending_task.delay(hex_codes, callsigns)
 
 
 @shared_task(
     queue='dump1090_queue',
     autoretry_for=(Exception,),
-    retry_backoff=30,
-    retry_backoff_max=300,
+    retry_backoff=1,
+    retry_backoff_max=POLLING_TIME,
     max_retries=3
 )
-def poll_dump1090_task():
+def poll_dump1090_task(receiver=None):
+    """
+    Fetch one receiver's aircraft.json (the first in DUMP1090_RECEIVERS by
+    default) and store it with ingest_flights. Does nothing when
+    DUMP1090_INGEST is 'stream', i.e. the stream_dump1090 collector owns
+    ingestion, or when the receiver's previous poll is still running or (in
+    the adaptive scheduler) its interval has not passed. Beat sends polls
+    with an expiry, so retries that would land after the next tick are
+    dropped by the worker. With DUMP1090_CAPTURE on, the raw snapshot is
+    also appended to the receiver's capture segment for replay_captures.
+    """
+    if INGEST_MODE == 'stream':
+        return
+    receiver = receiver or default_receiver()
+    url = receiver_url(receiver)
+    if url is None:
+        logger.error("Unknown receiver %s", receiver)
+        return
+    token = acquire_poll(receiver)
+    if token is None:
+        return
+    started = time.time()
+    failed = False
     try:
-        response = fetch_dump1090_data()
+        with stage('fetch'):
+            response = fetch_dump1090_data(url)
+        if response:
+            capture_snapshot(receiver, response, fetched=started)
         aircraft_list = response.get('aircraft', []) 
         if not aircraft_list:
             logger.warning("No aircraft found in response")
             return 
-        
-        aircraft_list = response.get('aircraft', [])
-        
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            list(executor.map(process_flight, aircraft_list))
+
+        flights = []
+        for flight in aircraft_list:
+            if isinstance(flight, dict):
+                flights.append(flight)
+            else:
+                logger.error("Received non-dictionary flight data: %s", flight)
+
+        return ingest_flights(flights, receiver=receiver, now=response.get('now'))
 
     except Exception as e:
+        failed = True
         logger.critical("Polling task failed: %s", e, exc_info=True)
-        raise
\ No newline at end of file
+        raise
+    finally:
+        depth = queue_depth() if POLL_SCHEDULER == 'adaptive' else None
+        release_poll(receiver, token, started, failed=failed, depth=depth)
+        observe('dump1090_poll_seconds', time.time() - started, receiver=receiver)
+        flush_metrics(force=True)
+
+
+@task_revoked.connect
+def count_stale_polls(sender=None, request=None, expired=False, **kwargs):
+    """Count polls (and their retries) the worker dropped because they expired."""
+    if expired and getattr(sender, 'name', sender) == poll_dump1090_task.name:
+        args = getattr(request, 'args', None) or [None]
+        count(args[0] or default_receiver(), 'stale_dropped')
+
+
+def enrichment_entries(flights):
+    """
+    store_snapshot entries for ``flights`` with whatever enrichment is
+    cached, plus the hex codes and callsigns that missed the cache. Missed
+    and failed lookups are passed as None so the rows stay unlinked.
+    """
+    keys = [flight_keys(flight) for flight in flights]
+    cached = get_cached_many({key for pair in keys for key in pair if key})
+
+    entries = []
+    missing_hex_codes = set()
+    missing_callsigns = set()
+    for flight, (hex_code, callsign) in zip(flights, keys):
+        aircraft_data = cached.get(hex_code) if hex_code else {}
+        callsign_data = cached.get(callsign) if callsign else {}
+        if aircraft_data is None:
+            missing_hex_codes.add(hex_code)
+        elif not aircraft_data and hex_code:
+            # Cached transport error: leave the row unlinked until it expires.
+            aircraft_data = None
+        if callsign_data is None:
+            missing_callsigns.add(callsign)
+        elif not callsign_data and callsign:
+            callsign_data = None
+        entries.append((flight, aircraft_data, callsign_data))
+    return entries, missing_hex_codes, missing_callsigns
+
+
+def ingest_flights(flights, receiver=None, now=None):
+    """
+    Store every changed position straight away. Enrichment already in the
+    cache is applied inline; anything else is stored without its foreign
+    keys and queued for enrich_pending_task to look up and back-fill.
+    Shared by the poll task and the streaming collector. Polls pass their
+    ``receiver`` and its clock (``now``) so aircraft other receivers already
+    reported are merged away first. Returns counts of aircraft seen, rows
+    stored, unchanged rows suppressed and duplicates merged.
+    """
+    seen = len(flights)
+    merged = 0
+    with counted_queries():
+        if receiver is not None:
+            with stage('merge'):
+                flights, merged = merge_receivers(flights, receiver, now=now)
+        with stage('live'):
+            update_live_picture(flights)
+        with stage('delta'):
+            flights, suppressed, states = filter_changed(flights)
+
+        with stage('enrichment_cache'):
+            entries, missing_hex_codes, missing_callsigns = enrichment_entries(flights)
+
+        with stage('store'):
+            store_snapshot(entries)
+            remember_states(states)
+        with stage('publish'):
+            publish_delta(flights)
+        with stage('enqueue'):
+            queue_enrichment(missing_hex_codes, missing_callsigns)
+            publish_identity_map_stats()
+
+    observe('dump1090_aircraft_per_poll', seen)
+    inc('dump1090_positions_total', len(entries), outcome='stored')
+    inc('dump1090_positions_total', suppressed, outcome='suppressed')
+    inc('dump1090_positions_total', merged, outcome='merged')
+    flush_metrics()
+    logger.info("Stored %s of %s positions, suppressed %s unchanged, merged %s from other receivers",
+                len(entries), seen, suppressed, merged)
+    return {'aircraft': seen, 'stored': len(entries), 'suppressed': suppressed, 'merged': merged}
+
+
+def already_stored(moments, replayed):
+    """
+    The fetch times among ``moments`` with a position already stored within
+    REPLAY_OVERLAP seconds, not counting the fetch times in ``replayed``,
+    which the replay stored itself.
+    """
+    overlap = timedelta(seconds=REPLAY_OVERLAP)
+    stored = (
+        FlightData.objects
+        .filter(timestamp__gte=min(moments) - overlap, timestamp__lte=max(moments) + overlap)
+        .order_by('timestamp')
+        .values_list('timestamp', flat=True)
+        .distinct()
+    )
+    stored = [moment for moment in stored if moment not in replayed]
+    found = set()
+    for moment in moments:
+        index = bisect_left(stored, moment - overlap)
+        if index < len(stored) and stored[index] <= moment + overlap:
+            found.add(moment)
+    return found
+
+
+def replay_snapshots(records, states, replayed=None):
+    """
+    Store a batch of captured snapshots (see services.capture) as history
+    with one bulk store_snapshot. Positions are stamped with the time their
+    snapshot was fetched, merged across receivers and filtered for change
+    against ``states``, the replay's own delta state, which is updated in
+    place. Snapshots already stored (see REPLAY_OVERLAP) are skipped;
+    ``replayed`` holds the fetch times stored by earlier batches of the same
+    replay and is updated in place too. Cached enrichment is applied and the
+    rest queued as in ingest_flights; the live picture and push feed are
+    left alone. On PostgreSQL the positions are written with COPY.
+
+    Stats, coverage and rollups only count positions newer than their
+    watermarks, so replayed history is not counted until they are reset
+    (see the replay_captures command). Returns the counts and the earliest
+    timestamp stored.
+    """
+    replayed = set() if replayed is None else replayed
+    moments = [datetime.fromtimestamp(record['fetched'], tz=dt_timezone.utc) for record in records]
+    skip = already_stored(moments, replayed) if records else set()
+    flights = []
+    timestamps = []
+    seen = suppressed = merged = 0
+    for record, moment in zip(records, moments):
+        if moment in skip:
+            continue
+        snapshot = record['snapshot']
+        snapshot_flights = [flight for flight in snapshot.get('aircraft', []) if isinstance(flight, dict)]
+        seen += len(snapshot_flights)
+        snapshot_flights, snapshot_merged = merge_receivers(
+            snapshot_flights, record['receiver'], now=snapshot.get('now', record['fetched']))
+        snapshot_flights, snapshot_suppressed, updates = filter_changed(
+            snapshot_flights, now=record['fetched'], states=states)
+        states.update(updates)
+        merged += snapshot_merged
+        suppressed += snapshot_suppressed
+        flights += snapshot_flights
+        timestamps += [moment] * len(snapshot_flights)
+
+    entries, missing_hex_codes, missing_callsigns = enrichment_entries(flights)
+    store_snapshot(entries, timestamps=timestamps, copy=True)
+    queue_enrichment(missing_hex_codes, missing_callsigns)
+    if moments:
+        # Only fetch times within the overlap of the next batch can matter.
+        horizon = max(moments) - timedelta(seconds=2 * REPLAY_OVERLAP)
+        replayed.difference_update([moment for moment in replayed if moment < horizon])
+        replayed.update(timestamps)
+    return {'aircraft': seen, 'stored': len(entries), 'suppressed': suppressed, 'merged': merged,
+            'skipped': len(skip), 'earliest': min(timestamps, default=None)}
+
+
+@shared_task(
+    queue='enrichment_queue',
+    autoretry_for=(Exception,),
+    retry_backoff=30,
+    retry_backoff_max=300,
+    max_retries=3
+)
+def enrich_pending_task(hex_codes, callsigns):
+    """Look up queued hex codes and callsigns on adsbdb and back-fill their positions."""
+    try:
+        with stage('enrichment_lookup'), ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            aircraft_data = dict(zip(hex_codes, executor.map(
+                partial(get_cached_data, fetch_fn=fetch_adsbdbAircraftData), hex_codes
+            )))
+            callsign_data = dict(zip(callsigns, executor.map(
+                partial(get_cached_data, fetch_fn=fetch_adsbdbCallsignData), callsigns
+            )))
+
+        # Failed lookups come back empty; leave those rows alone so the next
+        # poll queues them again.
+        with stage('backfill'):
+            backfill_aircraft({key: data for key, data in aircraft_data.items() if data})
+            backfill_routes({key: data for key, data in callsign_data.items() if data})
+    finally:
+        flush_metrics(force=True)
+        release_pending('aircraft', hex_codes)
+        release_pending('callsign', callsigns)
+
+
+@shared_task(queue='maintenance_queue')
+def rollup_flightdata_task():
+    """Aggregate new raw positions into per-minute FlightDataRollup rows."""
+    return rollup_positions()
+
+
+@shared_task(queue='maintenance_queue')
+def aggregate_coverage_task():
+    """Bin positions stored since the last run into the receiver coverage tables."""
+    return aggregate_coverage() or 0
+
+
+@shared_task(queue='maintenance_queue')
+def aggregate_stats_task():
+    """Count positions stored since the last run into the hourly and per-callsign stats tables."""
+    return aggregate_stats() or 0
+
+
+@shared_task(queue='maintenance_queue')
+def maintain_flightdata_storage_task():
+    """
+    Create upcoming FlightData partitions (when the table is partitioned),
+    move closed days of positions to the archive (when enabled), then expire
+    positions, rollups and flight sessions older than their retention
+    periods and captured
+    snapshots older than DUMP1090_CAPTURE_RETENTION_DAYS.
+    """
+    created = ensure_partitions() if is_partitioned() else []
+    archived = archive_closed_days()
+    result = apply_retention()
+    result['created_partitions'] = created
+    result['archived_days'] = [(day.isoformat(), positions) for day, positions in archived]
+    result['pruned_captures'] = prune_captures()
+    logger.info("FlightData storage maintenance: %s", result)
+    return result
@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.test import SimpleTestCase
+from dump1090_collector.adsbdb_client import AdsbdbClient, RedisTokenBucket, TokenBucket
+from dump1090_collector.benchmarks.stub_adsbdb import StubAdsbdbServer
+
+
+class TokenBucketTestCase(SimpleTestCase):
+    def test_acquire_waits_for_refill(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(sleeps, [])
+        bucket.acquire()
+        self.assertEqual(sleeps, [0.5])
+
+    def test_zero_rate_disables_limit(self):
+        bucket = TokenBucket(rate=0, capacity=0, sleep=self.fail)
+        for _ in range(10):
+            bucket.acquire()
+
+
+class FakeScriptClient:
+    """Registers a script that answers with queued wait times, recording its calls."""
+
+    def __init__(self, waits):
+        self.waits = list(waits)
+        self.calls = []
+
+    def register_script(self, source):
+        def script(keys, args):
+            self.calls.append((keys, args))
+            return str(self.waits.pop(0)).encode()
+        return script
+
+
+class RedisTokenBucketTestCase(SimpleTestCase):
+    def test_acquire_sleeps_until_the_shared_bucket_grants_a_token(self):
+        client = FakeScriptClient([0.25, 0.1, 0])
+        sleeps = []
+        bucket = RedisTokenBucket(client, rate=4, capacity=8, key='bucket', sleep=sleeps.append)
+        bucket.acquire()
+        self.assertEqual(sleeps, [0.25, 0.1])
+        self.assertEqual(client.calls, [(['bucket'], [4, 8])] * 3)
+
+    def test_zero_rate_skips_redis(self):
+        client = FakeScriptClient([])
+        RedisTokenBucket(client, rate=0, capacity=0, sleep=self.fail).acquire()
+        self.assertEqual(client.calls, [])
+
+
+class AdsbdbClientTestCase(SimpleTestCase):
+    def test_fetch_aircraft_and_callsign(self):
+        with StubAdsbdbServer(5) as stub:
+            client = AdsbdbClient(base_url=stub.base_url, rate=0)
+            aircraft = client.aircraft('400001')
+            callsign = client.callsign('DLH101  ')
+        self.assertEqual(aircraft['response']['aircraft']['registration'], 'G-0001')
+        self.assertEqual(callsign['response']['flightroute']['callsign'], 'DLH101')
+
+    def test_unknown_aircraft_returns_response(self):
+        with StubAdsbdbServer(1) as stub:
+            client = AdsbdbClient(base_url=stub.base_url, rate=0)
+            self.assertEqual(client.aircraft('abcdef'), {'response': 'unknown aircraft'})
+
+    def test_concurrent_lookups_are_coalesced(self):
+        with StubAdsbdbServer(5, latency=0.2) as stub:
+            client = AdsbdbClient(base_url=stub.base_url, rate=0)
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(lambda _: client.aircraft('400002'), range(8)))
+            self.assertEqual(stub.requests, 1)
+        self.assertEqual(client.coalesced_requests, 7)
+        self.assertTrue(all(result == results[0] for result in results))
+
+    def test_in_flight_requests_are_capped(self):
+        with StubAdsbdbServer(20, latency=0.05) as stub:
+            client = AdsbdbClient(base_url=stub.base_url, max_in_flight=3, rate=0)
+            hexes = [f'{0x400000 + index:06x}' for index in range(20)]
+            with ThreadPoolExecutor(max_workers=10) as executor:
+                list(executor.map(client.aircraft, hexes))
+            self.assertEqual(stub.requests, 20)
+            self.assertLessEqual(stub.max_in_flight, 3)
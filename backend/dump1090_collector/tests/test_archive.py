@@ -0,0 +1,75 @@
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from dump1090_collector.models import Aircraft, FlightData, Watermark
+from dump1090_collector.services.archive import UNTIL_KEY, archive_closed_days, day_path, read_archive
+
+NOW = datetime(2025, 3, 11, 12, 0, tzinfo=timezone.utc)
+
+
+def position(when, lat=51.5, callsign='BAW1', aircraft=None):
+    return FlightData.objects.create(
+        flight_hex='4CA2D6', callsign_norm=callsign, latitude=lat, longitude=-1.0, valid_position=True,
+        altitude=30000, timestamp=when, aircraft=aircraft,
+    )
+
+
+class ArchiveTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch('dump1090_collector.services.archive.ARCHIVE_DIR', directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.delete(UNTIL_KEY)
+        self.addCleanup(cache.delete, UNTIL_KEY)
+        self.aircraft = Aircraft.objects.create(hex_id='4CA2D6')
+        self.old = [position(NOW - timedelta(days=10, minutes=minutes), lat=51 + minutes / 100, aircraft=self.aircraft)
+                    for minutes in (20, 10)]
+        self.older_day = position(NOW - timedelta(days=9), callsign=None)
+        self.recent = position(NOW - timedelta(hours=1), aircraft=self.aircraft)
+
+    def test_closed_days_move_to_files(self):
+        archived = archive_closed_days(now=NOW, after_days=7)
+        self.assertEqual([positions for _, positions in archived], [2, 1])
+        self.assertEqual(list(FlightData.objects.values_list('id', flat=True)), [self.recent.id])
+        self.assertTrue(os.path.exists(day_path((NOW - timedelta(days=10)).date())))
+        self.assertEqual(Watermark.objects.get(name='archive').position, datetime(2025, 3, 3, tzinfo=timezone.utc))
+
+        rows = read_archive().to_pylist()
+        self.assertEqual([row['id'] for row in rows], [self.old[0].id, self.old[1].id, self.older_day.id])
+        self.assertEqual((rows[0]['timestamp'], rows[0]['latitude'], rows[0]['aircraft_id'], rows[2]['callsign_norm']),
+                         (self.old[0].timestamp, 51.2, self.aircraft.id, None))
+        self.assertEqual(read_archive(callsign_norm='BAW1', columns=['id']).num_rows, 2)
+        self.assertEqual(archive_closed_days(now=NOW, after_days=7), [])
+
+    def test_days_not_yet_counted_by_stats_stay(self):
+        Watermark.objects.create(name='stats', position=NOW - timedelta(days=9, hours=6))
+        self.assertEqual(len(archive_closed_days(now=NOW, after_days=7)), 1)
+        self.assertTrue(FlightData.objects.filter(id=self.older_day.id).exists())
+
+    def test_late_positions_are_merged_into_the_day(self):
+        archive_closed_days(now=NOW, after_days=7)
+        late = position(NOW - timedelta(days=10, minutes=5))
+        archive_closed_days(now=NOW, after_days=7)
+        ids = read_archive(columns=['id'])['id'].to_pylist()
+        self.assertEqual(ids, [self.old[0].id, self.old[1].id, late.id, self.older_day.id])
+
+    def test_tracks_and_raw_paths_read_the_archive(self):
+        archive_closed_days(now=NOW, after_days=7)
+        start = (NOW - timedelta(days=11)).isoformat()
+        body = self.client.get(reverse('flightdata-tracks'), {'hex': '4ca2d6', 'start': start}).json()
+        self.assertEqual(sum(track['points'] for track in body['tracks']), 4)
+
+        url = reverse('flightdata-flight-path')
+        params = {'aircraft_id': self.aircraft.id, 'start': start, 'resolution': 'raw'}
+        columns = self.client.get(url, {**params, 'layout': 'columns'}).json()['results']['columns']
+        self.assertEqual(columns['id'], [self.old[0].id, self.old[1].id, self.recent.id])
+        rows = self.client.get(url, params).json()['results']
+        self.assertEqual([row['aircraft']['hex_id'] for row in rows], ['4CA2D6'] * 3)
+        recent_only = self.client.get(url, {**params, 'start': (NOW - timedelta(days=1)).isoformat()}).json()
+        self.assertEqual([row['id'] for row in recent_only['results']], [self.recent.id])
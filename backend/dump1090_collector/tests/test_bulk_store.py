@@ -0,0 +1,79 @@
+import math
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from dump1090_collector.benchmarks.traffic import generate_entries
+from dump1090_collector.models import Flight, FlightData, Aircraft, Airline, Airport
+from dump1090_collector.services.bulk_store import BULK_BATCH_SIZE, store_snapshot
+from dump1090_collector.services.store_data import store_data
+
+
+def extra_batches(model, rows):
+    """INSERTs beyond the first that bulk_create needs for ``rows`` rows on this backend."""
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    size = min(connection.ops.bulk_batch_size(fields, [None] * rows), BULK_BATCH_SIZE)
+    return math.ceil(rows / size) - 1
+
+
+class StoreSnapshotTestCase(TestCase):
+    def test_store_snapshot_creates_rows(self):
+        entries = generate_entries(20)
+        flight_data = store_snapshot(entries)
+
+        self.assertEqual(len(flight_data), 20)
+        self.assertEqual(FlightData.objects.count(), 20)
+        self.assertEqual(Aircraft.objects.count(), 20)
+        self.assertEqual(Airline.objects.count(), 10)
+        self.assertFalse(FlightData.objects.filter(aircraft__isnull=True).exists())
+        self.assertFalse(FlightData.objects.filter(flight__origin_airport__isnull=True).exists())
+
+    def test_store_snapshot_query_count_is_constant(self):
+        store_snapshot(generate_entries(10))
+        with CaptureQueriesContext(connection) as small:
+            store_snapshot(generate_entries(10, poll=1))
+        with CaptureQueriesContext(connection) as large:
+            store_snapshot(generate_entries(100, poll=1))
+        # Three of them find, open and extend the flight sessions; PostgreSQL
+        # also locks their hex ids. Backends with a bind parameter limit
+        # (SQLite) split the bulk inserts.
+        bound = 13 + (connection.vendor == 'postgresql')
+        self.assertLessEqual(len(small), bound + sum(extra_batches(model, 10) for model in (Aircraft, Flight, FlightData)))
+        self.assertLessEqual(len(large), bound + sum(extra_batches(model, 100) for model in (Aircraft, Flight, FlightData)))
+
+    def test_store_snapshot_reuses_existing_rows(self):
+        store_snapshot(generate_entries(5))
+        store_snapshot(generate_entries(5, poll=1))
+        self.assertEqual(FlightData.objects.count(), 10)
+        self.assertEqual(Aircraft.objects.count(), 5)
+        self.assertEqual(Airline.objects.count(), 5)
+
+    def test_store_snapshot_matches_store_data(self):
+        for entry in generate_entries(8):
+            store_data(*entry)
+        expected_airports = Airport.objects.count()
+        expected_airlines = Airline.objects.count()
+
+        store_snapshot(generate_entries(8, poll=1))
+        self.assertEqual(Airport.objects.count(), expected_airports)
+        self.assertEqual(Airline.objects.count(), expected_airlines)
+        self.assertEqual(Aircraft.objects.count(), 8)
+
+    def test_store_snapshot_updates_aircraft_enrichment(self):
+        Aircraft.objects.create(registration='G-0000', hex_id='400000', aircraft_type='Old Type')
+        store_snapshot(generate_entries(1))
+        aircraft = Aircraft.objects.get()
+        self.assertEqual(aircraft.aircraft_type, 'A320')
+
+    def test_store_snapshot_dedupes_airports_within_batch(self):
+        flight = {'hex': 'ABCDEF', 'flight': 'UAL123'}
+        callsign_data = {'response': {'flightroute': {
+            'airline': {'icao': 'UAL', 'iata': 'UA'},
+            'origin': {'iata_code': 'JFK', 'icao_code': 'KJFK'},
+            'destination': {'iata_code': 'JFK', 'icao_code': ''},
+        }}}
+        flight_data = store_snapshot([(flight, {}, callsign_data)])
+        self.assertEqual(Airport.objects.count(), 1)
+        self.assertEqual(flight_data[0].flight.origin_airport_id, flight_data[0].flight.destination_airport_id)
+
+    def test_store_snapshot_empty(self):
+        self.assertEqual(store_snapshot([]), [])
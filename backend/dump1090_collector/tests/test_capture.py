@@ -0,0 +1,132 @@
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from dump1090_collector.benchmarks.traffic import generate_entries, generate_snapshot
+from dump1090_collector.models import FlightData, FlightDataRollup, Watermark
+from dump1090_collector.services.bulk_store import store_snapshot
+from dump1090_collector.services.capture import capture_segments, capture_snapshot, prune_captures, read_captures
+from dump1090_collector.services.enrichment_cache import enrichment_cache
+from dump1090_collector.tasks import poll_dump1090_task
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# 2025-03-11T11:59:50Z, ten seconds before a segment boundary.
+START = 1741694390
+
+
+def temporary_directory(test):
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    return directory.name
+
+
+class CaptureTestCase(SimpleTestCase):
+    def setUp(self):
+        self.directory = temporary_directory(self)
+
+    def test_segments_rotate_and_merge_receivers_in_fetch_order(self):
+        for poll in range(10):
+            receiver = 'north' if poll % 2 else 'south'
+            capture_snapshot(receiver, generate_snapshot(3, poll=poll), fetched=START + poll * 2, directory=self.directory)
+        segments = capture_segments([self.directory])
+        self.assertEqual([(receiver, int(start)) for receiver, start, _ in segments],
+                         [('north', START - 3590), ('south', START - 3590), ('north', START + 10), ('south', START + 10)])
+        records = list(read_captures(segments))
+        self.assertEqual([record['fetched'] for record in records], [START + poll * 2 for poll in range(10)])
+        self.assertEqual(records[3]['snapshot'], generate_snapshot(3, poll=3))
+        self.assertEqual(len(list(read_captures(capture_segments([self.directory], receivers=['north'])))), 5)
+        self.assertEqual(len(list(read_captures(segments, start=START + 4, end=START + 10))), 3)
+
+    def test_truncated_segment_reads_whole_snapshots(self):
+        for poll in range(3):
+            capture_snapshot('north', generate_snapshot(3, poll=poll), fetched=START + poll, directory=self.directory)
+        (_, _, path), = capture_segments([self.directory])
+        with open(path, 'r+b') as segment:
+            segment.truncate(os.path.getsize(path) - 10)
+        with self.assertLogs('dump1090_collector.services.capture', 'WARNING'):
+            self.assertEqual(len(list(read_captures(capture_segments([self.directory])))), 2)
+
+    def test_old_segments_are_pruned(self):
+        capture_snapshot('north', generate_snapshot(1), fetched=START, directory=self.directory)
+        capture_snapshot('north', generate_snapshot(1), fetched=START + 86400, directory=self.directory)
+        with mock.patch('dump1090_collector.services.capture.CAPTURE_DIR', self.directory):
+            self.assertEqual(prune_captures(now=START + 2 * 86400, retention_days=1), 1)
+        self.assertEqual(len(capture_segments([self.directory])), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+class ReplayTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        enrichment_cache.clear_local()
+        self.directory = temporary_directory(self)
+
+    @mock.patch('dump1090_collector.tasks.fetch_dump1090_data', return_value=generate_snapshot(2))
+    def test_polls_are_captured(self, mock_fetch, mock_delay):
+        with mock.patch('dump1090_collector.services.capture.CAPTURE_DIR', self.directory):
+            poll_dump1090_task()
+            with mock.patch('dump1090_collector.services.capture.CAPTURE_ENABLED', True):
+                poll_dump1090_task()
+        record, = read_captures(capture_segments([self.directory]))
+        self.assertEqual((record['receiver'], record['snapshot']), ('default', generate_snapshot(2)))
+
+    def test_replay_stores_history_at_capture_time(self, mock_delay):
+        snapshots = [generate_snapshot(3, poll=poll) for poll in range(4)]
+        snapshots.append(snapshots[-1])
+        for poll, snapshot in enumerate(snapshots):
+            capture_snapshot('default', snapshot, fetched=START + poll * 2, directory=self.directory)
+        out = io.StringIO()
+        call_command('replay_captures', self.directory, '--batch', '2', stdout=out)
+        self.assertIn('15 aircraft, 12 stored, 3 unchanged', out.getvalue())
+        timestamps = FlightData.objects.order_by('timestamp').values_list('timestamp', flat=True)
+        self.assertEqual(timestamps[0], datetime.fromtimestamp(START, tz=timezone.utc))
+        self.assertEqual(timestamps[11], datetime.fromtimestamp(START + 6, tz=timezone.utc))
+        self.assertTrue(mock_delay.called)
+
+    def test_replay_skips_snapshots_already_stored(self, mock_delay):
+        for poll in range(4):
+            capture_snapshot('default', generate_snapshot(3, poll=poll), fetched=START + poll * 20, directory=self.directory)
+        call_command('replay_captures', self.directory, '--batch', '2', stdout=io.StringIO())
+        FlightData.objects.filter(timestamp__gte=datetime.fromtimestamp(START + 40, tz=timezone.utc)).delete()
+
+        out = io.StringIO()
+        call_command('replay_captures', self.directory, '--batch', '3', stdout=out)
+        self.assertIn('6 aircraft, 6 stored, 0 unchanged, 0 merged, 2 snapshots already stored', out.getvalue())
+        self.assertEqual(FlightData.objects.count(), 12)
+
+    def test_replay_behind_the_aggregates_resets_them(self, mock_delay):
+        capture_snapshot('default', generate_snapshot(3), fetched=START, directory=self.directory)
+        later = datetime.fromtimestamp(START + 3600, tz=timezone.utc)
+        Watermark.objects.create(name='stats', position=later)
+        FlightDataRollup.objects.create(bucket=later, flight_hex='400000', points=1)
+
+        err = io.StringIO()
+        call_command('replay_captures', self.directory, stdout=io.StringIO(), stderr=err)
+        self.assertIn('behind the stats, rollups watermarks', err.getvalue())
+
+        FlightData.objects.all().delete()
+        call_command('replay_captures', self.directory, '--reset-aggregates', stdout=io.StringIO())
+        self.assertFalse(Watermark.objects.filter(name='stats').exists())
+        self.assertFalse(FlightDataRollup.objects.exists())
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', "COPY requires PostgreSQL")
+    def test_copy_matches_bulk_create(self, mock_delay):
+        fields = [field.attname for field in FlightData._meta.concrete_fields if not field.primary_key]
+        entries = generate_entries(5)
+        entries[0][0]['flight'] = 'BAW\t1\\'
+        timestamps = [datetime.fromtimestamp(START, tz=timezone.utc)] * len(entries)
+        store_snapshot(entries, timestamps=timestamps)
+        created = list(FlightData.objects.order_by('id').values_list(*fields))
+        FlightData.objects.all().delete()
+        store_snapshot(entries, timestamps=timestamps, copy=True)
+        copied = list(FlightData.objects.order_by('id').values_list(*fields))
+        # Same rows apart from their flight, a new session since the first rows were deleted.
+        self.assertEqual([row[:-1] for row in copied], [row[:-1] for row in created])
+        self.assertEqual(FlightData.objects.filter(flight__isnull=True).count(), 0)
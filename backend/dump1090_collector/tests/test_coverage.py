@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from django.test import TestCase
+from django.urls import reverse
+from dump1090_collector.models import CoverageGridCell, CoveragePolarCell, CoverageSector, FlightData, Watermark
+from dump1090_collector.services.coverage import aggregate_coverage
+from dump1090_collector.services.spatial import grid_cell
+
+NOW = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+RECEIVER = (51.0, -1.0)
+
+
+def position(lat, lon=-1.0, altitude=30000, minutes_ago=10, valid=True):
+    return FlightData.objects.create(
+        flight_hex='4CA2D6', latitude=lat, longitude=lon, altitude=altitude, valid_position=valid,
+        timestamp=NOW - timedelta(minutes=minutes_ago),
+    )
+
+
+@mock.patch.multiple('dump1090_collector.services.coverage', RECEIVER_LAT=RECEIVER[0], RECEIVER_LON=RECEIVER[1])
+class CoverageAggregationTestCase(TestCase):
+    def test_positions_are_binned_by_bearing_range_and_grid(self):
+        position(51 + 12 / 60)                      # 12 nm north
+        position(51 + 3 / 60, altitude=2000)        # 3 nm north, low
+        position(51 - 22 / 60, minutes_ago=20)      # 22 nm south
+        position(51 + 4 / 60, valid=False)
+        position(60.0)                              # 540 nm out: a bad decode
+
+        self.assertEqual(aggregate_coverage(now=NOW), 4)
+
+        sectors = {row.bearing: row for row in CoverageSector.objects.all()}
+        self.assertEqual(sorted(sectors), [0, 180])
+        self.assertAlmostEqual(sectors[0].max_range_nm, 12, places=1)
+        self.assertAlmostEqual(sectors[180].max_range_nm, 22, places=1)
+        self.assertEqual(sectors[180].timestamp, NOW - timedelta(minutes=20))
+        polar = dict(((cell.bearing, cell.range_nm), (cell.positions, cell.min_altitude))
+                     for cell in CoveragePolarCell.objects.all())
+        self.assertEqual(polar, {(0, 0): (1, 2000), (0, 10): (1, 30000), (180, 20): (1, 30000)})
+        self.assertEqual(CoverageGridCell.objects.get(cell=grid_cell(60.0, -1.0)).positions, 1)
+        self.assertEqual(sum(CoverageGridCell.objects.values_list('positions', flat=True)), 4)
+
+    def test_runs_only_read_rows_past_the_watermark(self):
+        position(51 + 12 / 60)
+        aggregate_coverage(now=NOW)
+        self.assertIsNone(aggregate_coverage(now=NOW))
+        self.assertEqual(Watermark.objects.get(name='coverage').position, NOW - timedelta(minutes=2))
+
+        position(51 + 13 / 60, altitude=5000, minutes_ago=-5)
+        position(51 + 30 / 60, minutes_ago=30)  # arrived late, behind the watermark
+        self.assertEqual(aggregate_coverage(now=NOW + timedelta(minutes=10)), 1)
+        cell = CoveragePolarCell.objects.get(bearing=0, range_nm=10)
+        self.assertEqual((cell.positions, cell.min_altitude), (2, 5000))
+        self.assertAlmostEqual(CoverageSector.objects.get(bearing=0).max_range_nm, 13, places=1)
+
+    def test_without_a_receiver_position_only_the_grid_is_binned(self):
+        position(51.5)
+        with mock.patch('dump1090_collector.services.coverage.RECEIVER_LAT', None):
+            aggregate_coverage(now=NOW)
+        self.assertFalse(CoverageSector.objects.exists())
+        self.assertEqual(CoverageGridCell.objects.count(), 1)
+
+    def test_coverage_endpoint_returns_columns(self):
+        position(51 + 11 / 60)
+        aggregate_coverage(now=NOW)
+        body = self.client.get(reverse('coverage-list')).json()
+        self.assertEqual(body['receiver'], {'lat': 51.0, 'lon': -1.0})
+        self.assertEqual(body['sectors']['bearing'], [0])
+        self.assertEqual(body['polar']['range_nm'], [10])
+        self.assertEqual((body['grid']['lat'], body['grid']['lon']), ([51.1], [-1.0]))
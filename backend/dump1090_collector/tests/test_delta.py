@@ -0,0 +1,73 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from dump1090_collector.benchmarks.traffic import generate_snapshot
+from dump1090_collector.models import FlightData
+from dump1090_collector.services.delta import filter_changed, remember_states
+from dump1090_collector.services.enrichment_cache import enrichment_cache
+from dump1090_collector.tasks import poll_dump1090_task
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FilterChangedTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.flight = {'hex': 'abcdef', 'flight': 'UAL123', 'lat': 1.0, 'lon': 2.0,
+                       'altitude': 30000, 'track': 90, 'speed': 450, 'squawk': '1200', 'messages': 10}
+
+    def poll(self, flights, now):
+        changed, suppressed, states = filter_changed(flights, now=now, heartbeat=30)
+        remember_states(states)
+        return changed, suppressed
+
+    def test_unchanged_flight_is_suppressed(self):
+        self.assertEqual(self.poll([self.flight], now=0), ([self.flight], 0))
+        self.assertEqual(self.poll([dict(self.flight, messages=11)], now=2), ([], 1))
+
+    def test_moved_flight_is_kept(self):
+        self.poll([self.flight], now=0)
+        moved = dict(self.flight, lat=1.01, messages=12)
+        self.assertEqual(self.poll([moved], now=2), ([moved], 0))
+
+    def test_no_new_messages_is_suppressed(self):
+        self.poll([self.flight], now=0)
+        self.assertEqual(self.poll([dict(self.flight, lat=1.01)], now=2), ([], 1))
+
+    def test_moved_flight_without_message_count_is_kept(self):
+        flight = dict(self.flight)
+        del flight['messages']
+        self.poll([flight], now=0)
+        self.assertEqual(self.poll([dict(flight)], now=2), ([], 1))
+        moved = dict(flight, lat=1.01)
+        self.assertEqual(self.poll([moved], now=4), ([moved], 0))
+
+    def test_heartbeat_emits_unchanged_flight(self):
+        self.poll([self.flight], now=0)
+        self.assertEqual(self.poll([self.flight], now=20), ([], 1))
+        self.assertEqual(self.poll([self.flight], now=31), ([self.flight], 0))
+
+    def test_state_is_only_remembered_when_stored(self):
+        filter_changed([self.flight], now=0, heartbeat=30)
+        self.assertEqual(self.poll([self.flight], now=2), ([self.flight], 0))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+class PollDeltaTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        enrichment_cache.clear_local()
+
+    @mock.patch('dump1090_collector.tasks.fetch_dump1090_data')
+    def test_poll_reports_suppressed_rows(self, mock_fetch, mock_delay):
+        snapshot = generate_snapshot(4)
+        mock_fetch.return_value = snapshot
+        self.assertEqual(poll_dump1090_task(), {'aircraft': 4, 'stored': 4, 'suppressed': 0, 'merged': 0})
+
+        moved = generate_snapshot(4, poll=1)
+        moved['aircraft'][:2] = snapshot['aircraft'][:2]
+        mock_fetch.return_value = moved
+        self.assertEqual(poll_dump1090_task(), {'aircraft': 4, 'stored': 2, 'suppressed': 2, 'merged': 0})
+        self.assertEqual(FlightData.objects.count(), 6)
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from dump1090_collector.benchmarks.traffic import generate_enrichment, generate_snapshot
+from dump1090_collector.models import DailyCallsign, FlightData
+from dump1090_collector.services.enrichment_cache import enrichment_cache
+from dump1090_collector.services.identity_map import IDENTITY_MAPS
+from dump1090_collector.services.stats import aggregate_stats
+from dump1090_collector.tasks import enrich_pending_task, poll_dump1090_task
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def fake_aircraft_lookup(hex_id):
+    return generate_enrichment(int(hex_id, 16) - 0x400000)[0]
+
+
+def fake_callsign_lookup(callsign):
+    for index, flight in enumerate(generate_snapshot(3)['aircraft']):
+        if flight['flight'].strip() == callsign:
+            return generate_enrichment(index)[1]
+    return {}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch('dump1090_collector.tasks.fetch_adsbdbCallsignData', side_effect=fake_callsign_lookup)
+@mock.patch('dump1090_collector.tasks.fetch_adsbdbAircraftData', side_effect=fake_aircraft_lookup)
+@mock.patch('dump1090_collector.tasks.fetch_dump1090_data', return_value=generate_snapshot(3))
+class EnrichmentQueueTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        enrichment_cache.clear_local()
+
+    def tearDown(self):
+        for identity_map in IDENTITY_MAPS.values():
+            identity_map.clear()
+
+    @mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+    def test_cold_poll_stores_positions_without_remote_lookups(self, mock_delay, *mocks):
+        mock_fetch_dump1090, mock_fetch_aircraft, mock_fetch_callsign = mocks
+        poll_dump1090_task()
+
+        self.assertEqual(FlightData.objects.count(), 3)
+        self.assertFalse(FlightData.objects.filter(aircraft__isnull=False).exists())
+        mock_fetch_aircraft.assert_not_called()
+        mock_fetch_callsign.assert_not_called()
+        mock_delay.assert_called_once_with(['400000', '400001', '400002'], ['AFR102', 'BAW100', 'DLH101'])
+
+    @mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+    def test_pending_lookups_are_queued_once(self, mock_delay, mock_fetch_dump1090, *mocks):
+        poll_dump1090_task()
+        mock_fetch_dump1090.return_value = generate_snapshot(3, poll=1)
+        poll_dump1090_task()
+        self.assertEqual(mock_delay.call_count, 1)
+        self.assertEqual(FlightData.objects.count(), 6)
+
+    @mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+    def test_enrichment_backfills_recent_positions(self, mock_delay, *mocks):
+        poll_dump1090_task()
+        aggregate_stats(now=timezone.now() + timedelta(minutes=5))
+        hex_codes, callsigns = mock_delay.call_args.args
+        with self.captureOnCommitCallbacks(execute=True):
+            enrich_pending_task(hex_codes, callsigns)
+
+        self.assertFalse(FlightData.objects.filter(aircraft__isnull=True).exists())
+        self.assertFalse(FlightData.objects.filter(flight__airline__isnull=True).exists())
+        self.assertEqual(DailyCallsign.objects.filter(airline__isnull=False).count(), 3)
+        position = FlightData.objects.get(flight_hex='400001')
+        self.assertEqual(position.aircraft.registration, 'G-0001')
+        self.assertEqual(position.flight.airline.icao, 'DLH')
+
+        # Enrichment is now cached, so the next poll links rows inline.
+        poll_dump1090_task()
+        self.assertEqual(mock_delay.call_count, 1)
+        self.assertFalse(FlightData.objects.filter(aircraft__isnull=True).exists())
+
+    @mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+    def test_failed_lookups_are_retried_after_error_ttl(self, mock_delay, mock_fetch_dump1090, mock_fetch_aircraft, mock_fetch_callsign):
+        poll_dump1090_task()
+        mock_fetch_aircraft.side_effect = None
+        mock_fetch_aircraft.return_value = {}
+        enrich_pending_task(*mock_delay.call_args.args)
+
+        # The error is cached, so the next poll neither links nor requeues.
+        poll_dump1090_task()
+        self.assertEqual(mock_delay.call_count, 1)
+        self.assertFalse(FlightData.objects.filter(aircraft__isnull=False).exists())
+
+        cache.clear()
+        enrichment_cache.clear_local()
+        poll_dump1090_task()
+        self.assertEqual(mock_delay.call_count, 2)
@@ -0,0 +1,76 @@
+import random
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from dump1090_collector.services.enrichment_cache import (
+    ERROR,
+    HIT,
+    UNKNOWN,
+    EnrichmentCache,
+    LocalCache,
+    classify,
+    jittered,
+)
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+TTLS = {HIT: 600, UNKNOWN: 3600, ERROR: 60}
+
+
+class ClassifyTestCase(SimpleTestCase):
+    def test_classify(self):
+        self.assertEqual(classify({'response': {'aircraft': {}}}), HIT)
+        self.assertEqual(classify({'response': 'unknown aircraft'}), UNKNOWN)
+        self.assertEqual(classify({'response': 'unknown callsign'}), UNKNOWN)
+        self.assertEqual(classify({}), ERROR)
+        self.assertEqual(classify(None), ERROR)
+
+    def test_jittered_stays_within_bounds(self):
+        rng = random.Random(1)
+        values = {jittered(1000, jitter=0.1, rng=rng) for _ in range(200)}
+        self.assertTrue(all(900 <= value <= 1100 for value in values))
+        self.assertGreater(len(values), 1)
+
+
+class LocalCacheTestCase(SimpleTestCase):
+    def test_entries_expire(self):
+        now = [0.0]
+        local = LocalCache(max_size=10, clock=lambda: now[0])
+        local.set('a', {'x': 1}, ttl=5)
+        self.assertEqual(local.get('a'), {'x': 1})
+        now[0] = 6
+        self.assertNotIsInstance(local.get('a'), dict)
+        self.assertEqual((local.hits, local.misses), (1, 1))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class EnrichmentCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.enrichment_cache = EnrichmentCache(local=LocalCache(), ttls=TTLS)
+
+    @mock.patch('dump1090_collector.services.enrichment_cache.cache')
+    def test_ttl_depends_on_classification(self, mock_cache):
+        with mock.patch('dump1090_collector.services.enrichment_cache.jittered', side_effect=lambda ttl: ttl):
+            self.enrichment_cache.set('a', {'response': {'aircraft': {}}})
+            self.enrichment_cache.set('b', {'response': 'unknown aircraft'})
+            self.enrichment_cache.set('c', {})
+        timeouts = [call.kwargs['timeout'] for call in mock_cache.set.call_args_list]
+        self.assertEqual(timeouts, [600, 3600, 60])
+
+    def test_errors_are_not_refetched(self):
+        fetch = mock.Mock(return_value={})
+        self.assertEqual(self.enrichment_cache.get_or_fetch('abc', fetch), {})
+        self.assertEqual(self.enrichment_cache.get_or_fetch('abc', fetch), {})
+        fetch.assert_called_once_with('abc')
+
+    def test_l1_serves_without_shared_cache(self):
+        self.enrichment_cache.set('abc', {'response': 'unknown aircraft'})
+        with mock.patch('dump1090_collector.services.enrichment_cache.cache') as mock_cache:
+            self.assertEqual(self.enrichment_cache.get_many(['abc']), {'abc': {'response': 'unknown aircraft'}})
+            mock_cache.get_many.assert_not_called()
+
+    def test_l1_is_filled_from_shared_cache(self):
+        cache.set('abc', '{"response": "unknown callsign"}')
+        self.assertEqual(self.enrichment_cache.get('abc'), {'response': 'unknown callsign'})
+        cache.clear()
+        self.assertEqual(self.enrichment_cache.get('abc'), {'response': 'unknown callsign'})
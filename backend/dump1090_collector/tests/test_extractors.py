@@ -87,3 +87,10 @@ class ExtractorsTestCase(TestCase):
         self.assertEqual(extracted_data['messages_received'], 50)
         self.assertEqual(extracted_data['seen'], 10)
         self.assertIsInstance(extracted_data['timestamp'], timezone.datetime)
+
+    def test_extract_flight_data_normalizes_identifiers(self):
+        extracted_data = extract_flight_data({'hex': ' abc123 ', 'flight': 'ual123  '})
+        self.assertEqual(extracted_data['flight_hex'], 'ABC123')
+        self.assertEqual(extracted_data['flight_callsign'], 'ual123')
+        self.assertEqual(extracted_data['callsign_norm'], 'UAL123')
+        self.assertIsNone(extract_flight_data({'hex': 'abc123', 'flight': '        '})['callsign_norm'])
@@ -0,0 +1,118 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from dump1090_collector.benchmarks.feeds import generate_sbs_capture, sbs_line, serve_feed, SBS_EPOCH
+from dump1090_collector.models import FlightData
+from dump1090_collector.services.enrichment_cache import enrichment_cache
+from dump1090_collector.services.feed import AircraftTracker, BeastDecoder, RawDecoder, SbsDecoder, StreamCollector
+from dump1090_collector.services.identity_map import IDENTITY_MAPS
+from dump1090_collector.services.live import get_live_store
+from dump1090_collector.services.modes import crc_residual, decode
+from dump1090_collector.tasks import ingest_flights, poll_dump1090_task
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Example messages from "The 1090 Megahertz Riddle" (Junzi Sun).
+IDENTIFICATION = '8D4840D6202CC371C32CE0576098'
+POSITION_EVEN = '8D40621D58C382D690C8AC2863A7'
+POSITION_ODD = '8D40621D58C386435CC412692AD6'
+VELOCITY = '8D485020994409940838175B284F'
+
+
+def beast_frame(message_hex, timestamp=b'\x00\x00\x00\x00\x1a\x01', signal=b'\x80'):
+    body = timestamp + signal + bytes.fromhex(message_hex)
+    return b'\x1a3' + body.replace(b'\x1a', b'\x1a\x1a')
+
+
+class ModeSDecodeTestCase(TestCase):
+    def test_identification_velocity_and_position(self):
+        self.assertEqual(decode(bytes.fromhex(IDENTIFICATION)), {'hex': '4840d6', 'flight': 'KLM1023'})
+        self.assertEqual(
+            decode(bytes.fromhex(VELOCITY)), {'hex': '485020', 'speed': 159, 'track': 183, 'vert_rate': -832}
+        )
+        position = decode(bytes.fromhex(POSITION_EVEN))
+        self.assertEqual((position['altitude'], position['cpr'][0]), (38000, 0))
+
+    def test_corrupt_messages_are_dropped(self):
+        message = bytearray.fromhex(IDENTIFICATION)
+        self.assertEqual(crc_residual(message), 0)
+        message[5] ^= 0x04
+        self.assertIsNone(decode(bytes(message)))
+
+    def test_tracker_resolves_cpr_pair_and_ignores_unknown_address_parity_replies(self):
+        tracker = AircraftTracker()
+        tracker.apply(decode(bytes.fromhex(POSITION_ODD)), now=100.0)
+        tracker.apply(decode(bytes.fromhex(POSITION_EVEN)), now=102.0)
+        self.assertFalse(tracker.apply({'hex': 'abcdef', 'ap': True, 'altitude': 1000}, now=102.0))
+        [flight] = tracker.flush(now=102.5)
+        self.assertEqual(flight['hex'], '40621d')
+        self.assertAlmostEqual(flight['lat'], 52.2572, places=4)
+        self.assertAlmostEqual(flight['lon'], 3.9194, places=4)
+        self.assertEqual((flight['altitude'], flight['messages'], flight['validposition']), (38000, 2, 1))
+        self.assertEqual(tracker.flush(now=103.0), [])
+
+
+class FeedDecoderTestCase(TestCase):
+    def test_beast_frames_split_across_reads_with_escaped_bytes(self):
+        data = b'\x00garbage' + beast_frame(IDENTIFICATION) + beast_frame(VELOCITY)
+        decoder = BeastDecoder()
+        updates = []
+        for offset in range(0, len(data), 5):
+            updates.extend(decoder.feed(data[offset:offset + 5]))
+        self.assertEqual([u['hex'] for u in updates], ['4840d6', '485020'])
+
+    def test_raw_lines(self):
+        decoder = RawDecoder()
+        updates = decoder.feed(f'*{IDENTIFICATION};\n@0123456789AB{VELOCITY};\n*{POSITION_EVEN[:10]}'.encode())
+        self.assertEqual([u['hex'] for u in updates], ['4840d6', '485020'])
+        self.assertEqual(decoder.feed(f'{POSITION_EVEN[10:]};\n'.encode())[0]['altitude'], 38000)
+
+    def test_sbs_lines(self):
+        line = sbs_line(3, '4CA2D6', SBS_EPOCH, altitude=37000, lat='51.45', lon='-0.97')
+        decoder = SbsDecoder()
+        self.assertEqual(decoder.feed(line[:40].encode()), [])
+        self.assertEqual(
+            decoder.feed(line[40:].encode() + b'STA,,5,179,400AE7\r\n'),
+            [{'hex': '4ca2d6', 'altitude': 37000, 'lat': 51.45, 'lon': -0.97}],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StreamReplayTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        enrichment_cache.clear_local()
+        get_live_store().clear()
+
+    def tearDown(self):
+        for identity_map in IDENTITY_MAPS.values():
+            identity_map.clear()
+
+    @mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+    def test_replayed_sbs_capture_is_stored(self, mock_delay):
+        capture = generate_sbs_capture(5, seconds=3)
+        with serve_feed(capture, chunk_size=500) as (host, port):
+            collector = StreamCollector(ingest_flights, host, port, 'sbs', reconnect=False)
+            collector.run()
+        self.assertEqual(collector.tracker.messages, capture.count(b'\n'))
+        self.assertEqual(FlightData.objects.values('flight_hex').distinct().count(), 5)
+        row = FlightData.objects.get(flight_hex='400000')
+        self.assertEqual(row.flight_callsign, 'BAW100')
+        self.assertTrue(row.valid_position)
+        self.assertEqual(len(get_live_store().current()), 5)
+
+    def test_replayed_beast_capture_is_batched(self):
+        capture = b''.join(beast_frame(message) for message in (IDENTIFICATION, POSITION_ODD, POSITION_EVEN, VELOCITY))
+        batches = []
+        with serve_feed(capture, chunk_size=7) as (host, port):
+            StreamCollector(batches.append, host, port, 'beast', reconnect=False).run()
+        flights = {flight['hex']: flight for batch in batches for flight in batch}
+        self.assertEqual(set(flights), {'4840d6', '40621d', '485020'})
+        self.assertEqual(flights['4840d6']['flight'], 'KLM1023')
+        self.assertAlmostEqual(flights['40621d']['lat'], 52.2572, places=4)
+
+    @mock.patch('dump1090_collector.tasks.fetch_dump1090_data')
+    def test_poll_task_stands_down_in_stream_mode(self, mock_fetch):
+        with mock.patch('dump1090_collector.tasks.INGEST_MODE', 'stream'):
+            self.assertIsNone(poll_dump1090_task())
+        mock_fetch.assert_not_called()
@@ -0,0 +1,115 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from dump1090_collector.models import Aircraft, Airline, Airport, DailyCallsign, Flight, FlightData
+from dump1090_collector.services.flights import FLIGHT_LOCK_NAMESPACE, assign_flights, build_flights_from_history
+
+NOW = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def position(minutes, callsign='BAW1', altitude=None, lat=0.0, hex_code='4CA2D6'):
+    return FlightData(
+        flight_hex=hex_code, callsign_norm=callsign, altitude=altitude, latitude=lat, longitude=-1.0,
+        valid_position=lat != 0.0, timestamp=NOW + timedelta(minutes=minutes),
+    )
+
+
+def store(*positions, routes=None):
+    assign_flights(list(positions), routes)
+    FlightData.objects.bulk_create(positions)
+    return [item.flight for item in positions]
+
+
+class AssignFlightsTestCase(TestCase):
+    def test_positions_within_the_gap_extend_one_flight(self):
+        store(position(0, altitude=3000), position(1, altitude=5000))
+        store(position(10, altitude=4000), position(5, callsign=None, altitude=1000))
+        flight = Flight.objects.get()
+        self.assertEqual((flight.callsign, flight.points, flight.min_altitude, flight.max_altitude),
+                         ('BAW1', 4, 1000, 5000))
+        self.assertEqual((flight.first_seen, flight.last_seen), (NOW, NOW + timedelta(minutes=10)))
+        self.assertEqual(FlightData.objects.filter(flight=flight).count(), 4)
+
+    def test_gap_or_new_callsign_opens_a_flight(self):
+        first, = store(position(0))
+        later, other, renamed = store(position(45), position(46, hex_code='400ABC'), position(50, callsign='BAW2'))
+        self.assertEqual(len({first.pk, later.pk, other.pk, renamed.pk}), 4)
+        self.assertEqual(Flight.objects.filter(flight_hex='4CA2D6').count(), 3)
+
+    def test_route_and_range_are_recorded(self):
+        airline = Airline.objects.create(name='British Airways', icao='BAW', iata='BA')
+        airports = [Airport.objects.create(icao_code=code) for code in ('EGLL', 'KJFK')]
+        with mock.patch('dump1090_collector.services.flights.receiver', return_value=(51.0, -1.0)):
+            store(position(0, lat=51.5), position(1, lat=60.0))  # 540 nm out: a bad decode
+            store(position(2, lat=51.2), routes=[(airline.pk, airports[0].pk, airports[1].pk)])
+        flight = Flight.objects.get()
+        self.assertAlmostEqual(flight.max_range_nm, 30, delta=0.1)
+        self.assertEqual((flight.airline, flight.destination_airport), (airline, airports[1]))
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', "Advisory locks require PostgreSQL")
+    def test_hex_ids_stay_locked_until_commit(self):
+        store(position(0), position(1, hex_code='400ABC'))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid() "
+                "AND classid = %s AND objid::int IN (hashtext('4CA2D6'), hashtext('400ABC'))",
+                [FLIGHT_LOCK_NAMESPACE],
+            )
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+class BuildFlightsFromHistoryTestCase(TestCase):
+    def test_stored_positions_are_grouped_with_their_route(self):
+        airline = Airline.objects.create(name='British Airways', icao='BAW', iata='BA')
+        DailyCallsign.objects.create(day=NOW.date(), callsign='BAW1', positions=2, first_seen=NOW,
+                                     last_seen=NOW, airline=airline)
+        for minutes, callsign in ((0, 'BAW1'), (1, 'BAW1'), (90, 'BAW2')):
+            item = position(minutes, callsign=callsign)
+            item.save()
+
+        self.assertEqual(build_flights_from_history(batch_size=2), 3)
+        self.assertEqual(build_flights_from_history(), 0)
+        flights = list(Flight.objects.order_by('first_seen'))
+        self.assertEqual([(flight.callsign, flight.points, flight.airline) for flight in flights],
+                         [('BAW1', 2, airline), ('BAW2', 1, None)])
+
+    def test_legacy_positions_keep_their_route_and_group_by_aircraft(self):
+        airline = Airline.objects.create(name='British Airways', icao='BAW', iata='BA')
+        origin, destination = (Airport.objects.create(icao_code=code) for code in ('EGLL', 'KJFK'))
+        aircraft = Aircraft.objects.create(hex_id='4ca2d6')
+        for minutes in (0, 1):
+            item = position(minutes, hex_code=None)
+            item.aircraft = aircraft
+            if minutes:
+                item.airline, item.origin_airport, item.destination_airport = airline, origin, destination
+            item.save()
+
+        self.assertEqual(build_flights_from_history(), 2)
+        flight = Flight.objects.get()
+        self.assertEqual((flight.flight_hex, flight.points, flight.aircraft), ('4CA2D6', 2, aircraft))
+        self.assertEqual((flight.airline, flight.origin_airport, flight.destination_airport),
+                         (airline, origin, destination))
+
+
+class FlightViewSetTestCase(TestCase):
+    def setUp(self):
+        store(position(0), position(1), position(2, hex_code='400ABC', callsign='EZY3'))
+
+    def test_sessions_are_listed_and_filtered(self):
+        rows = self.client.get(reverse('flight-list'), {'callsign': ' baw1 '}).json()['results']
+        self.assertEqual([(row['flight_hex'], row['points']) for row in rows], [('4CA2D6', 2)])
+        self.assertEqual(len(self.client.get(reverse('flight-list'), {'hex': '400abc'}).json()['results']), 1)
+        with mock.patch('django.utils.timezone.now', return_value=NOW + timedelta(hours=2)):
+            self.assertEqual(self.client.get(reverse('flight-list'), {'active': 'true'}).json()['results'], [])
+
+    def test_positions_of_one_flight(self):
+        flight = Flight.objects.get(callsign='BAW1')
+        url = reverse('flight-positions', args=[flight.pk])
+        rows = self.client.get(url).json()['results']
+        self.assertEqual([row['timestamp'] for row in rows], ['2025-03-01T12:00:00Z', '2025-03-01T12:01:00Z'])
+        self.assertNotIn('flight', rows[0])
+        columns = self.client.get(url, {'layout': 'columns'}).json()['results']
+        self.assertEqual(columns['columns']['flight_id'], [flight.pk] * 2)
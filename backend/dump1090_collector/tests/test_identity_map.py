@@ -0,0 +1,91 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from dump1090_collector.benchmarks.traffic import generate_entries
+from dump1090_collector.models import Aircraft, Airport
+from dump1090_collector.services.bulk_store import store_snapshot
+from dump1090_collector.services.identity_map import (
+    IDENTITY_MAPS,
+    IdentityMap,
+    aircraft_map,
+    airport_map,
+    sync_identity_maps,
+)
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class IdentityMapTestCase(TestCase):
+    def test_lru_eviction_and_counters(self):
+        identity_map = IdentityMap('test', max_size=2)
+        identity_map.put('a', 1)
+        identity_map.put('b', 2)
+        self.assertEqual(identity_map.get('a'), (1, None))
+        identity_map.put('c', 3)
+
+        self.assertIsNone(identity_map.get('b'))
+        self.assertEqual(identity_map.get('c'), (3, None))
+        self.assertEqual(identity_map.stats(), {
+            'size': 2, 'max_size': 2, 'hits': 2, 'misses': 1, 'evictions': 1,
+        })
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StoreSnapshotIdentityMapTestCase(TestCase):
+    def setUp(self):
+        sync_identity_maps()
+        for identity_map in IDENTITY_MAPS.values():
+            identity_map.clear()
+
+    def tearDown(self):
+        for identity_map in IDENTITY_MAPS.values():
+            identity_map.clear()
+
+    def store(self, entries):
+        with self.captureOnCommitCallbacks(execute=True):
+            return store_snapshot(entries)
+
+    def test_warm_poll_only_extends_flights_and_inserts_positions(self):
+        self.store(generate_entries(20))
+        with CaptureQueriesContext(connection) as queries:
+            self.store(generate_entries(20, poll=1))
+        statements = [query['sql'] for query in queries
+                      if 'SAVEPOINT' not in query['sql'] and 'pg_advisory_xact_lock' not in query['sql']]
+        # Find the open flights, fold the poll into them, insert the positions.
+        self.assertEqual(len(statements), 3)
+        self.assertTrue(all('dump1090_collector_flight"' in sql for sql in statements[:2]))
+        self.assertIn('INSERT INTO "dump1090_collector_flightdata"', statements[2])
+
+    def test_changed_enrichment_updates_aircraft(self):
+        entries = generate_entries(1)
+        self.store(entries)
+        flight, aircraft_data, callsign_data = entries[0]
+        aircraft_data['response']['aircraft']['type'] = 'A321'
+        self.store([(flight, aircraft_data, callsign_data)])
+        self.assertEqual(Aircraft.objects.get().aircraft_type, 'A321')
+
+    def test_rolled_back_rows_are_not_remembered(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            store_snapshot(generate_entries(1))
+        self.assertEqual(len(aircraft_map), 0)
+
+    def test_api_write_invalidates_map(self):
+        self.store(generate_entries(3))
+        self.assertGreater(len(airport_map), 0)
+        airport = Airport.objects.first()
+
+        response = APIClient().patch(
+            f'/dump1090_collector/api/airports/{airport.pk}/', {'name': 'Renamed'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(airport_map), 0)
+
+        # A worker that filled its map before the write drops it on the next poll.
+        airport_map.put(('XXX', 'XXXX'), 1)
+        sync_identity_maps()
+        self.assertEqual(len(airport_map), 0)
+
+        airport_map.put(('XXX', 'XXXX'), 1)
+        sync_identity_maps()
+        self.assertEqual(len(airport_map), 1)
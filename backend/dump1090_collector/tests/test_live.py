@@ -0,0 +1,137 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from dump1090_collector.benchmarks.traffic import generate_snapshot
+from dump1090_collector.services.enrichment_cache import enrichment_cache
+from dump1090_collector.services.identity_map import IDENTITY_MAPS
+from dump1090_collector.services.live import RedisLiveStore, get_live_store, live_state, update_live_picture
+from dump1090_collector.tasks import poll_dump1090_task
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class FakeRedis:
+    """Just enough of redis-py for RedisLiveStore, returning bytes like the real client."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.zsets = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k.encode(): v.encode() for k, v in mapping.items()})
+
+    def expire(self, key, ttl):
+        pass
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        for member in [m for m, score in zset.items() if score <= high]:
+            del zset[member]
+
+    def zrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        return [m.encode() for m, score in sorted(zset.items(), key=lambda item: item[1]) if score >= low]
+
+    def hgetall(self, key):
+        return self.hashes.get(key, {})
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+def states(flights, now):
+    return [live_state(flight, now) for flight in flights]
+
+
+class RedisLiveStoreTestCase(TestCase):
+    def test_round_trip_with_age_and_bbox_filters(self):
+        store = RedisLiveStore(FakeRedis(), read_interval=0)
+        flights = generate_snapshot(3)['aircraft']
+        flights[0]['seen'] = 100
+        store.update(states(flights, now=1000.0), now=1000.0)
+
+        current = store.current(max_age=60, now=1000.0)
+        self.assertEqual([state['hex'] for state in current], ['400001', '400002'])
+        self.assertEqual(current[0]['flight'], flights[1]['flight'].strip())
+        self.assertIsInstance(current[0]['lat'], float)
+
+        lat, lon = flights[1]['lat'], flights[1]['lon']
+        bbox = [lon - 0.01, lat - 0.01, lon + 0.01, lat + 0.01]
+        self.assertEqual([state['hex'] for state in store.current(bbox=bbox, now=1000.0)], ['400001'])
+
+    def test_stale_aircraft_are_trimmed(self):
+        client = FakeRedis()
+        store = RedisLiveStore(client, ttl=300, read_interval=0)
+        store.update(states(generate_snapshot(2)['aircraft'], now=1000.0), now=1000.0)
+        store.update(states(generate_snapshot(3)['aircraft'][2:], now=1400.0), now=1400.0)
+        self.assertEqual(list(client.zsets[store.index_key]), ['400002'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LiveEndpointTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        enrichment_cache.clear_local()
+        get_live_store().clear()
+        self.url = reverse('live-list')
+
+    def tearDown(self):
+        for identity_map in IDENTITY_MAPS.values():
+            identity_map.clear()
+
+    @mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+    @mock.patch('dump1090_collector.tasks.fetch_dump1090_data', return_value=generate_snapshot(4))
+    def test_poll_refreshes_every_aircraft_including_unchanged_ones(self, mock_fetch, mock_delay):
+        poll_dump1090_task()
+        get_live_store().clear()
+        result = poll_dump1090_task()
+        self.assertEqual(result['suppressed'], 4)
+        self.assertEqual(len(get_live_store().current()), 4)
+
+    def test_endpoint_reads_without_the_database(self):
+        update_live_picture(generate_snapshot(5)['aircraft'])
+        with self.assertNumQueries(0):
+            body = self.client.get(self.url).json()
+        self.assertEqual(body['count'], 5)
+        self.assertEqual(body['aircraft'][0]['hex'], '400000')
+
+    def test_max_age_and_bbox(self):
+        flights = generate_snapshot(3)['aircraft']
+        flights[2]['seen'] = 120
+        update_live_picture(flights)
+        self.assertEqual(self.client.get(self.url, {'max_age': 60}).json()['count'], 2)
+        self.assertEqual(self.client.get(self.url, {'max_age': 600}).json()['count'], 3)
+        lat, lon = flights[0]['lat'], flights[0]['lon']
+        bbox = f'{lon - 0.01},{lat - 0.01},{lon + 0.01},{lat + 0.01}'
+        self.assertEqual([a['hex'] for a in self.client.get(self.url, {'bbox': bbox}).json()['aircraft']], ['400000'])
+
+    def test_bbox_across_the_antimeridian(self):
+        update_live_picture([
+            {'hex': '400000', 'lat': -17.7, 'lon': 178.4},
+            {'hex': '400001', 'lat': -16.5, 'lon': -179.9},
+            {'hex': '400002', 'lat': -17.0, 'lon': 170.0},
+        ])
+        body = self.client.get(self.url, {'bbox': '177,-19,-178,-15'}).json()
+        self.assertEqual(sorted(a['hex'] for a in body['aircraft']), ['400000', '400001'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'bbox': '1,2,3'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'max_age': 'old'}).status_code, 400)
+        for max_age in ('nan', 'inf', '-5', '0'):
+            self.assertEqual(self.client.get(self.url, {'max_age': max_age}).status_code, 400)
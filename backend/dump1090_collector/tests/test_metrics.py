@@ -0,0 +1,95 @@
+from unittest import mock
+import requests
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from dump1090_collector.benchmarks.traffic import generate_snapshot
+from dump1090_collector.fetch_helper import fetch_json
+from dump1090_collector.services import metrics
+from dump1090_collector.services.enrichment_cache import enrichment_cache
+from dump1090_collector.tasks import poll_dump1090_task
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def rendered():
+    return metrics.render_metrics(metrics.get_metrics_store().read())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MetricsTestCase(SimpleTestCase):
+    def setUp(self):
+        metrics._buffer.drain()
+        metrics.get_metrics_store().clear()
+
+    def test_histogram_buckets_are_cumulative(self):
+        for value in (0.002, 0.002, 0.3, 20):
+            metrics.observe('dump1090_stage_seconds', value, stage='store')
+        metrics.flush_metrics(force=True)
+        lines = rendered()
+        self.assertIn('dump1090_stage_seconds_bucket{stage="store",le="0.001"} 0', lines)
+        self.assertIn('dump1090_stage_seconds_bucket{stage="store",le="0.0025"} 2', lines)
+        self.assertIn('dump1090_stage_seconds_bucket{stage="store",le="0.5"} 3', lines)
+        self.assertIn('dump1090_stage_seconds_bucket{stage="store",le="+Inf"} 4', lines)
+        self.assertIn('dump1090_stage_seconds_count{stage="store"} 4', lines)
+        self.assertIn('# TYPE dump1090_stage_seconds histogram', lines)
+
+    def test_counters_sum_across_flushes(self):
+        metrics.inc('dump1090_positions_total', 3, outcome='stored')
+        metrics.flush_metrics(force=True)
+        metrics.inc('dump1090_positions_total', 2, outcome='stored')
+        metrics.flush_metrics(force=True)
+        self.assertIn('dump1090_positions_total{outcome="stored"} 5', rendered())
+
+    def test_flush_is_rate_limited(self):
+        metrics.flush_metrics(force=True)
+        metrics.inc('dump1090_positions_total', outcome='stored')
+        with mock.patch('dump1090_collector.services.metrics.METRICS_FLUSH_INTERVAL', 60):
+            metrics.flush_metrics()
+        self.assertEqual(rendered(), [])
+
+    @mock.patch('dump1090_collector.services.metrics.METRICS_ENABLED', False)
+    def test_disabled_records_nothing(self):
+        metrics.inc('dump1090_positions_total', outcome='stored')
+        metrics.observe('dump1090_stage_seconds', 0.1, stage='store')
+        with metrics.stage('store'):
+            pass
+        metrics.flush_metrics(force=True)
+        self.assertEqual(metrics.get_metrics_store().read(), {})
+
+    @mock.patch('dump1090_collector.fetch_helper.requests.get',
+                side_effect=requests.exceptions.ConnectionError("refused"))
+    def test_upstream_errors_are_counted(self, mock_get):
+        self.assertEqual(fetch_json('http://dump1090/data/aircraft.json', upstream='dump1090'), {})
+        metrics.flush_metrics(force=True)
+        lines = rendered()
+        self.assertIn('dump1090_upstream_requests_total{outcome="error",upstream="dump1090"} 1', lines)
+        self.assertIn('dump1090_upstream_seconds_count{upstream="dump1090"} 1', lines)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+@mock.patch('dump1090_collector.tasks.fetch_dump1090_data', return_value=generate_snapshot(3))
+class MetricsEndpointTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        enrichment_cache.clear_local()
+        metrics._buffer.drain()
+        metrics.get_metrics_store().clear()
+
+    def test_poll_is_exposed(self, mock_fetch, mock_delay):
+        poll_dump1090_task()
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        lines = response.content.decode().splitlines()
+        self.assertIn('dump1090_aircraft_per_poll_sum 3', lines)
+        self.assertIn('dump1090_positions_total{outcome="stored"} 3', lines)
+        self.assertIn('dump1090_poll_seconds_count{receiver="default"} 1', lines)
+        self.assertIn('dump1090_queries_per_poll_count 1', lines)
+        self.assertIn('dump1090_poll_ticks_total{receiver="default",outcome="polls"} 1', lines)
+        for stage in ('fetch', 'store', 'publish'):
+            self.assertIn(f'dump1090_stage_seconds_count{{stage="{stage}"}} 1', lines)
+
+    @mock.patch('dump1090_collector.views.METRICS_ENABLED', False)
+    def test_disabled_endpoint_is_not_found(self, mock_fetch, mock_delay):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase
+from django.urls import reverse
+from dump1090_collector.models import Aircraft, FlightData, FlightDataRollup
+from dump1090_collector.services.normalize import normalize_existing_rows
+
+BUCKET = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class NormalizeExistingRowsTestCase(TestCase):
+    def test_legacy_rows_are_normalized_once(self):
+        aircraft = Aircraft.objects.create(hex_id='4ca7b5')
+        legacy = FlightData.objects.create(flight_hex='4ca7b5', flight_callsign='ryr12ab ', aircraft=aircraft)
+        blank = FlightData.objects.create(flight_hex='4CA7B6', flight_callsign='        ')
+        FlightDataRollup.objects.create(flight_hex='4ca7b5', flight_callsign='ryr12ab', bucket=BUCKET)
+        FlightDataRollup.objects.create(flight_hex='4CA7B5', flight_callsign='RYR12AB', bucket=BUCKET)
+
+        result = normalize_existing_rows(batch_size=1)
+
+        legacy.refresh_from_db()
+        blank.refresh_from_db()
+        aircraft.refresh_from_db()
+        self.assertEqual((legacy.flight_hex, legacy.callsign_norm), ('4CA7B5', 'RYR12AB'))
+        self.assertEqual(legacy.flight_callsign, 'ryr12ab ')
+        self.assertIsNone(blank.callsign_norm)
+        self.assertEqual(aircraft.hex_id, '4CA7B5')
+        self.assertEqual(list(FlightDataRollup.objects.values_list('flight_hex', 'flight_callsign')), [('4CA7B5', 'RYR12AB')])
+        self.assertEqual(result['flightdata_hex'], 1)
+
+        self.assertEqual(normalize_existing_rows()['flightdata_hex'], 0)
+
+    def test_positions_without_hex_take_it_from_their_aircraft(self):
+        aircraft = Aircraft.objects.create(hex_id='4CA7B5')
+        legacy = FlightData.objects.create(flight_callsign='RYR12AB', aircraft=aircraft)
+        orphan = FlightData.objects.create(flight_callsign='RYR12AB')
+
+        self.assertEqual(normalize_existing_rows()['flightdata_hex_backfill'], 1)
+
+        legacy.refresh_from_db()
+        orphan.refresh_from_db()
+        self.assertEqual(legacy.flight_hex, '4CA7B5')
+        self.assertIsNone(orphan.flight_hex)
+        self.assertEqual(normalize_existing_rows()['flightdata_hex_backfill'], 0)
+
+    def test_backfilled_positions_are_found_by_hex(self):
+        aircraft = Aircraft.objects.create(hex_id='4ca7b5')
+        for minute in range(3):
+            FlightData.objects.create(
+                flight_callsign='RYR12AB', callsign_norm='RYR12AB', latitude=51 + minute / 60, longitude=-1.0,
+                valid_position=True, timestamp=BUCKET + timedelta(minutes=minute), aircraft=aircraft,
+            )
+
+        normalize_existing_rows()
+
+        self.assertEqual(set(FlightData.objects.values_list('flight_hex', flat=True)), {'4CA7B5'})
+        body = self.client.get(reverse('flightdata-tracks'), {'hex': '4ca7b5'}).json()
+        self.assertEqual([track['points'] for track in body['tracks']], [3])
+
+
+class NormalizedLookupTestCase(TestCase):
+    def setUp(self):
+        self.aircraft = Aircraft.objects.create(hex_id='4CA7B5')
+        FlightData.objects.create(flight_hex='4CA7B5', flight_callsign='RYR12AB', callsign_norm='RYR12AB', aircraft=self.aircraft)
+        FlightData.objects.create(flight_hex='4CA7B6', flight_callsign='EZY1', callsign_norm='EZY1')
+
+    def test_flight_path_matches_callsign_case_and_padding(self):
+        response = self.client.get(reverse('flightdata-flight-path'), {'flight_callsign': ' ryr12ab  '})
+        self.assertEqual([row['flight_hex'] for row in response.json()['results']], ['4CA7B5'])
+
+    def test_list_filters_use_normalized_values(self):
+        url = reverse('flightdata-list')
+        self.assertEqual(len(self.client.get(url, {'flight_callsign': 'ezy1 '}).json()['results']), 1)
+        self.assertEqual(len(self.client.get(url, {'aircraft__hex_id': '4ca7b5'}).json()['results']), 1)
+        self.assertEqual(len(self.client.get(url, {'flight_callsign': '   '}).json()['results']), 2)
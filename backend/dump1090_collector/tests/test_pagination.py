@@ -0,0 +1,107 @@
+import json
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from dump1090_collector.models import Aircraft, FlightData
+from dump1090_collector.pagination import KeysetPagination
+
+START = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.url = reverse('flightdata-list')
+        # Pairs of rows share a timestamp so pages split inside a tie.
+        self.ids = [
+            FlightData.objects.create(flight_hex='400000', timestamp=START + timedelta(seconds=i // 2)).id
+            for i in range(7)
+        ]
+        self.ids.append(FlightData.objects.create(flight_hex='400000', timestamp=None).id)
+
+    def walk(self, url, params):
+        seen, pages = [], 0
+        response = self.client.get(url, params)
+        while True:
+            body = response.json()
+            seen.extend(row['id'] for row in body['results'])
+            pages += 1
+            if not body['next']:
+                return seen, pages
+            response = self.client.get(body['next'])
+
+    def test_pages_cover_every_row_once_in_order(self):
+        seen, pages = self.walk(self.url, {'page_size': 3})
+        self.assertEqual(seen, self.ids)
+        self.assertEqual(pages, 3)
+
+    def test_rows_added_behind_the_cursor_do_not_shift_pages(self):
+        first = self.client.get(self.url, {'page_size': 3}).json()
+        FlightData.objects.create(flight_hex='400001', timestamp=START - timedelta(hours=1))
+        second = self.client.get(first['next']).json()
+        self.assertEqual([row['id'] for row in second['results']], self.ids[3:6])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-cursor'}).status_code, 404)
+
+    def test_other_list_endpoints_stay_unpaginated(self):
+        aircraft_ids = [Aircraft.objects.create(hex_id=f'40000{i}').id for i in range(5)]
+        body = self.client.get(reverse('aircraft-list'), {'page_size': 2}).json()
+        self.assertEqual([row['id'] for row in body], aircraft_ids)
+
+    def test_descending_ordering_pages_newest_first(self):
+        paginator = KeysetPagination()
+        queryset = FlightData.objects.order_by('-timestamp', '-id')
+        seen, cursor = [], None
+        while True:
+            request = Request(APIRequestFactory().get('/', {'page_size': 3, **({'cursor': cursor} if cursor else {})}))
+            seen.extend(row.id for row in paginator.paginate_queryset(queryset, request))
+            link = paginator.get_next_link()
+            if not link:
+                break
+            cursor = parse_qs(urlparse(link).query)['cursor'][0]
+        self.assertEqual(seen, [*reversed(self.ids[:7]), self.ids[7]])
+
+    def test_expression_ordering_is_rejected(self):
+        request = Request(APIRequestFactory().get('/'))
+        with self.assertRaises(ImproperlyConfigured):
+            KeysetPagination().paginate_queryset(FlightData.objects.order_by(F('timestamp').desc()), request)
+
+    def test_flight_path_is_paginated(self):
+        aircraft = Aircraft.objects.create(hex_id='400000')
+        FlightData.objects.filter(timestamp__isnull=False).update(aircraft=aircraft)
+        seen, pages = self.walk(reverse('flightdata-flight-path'), {'aircraft_id': aircraft.id, 'page_size': 4})
+        self.assertEqual(seen, self.ids[:7])
+        self.assertEqual(pages, 2)
+
+
+class FlightPathStreamingTestCase(TestCase):
+    def setUp(self):
+        self.url = reverse('flightdata-flight-path')
+        for i in range(3):
+            FlightData.objects.create(flight_hex='400000', callsign_norm='BAW100', timestamp=START + timedelta(seconds=i))
+
+    def stream(self, **params):
+        response = self.client.get(self.url, {'flight_callsign': 'BAW100', **params})
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_stream_has_one_position_per_line(self):
+        response, body = self.stream(stream='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['timestamp'] for row in rows], sorted(row['timestamp'] for row in rows))
+        self.assertEqual(len(rows), 3)
+
+    def test_json_stream_is_a_single_array(self):
+        _, body = self.stream(stream='json')
+        self.assertEqual(len(json.loads(body)), 3)
+        _, body = self.stream(stream='json', flight_callsign='NONE')
+        self.assertEqual(json.loads(body), [])
+
+    def test_unknown_stream_format_is_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'flight_callsign': 'BAW100', 'stream': 'csv'}).status_code, 400)
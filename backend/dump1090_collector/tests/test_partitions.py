@@ -0,0 +1,96 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from django.db import connection
+from django.test import TestCase
+from dump1090_collector.models import Aircraft, FlightData
+from dump1090_collector.services.partitions import (
+    apply_retention,
+    convert_to_partitioned,
+    ensure_partitions,
+    is_partitioned,
+    list_partitions,
+    partition_name,
+    partition_start,
+)
+
+NOW = datetime(2025, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+
+class PartitionNamingTestCase(TestCase):
+    def test_partition_start_is_utc_midnight_or_monday(self):
+        self.assertEqual(partition_start(NOW), datetime(2025, 3, 10, tzinfo=timezone.utc))
+        self.assertEqual(partition_start(NOW + timedelta(days=2), 'week'), datetime(2025, 3, 10, tzinfo=timezone.utc))
+        self.assertTrue(partition_name(partition_start(NOW)).endswith('_p20250310'))
+
+    def test_unpartitioned_tables_are_left_alone(self):
+        if connection.vendor != 'postgresql':
+            self.assertFalse(is_partitioned())
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "FlightData partitioning requires PostgreSQL")
+class PartitionTestCase(TestCase):
+    def test_conversion_keeps_rows_and_foreign_keys(self):
+        aircraft = Aircraft.objects.create(hex_id='400000')
+        old = FlightData.objects.create(flight_hex='400000', aircraft=aircraft, timestamp=NOW - timedelta(days=2))
+        FlightData.objects.create(flight_hex='400001', timestamp=None)
+
+        self.assertTrue(convert_to_partitioned(now=NOW))
+        self.assertTrue(is_partitioned())
+        self.assertFalse(convert_to_partitioned(now=NOW))
+
+        names = [name for name, _, _ in list_partitions()]
+        self.assertIn(partition_name(partition_start(NOW - timedelta(days=2))), names)
+        self.assertIn(partition_name(partition_start(NOW + timedelta(days=3))), names)
+        self.assertEqual(list(FlightData.objects.values_list('pk', flat=True)), [old.pk])
+        self.assertEqual(FlightData.objects.get(pk=old.pk).aircraft, aircraft)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT flight_hex FROM {FlightData._meta.db_table}_undated")
+            self.assertEqual(cursor.fetchall(), [('400001',)])
+            cursor.execute(
+                "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+                [FlightData._meta.db_table],
+            )
+            self.assertEqual(cursor.fetchone()[0], 'PRIMARY KEY (id, "timestamp")')
+
+        new = FlightData.objects.create(flight_hex='400002', timestamp=NOW)
+        self.assertGreater(new.pk, old.pk)
+
+    def test_retention_drops_whole_partitions(self):
+        FlightData.objects.create(flight_hex='400000', timestamp=NOW - timedelta(days=40))
+        recent = FlightData.objects.create(flight_hex='400000', timestamp=NOW - timedelta(hours=1))
+        convert_to_partitioned(now=NOW)
+
+        result = apply_retention(now=NOW, raw_days=30, rollup_days=None)
+
+        self.assertEqual(result['dropped_partitions'], [partition_name(partition_start(NOW - timedelta(days=40)))])
+        self.assertEqual(list(FlightData.objects.values_list('pk', flat=True)), [recent.pk])
+        self.assertEqual(ensure_partitions(now=NOW + timedelta(days=1)), [partition_name(partition_start(NOW + timedelta(days=4)))])
+
+    def test_retention_prunes_expired_rows_from_the_default_partition(self):
+        convert_to_partitioned(now=NOW)
+        FlightData.objects.create(flight_hex='400000', timestamp=NOW - timedelta(days=60))
+        recent = FlightData.objects.create(flight_hex='400002', timestamp=NOW - timedelta(hours=1))
+
+        result = apply_retention(now=NOW, raw_days=30, rollup_days=None)
+
+        self.assertEqual(result['deleted_rows'], 1)
+        self.assertEqual(set(FlightData.objects.values_list('pk', flat=True)), {recent.pk})
+
+    def test_new_partition_takes_over_rows_from_the_default_partition(self):
+        convert_to_partitioned(now=NOW)
+        early = FlightData.objects.create(flight_hex='400000', timestamp=NOW + timedelta(days=10))
+        start = partition_start(early.timestamp)
+        self.assertEqual(partition_count(f'{FlightData._meta.db_table}_default'), 1)
+
+        created = ensure_partitions(now=NOW + timedelta(days=10), ahead=1)
+
+        self.assertIn(partition_name(start), created)
+        self.assertEqual(partition_count(f'{FlightData._meta.db_table}_default'), 0)
+        self.assertEqual(partition_count(partition_name(start)), 1)
+        self.assertEqual(list(FlightData.objects.values_list('pk', flat=True)), [early.pk])
+
+
+def partition_count(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+        return cursor.fetchone()[0]
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from dump1090_collector.benchmarks.traffic import generate_snapshot
+from dump1090_collector.services.enrichment_cache import enrichment_cache
+from dump1090_collector.services.polling import LOCK_KEY, acquire_poll, adapt_interval, poll_metrics, release_poll
+from dump1090_collector.tasks import count_stale_polls, poll_dump1090_task
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch('dump1090_collector.services.polling.POLLING_TIME', 2)
+class PollSchedulerTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_one_poll_per_receiver_in_flight(self):
+        token = acquire_poll('north', now=0)
+        self.assertIsNone(acquire_poll('north', now=2))
+        self.assertIsNotNone(acquire_poll('south', now=2))
+        release_poll('north', token, started=0, finished=3)
+        self.assertIsNotNone(acquire_poll('north', now=4))
+        self.assertEqual(poll_metrics(['north'])['north']['skipped_busy'], 1)
+
+    def test_expired_lock_is_not_released_by_its_old_holder(self):
+        token = acquire_poll('north', now=0)
+        cache.set(LOCK_KEY.format('north'), 'newer')
+        release_poll('north', token, started=0, finished=1)
+        self.assertEqual(cache.get(LOCK_KEY.format('north')), 'newer')
+
+    @mock.patch('dump1090_collector.services.polling.POLL_SCHEDULER', 'adaptive')
+    def test_adaptive_interval_follows_latency(self):
+        release_poll('north', acquire_poll('north', now=0), started=0, finished=5)
+        metrics = poll_metrics(['north'])['north']
+        self.assertEqual((metrics['latency'], metrics['interval'], metrics['polls']), (5, 7.5, 1))
+        self.assertIsNone(acquire_poll('north', now=5))
+        self.assertIsNotNone(acquire_poll('north', now=7))
+        self.assertEqual(poll_metrics(['north'])['north']['skipped_not_due'], 1)
+
+    @mock.patch('dump1090_collector.services.polling.POLL_MAX_INTERVAL', 30)
+    def test_queue_depth_backs_off(self):
+        self.assertEqual(adapt_interval(2, latency=0.5, queue_depth=0), 2)
+        self.assertEqual(adapt_interval(4, latency=0.5, queue_depth=50), 8)
+        self.assertEqual(adapt_interval(20, latency=0.5, queue_depth=50), 30)
+
+    def test_lag_behind_schedule(self):
+        release_poll('north', acquire_poll('north', now=0), started=0, finished=1)
+        release_poll('north', acquire_poll('north', now=5), started=5, finished=6)
+        self.assertEqual(poll_metrics(['north'])['north']['lag'], 3)
+
+    def test_expired_polls_are_counted(self):
+        task = poll_dump1090_task
+        count_stale_polls(sender=task, request=SimpleNamespace(args=['north']), expired=True)
+        count_stale_polls(sender=task, request=SimpleNamespace(args=['north']), expired=False)
+        self.assertEqual(poll_metrics(['north'])['north']['stale_dropped'], 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+@mock.patch('dump1090_collector.tasks.fetch_dump1090_data', return_value=generate_snapshot(2))
+class PollTaskLockTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        enrichment_cache.clear_local()
+
+    def test_busy_receiver_is_skipped(self, mock_fetch, mock_delay):
+        cache.set(LOCK_KEY.format('default'), 'running')
+        self.assertIsNone(poll_dump1090_task())
+        mock_fetch.assert_not_called()
+
+    def test_failed_poll_releases_the_lock(self, mock_fetch, mock_delay):
+        mock_fetch.side_effect = ValueError("boom")
+        with self.assertRaises(ValueError):
+            poll_dump1090_task()
+        self.assertIsNone(cache.get(LOCK_KEY.format('default')))
+        mock_fetch.side_effect = None
+        self.assertEqual(poll_dump1090_task()['stored'], 2)
+
+        stats = self.client.get(reverse('poll_stats-list')).json()['default']
+        self.assertEqual((stats['polls'], stats['failed']), (1, 1))
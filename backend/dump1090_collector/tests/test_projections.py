@@ -0,0 +1,67 @@
+import json
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase
+from django.urls import reverse
+from dump1090_collector.models import Aircraft, Airline, Airport, Flight, FlightData
+
+START = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class FlightDataLayoutTestCase(TestCase):
+    def setUp(self):
+        self.airline = Airline.objects.create(name='British Airways', icao='BAW', iata='BA')
+        self.origin = Airport.objects.create(iata_code='LHR', icao_code='EGLL')
+        self.destination = Airport.objects.create(iata_code='JFK', icao_code='KJFK')
+        self.aircraft = [Aircraft.objects.create(hex_id=f'40000{i}') for i in range(3)]
+        self.flight = Flight.objects.create(
+            flight_hex='400000', callsign='BAW100', first_seen=START, last_seen=START + timedelta(seconds=5),
+            airline=self.airline, origin_airport=self.origin, destination_airport=self.destination,
+        )
+        for i in range(6):
+            FlightData.objects.create(
+                flight_hex=f'40000{i % 3}', callsign_norm='BAW100', timestamp=START + timedelta(seconds=i),
+                aircraft=self.aircraft[i % 3], flight=self.flight,
+            )
+        self.list_url = reverse('flightdata-list')
+        self.path_url = reverse('flightdata-flight-path')
+
+    def test_nested_rows_join_their_relations(self):
+        with self.assertNumQueries(1):
+            rows = self.client.get(self.list_url).json()['results']
+        self.assertEqual(rows[0]['aircraft']['hex_id'], '400000')
+        self.assertEqual(rows[0]['flight']['origin_airport']['iata_code'], 'LHR')
+
+    def test_flat_layout_lists_each_related_object_once(self):
+        # Rows, then one query per side table.
+        with self.assertNumQueries(3):
+            body = self.client.get(self.list_url, {'layout': 'flat'}).json()['results']
+        self.assertEqual(len(body['positions']), 6)
+        self.assertEqual(body['positions'][0]['aircraft_id'], self.aircraft[0].id)
+        self.assertNotIn('aircraft', body['positions'][0])
+        self.assertEqual(sorted(body['aircraft']), sorted(str(a.id) for a in self.aircraft))
+        self.assertEqual(list(body['flights']), [str(self.flight.id)])
+        self.assertEqual(body['flights'][str(self.flight.id)]['airline']['icao'], 'BAW')
+
+    def test_columns_layout_returns_parallel_arrays(self):
+        body = self.client.get(self.path_url, {'flight_callsign': 'BAW100', 'layout': 'columns'}).json()['results']
+        columns = body['columns']
+        self.assertEqual(len(columns['timestamp']), 6)
+        self.assertEqual(len(columns['latitude']), 6)
+        self.assertEqual(columns['aircraft_id'][:3], [a.id for a in self.aircraft])
+        self.assertEqual(body['flights'][str(self.flight.id)]['destination_airport']['id'], self.destination.id)
+
+    def test_flat_layout_pages_with_the_cursor(self):
+        first = self.client.get(self.path_url, {'flight_callsign': 'BAW100', 'layout': 'flat', 'page_size': 4}).json()
+        second = self.client.get(first['next']).json()
+        ids = [row['id'] for row in first['results']['positions'] + second['results']['positions']]
+        self.assertEqual(ids, list(FlightData.objects.order_by('timestamp').values_list('id', flat=True)))
+
+    def test_flat_stream(self):
+        response = self.client.get(self.path_url, {'flight_callsign': 'BAW100', 'layout': 'flat', 'stream': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['flight_id'] for row in rows], [self.flight.id] * 6)
+
+    def test_invalid_layouts_are_rejected(self):
+        self.assertEqual(self.client.get(self.list_url, {'layout': 'tree'}).status_code, 400)
+        response = self.client.get(self.path_url, {'flight_callsign': 'BAW100', 'layout': 'columns', 'stream': 'json'})
+        self.assertEqual(response.status_code, 400)
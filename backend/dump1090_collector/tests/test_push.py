@@ -0,0 +1,121 @@
+import asyncio
+import json
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from dump1090_collector.benchmarks.traffic import generate_snapshot
+from dump1090_collector.services.enrichment_cache import enrichment_cache
+from dump1090_collector.services.identity_map import IDENTITY_MAPS
+from dump1090_collector.services.live import get_live_store, live_state, update_live_picture
+from dump1090_collector.services.push import DeltaHub, LocalPubSub, cells, publish_delta
+from dump1090_collector.tasks import poll_dump1090_task
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+LONDON = (-1.0, 51.0, 0.5, 52.0)
+PARIS = (2.0, 48.5, 3.0, 49.5)
+FIJI = (177.0, -19.0, -178.0, -15.0)
+
+
+def delta(*positions, now=1000.0):
+    aircraft = [
+        live_state({'hex': f'{index:06x}', 'lat': lat, 'lon': lon}, now)
+        for index, (lat, lon) in enumerate(positions)
+    ]
+    return json.dumps({'now': now, 'aircraft': aircraft})
+
+
+def payload(event):
+    kind, data = event.strip().split('\n')
+    return kind.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+
+class DeltaHubTestCase(TestCase):
+    async def test_dispatch_filters_each_subscriber_by_bbox(self):
+        hub = DeltaHub(LocalPubSub())
+        london, also_london, paris, everywhere = (
+            hub.subscribe(LONDON), hub.subscribe(LONDON), hub.subscribe(PARIS), hub.subscribe()
+        )
+        hub.dispatch(delta((51.5, -0.4), (51.9, 0.4), (40.0, -3.7)))
+
+        event = london.queue.get_nowait()
+        kind, data = payload(event)
+        self.assertEqual(kind, 'delta')
+        self.assertEqual([a['hex'] for a in data['aircraft']], ['000000', '000001'])
+        # Identical viewports share one encoded event.
+        self.assertIs(also_london.queue.get_nowait(), event)
+        self.assertEqual(len(payload(everywhere.queue.get_nowait())[1]['aircraft']), 3)
+        self.assertTrue(paris.queue.empty())
+        for subscription in (london, also_london, paris, everywhere):
+            hub.unsubscribe(subscription)
+
+    async def test_bbox_across_the_antimeridian(self):
+        hub = DeltaHub(LocalPubSub())
+        fiji = hub.subscribe(FIJI)
+        hub.dispatch(delta((-17.7, 178.4), (-16.5, -179.9), (-17.0, 170.0), (51.5, -0.4)))
+        self.assertEqual([a['hex'] for a in payload(fiji.queue.get_nowait())[1]['aircraft']], ['000000', '000001'])
+        hub.unsubscribe(fiji)
+
+    def test_cells_are_clamped_to_the_globe(self):
+        self.assertEqual(len(cells((-2000.0, -2000.0, 2000.0, 2000.0))), 361 * 181)
+
+    async def test_slow_subscriber_loses_oldest_events(self):
+        hub = DeltaHub(LocalPubSub())
+        subscription = hub.subscribe(LONDON, queue_size=2)
+        for now in (1.0, 2.0, 3.0):
+            hub.dispatch(delta((51.5, -0.4), now=now))
+        self.assertEqual(subscription.dropped, 1)
+        self.assertEqual([payload(subscription.queue.get_nowait())[1]['now'] for _ in range(2)], [2.0, 3.0])
+        hub.unsubscribe(subscription)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    async def test_published_deltas_reach_subscribers(self):
+        hub = DeltaHub()
+        subscription = hub.subscribe(LONDON)
+        await asyncio.sleep(0)
+        receivers = await asyncio.to_thread(publish_delta, [{'hex': 'abc123 ', 'lat': 51.5, 'lon': -0.4}], 1000.0)
+        self.assertEqual(receivers, 1)
+        kind, data = payload(await asyncio.wait_for(subscription.queue.get(), 1))
+        self.assertEqual(data['aircraft'][0]['hex'], 'ABC123')
+        hub.unsubscribe(subscription)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LiveStreamTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        enrichment_cache.clear_local()
+        get_live_store().clear()
+        self.url = reverse('live-stream')
+
+    def tearDown(self):
+        for identity_map in IDENTITY_MAPS.values():
+            identity_map.clear()
+
+    @mock.patch('dump1090_collector.tasks.publish_delta')
+    @mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+    @mock.patch('dump1090_collector.tasks.fetch_dump1090_data', return_value=generate_snapshot(4))
+    def test_poll_publishes_only_changed_aircraft(self, mock_fetch, mock_delay, mock_publish):
+        poll_dump1090_task()
+        poll_dump1090_task()
+        self.assertEqual([len(call.args[0]) for call in mock_publish.call_args_list], [4, 0])
+
+    async def test_stream_sends_snapshot_then_deltas_inside_bbox(self):
+        update_live_picture([{'hex': 'aaa111', 'lat': 51.5, 'lon': -0.4}, {'hex': 'bbb222', 'lat': 48.9, 'lon': 2.4}])
+        response = await self.async_client.get(self.url, {'bbox': ','.join(map(str, LONDON))})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = response.streaming_content
+
+        kind, data = payload((await anext(events)).decode())
+        self.assertEqual((kind, [a['hex'] for a in data['aircraft']]), ('snapshot', ['AAA111']))
+
+        await asyncio.to_thread(publish_delta, [{'hex': 'ccc333', 'lat': 48.8, 'lon': 2.3}, {'hex': 'ddd444', 'lat': 51.6, 'lon': 0.1}])
+        kind, data = payload((await asyncio.wait_for(anext(events), 1)).decode())
+        self.assertEqual((kind, [a['hex'] for a in data['aircraft']]), ('delta', ['DDD444']))
+        await events.aclose()
+
+    async def test_invalid_bbox(self):
+        for bbox in ('1,2,3', '-1e5,-1e5,1e5,1e5', '-1,51,0.5,95', 'nan,51,0.5,52', '-1,52,0.5,51'):
+            response = await self.async_client.get(self.url, {'bbox': bbox})
+            self.assertEqual(response.status_code, 400, bbox)
@@ -0,0 +1,74 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from dump1090_collector.benchmarks.traffic import generate_snapshot
+from dump1090_collector.models import FlightData
+from dump1090_collector.services.enrichment_cache import enrichment_cache
+from dump1090_collector.services.receivers import merge_receivers
+from dump1090_collector.tasks import poll_dump1090_task
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+RECEIVERS = {'north': 'http://north:8080', 'south': 'http://south:8080', 'east': 'http://east:8080'}
+
+
+def heard_by(url, poll=0):
+    """Each receiver hears two of the three aircraft; every aircraft is heard twice."""
+    snapshot = generate_snapshot(3, poll=poll)
+    skip = list(RECEIVERS.values()).index(url)
+    snapshot['aircraft'] = [flight for index, flight in enumerate(snapshot['aircraft']) if index != skip]
+    return snapshot
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch('dump1090_collector.services.receivers.RECEIVERS', RECEIVERS)
+class MergeReceiversTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.flights = [{'hex': 'abcdef', 'seen': 0}, {'hex': '123456', 'seen': 0}]
+
+    def test_first_receiver_in_a_window_wins(self):
+        self.assertEqual(merge_receivers(self.flights, 'north', now=100, window=2), (self.flights, 0))
+        self.assertEqual(merge_receivers(self.flights[:1], 'south', now=101, window=2), ([], 1))
+        self.assertEqual(merge_receivers(self.flights[:1], 'south', now=102, window=2), (self.flights[:1], 0))
+
+    def test_window_follows_observation_time(self):
+        merge_receivers(self.flights[:1], 'north', now=100, window=2)
+        late = dict(self.flights[0], seen=3)
+        self.assertEqual(merge_receivers([late], 'south', now=103, window=2), ([], 1))
+
+    def test_single_receiver_is_not_merged(self):
+        with mock.patch('dump1090_collector.services.receivers.RECEIVERS', {'default': 'http://dump1090:8080'}):
+            merge_receivers(self.flights, 'default', now=100)
+            self.assertEqual(merge_receivers(self.flights, 'default', now=100), (self.flights, 0))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch('dump1090_collector.services.receivers.RECEIVERS', RECEIVERS)
+@mock.patch('dump1090_collector.tasks.enrich_pending_task.delay')
+@mock.patch('dump1090_collector.tasks.fetch_dump1090_data', side_effect=heard_by)
+class MultiReceiverPollTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        enrichment_cache.clear_local()
+
+    def test_overlapping_receivers_store_each_aircraft_once(self, mock_fetch, mock_delay):
+        results = [poll_dump1090_task(receiver) for receiver in RECEIVERS]
+        self.assertEqual([result['merged'] for result in results], [0, 1, 2])
+        self.assertEqual(sorted(FlightData.objects.values_list('flight_hex', flat=True)),
+                         ['400000', '400001', '400002'])
+        self.assertEqual([call.args[0] for call in mock_fetch.call_args_list], list(RECEIVERS.values()))
+        # One enrichment queue entry per aircraft, whichever receiver heard it.
+        queued = [key for call in mock_delay.call_args_list for key in call.args[0]]
+        self.assertEqual(sorted(queued), ['400000', '400001', '400002'])
+
+    def test_next_window_is_stored_again(self, mock_fetch, mock_delay):
+        for receiver in RECEIVERS:
+            poll_dump1090_task(receiver)
+        mock_fetch.side_effect = lambda url: heard_by(url, poll=1)
+        for receiver in RECEIVERS:
+            poll_dump1090_task(receiver)
+        self.assertEqual(FlightData.objects.count(), 6)
+
+    def test_unknown_receiver_is_not_polled(self, mock_fetch, mock_delay):
+        self.assertIsNone(poll_dump1090_task('west'))
+        mock_fetch.assert_not_called()
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase
+from django.urls import reverse
+from dump1090_collector.models import Aircraft, Flight, FlightData, FlightDataRollup
+from dump1090_collector.services.partitions import apply_retention
+from dump1090_collector.services.rollups import mean_track, rollup_positions
+
+NOW = datetime(2025, 3, 1, 12, 0, 30, tzinfo=timezone.utc)
+
+
+def position(seconds_ago, hex_code='400000', **fields):
+    defaults = {
+        'flight_hex': hex_code,
+        'flight_callsign': 'BAW100  ',
+        'callsign_norm': 'BAW100',
+        'latitude': 51.0,
+        'longitude': -1.0,
+        'altitude': 30000,
+        'track': 90,
+        'speed_in_knots': 400,
+        'timestamp': NOW - timedelta(seconds=seconds_ago),
+    }
+    defaults.update(fields)
+    return FlightData.objects.create(**defaults)
+
+
+class RollupTestCase(TestCase):
+    def test_positions_are_averaged_per_hex_and_minute(self):
+        aircraft = Aircraft.objects.create(hex_id='400000')
+        position(75, latitude=51.0, altitude=30000, track=350, aircraft=aircraft)
+        position(65, latitude=51.2, altitude=31000, track=10, aircraft=aircraft)
+        position(70, hex_code='400001', latitude=0, longitude=0)  # no position yet
+        position(20)  # current minute, not complete
+
+        self.assertEqual(rollup_positions(now=NOW), 1)
+        rollup = FlightDataRollup.objects.get()
+        self.assertEqual(rollup.bucket, datetime(2025, 3, 1, 11, 59, tzinfo=timezone.utc))
+        self.assertAlmostEqual(rollup.latitude, 51.1)
+        self.assertEqual(rollup.altitude, 30500)
+        self.assertEqual(rollup.max_altitude, 31000)
+        self.assertEqual(rollup.track, 0)
+        self.assertEqual(rollup.points, 2)
+        self.assertEqual(rollup.flight_callsign, 'BAW100')
+        self.assertEqual(rollup.aircraft, aircraft)
+
+    def test_rerun_updates_recent_buckets_in_place(self):
+        position(75, altitude=30000)
+        rollup_positions(now=NOW)
+        position(62, altitude=32000)  # arrived late
+        position(20)
+        rollup_positions(now=NOW + timedelta(seconds=60))
+
+        rollup = FlightDataRollup.objects.get(bucket=datetime(2025, 3, 1, 11, 59, tzinfo=timezone.utc))
+        self.assertEqual(rollup.points, 2)
+        self.assertEqual(rollup.max_altitude, 32000)
+        self.assertEqual(FlightDataRollup.objects.count(), 2)
+
+    def test_mean_track_wraps_around_north(self):
+        self.assertIsNone(mean_track(None, None))
+        self.assertEqual(mean_track(0.0, -1.0), 180)
+        self.assertEqual(mean_track(-0.5, 0.5), 315)
+
+
+class RetentionTestCase(TestCase):
+    def test_old_rows_and_rollups_are_deleted(self):
+        position(40 * 86400)
+        recent = position(60)
+        FlightDataRollup.objects.create(bucket=NOW - timedelta(days=400), flight_hex='400000')
+        kept = FlightDataRollup.objects.create(bucket=NOW - timedelta(days=40), flight_hex='400000')
+        Flight.objects.create(flight_hex='400000', first_seen=NOW - timedelta(days=401),
+                              last_seen=NOW - timedelta(days=400))
+        flight = Flight.objects.create(flight_hex='400000', first_seen=NOW - timedelta(days=41),
+                                       last_seen=NOW - timedelta(days=40))
+
+        result = apply_retention(now=NOW, raw_days=30, rollup_days=365)
+
+        self.assertEqual(result['deleted_rows'], 1)
+        self.assertEqual(result['deleted_rollups'], 1)
+        self.assertEqual(result['deleted_flights'], 1)
+        self.assertEqual(list(FlightData.objects.all()), [recent])
+        self.assertEqual(list(FlightDataRollup.objects.all()), [kept])
+        self.assertEqual(list(Flight.objects.all()), [flight])
+
+
+class FlightPathResolutionTestCase(TestCase):
+    def setUp(self):
+        self.url = reverse('flightdata-flight-path')
+        self.aircraft = Aircraft.objects.create(hex_id='400000')
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.start = now - timedelta(days=2)
+        for minutes in (10, 20):
+            FlightData.objects.create(flight_hex='400000', aircraft=self.aircraft, timestamp=now - timedelta(minutes=minutes))
+            FlightDataRollup.objects.create(flight_hex='400000', aircraft=self.aircraft, bucket=now - timedelta(minutes=minutes), points=3)
+        FlightData.objects.create(flight_hex='400000', aircraft=self.aircraft, timestamp=now - timedelta(days=3))
+
+    def test_short_ranges_return_raw_positions(self):
+        response = self.client.get(self.url, {'aircraft_id': self.aircraft.id})
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertNotIn('points', response.json()['results'][0])
+
+    def test_long_ranges_use_rollups(self):
+        response = self.client.get(self.url, {'aircraft_id': self.aircraft.id, 'start': self.start.isoformat()})
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(response.json()['results'][0]['points'], 3)
+
+    def test_resolution_can_be_forced(self):
+        response = self.client.get(self.url, {
+            'aircraft_id': self.aircraft.id, 'start': self.start.isoformat(), 'resolution': 'raw',
+        })
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertIn('messages_received', response.json()['results'][0])
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'aircraft_id': self.aircraft.id, 'start': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'aircraft_id': self.aircraft.id, 'resolution': 'hour'}).status_code, 400)
@@ -0,0 +1,72 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from dump1090_collector.models import FlightData
+from dump1090_collector.services.normalize import normalize_existing_rows
+from dump1090_collector.services.spatial import GRID_COLUMNS, cells_in_bbox, grid_cell
+from dump1090_collector.services.store_data import build_flight_data
+
+RECEIVER = (51.47, -0.45)
+
+
+def position(lat, lon, minutes_ago=0, valid=True):
+    return FlightData.objects.create(
+        flight_hex='4CA2D6', latitude=lat, longitude=lon, valid_position=valid,
+        grid_cell=grid_cell(lat, lon) if valid else None,
+        timestamp=timezone.now() - timedelta(minutes=minutes_ago),
+    )
+
+
+class GridCellTestCase(TestCase):
+    def test_database_backfill_matches_ingest(self):
+        points = [(51.47, -0.45), (-33.9, 151.2), (0.0, -180.0), (90.0, 179.99), (-0.01, 0.01)]
+        for lat, lon in points:
+            FlightData.objects.create(latitude=lat, longitude=lon, valid_position=True)
+        FlightData.objects.create(latitude=0.0, longitude=0.0)
+
+        self.assertEqual(normalize_existing_rows()['flightdata_grid_cell'], len(points))
+        stored = FlightData.objects.order_by('id').values_list('grid_cell', flat=True)
+        self.assertEqual(list(stored), [grid_cell(lat, lon) for lat, lon in points] + [None])
+
+    def test_rows_are_bucketed_at_ingest(self):
+        fields = {name: None for name in ('flight_hex', 'squawk', 'flight_callsign', 'callsign_norm', 'altitude',
+                                          'vertical_rate', 'track', 'valid_track', 'speed_in_knots',
+                                          'messages_received', 'seen', 'timestamp')}
+        row = build_flight_data({**fields, 'lat': 51.47, 'lon': -0.45, 'valid_position': True})
+        self.assertEqual(row.grid_cell, grid_cell(*RECEIVER))
+        self.assertIsNone(build_flight_data({**fields, 'lat': 0.0, 'lon': 0.0, 'valid_position': False}).grid_cell)
+
+    def test_bbox_cells_wrap_the_antimeridian(self):
+        cells = cells_in_bbox(179.95, 10.0, -179.95, 10.05)
+        self.assertEqual(sorted(cell % GRID_COLUMNS for cell in cells), [0, GRID_COLUMNS - 1])
+        self.assertIsNone(cells_in_bbox(-180, -90, 180, 90))
+
+
+class SpatialFilterTestCase(TestCase):
+    def setUp(self):
+        self.url = reverse('flightdata-list')
+        self.near = position(51.6, -0.45)                   # ~8 nm north
+        self.far = position(52.0, -0.45)                    # ~32 nm north
+        self.old = position(51.5, -0.4, minutes_ago=180)   # ~2 nm, three hours ago
+        position(51.47, -0.45, valid=False)
+
+    def ids(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['id'] for row in response.json()['results'])
+
+    def test_radius_and_time_window(self):
+        self.assertEqual(self.ids({'radius': '51.47,-0.45,20'}), sorted([self.near.id, self.old.id]))
+        self.assertEqual(self.ids({'radius': '51.47,-0.45,20', 'max_age': 3600}), [self.near.id])
+        start = (timezone.now() - timedelta(hours=4)).isoformat()
+        end = (timezone.now() - timedelta(hours=1)).isoformat()
+        self.assertEqual(self.ids({'radius': '51.47,-0.45,20', 'start': start, 'end': end}), [self.old.id])
+
+    def test_bbox(self):
+        self.assertEqual(self.ids({'bbox': '-1,51.9,0,52.1'}), [self.far.id])
+        self.assertEqual(self.ids({'bbox': '-1,51,0,53'}), sorted([self.near.id, self.far.id, self.old.id]))
+
+    def test_invalid_spatial_parameters(self):
+        for params in ({'bbox': '1,2,3'}, {'radius': 'here'}, {'radius': '51,0,-5'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+import numpy as np
+from django.test import TestCase
+from django.urls import reverse
+from dump1090_collector.models import Airline, Airport, DailyCallsign, Flight, FlightData, HourlyTraffic
+from dump1090_collector.services.stats import (
+    add_to_sketch,
+    aggregate_stats,
+    airline_leaderboard,
+    empty_sketch,
+    estimate,
+    hourly_traffic,
+)
+
+NOW = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def position(hex_code, timestamp, messages=0, callsign=None, airline=None, route=(None, None)):
+    flight = Flight.objects.create(
+        flight_hex=hex_code, callsign=callsign, first_seen=timestamp, last_seen=timestamp,
+        airline=airline, origin_airport=route[0], destination_airport=route[1],
+    )
+    return FlightData.objects.create(
+        flight_hex=hex_code, callsign_norm=callsign, messages_received=messages, timestamp=timestamp, flight=flight,
+    )
+
+
+class HourlyTrafficTestCase(TestCase):
+    def test_positions_messages_and_aircraft_are_counted_per_hour(self):
+        position('4CA2D6', NOW - timedelta(minutes=30), messages=100)
+        position('4CA2D6', NOW - timedelta(minutes=3), messages=150)
+        position('400ABC', NOW - timedelta(minutes=20), messages=20)
+        position('400ABC', NOW - timedelta(minutes=15), messages=5)  # dump1090 lost and re-acquired it
+        self.assertEqual(aggregate_stats(now=NOW), 4)
+        self.assertIsNone(aggregate_stats(now=NOW))
+
+        # The previous counter comes from before the watermark.
+        position('4CA2D6', NOW - timedelta(minutes=1), messages=160)
+        position('4CA2D6', NOW + timedelta(minutes=1), messages=170)
+        self.assertEqual(aggregate_stats(now=NOW + timedelta(minutes=10)), 2)
+
+        hours = {row.hour: row for row in HourlyTraffic.objects.all()}
+        eleven = hours[NOW - timedelta(hours=1)]
+        self.assertEqual((eleven.positions, eleven.messages, eleven.aircraft), (5, 185, 2))
+        self.assertEqual((hours[NOW].positions, hours[NOW].messages, hours[NOW].aircraft), (1, 10, 1))
+
+        traffic = hourly_traffic(2, now=NOW + timedelta(minutes=10))
+        self.assertEqual(traffic['unique_aircraft'], 2)
+        self.assertEqual(traffic['hour'], [NOW - timedelta(hours=1), NOW])
+        # The current hour has only been counted for its first 8 minutes.
+        self.assertEqual(traffic['message_rate'], [round(185 / 3600, 2), round(10 / 480, 2)])
+
+    def test_sketch_estimates_and_merges_distinct_counts(self):
+        values = [f'{index:06X}' for index in range(10000)]
+        self.assertAlmostEqual(estimate(add_to_sketch(empty_sketch(), values)), 10000, delta=500)
+        self.assertAlmostEqual(estimate(add_to_sketch(empty_sketch(), values[:300] * 3)), 300, delta=9)
+        merged = np.maximum(add_to_sketch(empty_sketch(), values[:6000]), add_to_sketch(empty_sketch(), values[4000:]))
+        self.assertTrue((merged == add_to_sketch(empty_sketch(), values)).all())
+
+
+class LeaderboardTestCase(TestCase):
+    def setUp(self):
+        self.speedbird = Airline.objects.create(name='British Airways', icao='BAW', iata='BA')
+        self.easy = Airline.objects.create(name='easyJet', icao='EZY', iata='U2')
+        airports = {code: Airport.objects.create(icao_code=code) for code in ('EGLL', 'KJFK', 'LFPG', 'EGKK')}
+        # Pinned so the positions cannot straddle midnight.
+        patcher = mock.patch('django.utils.timezone.now', return_value=NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        now = NOW
+        position('400001', now - timedelta(minutes=40), callsign='BAW1')  # route not looked up yet
+        for minutes in (35, 30):
+            position('400001', now - timedelta(minutes=minutes), callsign='BAW1', airline=self.speedbird,
+                     route=(airports['EGLL'], airports['KJFK']))
+        position('400002', now - timedelta(minutes=30), callsign='BAW2', airline=self.speedbird,
+                 route=(airports['EGLL'], airports['LFPG']))
+        position('400003', now - timedelta(minutes=30), callsign='EZY3', airline=self.easy,
+                 route=(airports['EGKK'], airports['LFPG']))
+        position('400004', now - timedelta(minutes=30))  # no callsign
+        while aggregate_stats(now=now) is not None:
+            pass
+
+    def test_callsigns_are_counted_once_per_day_with_their_route(self):
+        baw1 = DailyCallsign.objects.get(callsign='BAW1')
+        self.assertEqual((baw1.positions, baw1.airline, baw1.destination_airport.icao_code),
+                         (3, self.speedbird, 'KJFK'))
+        ranking = airline_leaderboard(7, 10)
+        self.assertEqual([(row['airline']['icao'], row['flights'], row['positions']) for row in ranking],
+                         [('BAW', 2, 4), ('EZY', 1, 1)])
+
+    def test_leaderboard_endpoints(self):
+        body = self.client.get(reverse('stats-routes'), {'days': 1, 'limit': 2}).json()
+        self.assertEqual([(row['origin']['icao_code'], row['destination']['icao_code'], row['flights'])
+                          for row in body['results']], [('EGLL', 'KJFK', 1), ('EGLL', 'LFPG', 1)])
+        airlines = self.client.get(reverse('stats-airlines')).json()['results']
+        self.assertEqual(airlines[0]['airline']['name'], 'British Airways')
+        self.assertEqual(self.client.get(reverse('stats-hourly')).json()['positions'], [6])
+        for url, params in (('stats-airlines', {'days': 0}), ('stats-routes', {'limit': 'ten'}),
+                            ('stats-hourly', {'hours': 100000})):
+            self.assertEqual(self.client.get(reverse(url), params).status_code, 400)
@@ -20,6 +20,7 @@ class StoreDataTestCase(TestCase):
             'flight_hex': 'ABCDEF',
             'squawk': 1200,
             'flight_callsign': 'UAL123',
+            'callsign_norm': 'UAL123',
             'lat': 34.0522,
             'lon': -118.2437,
             'valid_position': True,
@@ -47,9 +48,9 @@ class StoreDataTestCase(TestCase):
         self.assertEqual(FlightData.objects.count(), 1)
         self.assertEqual(flight_data.flight_callsign, 'UAL123')
         self.assertEqual(flight_data.aircraft.registration, 'N12345')
-        self.assertEqual(flight_data.airline.name, 'United')
-        self.assertEqual(flight_data.origin_airport.iata_code, 'JFK')
-        self.assertEqual(flight_data.destination_airport.iata_code, 'LAX')
+        self.assertEqual(flight_data.flight.airline.name, 'United')
+        self.assertEqual(flight_data.flight.origin_airport.iata_code, 'JFK')
+        self.assertEqual(flight_data.flight.destination_airport.iata_code, 'LAX')
 
         mock_extract_aircraft_info.assert_called_once_with(adsbdb_aircraft_data)
         mock_extract_callsign_info.assert_called_once_with(adsbdb_callsign_data)
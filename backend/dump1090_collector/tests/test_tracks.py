@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from dump1090_collector.models import Aircraft, FlightData
+from dump1090_collector.services.tracks import build_tracks, drop_outliers, load_positions, segment_starts, simplify
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+START = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def positions(t, lat, lon, alt=None, callsign=None):
+    return {
+        't': np.array(t, dtype=float),
+        'lat': np.array(lat, dtype=float),
+        'lon': np.array(lon, dtype=float),
+        'alt': np.array(alt if alt is not None else [30000] * len(t), dtype=float),
+        'callsign': np.array(callsign if callsign is not None else ['BAW100'] * len(t), dtype=str),
+    }
+
+
+def store(seconds, latitude, longitude=-1.0, callsign='BAW100', altitude=30000, **fields):
+    defaults = {
+        'flight_hex': '4CA2D6',
+        'flight_callsign': callsign,
+        'callsign_norm': callsign,
+        'latitude': latitude,
+        'longitude': longitude,
+        'valid_position': True,
+        'altitude': altitude,
+        'timestamp': START + timedelta(seconds=seconds),
+    }
+    defaults.update(fields)
+    return FlightData.objects.create(**defaults)
+
+
+class TrackEngineTestCase(TestCase):
+    def test_flights_split_on_gaps_and_callsign_changes_but_not_missing_callsigns(self):
+        t = [0, 10, 20, 3000, 3010, 3020, 3030]
+        callsign = ['BAW100', '', 'BAW100', 'BAW200', '', 'DLH1', 'DLH1']
+        self.assertEqual(segment_starts(np.array(t, dtype=float), np.array(callsign), gap=1800).tolist(), [0, 3, 5])
+
+    def test_single_point_spikes_are_dropped(self):
+        cleaned = drop_outliers(positions([0, 10, 20, 30], [51.0, 51.01, 55.0, 51.03], [-1.0] * 4))
+        self.assertEqual(cleaned['lat'].tolist(), [51.0, 51.01, 51.03])
+
+    def test_speed_heading_and_climb_come_from_successive_points(self):
+        # One arc-minute of latitude is one nautical mile.
+        [track] = build_tracks(positions([0, 60, 120], [51.0, 51 + 1 / 60, 51 + 2 / 60], [-1.0] * 3,
+                                         alt=[30000, 31000, 31500]))
+        columns = track['columns']
+        self.assertEqual(columns['ground_speed'], [None, 60.0, 60.0])
+        self.assertEqual(columns['heading'], [None, 0.0, 0.0])
+        self.assertEqual(columns['climb'], [None, 1000.0, 500.0])
+        self.assertEqual((track['points'], track['distance_nm'], track['max_altitude']), (3, 2.0, 31500))
+
+    def test_load_positions_skips_invalid_positions(self):
+        store(0, 51.0)
+        store(10, 0.0, longitude=0.0)
+        store(20, 51.1, valid_position=False)
+        store(30, 51.2, callsign=None, altitude=None)
+        loaded = load_positions(FlightData.objects.all())
+        self.assertEqual(loaded['t'].tolist(), [START.timestamp(), START.timestamp() + 30])
+        self.assertEqual(loaded['callsign'].tolist(), ['BAW100', ''])
+        self.assertTrue(np.isnan(loaded['alt'][1]))
+
+    def test_simplify_keeps_the_corners_of_a_dogleg(self):
+        # North for 10 nm weaving ~0.04 nm either side, then east for 10 nm.
+        lat = [51 + min(step, 10) / 60 for step in range(21)]
+        lon = [-1 + (max(step - 10, 0) / 60 + (0.0006 if step % 2 and step < 10 else 0)) / np.cos(np.radians(51.1))
+               for step in range(21)]
+        self.assertEqual(simplify(lat, lon, tolerance=0.1).tolist(), [0, 10, 20])
+        self.assertEqual(simplify(lat, lon, tolerance=0.01).tolist(), list(range(11)) + [20])
+        self.assertEqual(simplify(lat, lon, max_points=3).tolist(), [0, 10, 20])
+        self.assertEqual(simplify(lat, lon, tolerance=0.01, max_points=2).tolist(), [0, 20])
+
+    def test_simplify_across_the_antimeridian(self):
+        lat, lon = [60.0, 60.0, 60.0], [179.9, -179.9, -179.7]
+        self.assertEqual(simplify(lat, lon, tolerance=0.1).tolist(), [0, 2])
+
+
+class TracksEndpointTestCase(TestCase):
+    def setUp(self):
+        self.url = reverse('flightdata-tracks')
+
+    def test_tracks_for_an_airframe(self):
+        aircraft = Aircraft.objects.create(hex_id='4CA2D6')
+        for second in range(0, 600, 60):
+            store(second, 51 + second / 36000, aircraft=aircraft)
+        for second in range(7200, 7800, 60):
+            store(second, 52 - (second - 7200) / 36000, callsign='BAW101', aircraft=aircraft)
+        store(7900, 52.0, flight_hex='400000', callsign='OTHER')
+
+        body = self.client.get(self.url, {'hex': '4ca2d6'}).json()
+        self.assertEqual(body['count'], 2)
+        self.assertEqual([track['callsign'] for track in body['tracks']], ['BAW100', 'BAW101'])
+        self.assertEqual(body['tracks'][0]['points'], 10)
+        self.assertEqual(len(body['tracks'][1]['columns']['lat']), 10)
+
+        summary = self.client.get(self.url, {'aircraft_id': aircraft.id, 'points': 'false',
+                                             'start': (START + timedelta(hours=1)).isoformat()}).json()
+        self.assertEqual(summary['count'], 1)
+        self.assertNotIn('columns', summary['tracks'][0])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'hex': '4CA2D6', 'gap': 'long'}).status_code, 400)
+        for gap in ('nan', 'inf', '-60', '0'):
+            self.assertEqual(self.client.get(self.url, {'hex': '4CA2D6', 'gap': gap}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'hex': '4CA2D6', 'start': 'yesterday'}).status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SimplifiedFlightPathTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('flightdata-flight-path')
+        self.aircraft = Aircraft.objects.create(hex_id='4CA2D6')
+        # A straight climb-out with a single turn half way along.
+        for step in range(40):
+            store(step * 2, 51 + min(step, 20) / 600, longitude=-1 + max(step - 20, 0) / 400, aircraft=self.aircraft)
+        self.params = {'aircraft_id': self.aircraft.id, 'resolution': 'raw', 'tolerance': '0.05',
+                       'end': (START + timedelta(minutes=5)).isoformat()}
+
+    def test_simplified_path_is_one_page_of_corner_points(self):
+        body = self.client.get(self.url, self.params).json()
+        self.assertIsNone(body['next'])
+        self.assertEqual([row['timestamp'][11:19] for row in body['results']], ['12:00:00', '12:00:40', '12:01:18'])
+
+        columns = self.client.get(self.url, {**self.params, 'layout': 'columns', 'max_points': 2}).json()
+        self.assertEqual(len(columns['results']['columns']['id']), 2)
+
+    def test_closed_ranges_are_served_from_the_cache(self):
+        self.client.get(self.url, self.params)
+        FlightData.objects.all().delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.client.get(self.url, self.params).json()['results']), 3)
+
+        open_ended = {key: value for key, value in self.params.items() if key != 'end'}
+        self.assertEqual(self.client.get(self.url, open_ended).json()['results'], [])
+
+    def test_invalid_simplification_parameters(self):
+        for params in ({'tolerance': 'far'}, {'tolerance': '-1'}, {'tolerance': 'nan'}, {'tolerance': 'inf'},
+                       {'max_points': '1'}, {'tolerance': '0.1', 'stream': 'ndjson'}):
+            self.assertEqual(self.client.get(self.url, {'aircraft_id': self.aircraft.id, **params}).status_code, 400)
@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+from dump1090_collector.benchmarks.traffic import generate_traffic, great_circle, traffic_fleet_size
+
+
+class TrafficGeneratorTestCase(SimpleTestCase):
+    def test_great_circle(self):
+        lat, lon, track = great_circle(0.0, 0.0, 90, 60)
+        self.assertAlmostEqual(lat, 0.0)
+        self.assertAlmostEqual(lon, 1.0, places=2)
+        self.assertAlmostEqual(track, 90)
+        # Eastbound from 50N the great circle bends south.
+        self.assertGreater(great_circle(50.0, 0.0, 90, 600)[2], 90)
+
+    def test_churn_replaces_the_fleet(self):
+        first = {flight['hex'] for flight in generate_traffic(100, poll=0, churn=0.1)['aircraft']}
+        later = generate_traffic(100, poll=1, churn=0.1)['aircraft']
+        new = [flight for flight in later if flight['hex'] not in first]
+        self.assertEqual(len(new), 10)
+        self.assertTrue(all('flight' not in flight for flight in new))
+        hexes = {flight['hex'] for poll in range(30) for flight in generate_traffic(100, poll=poll, churn=0.1)['aircraft']}
+        self.assertLessEqual(len(hexes), traffic_fleet_size(100, 30, churn=0.1))
+
+    def test_missing_fields_are_deterministic(self):
+        snapshot = generate_traffic(200, poll=3, missing=0.2, seed=1)
+        self.assertEqual(snapshot, generate_traffic(200, poll=3, missing=0.2, seed=1))
+        without_position = [flight for flight in snapshot['aircraft'] if 'lat' not in flight]
+        self.assertTrue(20 < len(without_position) < 60)
+        self.assertTrue(all(flight['validposition'] == 0 for flight in without_position))
+        self.assertTrue(all('flight' in flight for flight in generate_traffic(50, poll=3)['aircraft']))
@@ -1,13 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import FlightDataViewSet, AircraftViewSet, AirlineViewSet, AirportViewSet
+from .views import FlightDataViewSet, FlightViewSet, AircraftViewSet, AirlineViewSet, AirportViewSet, IdentityMapStatsViewSet, LiveAircraftViewSet, PollStatsViewSet, CoverageViewSet, StatsViewSet, live_stream
 
 router = DefaultRouter()
 router.register(r'flightdata', FlightDataViewSet)
+router.register(r'flights', FlightViewSet)
 router.register(r'aircraft', AircraftViewSet)
 router.register(r'airlines', AirlineViewSet)
 router.register(r'airports', AirportViewSet)
+router.register(r'live', LiveAircraftViewSet, basename='live')
+router.register(r'coverage', CoverageViewSet, basename='coverage')
+router.register(r'stats', StatsViewSet, basename='stats')
+router.register(r'identity_map_stats', IdentityMapStatsViewSet, basename='identity_map_stats')
+router.register(r'poll_stats', PollStatsViewSet, basename='poll_stats')
 
 urlpatterns = [
+    path('api/live/stream/', live_stream, name='live-stream'),
     path('api/', include(router.urls)),
 ]
@@ -1,19 +1,76 @@
+import logging
+import math
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models.functions import Trim
 
-from .models import FlightData, Aircraft, Airline, Airport
-from .serializers import FlightDataSerializer, AircraftSerializer, AirlineSerializer, AirportSerializer
-from .filters import FlightDataFilter
+from .models import Flight, FlightData, FlightDataRollup, Aircraft, Airline, Airport
+from .serializers import (
+    FlightSerializer,
+    FlightPositionSerializer,
+    FlightDataSerializer,
+    FlightDataRollupSerializer,
+    AircraftSerializer,
+    AirlineSerializer,
+    AirportSerializer,
+)
+from .filters import FlightDataFilter, FlightFilter
+from .pagination import KeysetPagination
+from .services.extractors import normalize_callsign, normalize_hex
+from .services.live import LIVE_MAX_AGE, get_live_store
+from .services.push import live_events
+from .services.coverage import coverage_summary
+from .services.stats import airline_leaderboard, hourly_traffic, route_leaderboard
+from .services.tracks import TRACK_GAP, build_tracks, load_positions, simplified_ids, simplify
+from .services.archive import archived_positions, archived_rows, archived_until, with_archived
+from .services.identity_map import invalidate_identity_map, published_identity_map_stats
+from .services.metrics import METRICS_ENABLED, get_metrics_store, render_metrics
+from .services.polling import poll_metrics, render_poll_metrics
+from .services.receivers import RECEIVERS
+from .services.partitions import RAW_RETENTION_DAYS
+from .projections import LAYOUTS, flat_queryset, project
+from .streaming import STREAM_FORMATS, streaming_response
+
+logger = logging.getLogger(__name__)
+
+# flight_path answers from per-minute rollups when the requested range is
+# longer than this many seconds or starts before raw positions expire.
+ROLLUP_QUERY_THRESHOLD = getattr(settings, 'DUMP1090_ROLLUP_QUERY_THRESHOLD', 6 * 60 * 60)
+# Simplified paths are cached this long once their range has closed, i.e.
+# ends more than DUMP1090_TRACK_GAP seconds ago and can no longer grow.
+SIMPLIFIED_PATH_CACHE_TIMEOUT = getattr(settings, 'DUMP1090_SIMPLIFIED_PATH_CACHE_TIMEOUT', 24 * 60 * 60)
 
 
 class FlightDataViewSet(viewsets.ModelViewSet):
-    queryset = FlightData.objects.all().order_by('timestamp')
+    queryset = FlightData.objects.select_related(
+        'aircraft', 'flight__airline', 'flight__origin_airport', 'flight__destination_airport'
+    ).order_by('timestamp', 'id')
     serializer_class = FlightDataSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = FlightDataFilter
+    pagination_class = KeysetPagination
+
+    def list(self, request, *args, **kwargs):
+        """Accepts ``layout=flat|columns`` for compact responses (see projections.LAYOUTS)."""
+        layout = request.query_params.get('layout', 'nested')
+        if layout not in LAYOUTS:
+            return Response({"error": "Invalid layout: expected nested, flat or columns."}, status=400)
+        if layout == 'nested':
+            return super().list(request, *args, **kwargs)
+        return self.projected_response(self.filter_queryset(self.get_queryset()), layout)
+
+    def projected_response(self, queryset, layout):
+        page = self.paginate_queryset(flat_queryset(queryset))
+        return self.get_paginated_response(project(page, queryset.model, layout))
 
     @action(detail=False, methods=['get'], url_path='flight_path')
     def flight_path(self, request):
@@ -25,40 +82,481 @@ class FlightDataViewSet(viewsets.ModelViewSet):
           - aircraft_id: the primary key of the Aircraft record
           - flight_callsign: the callsign of the flight
 
+        Optional parameters:
+          - start, end: ISO 8601 datetimes bounding the path
+          - resolution: "raw" for every stored position or "minute" for one
+            averaged position per minute. By default long or old ranges are
+            served from the minute rollups. Raw paths starting before the
+            archived range (see services.archive) are read back from the
+            archive files and come back as one page.
+          - stream: "ndjson" or "json" to stream the whole path from a
+            server-side cursor instead of returning it a page at a time
+            (page_size / cursor, see KeysetPagination).
+          - layout: "flat" for rows with foreign key ids plus one side table
+            per related model, "columns" for parallel arrays. Streams only
+            support "flat", without side tables.
+          - tolerance: simplify the path for drawing (Ramer-Douglas-Peucker),
+            dropping points within this many nautical miles of the simplified
+            line. The whole simplified path comes back as one page.
+          - max_points: simplify to at most this many of the most significant
+            points, alone or on top of tolerance.
+
         Example URLs:
           /dump1090_collector/api/flightdata/flight_path/?aircraft_id=1
           /dump1090_collector/api/flightdata/flight_path/?flight_callsign=UAL1012
+          /dump1090_collector/api/flightdata/flight_path/?aircraft_id=1&start=2025-01-01T00:00:00Z&resolution=minute
+          /dump1090_collector/api/flightdata/flight_path/?flight_callsign=UAL1012&stream=ndjson
+          /dump1090_collector/api/flightdata/flight_path/?aircraft_id=1&tolerance=0.05&max_points=500
         """
         aircraft_id = request.query_params.get('aircraft_id', None)
         flight_callsign = request.query_params.get('flight_callsign', None)
 
-        if aircraft_id:
-            flight_data_qs = FlightData.objects.filter(aircraft__id=aircraft_id).order_by('timestamp')
-        elif flight_callsign:
-            flight_callsign = flight_callsign.strip()
-            flight_data_qs = FlightData.objects.annotate(
-                trimmed_callsign=Trim('flight_callsign')
-            ).filter(trimmed_callsign__iexact=flight_callsign).order_by('timestamp')
-        else:
+        if not aircraft_id and not flight_callsign:
             return Response(
                 {"error": "Missing query parameter: provide either aircraft_id or flight_callsign."},
                 status=400
             )
 
-        serializer = self.get_serializer(flight_data_qs, many=True)
-        return Response(serializer.data)
+        bounds = {}
+        for name in ('start', 'end'):
+            value = request.query_params.get(name)
+            if value:
+                parsed = parse_datetime(value)
+                if parsed is None:
+                    return Response({"error": f"Invalid {name}: expected an ISO 8601 datetime."}, status=400)
+                bounds[name] = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+        resolution = request.query_params.get('resolution') or self.default_resolution(**bounds)
+        if resolution not in ('raw', 'minute'):
+            return Response({"error": "Invalid resolution: expected raw or minute."}, status=400)
+
+        stream = request.query_params.get('stream')
+        if stream and stream not in STREAM_FORMATS:
+            return Response({"error": "Invalid stream: expected ndjson or json."}, status=400)
+
+        layout = request.query_params.get('layout', 'nested')
+        if layout not in LAYOUTS or (stream and layout == 'columns'):
+            allowed = 'nested or flat' if stream else 'nested, flat or columns'
+            return Response({"error": f"Invalid layout: expected {allowed}."}, status=400)
+
+        try:
+            tolerance = float(request.query_params['tolerance']) if request.query_params.get('tolerance') else None
+            max_points = int(request.query_params['max_points']) if request.query_params.get('max_points') else None
+        except ValueError:
+            return Response({"error": "Invalid tolerance or max_points: expected numbers."}, status=400)
+        if (tolerance is not None and not (math.isfinite(tolerance) and tolerance >= 0)) or (
+                max_points is not None and max_points < 2):
+            return Response({"error": "Invalid tolerance or max_points: expected tolerance >= 0 and max_points >= 2."},
+                            status=400)
+        simplified = tolerance is not None or max_points is not None
+        if stream and simplified:
+            return Response({"error": "Simplified paths can't be streamed."}, status=400)
+
+        if resolution == 'minute':
+            model, time_field, serializer_class = FlightDataRollup, 'bucket', FlightDataRollupSerializer
+        else:
+            model, time_field, serializer_class = FlightData, 'timestamp', self.get_serializer_class()
+
+        if model is FlightData:
+            flight_data_qs = self.get_queryset()
+        else:
+            flight_data_qs = model.objects.all()
+        if aircraft_id:
+            flight_data_qs = flight_data_qs.filter(aircraft_id=aircraft_id)
+        else:
+            callsign_field = 'callsign_norm' if model is FlightData else 'flight_callsign'
+            flight_data_qs = flight_data_qs.filter(**{callsign_field: normalize_callsign(flight_callsign) or ''})
+
+        if 'start' in bounds:
+            flight_data_qs = flight_data_qs.filter(**{f'{time_field}__gte': bounds['start']})
+        if 'end' in bounds:
+            flight_data_qs = flight_data_qs.filter(**{f'{time_field}__lt': bounds['end']})
+        flight_data_qs = flight_data_qs.order_by(time_field, 'id')
+
+        until = archived_until()
+        if model is FlightData and until is not None and bounds.get('start') and bounds['start'] < until:
+            try:
+                equals = ({'aircraft_id': int(aircraft_id)} if aircraft_id
+                          else {'callsign_norm': normalize_callsign(flight_callsign) or ''})
+            except ValueError:
+                return Response({"error": "Invalid aircraft_id."}, status=400)
+            return self.archived_response(flight_data_qs, bounds, equals, until, layout, stream, tolerance, max_points)
+
+        if simplified:
+            key = ':'.join(str(part) for part in (
+                'flight_path', 'simplified', resolution, layout, aircraft_id or '',
+                normalize_callsign(flight_callsign) or '', *(f'{name}={bound.isoformat()}' for name, bound in bounds.items()),
+                tolerance, max_points,
+            ))
+            closed = 'end' in bounds and bounds['end'] <= timezone.now() - timedelta(seconds=TRACK_GAP)
+            return self.simplified_response(flight_data_qs, layout, serializer_class, tolerance, max_points,
+                                            key if closed else None)
+
+        if stream and layout == 'flat':
+            return streaming_response(flat_queryset(flight_data_qs), dict, stream)
+        if layout != 'nested':
+            return self.projected_response(flight_data_qs, layout)
+
+        context = self.get_serializer_context()
+        if stream:
+            return streaming_response(flight_data_qs, serializer_class(context=context).to_representation, stream)
+
+        page = self.paginate_queryset(flight_data_qs)
+        serializer = serializer_class(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
+    def simplified_response(self, queryset, layout, serializer_class, tolerance, max_points, cache_key=None):
+        """
+        The simplified path as a single page. Closed ranges pass a
+        ``cache_key`` so repeat views skip the database altogether.
+        """
+        data = cache.get(cache_key) if cache_key else None
+        if data is None:
+            queryset = queryset.filter(id__in=simplified_ids(queryset, tolerance, max_points))
+            if layout == 'nested':
+                data = list(serializer_class(queryset, many=True, context=self.get_serializer_context()).data)
+            else:
+                data = project(flat_queryset(queryset), queryset.model, layout)
+            if cache_key:
+                cache.set(cache_key, data, timeout=SIMPLIFIED_PATH_CACHE_TIMEOUT)
+        return Response({'next': None, 'results': data})
+
+    def archived_response(self, queryset, bounds, equals, until, layout, stream, tolerance, max_points):
+        """
+        A raw path starting before ``until``: the archived positions, then
+        the ones still in FlightData, as one page.
+        """
+        rows = archived_rows(bounds['start'], bounds.get('end'), **equals)
+        rows += flat_queryset(queryset.filter(timestamp__gte=until))
+        if tolerance is not None or max_points is not None:
+            rows = [row for row in rows if row['latitude'] is not None and row['longitude'] is not None]
+            if rows:
+                kept = simplify([row['latitude'] for row in rows], [row['longitude'] for row in rows],
+                                tolerance, max_points)
+                rows = [rows[index] for index in kept.tolist()]
+        if layout != 'nested':
+            if stream:
+                return streaming_response(rows, dict, stream)
+            return Response({'next': None, 'results': project(rows, FlightData, layout)})
+
+        positions = [FlightData(**row) for row in rows]
+        prefetch_related_objects(positions, 'aircraft', 'flight__airline', 'flight__origin_airport',
+                                 'flight__destination_airport')
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        if stream:
+            return streaming_response(positions, serializer.to_representation, stream)
+        return Response({'next': None, 'results': [serializer.to_representation(position) for position in positions]})
+
+    @action(detail=False, methods=['get'])
+    def tracks(self, request):
+        """
+        An aircraft's positions split into flights, with bad position spikes
+        removed and ground speed, heading and climb derived from successive
+        points.
+
+        Provide one of:
+          - aircraft_id: the primary key of the Aircraft record
+          - hex: the ICAO hex id
+
+        Optional parameters:
+          - start, end: ISO 8601 datetimes bounding the positions; a start
+            before the archived range also reads the archive files
+          - gap: seconds without a position that end a flight (default DUMP1090_TRACK_GAP)
+          - points: "false" for the per-flight summaries only
+
+        Example URL:
+          /dump1090_collector/api/flightdata/tracks/?hex=4CA2D6&start=2025-01-01T00:00:00Z
+        """
+        aircraft_id = request.query_params.get('aircraft_id')
+        hex_code = request.query_params.get('hex')
+        if not aircraft_id and not hex_code:
+            return Response({"error": "Missing query parameter: provide either aircraft_id or hex."}, status=400)
+
+        bounds = {}
+        for name in ('start', 'end'):
+            value = request.query_params.get(name)
+            if value:
+                parsed = parse_datetime(value)
+                if parsed is None:
+                    return Response({"error": f"Invalid {name}: expected an ISO 8601 datetime."}, status=400)
+                bounds[name] = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+        try:
+            gap = float(request.query_params.get('gap', TRACK_GAP))
+        except ValueError:
+            return Response({"error": "Invalid gap: expected seconds."}, status=400)
+        if not math.isfinite(gap) or gap <= 0:
+            return Response({"error": "Invalid gap: expected a positive number of seconds."}, status=400)
+
+        queryset = FlightData.objects.all()
+        if aircraft_id:
+            queryset = queryset.filter(aircraft_id=aircraft_id)
+        else:
+            queryset = queryset.filter(flight_hex=normalize_hex(hex_code))
+        if 'start' in bounds:
+            queryset = queryset.filter(timestamp__gte=bounds['start'])
+        if 'end' in bounds:
+            queryset = queryset.filter(timestamp__lt=bounds['end'])
+
+        until = archived_until()
+        if until is not None and bounds.get('start') and bounds['start'] < until:
+            try:
+                equals = {'aircraft_id': int(aircraft_id)} if aircraft_id else {'flight_hex': normalize_hex(hex_code)}
+            except ValueError:
+                return Response({"error": "Invalid aircraft_id."}, status=400)
+            positions = with_archived(archived_positions(bounds['start'], bounds.get('end'), **equals),
+                                      load_positions(queryset.filter(timestamp__gte=until)))
+        else:
+            positions = load_positions(queryset)
+
+        include_points = request.query_params.get('points', 'true').lower() not in ('false', '0', 'no')
+        tracks = build_tracks(positions, gap=gap, include_points=include_points)
+        return Response({'count': len(tracks), 'tracks': tracks})
+
+    @staticmethod
+    def default_resolution(start=None, end=None):
+        if start is None:
+            return 'raw'
+        if RAW_RETENTION_DAYS is not None and start < timezone.now() - timedelta(days=RAW_RETENTION_DAYS):
+            return 'minute'
+        if ((end or timezone.now()) - start).total_seconds() > ROLLUP_QUERY_THRESHOLD:
+            return 'minute'
+        return 'raw'
 
 
-class AircraftViewSet(viewsets.ModelViewSet):
+class FlightViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Flight sessions opened by the collector, oldest first, with their
+    first/last seen, altitude range, max range, point count and route.
+    Filters are in filters.FlightFilter.
+
+    Example URLs:
+      /dump1090_collector/api/flights/?callsign=BAW123&start=2025-03-01T00:00:00Z
+      /dump1090_collector/api/flights/42/positions/?layout=columns
+    """
+    queryset = Flight.objects.select_related(
+        'airline', 'origin_airport', 'destination_airport'
+    ).order_by('first_seen', 'id')
+    serializer_class = FlightSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = FlightFilter
+    pagination_class = KeysetPagination
+
+    @action(detail=True, methods=['get'])
+    def positions(self, request, pk=None):
+        """The flight's positions in time order; accepts ``layout=flat|columns`` like the flightdata list."""
+        layout = request.query_params.get('layout', 'nested')
+        if layout not in LAYOUTS:
+            return Response({"error": "Invalid layout: expected nested, flat or columns."}, status=400)
+        queryset = FlightData.objects.filter(flight=self.get_object()).order_by('timestamp', 'id')
+        if layout != 'nested':
+            page = self.paginate_queryset(flat_queryset(queryset))
+            return self.get_paginated_response(project(page, FlightData, layout))
+        page = self.paginate_queryset(queryset.select_related('aircraft'))
+        return self.get_paginated_response(FlightPositionSerializer(page, many=True).data)
+
+
+class IdentityMapInvalidationMixin:
+    """
+    Drop the collector's cached natural key -> primary key mappings whenever
+    a record is written through the API, so the next poll goes back to the
+    database for it.
+    """
+    identity_map_name = None
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        invalidate_identity_map(self.identity_map_name)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_identity_map(self.identity_map_name)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidate_identity_map(self.identity_map_name)
+
+
+class AircraftViewSet(IdentityMapInvalidationMixin, viewsets.ModelViewSet):
     queryset = Aircraft.objects.all()
     serializer_class = AircraftSerializer
+    identity_map_name = 'aircraft'
 
 
-class AirlineViewSet(viewsets.ModelViewSet):
+class AirlineViewSet(IdentityMapInvalidationMixin, viewsets.ModelViewSet):
     queryset = Airline.objects.all()
     serializer_class = AirlineSerializer
+    identity_map_name = 'airline'
 
 
-class AirportViewSet(viewsets.ModelViewSet):
+class AirportViewSet(IdentityMapInvalidationMixin, viewsets.ModelViewSet):
     queryset = Airport.objects.all()
     serializer_class = AirportSerializer
+    identity_map_name = 'airport'
+
+
+LIVE_PARAMS_ERROR = "Invalid max_age (positive seconds) or bbox (min_lon,min_lat,max_lon,max_lat)."
+
+
+def live_params(params):
+    """max_age and bbox query parameters shared by the live endpoints; raises ValueError."""
+    max_age = float(params.get('max_age', LIVE_MAX_AGE))
+    if not math.isfinite(max_age) or max_age <= 0:
+        raise ValueError
+    bbox = params.get('bbox')
+    bbox = [float(value) for value in bbox.split(',')] if bbox else None
+    if bbox is not None:
+        if len(bbox) != 4 or not all(math.isfinite(value) for value in bbox):
+            raise ValueError
+        min_lon, min_lat, max_lon, max_lat = bbox
+        if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+            raise ValueError
+    return max_age, bbox
+
+
+class LiveAircraftViewSet(viewsets.ViewSet):
+    """
+    What is in the sky now, read from the collector's current-picture store
+    rather than the database.
+
+    Optional query parameters:
+      - max_age: only aircraft heard within this many seconds (default DUMP1090_LIVE_MAX_AGE)
+      - bbox: min_lon,min_lat,max_lon,max_lat (min_lon > max_lon crosses the antimeridian)
+
+    Example URL:
+      /dump1090_collector/api/live/?bbox=-1.5,51,0.5,52&max_age=30
+    """
+    authentication_classes = []
+    permission_classes = []
+
+    def list(self, request):
+        try:
+            max_age, bbox = live_params(request.query_params)
+        except ValueError:
+            return Response({"error": LIVE_PARAMS_ERROR}, status=400)
+
+        now = time.time()
+        try:
+            aircraft = get_live_store().current_json(max_age=max_age, bbox=bbox, now=now)
+        except Exception as e:
+            logger.error("Could not read the live picture: %s", e)
+            return Response({"error": "Live picture unavailable."}, status=503)
+        # States come pre-encoded from the store; splice them in rather than
+        # re-serializing hundreds of dicts on every request.
+        body = f'{{"now":{now},"count":{len(aircraft)},"aircraft":[{",".join(aircraft)}]}}'
+        return HttpResponse(body, content_type='application/json')
+
+
+async def live_stream(request):
+    """
+    Server-sent events: the current picture once, then only the aircraft
+    that changed in each poll, limited to an optional bbox. Takes the same
+    max_age and bbox parameters as /api/live/ (max_age applies to the
+    initial snapshot). Needs the ASGI server (the live-web service); under
+    WSGI the stream would tie up a worker per client.
+
+    Example URL:
+      /dump1090_collector/api/live/stream/?bbox=-1.5,51,0.5,52
+    """
+    try:
+        max_age, bbox = live_params(request.GET)
+    except ValueError:
+        return JsonResponse({"error": LIVE_PARAMS_ERROR}, status=400)
+    response = StreamingHttpResponse(live_events(bbox, max_age), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class CoverageViewSet(viewsets.ViewSet):
+    """
+    Receiver coverage binned by the aggregate_coverage job, as parallel
+    columns per layer:
+      - sectors: furthest position per bearing sector
+      - polar: positions and lowest altitude per bearing sector and range ring
+      - grid: positions and lowest altitude per lat/lon cell
+
+    Example URL:
+      /dump1090_collector/api/coverage/
+    """
+
+    def list(self, request):
+        return Response(coverage_summary())
+
+
+def bounded_int(params, name, default, maximum):
+    """Integer query parameter between 1 and ``maximum``; raises ValueError."""
+    value = int(params.get(name, default))
+    if not 1 <= value <= maximum:
+        raise ValueError
+    return value
+
+
+class StatsViewSet(viewsets.ViewSet):
+    """
+    Traffic statistics counted by the aggregate_stats job into summary
+    tables, so they cost the same however much history is stored:
+      - hourly: positions, messages, message rate and distinct aircraft per
+        hour for the last ``hours`` (default 24), plus distinct aircraft over
+        the whole range
+      - airlines, routes: leaderboards by flights (callsign-days) over the
+        last ``days`` (default 7), top ``limit`` (default 10)
+
+    Example URL:
+      /dump1090_collector/api/stats/airlines/?days=30&limit=5
+    """
+
+    @action(detail=False, methods=['get'])
+    def hourly(self, request):
+        try:
+            hours = bounded_int(request.query_params, 'hours', 24, 24 * 366)
+        except ValueError:
+            return Response({"error": "hours must be between 1 and 8784."}, status=400)
+        return Response(hourly_traffic(hours))
+
+    @action(detail=False, methods=['get'])
+    def airlines(self, request):
+        return self.leaderboard(request, airline_leaderboard)
+
+    @action(detail=False, methods=['get'])
+    def routes(self, request):
+        return self.leaderboard(request, route_leaderboard)
+
+    @staticmethod
+    def leaderboard(request, rank):
+        try:
+            days = bounded_int(request.query_params, 'days', 7, 366)
+            limit = bounded_int(request.query_params, 'limit', 10, 100)
+        except ValueError:
+            return Response({"error": "days must be between 1 and 366, limit between 1 and 100."}, status=400)
+        return Response({'days': days, 'results': rank(days, limit)})
+
+
+class IdentityMapStatsViewSet(viewsets.ViewSet):
+    """Hit, miss and eviction counters last published by the collector."""
+
+    def list(self, request):
+        return Response(published_identity_map_stats())
+
+
+def metrics(request):
+    """
+    Prometheus text exposition: ingest stage latencies, upstream requests,
+    enrichment cache hits, queries and aircraft per poll, summed over every
+    collector process, plus each receiver's poll scheduling. 404 while
+    DUMP1090_METRICS_ENABLED is off.
+    """
+    if not METRICS_ENABLED:
+        raise Http404
+    lines = render_metrics(get_metrics_store().read()) + render_poll_metrics(poll_metrics(RECEIVERS))
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class PollStatsViewSet(viewsets.ViewSet):
+    """
+    Per receiver: the last poll's start, latency (smoothed), lag behind its
+    schedule, queue depth and current interval, plus counts of polls, failed
+    polls, ticks skipped while busy or not yet due and stale polls dropped.
+    """
+
+    def list(self, request):
+        return Response(poll_metrics(RECEIVERS))
@@ -19,6 +19,16 @@ else
         exit 1
     else
         echo "'migrate' command completed. Database migrations applied."
+        docker exec "${BACKEND_CONTAINER_NAME}" python manage.py normalize_identifiers
+        if [ $? -ne 0 ]; then
+            echo "Error running 'normalize_identifiers' command. Check the output above for errors."
+            exit 1
+        fi
+        docker exec "${BACKEND_CONTAINER_NAME}" python manage.py build_flights
+        if [ $? -ne 0 ]; then
+            echo "Error running 'build_flights' command. Check the output above for errors."
+            exit 1
+        fi
     fi
 fi
 